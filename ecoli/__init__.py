@@ -1,5 +1,6 @@
 from vivarium.core.registry import (
     divider_registry,
+    emitter_registry,
     updater_registry,
     serializer_registry,
 )
@@ -22,6 +23,7 @@ from ecoli.library.updaters import (
     inverse_update_bulk_numpy,
     inverse_update_unique_numpy
 )
+from ecoli.library.emit_policy import EmitPolicyEmitter
 from ecoli.library.serialize import (
     UnumSerializer, ParameterSerializer,
     NumpyRandomStateSerializer, MethodSerializer)
@@ -49,6 +51,9 @@ divider_registry.register('empty_dict', empty_dict_divider)
 divider_registry.register('ribosome_by_RNA', divide_ribosomes_by_RNA)
 divider_registry.register('set_none', divide_set_none)
 
+# register emitters
+emitter_registry.register('emit_policy', EmitPolicyEmitter)
+
 # register serializers
 for serializer_cls in (
     UnumSerializer, ParameterSerializer,
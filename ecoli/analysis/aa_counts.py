@@ -2,13 +2,13 @@
 Plot amino acid counts
 """
 
-import pickle
 import os
 
 import numpy as np
 from matplotlib import pyplot as plt
 
 from ecoli.composites.ecoli_master import run_ecoli, SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.tablereader import TableReader, read_bulk_molecule_counts
 
 
@@ -21,8 +21,7 @@ class Plot:
 
         self.sim_data = sim_data
         if not sim_data:
-            with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-                self.sim_data = pickle.load(sim_data_file)
+            self.sim_data = get_sim_data(SIM_DATA_PATH)
 
         self.do_plot(self.data)
 
@@ -1,9 +1,9 @@
 import argparse
 import os
-import pickle
 
 from ecoli.composites.ecoli_master import SIM_DATA_PATH
-from ecoli.analysis.db import access
+from ecoli.analysis.query_cache import cached_access
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.compartment_mass_fraction_summary import Plot as CompartmentsMassFraction
 from ecoli.analysis.mass_fraction_summary import Plot as MassFraction
 from ecoli.analysis.mass_fractions_voronoi import Plot as VoronoiMassFraction
@@ -28,8 +28,7 @@ def make_plots(data, experiment_id='ecoli', sim_config=None):
         sim_config = {}
     out_dir = os.path.join(OUT_DIR, str(experiment_id))
 
-    with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-        sim_data = pickle.load(sim_data_file)
+    sim_data = get_sim_data(SIM_DATA_PATH)
 
     # run plots
     for analysis in ANALYSIS:
@@ -46,6 +45,9 @@ def main():
     parser.add_argument(
         '--agent_id', '-a', type=str, default='',
         help='ID of agent. If unspecified, assume single-cell sim.')
+    parser.add_argument(
+        '--refresh', '-r', action='store_true',
+        help='Pull data from the database even if it is cached locally.')
     args = parser.parse_args()
     experiment_id = args.experiment_id
 
@@ -58,7 +60,8 @@ def main():
     ]
     if args.agent_id:
         query = [('agents', args.agent_id) + path for path in query]
-    data, experiment_id, sim_config = access(experiment_id, query)
+    data, experiment_id, sim_config = cached_access(
+        experiment_id, query, refresh=args.refresh)
     if args.agent_id:
         data = {
             time: timepoint['agents'][args.agent_id]
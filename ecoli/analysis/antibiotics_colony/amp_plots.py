@@ -15,6 +15,7 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 from ecoli.analysis.antibiotics_colony import COUNTS_PER_FL_TO_NANOMOLAR
+from ecoli.analysis.antibiotics_colony.sim_dfs import load_sim_df
 from ecoli.analysis.antibiotics_colony.plot_utils import (
     BG_GRAY,
     HIGHLIGHT_BLUE,
@@ -41,14 +42,12 @@ def load_data(
     # Load glc data
     if verbose:
         print("Loading glucose data...")
-    glc_data = pd.read_csv(glc_data, dtype={
-        'Agent ID': str, 'Seed': str}, index_col=0)
+    glc_data = load_sim_df(path=glc_data)
 
     # Load amp data
     if verbose:
         print("Loading ampicillin data...")
-    amp_data = pd.read_csv(amp_data, dtype={
-        'Agent ID': str, 'Seed': str}, index_col=0)
+    amp_data = load_sim_df(path=amp_data)
 
     # Validate data:
     # - glc_data must be in Glucose condition,
@@ -892,13 +891,13 @@ def cli():
     parser.add_argument(
         "glc_data",
         type=str,
-        help="Locally saved dataframe file for data from baseline glucose simulation.",
+        help="Locally saved .npz file for data from baseline glucose simulation.",
     )
 
     parser.add_argument(
         "amp_data",
         type=str,
-        help="Locally saved dataframe file for data following addition of ampicillin.",
+        help="Locally saved .npz file for data following addition of ampicillin.",
     )
 
     parser.add_argument(
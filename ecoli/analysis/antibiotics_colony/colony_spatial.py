@@ -0,0 +1,261 @@
+"""
+Pairwise spatial and phylogenetic analysis of colony snapshots.
+
+Agent IDs are binary strings that grow by one character per division, so
+the phylogenetic distance between two agents is the number of divisions
+separating them: ``len(A) + len(B) - 2 * len(common prefix)``. IDs are
+encoded as arrays of character codes and compared in blocks of pairs
+together with the distances between agent locations. Summaries are
+accumulated in histograms, so all pairs are never held in memory at once.
+"""
+
+import numpy as np
+from scipy.stats import t as t_distribution
+
+
+def encode_lineages(agent_ids):
+    """Encode agent IDs as arrays of character codes
+
+    Returns:
+        Tuple of an array with one row of codes per agent (padded with
+        zeros) and an array of ID lengths.
+    """
+    agent_ids = [str(agent_id) for agent_id in agent_ids]
+    lengths = np.array([len(agent_id) for agent_id in agent_ids], dtype=int)
+    width = max(lengths.max(initial=0), 1)
+    codes = np.array(agent_ids, dtype=f'<U{width}').view(np.uint32)
+    return codes.reshape(len(agent_ids), width), lengths
+
+
+def phylogenetic_distances(codes_a, lengths_a, codes_b, lengths_b):
+    """Number of divisions separating each agent in A from each in B"""
+    match = codes_a[:, np.newaxis, :] == codes_b[np.newaxis, :, :]
+    prefix = np.where(match.all(axis=2), match.shape[2], match.argmin(axis=2))
+    prefix = np.minimum(prefix, np.minimum.outer(lengths_a, lengths_b))
+    return lengths_a[:, np.newaxis] + lengths_b[np.newaxis, :] - 2 * prefix
+
+
+def iter_pairwise(agent_ids, locations, block_size=1024):
+    """Yield phylogenetic and spatial distances for blocks of agent pairs
+
+    Every unordered pair of distinct agents is yielded exactly once.
+
+    Args:
+        agent_ids: Sequence of agent IDs
+        locations: Array of agent locations with one row per agent
+        block_size: Number of agents on each side of a block, so each
+            block holds up to ``block_size ** 2`` pairs.
+    """
+    codes, lengths = encode_lineages(agent_ids)
+    locations = np.asarray(locations, dtype=float)
+    n_agents = len(lengths)
+    for start_a in range(0, n_agents, block_size):
+        end_a = min(start_a + block_size, n_agents)
+        for start_b in range(start_a, n_agents, block_size):
+            end_b = min(start_b + block_size, n_agents)
+            pairs = (np.arange(start_a, end_a)[:, np.newaxis]
+                < np.arange(start_b, end_b)[np.newaxis, :])
+            relatedness = phylogenetic_distances(
+                codes[start_a:end_a], lengths[start_a:end_a],
+                codes[start_b:end_b], lengths[start_b:end_b])
+            distances = np.linalg.norm(
+                locations[start_a:end_a, np.newaxis]
+                - locations[np.newaxis, start_b:end_b], axis=-1)
+            yield relatedness[pairs], distances[pairs]
+
+
+def _histogram_quantiles(counts, bin_width, q, low, high):
+    """Quantiles of values binned in a histogram starting at 0
+
+    Values are assumed to be evenly spread within each bin, so the
+    quantiles are within ``bin_width`` of those of the original values.
+    As in :py:func:`numpy.quantile`, quantiles between two values are
+    linearly interpolated.
+    """
+    cumulative = np.cumsum(counts)
+
+    def order_statistic(ranks):
+        bins = np.searchsorted(cumulative, ranks, side='right')
+        before = cumulative[bins] - counts[bins]
+        return (bins + (ranks - before + 0.5) / counts[bins]) * bin_width
+
+    positions = np.asarray(q) * (cumulative[-1] - 1)
+    below = np.floor(positions)
+    fraction = positions - below
+    values = order_statistic(below) * (1 - fraction) + order_statistic(
+        np.minimum(below + 1, cumulative[-1] - 1)) * fraction
+    return np.clip(values, low, high)
+
+
+def _midranks(counts):
+    return np.cumsum(counts) - (counts - 1) / 2
+
+
+def histogram_spearmanr(counts):
+    """Spearman correlation of the row and column indices of a histogram
+
+    Values that share a row or column are treated as ties.
+
+    Returns:
+        Tuple of the correlation coefficient and its two-sided p-value.
+    """
+    counts = np.asarray(counts, dtype=float)
+    n = counts.sum()
+    mean_rank = (n + 1) / 2
+    row_counts = counts.sum(axis=1)
+    col_counts = counts.sum(axis=0)
+    row_ranks = _midranks(row_counts) - mean_rank
+    col_ranks = _midranks(col_counts) - mean_rank
+    covariance = row_ranks @ counts @ col_ranks
+    r = covariance / np.sqrt(
+        (row_counts * row_ranks ** 2).sum()
+        * (col_counts * col_ranks ** 2).sum())
+    dof = n - 2
+    if abs(r) >= 1:
+        return r, 0.0
+    t = r * np.sqrt(dof / (1 - r ** 2))
+    return r, 2 * t_distribution.sf(abs(t), dof)
+
+
+def relatedness_distance_summary(agent_ids, locations, bin_width=0.01,
+    block_size=1024
+):
+    """Summarize distances between agents by phylogenetic distance
+
+    Distances are binned into histograms for each phylogenetic distance
+    in one pass over all pairs. A second pass collects the outliers,
+    which are the distances more than 1.5 interquartile ranges beyond
+    the quartiles.
+
+    Args:
+        agent_ids: Sequence of agent IDs
+        locations: Array of agent locations with one row per agent
+        bin_width: Width of the distance bins. Quartiles and the Spearman
+            correlation are computed from the binned distances.
+        block_size: See :py:func:`iter_pairwise`.
+
+    Returns:
+        Dictionary with the keys:
+
+        * ``'relatedness'``: Dictionary from each phylogenetic distance
+          with at least one pair to a dictionary with its ``'quartiles'``
+          (25th, 50th, and 75th percentiles), ``'whiskers'`` (the lowest
+          and highest distances that are not outliers), and
+          ``'outliers'`` (array of outlying distances).
+        * ``'spearman'``: Tuple of the Spearman correlation between
+          distance and phylogenetic distance and its p-value. As in the
+          original analysis, phylogenetic distances are ranked as string
+          labels, so e.g. 10 ranks below 2.
+        * ``'n_pairs'``: Number of pairs of agents.
+    """
+    _, lengths = encode_lineages(agent_ids)
+    locations = np.asarray(locations, dtype=float)
+    if len(lengths) < 2:
+        return {'relatedness': {}, 'spearman': (np.nan, np.nan), 'n_pairs': 0}
+    extent = np.linalg.norm(np.ptp(locations, axis=0))
+    n_bins = int(extent // bin_width) + 1
+    n_classes = 2 * lengths.max() + 1
+    histogram = np.zeros(n_classes * n_bins, dtype=np.int64)
+    lowest = np.full(n_classes, np.inf)
+    highest = np.full(n_classes, -np.inf)
+    for relatedness, distances in iter_pairwise(
+            agent_ids, locations, block_size):
+        bins = np.minimum((distances / bin_width).astype(int), n_bins - 1)
+        histogram += np.bincount(
+            relatedness * n_bins + bins, minlength=histogram.size)
+        np.minimum.at(lowest, relatedness, distances)
+        np.maximum.at(highest, relatedness, distances)
+    histogram = histogram.reshape(n_classes, n_bins)
+
+    summary = {}
+    lower_fences = np.full(n_classes, -np.inf)
+    upper_fences = np.full(n_classes, np.inf)
+    for relatedness in np.flatnonzero(histogram.sum(axis=1)):
+        quartiles = _histogram_quantiles(
+            histogram[relatedness], bin_width, [0.25, 0.5, 0.75],
+            lowest[relatedness], highest[relatedness])
+        iqr = quartiles[2] - quartiles[0]
+        lower_fences[relatedness] = quartiles[0] - 1.5 * iqr
+        upper_fences[relatedness] = quartiles[2] + 1.5 * iqr
+        summary[int(relatedness)] = {
+            'quartiles': tuple(quartiles),
+            'whiskers': (
+                max(lower_fences[relatedness], lowest[relatedness]),
+                min(upper_fences[relatedness], highest[relatedness])),
+        }
+
+    outlier_classes = []
+    outliers = []
+    for relatedness, distances in iter_pairwise(
+            agent_ids, locations, block_size):
+        outlying = ((distances < lower_fences[relatedness])
+            | (distances > upper_fences[relatedness]))
+        outlier_classes.append(relatedness[outlying])
+        outliers.append(distances[outlying])
+    outlier_classes = np.concatenate(outlier_classes)
+    outliers = np.concatenate(outliers)
+    for relatedness, class_summary in summary.items():
+        class_summary['outliers'] = outliers[outlier_classes == relatedness]
+
+    label_order = sorted(range(n_classes), key=str)
+    return {
+        'relatedness': summary,
+        'spearman': histogram_spearmanr(histogram[label_order]),
+        'n_pairs': int(histogram.sum()),
+    }
+
+
+def test_relatedness_distance_summary():
+    import os
+    from itertools import combinations
+    import pandas as pd
+    from scipy.stats import spearmanr
+
+    rng = np.random.default_rng(0)
+    agent_ids = ['0']
+    for _ in range(6):
+        agent_ids = [
+            agent_id + daughter
+            for agent_id in agent_ids for daughter in '01']
+    agent_ids = list(rng.choice(agent_ids, 40, replace=False)) + ['1', '10']
+    locations = rng.uniform(0, 20, (len(agent_ids), 2))
+
+    relatednesses = []
+    distances = []
+    for a, b in combinations(range(len(agent_ids)), 2):
+        prefix = os.path.commonprefix([agent_ids[a], agent_ids[b]])
+        relatednesses.append(
+            len(agent_ids[a]) + len(agent_ids[b]) - 2 * len(prefix))
+        distances.append(np.linalg.norm(locations[a] - locations[b]))
+    relatednesses = np.array(relatednesses)
+    distances = np.array(distances)
+
+    # blocks cover each pair exactly once
+    blocks = list(iter_pairwise(agent_ids, locations, block_size=16))
+    assert len(blocks) == 6
+    assert sum(len(block[0]) for block in blocks) == len(distances)
+
+    bin_width = 0.001
+    summary = relatedness_distance_summary(
+        agent_ids, locations, bin_width=bin_width, block_size=16)
+    assert summary['n_pairs'] == len(distances)
+    assert set(summary['relatedness']) == set(relatednesses)
+    for relatedness, class_summary in summary['relatedness'].items():
+        class_distances = distances[relatednesses == relatedness]
+        np.testing.assert_allclose(
+            class_summary['quartiles'],
+            np.quantile(class_distances, [0.25, 0.5, 0.75]),
+            atol=bin_width)
+        q1, _, q3 = class_summary['quartiles']
+        outliers = class_distances[
+            (class_distances < q1 - 1.5 * (q3 - q1))
+            | (class_distances > q3 + 1.5 * (q3 - q1))]
+        np.testing.assert_allclose(
+            np.sort(class_summary['outliers']), np.sort(outliers))
+
+    # same as the original analysis, which ranked relatedness labels
+    df = pd.DataFrame({
+        'Distance': distances, 'Relatedness': relatednesses.astype(np.str_)})
+    r, p = spearmanr(df['Distance'], df['Relatedness'])
+    assert np.isclose(summary['spearman'][0], r, atol=1e-3)
+    assert np.isclose(summary['spearman'][1], p, atol=1e-3)
@@ -1,52 +1,90 @@
 import argparse
 import json
 import os
-from concurrent.futures import ProcessPoolExecutor
-from functools import partial
 
-import pandas as pd
-from tqdm import tqdm
-from vivarium.library.dict_utils import get_value_from_path
+import numpy as np
 
 from ecoli.analysis.antibiotics_colony import (EXPERIMENT_ID_MAPPING,
                                                PATHS_TO_LOAD)
-from ecoli.analysis.db import access_counts, deserialize_and_remove_units
+from ecoli.analysis.antibiotics_colony.sim_dfs import (SIM_DFS_DIR,
+                                                       metadata_path,
+                                                       save_sim_df)
+from ecoli.analysis.query_cache import cached_access_counts
 
 
-def agent_data_table(raw_data, paths_dict, condition, seed):
-    """Combine data from all agents into DataFrames for each timestep.
+def agent_data_columns(rep_data, paths_dict):
+    """Collect data from all agents at all times into columns.
+
+    Each path is looked up one key at a time across all agents at once,
+    and columns of numbers are stored as typed arrays.
 
     Args:
-        raw_data: Tuple of (time, dictionary at time for one replicate).
+        rep_data: Dictionary of data at each time for one replicate.
         paths_dict: Dictionary mapping paths within each agent to names
             that will be used the keys in the returned dictionary.
-        condition: String identifier for experimental condition
-        seed: Initial seed for this replicate
 
     Returns:
-        Dataframe where each column is a path and each row is an agent."""
-    time = raw_data[0]
-    raw_data = raw_data[1]
-    collected_data = {'Agent ID': []}
-    agents_at_time = raw_data['agents']
-    for agent_id, agent_at_time in agents_at_time.items():
-        collected_data['Agent ID'].append(agent_id)
-        for name, path in paths_dict.items():
-            value_in_agent = get_value_from_path(agent_at_time, path)
-            # Replace missing values with 0
-            if value_in_agent is None:
-                value_in_agent = 0
-            path_data = collected_data.setdefault(name, [])
-            path_data.append(value_in_agent)
-    collected_data = pd.DataFrame(collected_data)
-    collected_data['Time'] = [time] * len(collected_data)
-    collected_data['Seed'] = [seed] * len(collected_data)
-    collected_data['Condition'] = [condition] * len(collected_data)
-    return collected_data
+        Dictionary of arrays (or lists, for nested values) with one value
+        per agent per time, including ``Time`` and ``Agent ID``."""
+    agents_at_times = [
+        data_at_time['agents'] for data_at_time in rep_data.values()]
+    agent_states = [
+        agent_at_time for agents in agents_at_times
+        for agent_at_time in agents.values()]
+    columns = {
+        'Time': np.repeat(
+            np.asarray(list(rep_data)),
+            [len(agents) for agents in agents_at_times]),
+        'Agent ID': np.asarray([
+            agent_id for agents in agents_at_times for agent_id in agents],
+            dtype=str),
+    }
+    for name, path in paths_dict.items():
+        values = agent_states
+        for key in path:
+            values = [
+                value.get(key) if isinstance(value, dict) else None
+                for value in values]
+        # Replace missing values with 0
+        values = [0 if value is None else value for value in values]
+        try:
+            array = np.asarray(values)
+        except ValueError:
+            array = None
+        if array is not None and array.ndim == 1 and (
+                array.dtype.kind in 'biuf'):
+            columns[name] = array
+        else:
+            columns[name] = values
+    return columns
+
+
+def test_agent_data_columns():
+    rep_data = {
+        0.0: {'agents': {
+            '0': {'listeners': {'mass': {'dry_mass': 300.0}},
+                'bulk': {'A[c]': 3}},
+            '1': {'listeners': {'mass': {'dry_mass': 310.0}}}}},
+        2.0: {'agents': {
+            '00': {'listeners': {'mass': {'dry_mass': 160.0}},
+                'bulk': {'A[c]': 1},
+                'boundary': {'location': [1.0, 2.0]}}}},
+    }
+    columns = agent_data_columns(rep_data, {
+        'Dry mass': ('listeners', 'mass', 'dry_mass'),
+        'A': ('bulk', 'A[c]'),
+        'Location': ('boundary', 'location')})
+    assert columns['Time'].tolist() == [0.0, 0.0, 2.0]
+    assert columns['Agent ID'].tolist() == ['0', '1', '00']
+    assert columns['Dry mass'].dtype == np.float64
+    assert columns['Dry mass'].tolist() == [300.0, 310.0, 160.0]
+    assert columns['A'].dtype.kind == 'i'
+    assert columns['A'].tolist() == [3, 0, 1]
+    assert columns['Location'] == [0, 0, [1.0, 2.0]]
 
 
 def load_data(experiment_id=None, cpus=8, sampling_rate=2,
-    host="10.138.0.75", port=27017
+    host="10.138.0.75", port=27017, refresh=False
 ):
     # Get data for the specified experiment_id
     monomers = [path[-1] for path in PATHS_TO_LOAD.values() if path[0]=='monomer']
@@ -60,7 +98,9 @@ def load_data(experiment_id=None, cpus=8, sampling_rate=2,
             if curr_experiment_id != experiment_id:
                 continue
             metadata = {condition: {seed: {}}}
-            rep_data = access_counts(
+            # deserialized data is cached locally, so it is only pulled
+            # from the database once
+            rep_data = cached_access_counts(
                 experiment_id=experiment_id,
                 monomer_names=monomers,
                 mrna_names=mrnas,
@@ -72,13 +112,9 @@ def load_data(experiment_id=None, cpus=8, sampling_rate=2,
                 sampling_rate=sampling_rate,
                 cpus=cpus,
                 start_time=0,
-                end_time=26000)
-            with ProcessPoolExecutor(cpus) as executor:
-                print('Deserializing data and removing units...')
-                deserialized_data = list(tqdm(executor.map(
-                    deserialize_and_remove_units, rep_data.values()),
-                    total=len(rep_data)))
-            rep_data = dict(zip(rep_data.keys(), deserialized_data))
+                end_time=26000,
+                deserialize=True,
+                refresh=refresh)
             # Get spatial environment data for snapshot plots
             print('Extracting spatial environment data...')
             metadata[condition][seed]['bounds'] = rep_data[
@@ -87,20 +123,11 @@ def load_data(experiment_id=None, cpus=8, sampling_rate=2,
                 time: data_at_time['fields']
                 for time, data_at_time in rep_data.items()
             }
-            agent_df_paths = partial(agent_data_table,
-                paths_dict=PATHS_TO_LOAD, condition=condition, seed=seed)
-            with ProcessPoolExecutor(cpus) as executor:
-                print('Converting data to DataFrame...')
-                rep_dfs = list(tqdm(executor.map(
-                    agent_df_paths, rep_data.items()),
-                    total=len(rep_data)))
-            # Save data for each experiment as local csv
-            pd.concat(rep_dfs).to_csv(
-                f'data/colony_data/sim_dfs/{experiment_id}.csv')
-            with open(f'data/colony_data/sim_dfs{experiment_id}_metadata.json',
-                'wb'
-            ) as f:
-                json.dump(metadata, f)
+            print('Saving agent data...')
+            columns = agent_data_columns(rep_data, PATHS_TO_LOAD)
+            save_sim_df(columns, condition, seed)
+            with open(metadata_path(condition, seed), 'w') as f:
+                json.dump(metadata, f, default=np.ndarray.tolist)
 
 
 def main():
@@ -118,9 +145,15 @@ def main():
         help="# of CPUs to use for deserializing",
         required=True,
     )
+    parser.add_argument(
+        "--refresh",
+        "-r",
+        action="store_true",
+        help="Pull data from the database even if it is cached locally",
+    )
     args = parser.parse_args()
-    os.makedirs('data/colony_data/sim_dfs/', exist_ok=True)
-    load_data(args.experiment_id, cpus=args.cpus)
+    os.makedirs(SIM_DFS_DIR, exist_ok=True)
+    load_data(args.experiment_id, cpus=args.cpus, refresh=args.refresh)
 
 if __name__ == '__main__':
     main()
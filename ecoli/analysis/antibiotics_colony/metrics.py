@@ -1,4 +1,3 @@
-import ast
 import os
 
 import numpy as np
@@ -6,10 +5,26 @@ import pandas as pd
 from scipy.stats import variation
 
 from ecoli.analysis.antibiotics_colony import COUNTS_PER_FL_TO_NANOMOLAR
-
-GLUCOSE_DATA = "data/colony_data/sim_dfs/2022-12-08_00-35-28_562633+0000.csv"
-TET_DATA = "data/colony_data/sim_dfs/2023-01-05_01-00-44_215314+0000.csv"
-AMP_DATA = "data/colony_data/sim_dfs/2022-12-08_17-03-56_357734+0000.csv"
+from ecoli.analysis.antibiotics_colony.sim_dfs import load_sim_df
+
+GLUCOSE_EXPERIMENT_ID = "2022-12-08_00-35-28_562633+0000"
+TET_EXPERIMENT_ID = "2023-01-05_01-00-44_215314+0000"
+AMP_EXPERIMENT_ID = "2022-12-08_17-03-56_357734+0000"
+# Columns used to calculate each set of metrics
+GLUCOSE_COLUMNS = [
+    "ompF mRNA", "tolC mRNA", "ampC mRNA", "marR mRNA",
+    "OmpF monomer", "TolC monomer", "AmpC monomer", "MarR monomer",
+]
+TET_COLUMNS = [
+    "Volume", "OmpF complex", "AcrAB-TolC", "Active ribosomes",
+    "micF-ompF duplex", "Outer tet. permeability (cm/s)",
+    "Periplasmic tetracycline", "Cytoplasmic tetracycline",
+    "OmpF monomer", "ompF mRNA",
+]
+AMP_COLUMNS = [
+    "Volume", "AmpC monomer", "Periplasmic ampicillin",
+    "Active fraction PBP1a", "Active fraction PBP1b",
+]
 PERIPLASMIC_VOLUME_FRACTION = 0.2
 
 
@@ -320,26 +335,17 @@ def calculate_amp_metrics(data,
 def main():
     os.makedirs("out/analysis/paper_figures/metrics/", exist_ok=True)
     print("Calculating glucose metrics...")
-    glc_data = pd.read_csv(GLUCOSE_DATA,
-        dtype={'Agent ID': str, 'Seed': str}, index_col=0)
-    glc_data['Boundary'] = glc_data['Boundary'].apply(
-        ast.literal_eval)
+    glc_data = load_sim_df(GLUCOSE_EXPERIMENT_ID, columns=GLUCOSE_COLUMNS)
     calculate_glucose_metrics(glc_data)
     del glc_data
 
     print("Calculating tetracycline metrics...")
-    tet_data = pd.read_csv(TET_DATA,
-        dtype={'Agent ID': str, 'Seed': str}, index_col=0)
-    tet_data['Boundary'] = tet_data['Boundary'].apply(
-        ast.literal_eval)
+    tet_data = load_sim_df(TET_EXPERIMENT_ID, columns=TET_COLUMNS)
     calculate_tet_metrics(tet_data)
     del tet_data
 
     print("Calculating ampicillin metrics...")
-    amp_data = pd.read_csv(AMP_DATA,
-        dtype={'Agent ID': str, 'Seed': str}, index_col=0)
-    amp_data['Boundary'] = amp_data['Boundary'].apply(
-        ast.literal_eval)
+    amp_data = load_sim_df(AMP_EXPERIMENT_ID, columns=AMP_COLUMNS)
     calculate_amp_metrics(amp_data)
     del amp_data
 
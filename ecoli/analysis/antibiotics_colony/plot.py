@@ -4,7 +4,7 @@ Before running, extract colony_data.zip in the "data" folder.
 Mapping between filenames in "colony_data/sim_dfs" folder and
 simulation conditions in ecoli/analysis/antibiotics_colony/__init__.py.
 The __init__ file also constructs a dictionary of all columns in the saved
-CSV files (and gives their paths in the simulation store hierarchy).
+.npz files (and gives their paths in the simulation store hierarchy).
 
 Refer to these other scripts for the code to create remaining figures:
     - ecoli/analysis/antibiotics_colony/subgen_gene_plots/
@@ -12,14 +12,14 @@ Refer to these other scripts for the code to create remaining figures:
             - Run with "--data data/colony_data/glc_10000_expressome.csv"
         - make_fig_1b.py: create Fig. 1B
     - ecoli/analysis/antibiotics_colony/snapshot_and_hist_plot.py: Fig. 2E-F
-        - Run with "--local data/colony_data/2022-12-08_00-35-28_562633+0000.csv"
+        - Run with "--local data/colony_data/sim_dfs/Glucose/seed_10000.npz"
     - ecoli/analysis/antibiotics_colony/tet_dry_mass.py: Fig. 3E
     - ecoli/analysis/antibiotics_colony/amp_plots.py: Fig. 4D-J, L
-        - Run with "--glc_data data/colony_data/2022-12-08_00-33-56_581605+0000.csv"
-          and "--amp_data data/colony_data/2022-12-08_17-03-56_357734+0000.csv"
+        - Run with "data/colony_data/sim_dfs/Glucose/seed_0.npz"
+          and "data/colony_data/sim_dfs/Ampicillin_2_mg_L/seed_0.npz"
     - ecoli/analysis/antibiotics_colony/spatial_autocorrelation.py: Fig. S4
-        - Run with "data/colony_data/sim_dfs/2022-12-08_00-35-28_562633+0000.csv"
-        - Repeat with CSV files for other two baseline glucose simulations
+        - Run with "data/colony_data/sim_dfs/Glucose/seed_10000.npz"
+        - Repeat with .npz files for other two baseline glucose simulations
           to get all Moran's I and p-values in Table S1
     - ecoli/analysis/proteinCountsValidation.py: Fig. S2A
         - Run with "--avg_data data/colony_data/glc_10000_proteome_avgs.csv"
@@ -27,7 +27,6 @@ Refer to these other scripts for the code to create remaining figures:
         - Run with "--numpy_data data/colony_data/glc_10000_fluxome.csv" and
           "--sim_df data/colony_data/2022-12-08_00-35-28_562633+0000.csv"
 """
-import ast
 import argparse
 import os
 from itertools import combinations
@@ -45,6 +44,9 @@ from ecoli.analysis.antibiotics_colony import (COUNTS_PER_FL_TO_NANOMOLAR,
                                                DE_GENES, EXPERIMENT_ID_MAPPING,
                                                MAX_TIME, SPLIT_TIME,
                                                restrict_data)
+from ecoli.analysis.antibiotics_colony.sim_dfs import (find_partition,
+                                                       load_sim_df,
+                                                       metadata_path)
 from ecoli.analysis.antibiotics_colony.exploration import (
     plot_exp_growth_rate, plot_ampc_phylo)
 from ecoli.analysis.antibiotics_colony.timeseries import (plot_field_snapshots,
@@ -1007,22 +1009,25 @@ def make_figure_s10(data, metadata):
     print('Done with Figure S10.')
 
 
-def load_exp_data(experiment_ids):
+def load_exp_data(experiment_ids, columns=None):
+    # columns needed below that are dropped again if not requested
+    extra_columns = []
+    if columns is not None:
+        extra_columns = [
+            name for name in ('Dry mass', 'Boundary') if name not in columns]
+        columns = list(columns) + extra_columns
     data = []
     metadata = {}
     for exp_id in experiment_ids:
-        exp_data = pd.read_csv(f'data/colony_data/sim_dfs/{exp_id}.csv',
-            dtype={'Agent ID': str, 'Seed': str}, index_col=0)
+        condition, seed = find_partition(exp_id)
+        exp_data = load_sim_df(
+            condition=condition, seed=seed, columns=columns)
         if exp_data.loc[:, 'Dry mass'].iloc[-1]==0:
             exp_data = exp_data.iloc[:-1, :]
         data.append(exp_data)
-        with open(f'data/colony_data/sim_dfs/{exp_id}_metadata.json',
-            'r'
-        ) as f:
+        with open(metadata_path(condition, seed), 'r') as f:
             metadata = deep_merge(metadata, json.load(f))
     data = pd.concat(data)
-    # Convert strings to dictionaries
-    data['Boundary'] = data['Boundary'].apply(ast.literal_eval)
     initial_external_tet = []
     initial_external_amp = []
     for condition in data['Condition'].unique():
@@ -1049,6 +1054,7 @@ def load_exp_data(experiment_ids):
             initial_external_amp += [0] * len(cond_data)
     data['Initial external tet.'] = initial_external_tet
     data['Initial external amp.'] = initial_external_amp
+    data = data.drop(columns=extra_columns)
     return data, metadata
 
 
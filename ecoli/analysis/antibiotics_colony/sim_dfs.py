@@ -0,0 +1,237 @@
+"""
+Typed columnar storage for colony simulation data.
+
+Each condition and seed is saved as a compressed ``.npz`` file under
+``data/colony_data/sim_dfs/{condition}/seed_{seed}.npz`` with one array
+per column. Nested values such as ``Boundary`` are flattened into numeric
+columns named by their path (e.g. ``Boundary/location/0``), and the
+nested layout is saved with the data so the original column can be
+rebuilt. Columns are decompressed only when they are loaded.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from ecoli.analysis.antibiotics_colony import EXPERIMENT_ID_MAPPING
+
+
+SIM_DFS_DIR = 'data/colony_data/sim_dfs'
+SEPARATOR = '/'
+#: Columns that are always loaded
+INDEX_COLUMNS = ['Time', 'Agent ID']
+#: Columns that are added from the partition metadata
+METADATA_COLUMNS = ['Seed', 'Condition']
+LAYOUT_KEY = '__layout__'
+
+
+def partition_path(condition, seed, out_dir=SIM_DFS_DIR):
+    condition_dir = re.sub(r'[^A-Za-z0-9.]+', '_', condition).strip('_')
+    return os.path.join(out_dir, condition_dir, f'seed_{seed}.npz')
+
+
+def metadata_path(condition, seed, out_dir=SIM_DFS_DIR):
+    """Path of the JSON file with environment data for a partition"""
+    return os.path.splitext(
+        partition_path(condition, seed, out_dir))[0] + '_metadata.json'
+
+
+def find_partition(experiment_id):
+    """Get the condition and seed of an experiment"""
+    for condition, seeds in EXPERIMENT_ID_MAPPING.items():
+        for seed, curr_experiment_id in seeds.items():
+            if curr_experiment_id == experiment_id:
+                return condition, seed
+    raise KeyError(f'{experiment_id} is not in EXPERIMENT_ID_MAPPING')
+
+
+def _is_sequence(value):
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+def flatten_column(name, values):
+    """Split a column of nested values into typed arrays
+
+    Dictionaries are split by key and sequences of equal length by index.
+    Rows that are missing a nested value hold 0.
+
+    Returns:
+        Tuple of a dictionary of arrays keyed by column name and the
+        layout of the column: the name of an array, or a dictionary with
+        the ``type`` (``'dict'`` or ``'list'``) and layouts of ``items``.
+    """
+    if any(isinstance(value, dict) for value in values):
+        keys = {}
+        for value in values:
+            if isinstance(value, dict):
+                keys.update(dict.fromkeys(value))
+        arrays = {}
+        items = {}
+        for key in keys:
+            arrays_for_key, items[key] = flatten_column(
+                f'{name}{SEPARATOR}{key}', [
+                    value.get(key, 0) if isinstance(value, dict) else 0
+                    for value in values])
+            arrays.update(arrays_for_key)
+        return arrays, {'type': 'dict', 'items': items}
+
+    sequences = [value for value in values if _is_sequence(value)]
+    if sequences and all(
+        _is_sequence(value) or value == 0 for value in values
+    ):
+        lengths = {len(value) for value in sequences}
+        if len(lengths) == 1:
+            missing = [0] * lengths.pop()
+            array = np.asarray([
+                value if _is_sequence(value) else missing
+                for value in values])
+            if array.ndim == 2 and array.dtype.kind in 'biuf':
+                arrays = {}
+                items = []
+                for index in range(array.shape[1]):
+                    index_name = f'{name}{SEPARATOR}{index}'
+                    arrays[index_name] = array[:, index]
+                    items.append(index_name)
+                return arrays, {'type': 'list', 'items': items}
+
+    try:
+        array = np.asarray(values) if values else np.zeros(0)
+    except ValueError:
+        array = None
+    if array is None or array.ndim != 1 or array.dtype.kind not in 'biufU':
+        # ragged or non-numeric values are kept as objects
+        array = np.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            array[index] = value
+    return {name: array}, name
+
+
+def _rebuild(layout, arrays):
+    """Rebuild the nested values of a column from its flattened arrays"""
+    if isinstance(layout, str):
+        return arrays[layout].tolist()
+    if layout['type'] == 'list':
+        items = [_rebuild(item, arrays) for item in layout['items']]
+        return [list(row) for row in zip(*items)]
+    keys = list(layout['items'])
+    items = [_rebuild(layout['items'][key], arrays) for key in keys]
+    return [dict(zip(keys, row)) for row in zip(*items)]
+
+
+def _leaves(layout):
+    if isinstance(layout, str):
+        return [layout]
+    items = layout['items']
+    if isinstance(items, dict):
+        items = items.values()
+    return [leaf for item in items for leaf in _leaves(item)]
+
+
+def save_sim_df(columns, condition, seed, out_dir=SIM_DFS_DIR):
+    """Save columns of agent data for one condition and seed
+
+    Args:
+        columns: Dictionary of lists or arrays with one value per agent
+            per time, including ``Time`` and ``Agent ID``.
+        condition: String identifier for experimental condition
+        seed: Initial seed for this replicate
+
+    Returns:
+        The path of the saved file
+    """
+    arrays = {}
+    layout = {}
+    for name, values in columns.items():
+        column_arrays, layout[name] = flatten_column(name, list(values))
+        arrays.update(column_arrays)
+    arrays['Agent ID'] = np.asarray(columns['Agent ID'], dtype=str)
+    meta = {'condition': condition, 'seed': seed, 'columns': layout}
+    path = partition_path(condition, seed, out_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(
+        path, **{LAYOUT_KEY: np.array(json.dumps(meta))}, **arrays)
+    return path
+
+
+def load_sim_df(experiment_id=None, condition=None, seed=None, path=None,
+    columns=None, out_dir=SIM_DFS_DIR
+):
+    """Load agent data saved by :py:func:`save_sim_df` as a DataFrame
+
+    The data is found by experiment ID, by condition and seed, or by path.
+
+    Args:
+        columns: Columns to load in addition to ``Time``, ``Agent ID``,
+            ``Condition``, and ``Seed``. These can be saved columns, which
+            are rebuilt with their nested values, or flattened columns
+            such as ``Boundary/location/0``. If None, all saved columns
+            are loaded.
+    """
+    if path is None:
+        if experiment_id is not None:
+            condition, seed = find_partition(experiment_id)
+        path = partition_path(condition, seed, out_dir)
+    with np.load(path, allow_pickle=True) as data:
+        meta = json.loads(data[LAYOUT_KEY][()])
+        layout = meta['columns']
+        if columns is None:
+            columns = list(layout)
+        names = INDEX_COLUMNS + [
+            name for name in columns
+            if name not in INDEX_COLUMNS + METADATA_COLUMNS]
+        frame = {}
+        for name in names:
+            if name in layout and not isinstance(layout[name], str):
+                arrays = {leaf: data[leaf] for leaf in _leaves(layout[name])}
+                frame[name] = _rebuild(layout[name], arrays)
+            else:
+                frame[name] = data[name]
+    frame = pd.DataFrame(frame)
+    frame['Seed'] = str(meta['seed'])
+    frame['Condition'] = meta['condition']
+    return frame
+
+
+def test_sim_dfs():
+    import tempfile
+
+    columns = {
+        'Time': [0.0, 0.0, 2.0],
+        'Agent ID': ['0', '1', '0'],
+        'Volume': [1.0, 1.2, 1.1],
+        'Boundary': [
+            {'location': [1.0, 2.0], 'external': {'tetracycline': 0.0}},
+            {'location': [3.0, 4.0], 'external': {'tetracycline': 0.5}},
+            0,
+        ],
+        'Max hole size': [[1, 2], [3], []],
+    }
+    with tempfile.TemporaryDirectory() as out_dir:
+        path = save_sim_df(
+            columns, 'Tetracycline (1.5 mg/L)', 0, out_dir)
+        assert path == os.path.join(
+            out_dir, 'Tetracycline_1.5_mg_L', 'seed_0.npz')
+
+        data = load_sim_df(path=path)
+        assert list(data['Agent ID']) == ['0', '1', '0']
+        assert list(data['Seed']) == ['0'] * 3
+        assert data['Volume'].dtype == np.float64
+        assert data['Boundary'][1] == {
+            'location': [3.0, 4.0], 'external': {'tetracycline': 0.5}}
+        assert data['Boundary'][2] == {
+            'location': [0, 0], 'external': {'tetracycline': 0}}
+        assert data['Max hole size'][0] == [1, 2]
+
+        # only the requested columns are loaded
+        data = load_sim_df(
+            condition='Tetracycline (1.5 mg/L)', seed=0,
+            columns=['Boundary/location/0', 'Seed', 'Condition'],
+            out_dir=out_dir)
+        assert list(data.columns) == [
+            'Time', 'Agent ID', 'Boundary/location/0', 'Seed', 'Condition']
+        np.testing.assert_array_equal(
+            data['Boundary/location/0'], [1.0, 3.0, 0])
+        assert list(data['Condition']) == ['Tetracycline (1.5 mg/L)'] * 3
@@ -1,5 +1,4 @@
 import argparse
-import ast
 import concurrent.futures
 import os
 import warnings
@@ -24,6 +23,7 @@ from ecoli.analysis.db import access_counts, deserialize_and_remove_units
 from ecoli.plots.snapshots import format_snapshot_data, get_tag_ranges, plot_tags
 
 from ecoli.analysis.antibiotics_colony import COUNTS_PER_FL_TO_NANOMOLAR, PATHS_TO_LOAD
+from ecoli.analysis.antibiotics_colony.sim_dfs import load_sim_df
 
 
 PERIPLASMIC_VOLUME_FRACTION = 0.2
@@ -286,7 +286,7 @@ def main():
         "-l",
         default=None,
         type=str,
-        help="Locally saved dataframe file to run the plots on (if provided). "
+        help="Locally saved .npz file to run the plots on (if provided). "
         "Setting this option overrides database options (experiment_id, host, port).",
     )
     parser.add_argument("--cpus", "-c", type=int, default=1)
@@ -309,11 +309,6 @@ def main():
 
     if args.local:
         # Load data
-        data = pd.read_csv(args.local, dtype={
-            'Agent ID': str, 'Seed': str}, index_col=0)
-        # Convert string to dictionary
-        data['Boundary'] = data['Boundary'].apply(ast.literal_eval)
-
         # Get only desired columns
         paths_to_columns = {v: k for k, v in PATHS_TO_LOAD.items() if v in molecules}
         for missing in [p for p in molecules if p not in paths_to_columns]:
@@ -328,6 +323,7 @@ def main():
             "Boundary",
             *paths_to_columns.values(),
         ]
+        data = load_sim_df(path=args.local, columns=keep_columns)
         data = data[keep_columns]
 
         # Load metadata
@@ -1,13 +1,9 @@
 import argparse
-import ast
 import os
-from itertools import combinations
 
 import matplotlib
 import numpy as np
-import pandas as pd
 import seaborn as sns
-from scipy.stats import spearmanr
 from esda.moran import Moran
 from libpysal.weights import DistanceBand
 from splot.esda import plot_moran
@@ -16,22 +12,27 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 from ecoli.analysis.antibiotics_colony import COUNTS_PER_FL_TO_NANOMOLAR
+from ecoli.analysis.antibiotics_colony.colony_spatial import (
+    relatedness_distance_summary)
 from ecoli.analysis.antibiotics_colony.amp_plots import PERIPLASMIC_VOLUME_FRACTION
+from ecoli.analysis.antibiotics_colony.sim_dfs import load_sim_df
+
+LOCATION_COLUMNS = ["Boundary/location/0", "Boundary/location/1"]
+# Columns used by the plots in this module
+COLUMNS = LOCATION_COLUMNS + [
+    "Volume", "OmpF monomer", "MarR monomer", "TolC monomer", "AmpC monomer"]
 
 
 def make_spatial_correlation_plot(glc_data, column, to_conc=False):
     # Filter to just last snapshot
     max_t = glc_data.Time.max()
-    data = glc_data[glc_data.Time == max_t][["Boundary", "Volume", column]]
+    data = glc_data[glc_data.Time == max_t][
+        LOCATION_COLUMNS + ["Volume", column]]
 
     if to_conc:
         data[column] = data[column] * COUNTS_PER_FL_TO_NANOMOLAR / data["Volume"]
 
-    location = data["Boundary"].apply(lambda b: np.array(b["location"]))
-    data["X"] = location.apply(lambda l: l[0])
-    data["Y"] = location.apply(lambda l: l[1])
-
-    location = data[["X", "Y"]].values
+    location = data[LOCATION_COLUMNS].values
 
     weights = DistanceBand(location, 3, alpha=-2.0, binary=False)
     moran = Moran(data[column], weights, permutations=9999)
@@ -44,16 +45,13 @@ def make_spatial_correlation_plot(glc_data, column, to_conc=False):
 def make_threshold_sweep_plot(glc_data, column, to_conc=False):
     # Filter to just last snapshot
     max_t = glc_data.Time.max()
-    data = glc_data[glc_data.Time == max_t][["Boundary", "Volume", column]]
+    data = glc_data[glc_data.Time == max_t][
+        LOCATION_COLUMNS + ["Volume", column]]
 
     if to_conc:
         data[column] = data[column] * COUNTS_PER_FL_TO_NANOMOLAR / data["Volume"]
 
-    location = data["Boundary"].apply(lambda b: np.array(b["location"]))
-    data["X"] = location.apply(lambda l: l[0])
-    data["Y"] = location.apply(lambda l: l[1])
-
-    location = data[["X", "Y"]].values
+    location = data[LOCATION_COLUMNS].values
 
     thresholds = np.linspace(0, 50, 50)
     i_values = []
@@ -78,49 +76,27 @@ def make_threshold_sweep_plot(glc_data, column, to_conc=False):
 
 
 def make_relatedness_vs_distance_plot(glc_data):
-    def relatedness(A, B):
-        common_ancestor = os.path.commonprefix([A, B])
-        return len(A) + len(B) - 2 * len(common_ancestor)
-
     max_t = glc_data.Time.max()
     endpoint_data = glc_data[glc_data.Time == max_t]
-    endpoint_data.loc[:, "Location"] = endpoint_data["Boundary"].apply(
-        lambda b: np.array(b["location"])
-    )
-    final_agents = {
-        agent: location
-        for agent, location in zip(endpoint_data["Agent ID"], endpoint_data["Location"])
-    }
-
-    relatednesses = []
-    distances = []
-    for A, B in combinations(final_agents.keys(), 2):
-        relatednesses.append(relatedness(A, B))
-        distances.append(np.linalg.norm(final_agents[A] - final_agents[B]))
+    summary = relatedness_distance_summary(
+        endpoint_data["Agent ID"], endpoint_data[LOCATION_COLUMNS].values)
 
     # Order relatedness from most (bottom) to least (top)
-    order = [str(i) for i in list(range(19))[:1:-1]]
-    df = pd.DataFrame({'Distance': np.array(distances), 'Relatedness': np.array(relatednesses, dtype=np.str_)})
+    order = list(range(19))[:1:-1]
     fig, ax = plt.subplots(figsize=(3,3))
     for relatedness_score in order:
-        filtered_dist = df.loc[df.loc[:, 'Relatedness']==relatedness_score, 'Distance']
-        quantiles = np.quantile(filtered_dist, [0.25, 0.50, 0.75])
+        if relatedness_score not in summary['relatedness']:
+            continue
+        class_summary = summary['relatedness'][relatedness_score]
+        quantiles = class_summary['quartiles']
         median = quantiles[1]
-        iqr = quantiles[2] - quantiles[0]
-        lower_bound = quantiles[0] - 1.5*iqr
-        lower_outliers = filtered_dist[filtered_dist < lower_bound]
-        if len(lower_outliers) == 0:
-            lower_bound = filtered_dist.min()
-        upper_bound = quantiles[2] + 1.5*iqr
-        upper_outliers = filtered_dist[filtered_dist > upper_bound]
-        if len(upper_outliers) == 0:
-            upper_bound = filtered_dist.max()
-        
-        ax.hlines(int(relatedness_score), lower_bound, upper_bound, colors=['k'], linewidth=1, zorder=1)
-        ax.hlines(int(relatedness_score), quantiles[0], quantiles[2], colors=['k'], linewidth=3, zorder=2)
-        ax.scatter(median, int(relatedness_score), c='w', s=2, zorder=3)
-        ax.scatter(upper_outliers, [int(relatedness_score)]*len(upper_outliers), s=4, c='k', marker='d')
-        ax.scatter(lower_outliers, [int(relatedness_score)]*len(lower_outliers), s=4, c='k', marker='d')
+        lower_bound, upper_bound = class_summary['whiskers']
+        outliers = class_summary['outliers']
+
+        ax.hlines(relatedness_score, lower_bound, upper_bound, colors=['k'], linewidth=1, zorder=1)
+        ax.hlines(relatedness_score, quantiles[0], quantiles[2], colors=['k'], linewidth=3, zorder=2)
+        ax.scatter(median, relatedness_score, c='w', s=2, zorder=3)
+        ax.scatter(outliers, [relatedness_score]*len(outliers), s=4, c='k', marker='d')
     ax.set_xlabel('Distance (\u03BCm)', fontsize=9)
     ax.set_ylabel('Phylogenetic distance', fontsize=9)
     ax.set_yticks([3,6,9,12,15,18], [3,6,9,12,15,18], fontsize=8)
@@ -128,7 +104,7 @@ def make_relatedness_vs_distance_plot(glc_data):
     sns.despine(ax=ax)
     plt.tight_layout()
 
-    r, p = spearmanr(df['Distance'], df['Relatedness'])
+    r, p = summary['spearman']
     print(f'Relatedness vs distance: Spearman r = {r}, p = {p}')
 
     return fig, ax
@@ -141,10 +117,7 @@ def load_data(
     # Load glc data
     if verbose:
         print("Loading Glucose data...")
-    glc_data = pd.read_csv(glc_data, dtype={
-        'Agent ID': str, 'Seed': str}, index_col=0)
-    # Convert string to actual dictionary
-    glc_data['Boundary'] = glc_data['Boundary'].apply(ast.literal_eval)
+    glc_data = load_sim_df(path=glc_data, columns=COLUMNS)
 
     # Validate data:
     # - glc_data must be in Glucose condition
@@ -171,7 +144,7 @@ def cli():
     parser.add_argument(
         "glc_data",
         type=str,
-        help="Locally saved dataframe file for glucose (before addition of ampicillin.)",
+        help="Locally saved .npz file for glucose (before addition of ampicillin.)",
     )
 
     parser.add_argument(
@@ -12,6 +12,8 @@ import pandas as pd
 import pickle
 from tqdm import tqdm
 
+from ecoli.analysis.sim_data_cache import get_sim_data
+
 # antibiotic_response_genes.txt was created by listing out all the genes EcoCyc
 # considers related to antibiotic response in E. Coli
 # (https://ecocyc.org/ECOLI/NEW-IMAGE?type=ECOCYC-CLASS&object=GO:0046677).
@@ -43,7 +45,7 @@ def convert_dict_to_df(data):
 
 
 def count_antibiotic_subgen(data):
-    sim_data = pickle.load(open(SIM_DATA_PATH, 'rb'))
+    sim_data = get_sim_data(SIM_DATA_PATH)
     # Get indices of antibiotic response genes in mRNA count array
     all_TU_ids = sim_data.process.transcription.rna_data['id']
     rnas = pd.read_csv(RNAS_TSV_PATH, sep='\t', comment='#')
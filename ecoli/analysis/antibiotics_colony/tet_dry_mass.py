@@ -6,13 +6,14 @@ import numpy as np
 import pandas as pd
 
 from ecoli.analysis.antibiotics_colony.plot_utils import HIGHLIGHT_BLUE
+from ecoli.analysis.antibiotics_colony.sim_dfs import load_sim_df
 from ecoli.analysis.antibiotics_colony.timeseries import plot_timeseries
 
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-GLC_DATA = "data/colony_data/sim_dfs/2022-12-08_00-33-56_581605+0000.csv"
-TET_DATA = "data/colony_data/sim_dfs/2023-01-05_01-00-44_215314+0000.csv"
+GLC_EXPERIMENT_ID = "2022-12-08_00-33-56_581605+0000"
+TET_EXPERIMENT_ID = "2023-01-05_01-00-44_215314+0000"
 OUTDIR = "out/figure_3"
 HIGHLIGHT_LINEAGE = "0011111"
 
@@ -48,10 +49,8 @@ def make_tet_dry_mass_plot(glc_data, tet_data):
 
 
 def main():
-    glc_data = pd.read_csv(GLC_DATA, dtype={
-        'Agent ID': str, 'Seed': str}, index_col=0)
-    tet_data = pd.read_csv(TET_DATA, dtype={
-        'Agent ID': str, 'Seed': str}, index_col=0)
+    glc_data = load_sim_df(GLC_EXPERIMENT_ID, columns=["Dry mass"])
+    tet_data = load_sim_df(TET_EXPERIMENT_ID, columns=["Dry mass"])
 
     os.makedirs(OUTDIR, exist_ok=True)
 
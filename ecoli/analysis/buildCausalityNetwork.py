@@ -12,7 +12,8 @@ import subprocess
 import time
 
 from ecoli.analysis import read_dynamics
-from ecoli.analysis.build_network import BuildNetwork
+from ecoli.analysis.build_network import cached_nodes_and_edges
+from ecoli.analysis.sim_data_cache import get_sim_data
 from wholecell.utils import filepath as fp
 from time import monotonic as monotonic_seconds
 from time import process_time as process_time_seconds
@@ -46,6 +47,12 @@ class BuildCausalityNetwork:
 			' processing data.')
 		parser.add_argument('--id', type=str, default='',
 			help='If set, a causality network is built using a custom listener dataset.')
+		parser.add_argument('--cpus', type=int, default=1,
+			help='Number of processes that read and compress node dynamics.')
+		parser.add_argument('--append', action='store_true',
+			help='Append the dynamics of this dataset (e.g. the next'
+			' generation) to those already converted in the output, without'
+			' reading them again.')
 
 	def parse_args(self):
 		# type: () -> argparse.Namespace
@@ -70,11 +77,12 @@ class BuildCausalityNetwork:
 			time.ctime(), type(self).__name__))
 
 		print("{}: Building the Causality network".format(time.ctime()))
-		causality_network = BuildNetwork(
+		sim_data = get_sim_data(SIM_DATA_PATH)
+		node_list, edge_list = cached_nodes_and_edges(
 			SIM_DATA_PATH,
 			DYNAMICS_OUTPUT,
-			args.check_sanity)
-		node_list, edge_list = causality_network.build_nodes_and_edges()
+			args.check_sanity,
+			sim_data)
 
 		fp.makedirs(DYNAMICS_OUTPUT)
 
@@ -82,10 +90,12 @@ class BuildCausalityNetwork:
 
 		read_dynamics.convert_dynamics(
 			DYNAMICS_OUTPUT,
-			causality_network.sim_data,
+			sim_data,
 			node_list,
 			edge_list,
-			args.id)
+			args.id,
+			cpus=args.cpus,
+			append=args.append)
 
 		elapsed_real_sec = monotonic_seconds() - start_real_sec
 
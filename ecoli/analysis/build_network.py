@@ -70,14 +70,15 @@ which assigns that node dynamics from listener output:
 	node.read_dynamics(dynamics, dynamics_units)
 """
 from collections import Counter
+import hashlib
 import numpy as np
 import re
 import os
-import pickle
 import json
 
 from typing import Union
 
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.network_components import (
 	Node, Edge,
 	NODELIST_FILENAME, EDGELIST_FILENAME,
@@ -147,6 +148,47 @@ def molecule_compartment(molecule):
 	if match:
 		return COMPARTMENTS.get(match.groups()[0])
 
+def _json_default(value):
+	if isinstance(value, np.generic):
+		return value.item()
+	if isinstance(value, np.ndarray):
+		return value.tolist()
+	raise TypeError(f'{type(value)} is not JSON serializable')
+
+
+def cached_nodes_and_edges(sim_data_file, cache_dir, check_sanity=False,
+		sim_data=None):
+	"""
+	Build the node and edge lists of the network, or load them from a cache
+	in cache_dir keyed by the SHA-256 of sim_data_file, since they only
+	depend on sim_data.
+
+	Returns:
+		Tuple of the node list and edge list, as decoded from JSON.
+	"""
+	digest = hashlib.sha256()
+	with open(sim_data_file, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b''):
+			digest.update(block)
+	cache_path = os.path.join(cache_dir, 'network_{}{}.json'.format(
+		digest.hexdigest(), '_checked' if check_sanity else ''))
+	if not os.path.exists(cache_path):
+		node_list, edge_list = BuildNetwork(
+			sim_data_file, cache_dir, check_sanity, sim_data
+			).build_nodes_and_edges()
+		os.makedirs(cache_dir, exist_ok=True)
+		with open(cache_path + '.tmp', 'w') as f:
+			json.dump({'nodes': node_list, 'edges': edge_list}, f,
+				default=_json_default)
+		os.replace(cache_path + '.tmp', cache_path)
+
+	# Always read the lists back so they have the same types whether or
+	# not they were cached
+	with open(cache_path) as f:
+		network = json.load(f)
+	return network['nodes'], network['edges']
+
+
 class BuildNetwork(object):
 	"""
 	Constructs a causality network of simulation components, namely states and
@@ -155,7 +197,8 @@ class BuildNetwork(object):
 	to extract simulation results, and for the visual representation of the
 	network.
 	"""
-	def __init__(self, sim_data_file, output_dir, check_sanity=False):
+	def __init__(self, sim_data_file, output_dir, check_sanity=False,
+			sim_data=None):
 		"""
 		Args:
 			sim_data_file: path to the variant sim_data pickle file used for
@@ -165,10 +208,12 @@ class BuildNetwork(object):
 			duplicate IDs in the network.
 				# TODO: have check_sanity looks for disconnected nodes, and edges
 				# with non-existent nodes.
+			sim_data: sim_data already loaded from sim_data_file, if any.
 		"""
 		# Open simulation data and save as attribute
-		with open(sim_data_file, 'rb') as f:
-			self.sim_data = pickle.load(f)
+		if sim_data is None:
+			sim_data = get_sim_data(sim_data_file)
+		self.sim_data = sim_data
 
 		self.output_dir = output_dir
 		self.check_sanity = check_sanity
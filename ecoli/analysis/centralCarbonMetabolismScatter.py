@@ -13,6 +13,7 @@ from unum import Unum
 
 from wholecell.utils import units
 from ecoli.library.sim_data import SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.processes.metabolism import (
     COUNTS_UNITS,
     VOLUME_UNITS,
@@ -103,7 +104,7 @@ class Plot():
             all_fluxes = arr_data
 
         # Convert from mmol/L/hr to mmol/g DCW/hr
-        sim_data = pickle.load(open(simDataFile, "rb"))
+        sim_data = get_sim_data(simDataFile)
         cell_density = sim_data.constants.cell_density.asNumber(units.g/units.L)
         cell_masses = sim_df.loc[:, "Cell mass"]
         dry_masses = sim_df.loc[:, "Dry mass"]
@@ -159,7 +160,7 @@ class Plot():
 
 
 def get_toya_flux_rxns(simDataFile):
-    sim_data = pickle.load(open(simDataFile, "rb"))
+    sim_data = get_sim_data(simDataFile)
     reaction_stoich = sim_data.process.metabolism.reaction_stoich
     reaction_stoich = {k: reaction_stoich[k] for k in sorted(reaction_stoich)}
     stoich_matrix = pd.DataFrame(list(reaction_stoich.values()))
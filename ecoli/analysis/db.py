@@ -1,19 +1,24 @@
+import os
 import copy
+import queue
 import itertools
+import threading
 import collections
+from typing import NamedTuple, Optional, Sequence, Tuple
 from bson import MinKey, MaxKey
-from functools import partial
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pymongo import MongoClient
 
 from vivarium.core.emitter import (
     data_from_database,
-    DatabaseEmitter,
     assemble_data,
-    get_local_client,
     get_data_chunks,
     apply_func
 )
 from vivarium.core.serialize import deserialize_value
+from vivarium.library.topology import assoc_path
 from vivarium.library.units import remove_units
 
 from ecoli.analysis.centralCarbonMetabolismScatter import get_toya_flux_rxns
@@ -82,16 +87,342 @@ def custom_deep_merge_check(
     return dct
 
 
+#: Index used by all queries on the history collection
+HISTORY_HINT = {'experiment_id': 1, 'data.time': 1, '_id': 1}
+
+#: MongoDB clients, keyed by process ID, host, and port. Each client
+#: keeps a connection pool that is reused by all queries in the process.
+_clients = {}
+
+
+def get_database(host='localhost', port=27017, database='simulations'):
+    """Get a database from a client that is shared by all queries to the
+    same host and port in this process."""
+    key = (os.getpid(), host, port)
+    if key not in _clients:
+        _clients[key] = MongoClient(f'{host}:{port}')
+    return _clients[key][database]
+
+
+class Projection(NamedTuple):
+    """Values to retrieve from each agent at each time.
+
+    Attributes:
+        name: Name of the column the values are returned in.
+        path: Path to the value inside each agent.
+        indices: Indices to select from the array at ``path``. If None,
+            the whole value is returned.
+        operator: Accumulator applied to the (selected) array, e.g.
+            ``'$sum'``. If None, the values are returned.
+    """
+    name: str
+    path: Tuple[str, ...]
+    indices: Optional[Sequence[int]] = None
+    operator: Optional[str] = None
+
+
+def time_match(experiment_id, sampling_rate=None, start_time=None,
+    end_time=None
+):
+    """Get a ``$match`` filter for the history of an experiment."""
+    match = {'experiment_id': experiment_id}
+    time_filter = {}
+    if start_time is not None:
+        time_filter['$gte'] = start_time
+    if end_time is not None:
+        time_filter['$lte'] = end_time
+    if sampling_rate:
+        time_filter['$mod'] = [sampling_rate, 0]
+    if time_filter:
+        match['data.time'] = time_filter
+    return match
+
+
+def projection_expression(projection, variable='$$agent.v'):
+    """MongoDB aggregation expression that evaluates to the values of a
+    :py:class:`Projection` for the agent in ``variable``, or to nothing if
+    the agent does not have the path."""
+    path = '.'.join((variable,) + tuple(projection.path))
+    if projection.indices is None and projection.operator is None:
+        return path
+    value = path
+    if projection.indices is not None:
+        value = {
+            '$map': {
+                'input': [int(index) for index in projection.indices],
+                'as': 'index',
+                'in': {'$arrayElemAt': [path, '$$index']},
+            },
+        }
+    if projection.operator is not None:
+        value = {projection.operator: value}
+    return {
+        '$cond': {
+            'if': {'$isArray': path},
+            'then': value,
+            'else': '$$REMOVE',
+        }
+    }
+
+
+def agent_pipeline(match, projections, outer_paths=()):
+    """Aggregation pipeline that returns one document per history
+    document, with the time and a list of agents holding their ID
+    (``agent_id``) and the values of each projection. Paths outside the
+    agents in ``outer_paths``, e.g. ``('data', 'fields')``, are kept at
+    the same paths in each document."""
+    agent = {'agent_id': '$$agent.k'}
+    for projection in projections:
+        agent[projection.name] = projection_expression(projection)
+    return [
+        {'$match': match},
+        {'$sort': {'data.time': 1}},
+        {'$project': {
+            '_id': 0,
+            **{'.'.join(path): 1 for path in outer_paths},
+            'time': '$data.time',
+            'agents': {
+                '$map': {
+                    'input': {
+                        '$objectToArray': {
+                            # Add fail-safe for sims with no live agents
+                            '$ifNull': ['$data.agents', {}]
+                        }
+                    },
+                    'as': 'agent',
+                    'in': agent,
+                }
+            },
+        }},
+    ]
+
+
+def stream_documents(collection, pipelines, batch_size=1000):
+    """Iterate over the results of one or more aggregation pipelines.
+
+    Multiple pipelines are run in threads that share the client's
+    connection pool. Documents are yielded as batches arrive, so results
+    from different pipelines may be interleaved.
+    """
+    if len(pipelines) == 1:
+        yield from collection.aggregate(
+            pipelines[0], hint=HISTORY_HINT, batchSize=batch_size)
+        return
+
+    batches = queue.Queue(maxsize=2 * len(pipelines))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce(pipeline):
+        try:
+            batch = []
+            for document in collection.aggregate(
+                pipeline, hint=HISTORY_HINT, batchSize=batch_size
+            ):
+                batch.append(document)
+                if len(batch) == batch_size:
+                    put(batch)
+                    batch = []
+            put(batch)
+        finally:
+            put(None)
+
+    with ThreadPoolExecutor(len(pipelines)) as executor:
+        futures = [executor.submit(produce, pipeline)
+            for pipeline in pipelines]
+        try:
+            finished = 0
+            while finished < len(pipelines):
+                batch = batches.get()
+                if batch is None:
+                    finished += 1
+                    continue
+                yield from batch
+        finally:
+            stop.set()
+        for future in futures:
+            future.result()
+
+
+def chunk_pipelines(db, pipeline, experiment_id, start_time=None,
+    end_time=None, cpus=1
+):
+    """Split a pipeline into ``cpus`` pipelines over ranges of
+    ``_id``."""
+    if cpus <= 1:
+        return [pipeline]
+    chunks = get_data_chunks(
+        db.history, experiment_id,
+        MinKey() if start_time is None else start_time,
+        MaxKey() if end_time is None else end_time,
+        cpus)
+    pipelines = []
+    for lower, upper in chunks:
+        chunk_pipeline = copy.deepcopy(pipeline)
+        chunk_pipeline[0]['$match']['_id'] = {'$gte': lower, '$lt': upper}
+        pipelines.append(chunk_pipeline)
+    return pipelines
+
+
+class AgentColumns:
+    """Collects agent values from :py:func:`agent_pipeline` documents into
+    NumPy arrays with one row per agent per time.
+
+    Documents that hold different parts of the same emit are merged into
+    the same rows. Arrays are grown by doubling, so documents can be
+    streamed without knowing the number of rows in advance. Values must
+    be numeric, and missing values are NaN. Columns of integers without
+    missing values, e.g. counts, are returned as integer arrays.
+    """
+
+    def __init__(self, names, capacity=1024):
+        self.names = list(names)
+        self.rows = {}
+        self.size = 0
+        self.time = np.empty(capacity)
+        self.agent_id = np.empty(capacity, dtype=object)
+        self.columns = {}
+        self.integer = dict.fromkeys(self.names, True)
+
+    def _grow(self):
+        capacity = 2 * len(self.time)
+        self.time = np.resize(self.time, capacity)
+        self.agent_id = np.resize(self.agent_id, capacity)
+        for name, column in self.columns.items():
+            grown = np.full(
+                (capacity,) + column.shape[1:], np.nan, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def _row(self, time, agent_id):
+        key = (time, agent_id)
+        row = self.rows.get(key)
+        if row is None:
+            if self.size == len(self.time):
+                self._grow()
+            row = self.size
+            self.rows[key] = row
+            self.time[row] = time
+            self.agent_id[row] = agent_id
+            self.size += 1
+        return row
+
+    def add(self, document):
+        time = document['time']
+        for agent in document.get('agents', ()):
+            values = {
+                name: agent[name] for name in self.names
+                if agent.get(name) is not None}
+            if not values:
+                continue
+            row = self._row(time, agent['agent_id'])
+            for name, value in values.items():
+                value = np.asarray(value)
+                if value.dtype.kind not in 'iub':
+                    self.integer[name] = False
+                value = value.astype(np.float64)
+                column = self.columns.get(name)
+                if column is None:
+                    column = np.full(
+                        (len(self.time),) + value.shape, np.nan)
+                    self.columns[name] = column
+                column[row] = value
+
+    def finish(self):
+        """Get the collected values as a dictionary of arrays, including
+        ``time`` and ``agent_id``, sorted by time."""
+        size = self.size
+        data = {
+            'time': self.time[:size],
+            'agent_id': self.agent_id[:size],
+        }
+        for name in self.names:
+            column = self.columns.get(name)
+            if column is None:
+                column = np.full(size, np.nan)
+            else:
+                column = column[:size]
+                if self.integer[name] and not np.isnan(column).any():
+                    column = column.astype(np.int64)
+            data[name] = column
+        if np.any(np.diff(data['time']) < 0):
+            order = np.argsort(data['time'], kind='stable')
+            data = {key: value[order] for key, value in data.items()}
+        return data
+
+
+def query_agent_columns(experiment_id, projections, host='localhost',
+    port=27017, sampling_rate=None, start_time=None, end_time=None, cpus=1,
+    batch_size=1000
+):
+    """Retrieve values from every agent at every time as NumPy arrays.
+
+    Index selection and sampling are done by MongoDB in a single
+    aggregation pipeline, and results are streamed into the arrays in
+    batches.
+
+    Args:
+        experiment_id: Experiment ID for simulation
+        projections: List of :py:class:`Projection` to retrieve
+        host: Host name of MongoDB
+        port: Port of MongoDB
+        sampling_rate: Get data every this many seconds
+        start_time: Time to start pulling data
+        end_time: Time to stop pulling data
+        cpus: Number of chunks to split aggregation into to be run in
+            parallel threads
+        batch_size: Number of documents per cursor batch
+
+    Returns:
+        Dictionary with one row per agent per time, containing a ``time``
+        array, an ``agent_id`` array, and an array for each projection
+        with the projected values (or indices) along its second axis.
+    """
+    db = get_database(host, port)
+    match = time_match(experiment_id, sampling_rate, start_time, end_time)
+    pipeline = agent_pipeline(match, projections)
+    pipelines = chunk_pipelines(
+        db, pipeline, experiment_id, start_time, end_time, cpus)
+    columns = AgentColumns([projection.name for projection in projections])
+    for document in stream_documents(db.history, pipelines, batch_size):
+        columns.add(document)
+    return columns.finish()
+
+
+def columns_to_nested(columns, projections):
+    """Convert the output of :py:func:`query_agent_columns` to the nested
+    format ``{time: {'agents': {agent_id: {...}}}}`` with each projection
+    at its path."""
+    data = {}
+    for row, (time, agent_id) in enumerate(
+        zip(columns['time'].tolist(), columns['agent_id'])
+    ):
+        agent = data.setdefault(time, {'agents': {}})['agents'].setdefault(
+            agent_id, {})
+        for projection in projections:
+            value = columns[projection.name][row]
+            if value.dtype.kind == 'f' and np.all(np.isnan(value)):
+                continue
+            node = agent
+            for key in projection.path[:-1]:
+                node = node.setdefault(key, {})
+            node[projection.path[-1]] = value.tolist()
+    return data
+
+
 def access(
     experiment_id, query=None, host='localhost', port=27017,
     func_dict=None, f=None, sampling_rate=None, start_time=MinKey(),
     end_time=MaxKey(), cpus=1
 ):
-    config = {
-        'host': '{}:{}'.format(host, port),
-        'database': 'simulations'}
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
+    db = get_database(host, port)
 
     filters = {}
     if sampling_rate:
@@ -104,11 +435,7 @@ def access(
 
 
 def get_agent_ids(experiment_id, host='localhost', port=27017):
-    config = {
-        'host': '{}:{}'.format(host, port),
-        'database': 'simulations'}
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
+    db = get_database(host, port)
 
     result = db.history.aggregate([
         {'$match': {'experiment_id': experiment_id}},
@@ -126,36 +453,8 @@ def get_agent_ids(experiment_id, host='localhost', port=27017):
 
 def get_aggregation(host, port, aggregation):
     """Helper function for parallel aggregations"""
-    history_collection = get_local_client(host, port, 'simulations').history
-    return list(history_collection.aggregate(
-        aggregation, hint={'experiment_id':1, 'data.time':1, '_id':1}))
-
-
-def val_at_idx_in_path(idx, path):
-    """Helper function that returns MongoDB aggregation expression
-    which evaluates to the value at idx in the array at path after
-    an $objectToArray projection."""
-    return {
-        '$cond': {
-            # If path does not point to an array, return null
-            'if': {'$isArray': {'$first': f"${path}"}},
-            'then': {
-                # Flatten array of length 1 into single count
-                '$first': {
-                    # Get monomer count at specified index with $slice
-                    '$slice': [
-                        # $objectToArray turns all embedded document fields 
-                        # into arrays so we flatten here before slicing
-                        {'$first': f"${path}"},
-                        idx,
-                        1
-                    ]
-                },
-            },
-            'else': None
-        }
-        
-    }
+    history_collection = get_database(host, port).history
+    return list(history_collection.aggregate(aggregation, hint=HISTORY_HINT))
 
 
 def access_counts(experiment_id, monomer_names=None, mrna_names=None,
@@ -204,16 +503,7 @@ def access_counts(experiment_id, monomer_names=None, mrna_names=None,
         inner_paths = []
     if not outer_paths:
         outer_paths = []
-    if not start_time:
-        start_time = MinKey()
-    if not end_time:
-        end_time = MaxKey()
-    config = {
-        'host': f'{host}:{port}',
-        'database': 'simulations'
-    }
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
+    db = get_database(host, port)
 
     # Retrieve and re-assemble experiment config
     experiment_query = {'experiment_id': experiment_id}
@@ -231,153 +521,94 @@ def access_counts(experiment_id, monomer_names=None, mrna_names=None,
         mar_regulon=experiment_config.get('mar_regulon', False),
         rnai_data=rnai_data)
 
-    time_filter = {'data.time': {'$gte': start_time, '$lte': end_time}}
-    if sampling_rate:
-        time_filter['data.time']['$mod'] = [sampling_rate, 0]
-    aggregation = [{'$match': {
-        **experiment_query, **time_filter}}]
-    aggregation.append({'$project': {
-        'data.agents': {
-            '$objectToArray': {
-                # Add fail-safe for sims with no live agents
-                '$ifNull': ['$data.agents', {}]
-            }
-        },
-        'data.time': 1,
-        'data.fields': 1,
-        'data.dimensions': 1,
-        'assembly_id': 1,
-        }})
-    monomer_idx = sim_data.get_monomer_counts_indices(monomer_names)
-    projection = {
-        '$project': {
-            f'data.agents.v.monomer.{monomer}':
-                val_at_idx_in_path(
-                    monomer_index, 
-                    "data.agents.v.listeners.monomer_counts"
-                )
-            for monomer, monomer_index in zip(monomer_names, monomer_idx)
-        }
-    }
-    mrna_idx = sim_data.get_mrna_counts_indices(mrna_names)
-    projection['$project'].update({
-        f'data.agents.v.mrna.{mrna}':
-            val_at_idx_in_path(
-                mrna_index,
-                'data.agents.v.listeners.rna_counts.mRNA_counts'
-            )
-        for mrna, mrna_index in zip(mrna_names, mrna_idx)
-    })
-    projection['$project'].update({
-        'data.agents.v.total_mrna': {
-            '$cond': {
-                # If path does not point to an array, return null
-                'if': {'$isArray': {'$first': '$data.agents.v.listeners.rna_counts.mRNA_counts'}},
-                'then': {
-                    '$sum': {
-                        '$first': '$data.agents.v.listeners.rna_counts.mRNA_counts'
-                    }
-                },
-                'else': None
-            }
-        }
-    })
-    rna_idx = sim_data.get_rna_indices(rna_init)
-    projection['$project'].update({
-        f'data.agents.v.rna_init.{rna}':
-            val_at_idx_in_path(
-                rna_index,
-                'data.agents.v.listeners.rnap_data.rna_init_event'
-            )
-        for rna, rna_index in zip(rna_init, rna_idx)
-    })
-    rna_idx = sim_data.get_rna_indices(rna_synth_prob)
-    projection['$project'].update({
-        f'data.agents.v.rna_synth_prob.{rna}':
-            val_at_idx_in_path(
-                rna_index,
-                'data.agents.v.listeners.rna_synth_prob.rna_synth_prob'
-            )
-        for rna, rna_index in zip(rna_synth_prob, rna_idx)
-    })
-    for inner_path in inner_paths:
-        inner_path = ('data', 'agents', 'v') + inner_path
-        projection['$project']['.'.join(inner_path)] = 1
+    # values selected by index, keyed by name under the projection name
+    named_projections = [
+        (Projection('monomer', ('listeners', 'monomer_counts'),
+            sim_data.get_monomer_counts_indices(monomer_names)),
+            monomer_names),
+        (Projection('mrna', ('listeners', 'rna_counts', 'mRNA_counts'),
+            sim_data.get_mrna_counts_indices(mrna_names)),
+            mrna_names),
+        (Projection('rna_init', ('listeners', 'rnap_data', 'rna_init_event'),
+            sim_data.get_rna_indices(rna_init)),
+            rna_init),
+        (Projection('rna_synth_prob',
+            ('listeners', 'rna_synth_prob', 'rna_synth_prob'),
+            sim_data.get_rna_indices(rna_synth_prob)),
+            rna_synth_prob),
+    ]
+    named_projections = [
+        (projection, names) for projection, names in named_projections
+        if names]
+    projections = [projection for projection, _ in named_projections]
+    projections.append(Projection(
+        'total_mrna', ('listeners', 'rna_counts', 'mRNA_counts'),
+        operator='$sum'))
     # Boundary data necessary for snapshot plots
-    projection['$project']['data.agents.v.boundary'] = 1
-    projection['$project']['data.fields'] = 1
-    projection['$project']['data.dimensions'] = 1
-    projection['$project']['data.agents.k'] = 1
-    projection['$project']['data.time'] = 1
-    projection['$project']['assembly_id'] = 1
-    aggregation.append(projection)
-
-    final_projection = {'$project': {
-        'data.agents': {'$arrayToObject': '$data.agents'},
-        'data.time': 1,
-        'assembly_id': 1,
-    }}
-    for outer_path in outer_paths:
-        final_projection['$project']['.'.join(outer_path)] = 1
-    final_projection['$project']['data.fields'] = 1
-    final_projection['$project']['data.dimensions'] = 1
-    aggregation.append(final_projection)
-    
-    if cpus > 1:
-        chunks = get_data_chunks(
-            db.history, experiment_id, start_time, end_time, cpus)
-        aggregations = []
-        for chunk in chunks:
-            agg_chunk = copy.deepcopy(aggregation)
-            agg_chunk[0]['$match'] = {
-                **experiment_query,
-                '_id': {'$gte': chunk[0], '$lt': chunk[1]},
-                'data.time': {'$gte': start_time, '$lte': end_time, 
-                              '$mod': [sampling_rate, 0]}
-            }
-            aggregations.append(agg_chunk)
-        partial_get_agg = partial(get_aggregation, host, port)
-        with ProcessPoolExecutor(cpus) as executor:
-            queried_chunks = executor.map(partial_get_agg, aggregations)
-        result = itertools.chain.from_iterable(queried_chunks)
-    else:
-        result = db.history.aggregate(
-            aggregation, 
-            hint={'experiment_id':1, 'data.time':1, '_id':1})
-    
-    if func_dict:
-        raw_data = []
-        for document in result:
-            assert document.get('assembly_id'), \
-                "all database documents require an assembly_id"
-            for field, func in func_dict.items():
-                document["data"] = apply_func(
-                    document["data"], field, func)
-            raw_data.append(document)
-    else:
-        raw_data = result
-
-    # re-assemble data
-    assembly = assemble_data(list(raw_data))
-
-    # restructure by time
+    inner_paths = [tuple(path) for path in inner_paths]
+    if ('boundary',) not in inner_paths:
+        inner_paths.append(('boundary',))
+    path_projections = [
+        Projection('/'.join(path), path) for path in inner_paths]
+    projections.extend(path_projections)
+    outer_paths = {tuple(path) for path in outer_paths} | {
+        ('data', 'fields'), ('data', 'dimensions')}
+
+    match = time_match(experiment_id, sampling_rate, start_time, end_time)
+    pipeline = agent_pipeline(match, projections, sorted(outer_paths))
+    pipelines = chunk_pipelines(
+        db, pipeline, experiment_id, start_time, end_time, cpus)
+
+    # restructure by time, merging the documents of emits that were split
     data = {}
-    for datum in assembly.values():
-        time = datum['time']
-        datum = datum.copy()
-        datum.pop('_id', None)
+    for document in stream_documents(db.history, pipelines):
+        time = document['time']
+        datum = document.get('data', {})
         datum.pop('time', None)
-        custom_deep_merge_check(
-            data,
-            {time: datum},
-            check_equality=True,
-            overwrite_none=True
-        )
+        agents = datum['agents'] = {}
+        for agent in document['agents']:
+            agent_data = {}
+            for projection, names in named_projections:
+                values = agent.get(projection.name)
+                if values is not None:
+                    agent_data[projection.name] = dict(zip(names, values))
+            if agent.get('total_mrna') is not None:
+                agent_data['total_mrna'] = agent['total_mrna']
+            for projection in path_projections:
+                value = agent.get(projection.name)
+                if value is not None:
+                    custom_deep_merge_check(
+                        agent_data, assoc_path({}, projection.path, value),
+                        check_equality=True)
+            agents[agent['agent_id']] = agent_data
+        if func_dict:
+            for field, func in func_dict.items():
+                datum = apply_func(datum, field, func)
+        if time in data:
+            custom_deep_merge_check(
+                data[time], datum, check_equality=True, overwrite_none=True)
+        else:
+            data[time] = datum
 
-    return data
+    return dict(sorted(data.items()))
 
 
-def get_proteome_data(experiment_id, host='localhost', port=27017, cpus=1):
+def get_agent_data(experiment_id, projections, host='localhost', port=27017,
+    cpus=1, as_columns=False, **kwargs
+):
+    """Get values for all agents in a sim, either as NumPy arrays (see
+    :py:func:`query_agent_columns`) or nested by time and agent (see
+    :py:func:`columns_to_nested`)."""
+    columns = query_agent_columns(
+        experiment_id, projections, host, port, cpus=cpus, **kwargs)
+    if as_columns:
+        return columns
+    return columns_to_nested(columns, projections)
+
+
+def get_proteome_data(experiment_id, host='localhost', port=27017, cpus=1,
+    as_columns=False
+):
     """Get monomer counts for all agents in a sim.
     
     Args:
@@ -385,88 +616,17 @@ def get_proteome_data(experiment_id, host='localhost', port=27017, cpus=1):
         host: Host name of MongoDB
         port: Port of MongoDB
         cpus: Number of chunks to split aggregation into to be run in parallel
+        as_columns: Return NumPy arrays instead of nested dictionaries
     """
-    config = {
-        'host': f'{host}:{port}',
-        'database': 'simulations'
-    }
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
+    projections = [Projection(
+        'monomer_counts', ('listeners', 'monomer_counts'))]
+    return get_agent_data(
+        experiment_id, projections, host, port, cpus, as_columns)
 
-    aggregation = [
-        {'$match': {'experiment_id': experiment_id}},
-        {
-            '$project': {
-                'data.agents': {
-                    '$objectToArray': {
-                        # Add fail-safe for sims with no live agents
-                        '$ifNull': ['$data.agents', {}]
-                    }
-                },
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        },
-        {
-            '$project': {
-                'data.agents.v.listeners.monomer_counts': 1,
-                'data.agents.k': 1,
-                'data.time': 1,
-                'assembly_id': 1
-            }
-        },
-        {
-            '$project': {
-                'data.agents': {'$arrayToObject': '$data.agents'},
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        }
-    ]
-
-    if cpus > 1:
-        start_time = MinKey()
-        end_time = MaxKey()
-        chunks = get_data_chunks(
-            db.history, experiment_id, start_time, end_time, cpus)
-        aggregations = []
-        for chunk in chunks:
-            agg_chunk = copy.deepcopy(aggregation)
-            agg_chunk[0]['$match'] = {
-                'experiment_id': experiment_id,
-                '_id': {'$gte': chunk[0], '$lt': chunk[1]}
-            }
-            aggregations.append(agg_chunk)
-        partial_get_agg = partial(get_aggregation, host, port)
-        with ProcessPoolExecutor(cpus) as executor:
-            queried_chunks = executor.map(partial_get_agg, aggregations)
-        result = itertools.chain.from_iterable(queried_chunks)
-    else:
-        result = db.history.aggregate(
-            aggregation, 
-            hint={'experiment_id':1, 'data.time':1, '_id':1})
-    
-    # re-assemble data
-    assembly = assemble_data(list(result))
 
-    # restructure by time
-    data = {}
-    for datum in assembly.values():
-        time = datum['time']
-        datum = datum.copy()
-        datum.pop('_id', None)
-        datum.pop('time', None)
-        custom_deep_merge_check(
-            data,
-            {time: datum},
-            check_equality=True,
-            overwrite_none=True
-        )
-
-    return data
-
-
-def get_transcriptome_data(experiment_id, host='localhost', port=27017, cpus=1):
+def get_transcriptome_data(experiment_id, host='localhost', port=27017, cpus=1,
+    as_columns=False
+):
     """Get mRNA counts for all agents in a sim.
     
     Args:
@@ -474,88 +634,17 @@ def get_transcriptome_data(experiment_id, host='localhost', port=27017, cpus=1):
         host: Host name of MongoDB
         port: Port of MongoDB
         cpus: Number of chunks to split aggregation into to be run in parallel
+        as_columns: Return NumPy arrays instead of nested dictionaries
     """
-    config = {
-        'host': f'{host}:{port}',
-        'database': 'simulations'
-    }
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
-
-    aggregation = [
-        {'$match': {'experiment_id': experiment_id}},
-        {
-            '$project': {
-                'data.agents': {
-                    '$objectToArray': {
-                        # Add fail-safe for sims with no live agents
-                        '$ifNull': ['$data.agents', {}]
-                    }
-                },
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        },
-        {
-            '$project': {
-                'data.agents.v.listeners.RNA_counts.mRNA_counts': 1,
-                'data.agents.k': 1,
-                'data.time': 1,
-                'assembly_id': 1
-            }
-        },
-        {
-            '$project': {
-                'data.agents': {'$arrayToObject': '$data.agents'},
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        }
-    ]
-
-    if cpus > 1:
-        start_time = MinKey()
-        end_time = MaxKey()
-        chunks = get_data_chunks(
-            db.history, experiment_id, start_time, end_time, cpus)
-        aggregations = []
-        for chunk in chunks:
-            agg_chunk = copy.deepcopy(aggregation)
-            agg_chunk[0]['$match'] = {
-                'experiment_id': experiment_id,
-                '_id': {'$gte': chunk[0], '$lt': chunk[1]}
-            }
-            aggregations.append(agg_chunk)
-        partial_get_agg = partial(get_aggregation, host, port)
-        with ProcessPoolExecutor(cpus) as executor:
-            queried_chunks = executor.map(partial_get_agg, aggregations)
-        result = itertools.chain.from_iterable(queried_chunks)
-    else:
-        result = db.history.aggregate(
-            aggregation, 
-            hint={'experiment_id':1, 'data.time':1, '_id':1})
-    
-    # re-assemble data
-    assembly = assemble_data(list(result))
-
-    # restructure by time
-    data = {}
-    for datum in assembly.values():
-        time = datum['time']
-        datum = datum.copy()
-        datum.pop('_id', None)
-        datum.pop('time', None)
-        custom_deep_merge_check(
-            data,
-            {time: datum},
-            check_equality=True,
-            overwrite_none=True
-        )
-
-    return data
+    projections = [Projection(
+        'mRNA_counts', ('listeners', 'RNA_counts', 'mRNA_counts'))]
+    return get_agent_data(
+        experiment_id, projections, host, port, cpus, as_columns)
 
 
-def get_gene_expression_data(experiment_id, host='localhost', port=27017, cpus=1):
+def get_gene_expression_data(experiment_id, host='localhost', port=27017,
+    cpus=1, as_columns=False
+):
     """Get expression events for each mRNAs at each timestep for each agent.
     
     Args:
@@ -563,88 +652,18 @@ def get_gene_expression_data(experiment_id, host='localhost', port=27017, cpus=1
         host: Host name of MongoDB
         port: Port of MongoDB
         cpus: Number of chunks to split aggregation into to be run in parallel
+        as_columns: Return NumPy arrays instead of nested dictionaries
     """
-    config = {
-        'host': f'{host}:{port}',
-        'database': 'simulations'
-    }
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
+    projections = [Projection('countRnaSynthesized', (
+        'listeners', 'transcript_elongation_listener',
+        'countRnaSynthesized'))]
+    return get_agent_data(
+        experiment_id, projections, host, port, cpus, as_columns)
 
-    aggregation = [
-        {'$match': {'experiment_id': experiment_id}},
-        {
-            '$project': {
-                'data.agents': {
-                    '$objectToArray': {
-                        # Add fail-safe for sims with no live agents
-                        '$ifNull': ['$data.agents', {}]
-                    }
-                },
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        },
-        {
-            '$project': {
-                'data.agents.v.listeners.transcript_elongation_listener.countRnaSynthesized': 1,
-                'data.agents.k': 1,
-                'data.time': 1,
-                'assembly_id': 1
-            }
-        },
-        {
-            '$project': {
-                'data.agents': {'$arrayToObject': '$data.agents'},
-                'data.time': 1,
-                'assembly_id': 1,
-            }
-        }
-    ]
 
-    if cpus > 1:
-        start_time = MinKey()
-        end_time = MaxKey()
-        chunks = get_data_chunks(
-            db.history, experiment_id, start_time, end_time, cpus)
-        aggregations = []
-        for chunk in chunks:
-            agg_chunk = copy.deepcopy(aggregation)
-            agg_chunk[0]['$match'] = {
-                'experiment_id': experiment_id,
-                '_id': {'$gte': chunk[0], '$lt': chunk[1]}
-            }
-            aggregations.append(agg_chunk)
-        partial_get_agg = partial(get_aggregation, host, port)
-        with ProcessPoolExecutor(cpus) as executor:
-            queried_chunks = executor.map(partial_get_agg, aggregations)
-        result = itertools.chain.from_iterable(queried_chunks)
-    else:
-        result = db.history.aggregate(
-            aggregation, 
-            hint={'experiment_id':1, 'data.time':1, '_id':1})
-    
-    # re-assemble data
-    assembly = assemble_data(list(result))
-
-    # restructure by time
-    data = {}
-    for datum in assembly.values():
-        time = datum['time']
-        datum = datum.copy()
-        datum.pop('_id', None)
-        datum.pop('time', None)
-        custom_deep_merge_check(
-            data,
-            {time: datum},
-            check_equality=True,
-            overwrite_none=True
-        )
-
-    return data
-
-
-def get_fluxome_data(experiment_id, host='localhost', port=27017, cpus=1):
+def get_fluxome_data(experiment_id, host='localhost', port=27017, cpus=1,
+    as_columns=False
+):
     """Get central carbon metabolism fluxes for all agents in a sim.
     
     Args:
@@ -652,94 +671,83 @@ def get_fluxome_data(experiment_id, host='localhost', port=27017, cpus=1):
         host: Host name of MongoDB
         port: Port of MongoDB
         cpus: Number of chunks to split aggregation into to be run in parallel
+        as_columns: Return NumPy arrays instead of nested dictionaries, with
+            fluxes in the order of ``sim_rxn_indices``
     """
-    config = {
-        'host': f'{host}:{port}',
-        'database': 'simulations'
-    }
-    emitter = DatabaseEmitter(config)
-    db = emitter.db
-    
     rxn_ids = get_toya_flux_rxns(SIM_DATA_PATH)
-    sim_rxn_indices = [int(i) for i in itertools.chain.from_iterable(list(rxn_ids.values()))]
-
-    aggregation = [
-        {'$match': {'experiment_id': experiment_id}},
-        {
-            '$project': {
-                'data.agents': {
-                    '$objectToArray': {
-                        # Add fail-safe for sims with no live agents
-                        '$ifNull': ['$data.agents', {}]
-                    }
-                },
-                'data.time': 1,
-                'data.fields': 1,
-                'data.dimensions': 1,
-                'assembly_id': 1,
+    sim_rxn_indices = [int(i) for i in itertools.chain.from_iterable(
+        list(rxn_ids.values()))]
+    projections = [Projection(
+        'fluxome', ('listeners', 'fba_results', 'reactionFluxes'),
+        sim_rxn_indices)]
+    columns = query_agent_columns(
+        experiment_id, projections, host, port, cpus=cpus)
+    if as_columns:
+        columns['sim_rxn_indices'] = np.array(sim_rxn_indices)
+        return columns
+
+    # fluxes keyed by reaction index under 'fluxome' in each agent
+    data = {}
+    for time, agent_id, fluxes in zip(
+        columns['time'].tolist(), columns['agent_id'], columns['fluxome']
+    ):
+        data.setdefault(time, {'agents': {}})['agents'][agent_id] = {
+            'fluxome': {
+                str(rxn_index): flux
+                for rxn_index, flux in zip(sim_rxn_indices, fluxes.tolist())
             }
         }
-    ]
-    projection = {
-        '$project': {
-            f'data.agents.v.fluxome.{rxn_index}':
-                val_at_idx_in_path(
-                    rxn_index, 
-                    "data.agents.v.listeners.fba_results.reactionFluxes"
-                )
-            for rxn_index in sim_rxn_indices
-        }
-    }
+    return data
 
-    projection['$project']['data.agents.k'] = 1
-    projection['$project']['data.time'] = 1
-    projection['$project']['assembly_id'] = 1
-    aggregation.append(projection)
-
-    final_projection = {'$project': {
-        'data.agents': {'$arrayToObject': '$data.agents'},
-        'data.time': 1,
-        'assembly_id': 1,
-    }}
-    aggregation.append(final_projection)
-
-    if cpus > 1:
-        start_time = MinKey()
-        end_time = MaxKey()
-        chunks = get_data_chunks(
-            db.history, experiment_id, start_time, end_time, cpus)
-        aggregations = []
-        for chunk in chunks:
-            agg_chunk = copy.deepcopy(aggregation)
-            agg_chunk[0]['$match'] = {
-                'experiment_id': experiment_id,
-                '_id': {'$gte': chunk[0], '$lt': chunk[1]}
-            }
-            aggregations.append(agg_chunk)
-        partial_get_agg = partial(get_aggregation, host, port)
-        with ProcessPoolExecutor(cpus) as executor:
-            queried_chunks = executor.map(partial_get_agg, aggregations)
-        result = itertools.chain.from_iterable(queried_chunks)
-    else:
-        result = db.history.aggregate(
-            aggregation, 
-            hint={'experiment_id':1, 'data.time':1, '_id':1})
-    
-    # re-assemble data
-    assembly = assemble_data(list(result))
 
-    # restructure by time
-    data = {}
-    for datum in assembly.values():
-        time = datum['time']
-        datum = datum.copy()
-        datum.pop('_id', None)
-        datum.pop('time', None)
-        custom_deep_merge_check(
-            data,
-            {time: datum},
-            check_equality=True,
-            overwrite_none=True
-        )
-
-    return data
+def test_agent_columns():
+    projections = [
+        Projection('counts', ('listeners', 'counts'), [0, 2]),
+        Projection('volume', ('volume',)),
+    ]
+    pipeline = agent_pipeline(time_match('exp', sampling_rate=2), projections)
+    assert pipeline[0] == {'$match': {
+        'experiment_id': 'exp', 'data.time': {'$mod': [2, 0]}}}
+    agent = pipeline[2]['$project']['agents']['$map']['in']
+    assert agent['volume'] == '$$agent.v.volume'
+    assert agent['counts']['$cond']['then']['$map']['input'] == [0, 2]
+
+    documents = [
+        # an emit split over two documents
+        {'time': 2.0, 'agents': [
+            {'agent_id': '0', 'counts': [1, 3]},
+            {'agent_id': '1'}]},
+        {'time': 2.0, 'agents': [
+            {'agent_id': '0', 'volume': 1.5},
+            {'agent_id': '1', 'volume': 1.0}]},
+        {'time': 0.0, 'agents': [
+            {'agent_id': '0', 'counts': [4, None], 'volume': 1.2}]},
+    ]
+    columns = AgentColumns(['counts', 'volume'], capacity=1)
+    for document in documents:
+        columns.add(document)
+    data = columns.finish()
+    np.testing.assert_array_equal(data['time'], [0.0, 2.0, 2.0])
+    assert list(data['agent_id']) == ['0', '0', '1']
+    np.testing.assert_array_equal(
+        data['counts'], [[4, np.nan], [1, 3], [np.nan, np.nan]])
+    np.testing.assert_array_equal(data['volume'], [1.2, 1.5, 1.0])
+
+    nested = columns_to_nested(data, projections)
+    assert nested[2.0]['agents']['0'] == {
+        'listeners': {'counts': [1.0, 3.0]}, 'volume': 1.5}
+    assert nested[2.0]['agents']['1'] == {'volume': 1.0}
+
+    # counts stay integers when no values are missing
+    total = Projection('total', ('listeners', 'counts'), operator='$sum')
+    assert projection_expression(total)['$cond']['then'] == {
+        '$sum': '$$agent.v.listeners.counts'}
+    columns = AgentColumns(['counts'])
+    columns.add({'time': 0.0, 'agents': [
+        {'agent_id': '0', 'counts': [4, 5]}]})
+    data = columns.finish()
+    assert data['counts'].dtype == np.int64
+    nested = columns_to_nested(data, projections[:1])
+    assert nested[0.0]['agents']['0'] == {'listeners': {'counts': [4, 5]}}
+    assert all(isinstance(count, int)
+        for count in nested[0.0]['agents']['0']['listeners']['counts'])
@@ -1,11 +1,11 @@
 import argparse
 import os
-import pickle
 
 import numpy as np
 from matplotlib import pyplot as plt
 
 from ecoli.composites.ecoli_master import SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.tablereader import TableReader
 from ecoli.analysis.db import access
 
@@ -111,8 +111,7 @@ def run_plot():
             if args.agent_id in timepoint['agents']
         }
 
-    with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-        sim_data = pickle.load(sim_data_file)
+    sim_data = get_sim_data(SIM_DATA_PATH)
     out_dir = os.path.join('out', 'analysis', args.experiment_id)
     if args.agent_id:
         out_dir = os.path.join(out_dir, args.agent_id)
@@ -3,7 +3,6 @@ Plot the Voronoi diagram of mass fractions
 """
 
 import os
-import pickle
 import numpy as np
 from matplotlib import pyplot as plt
 
@@ -11,6 +10,7 @@ from wholecell.utils import units
 from wholecell.utils.voronoi_plot_main import VoronoiMaster
 
 from ecoli.composites.ecoli_master import run_ecoli, SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.tablereader import TableReader
 
 
@@ -26,8 +26,7 @@ class Plot:
 
         self.sim_data = sim_data
         if not sim_data:
-            with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-                self.sim_data = pickle.load(sim_data_file)
+            self.sim_data = get_sim_data(SIM_DATA_PATH)
 
         self.do_plot(self.data)
 
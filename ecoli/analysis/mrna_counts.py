@@ -2,12 +2,12 @@
 Plot mRNA counts
 """
 
-import pickle
 import os
 
 from matplotlib import pyplot as plt
 
 from ecoli.composites.ecoli_master import run_ecoli, SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.tablereader import TableReader
 
 
@@ -20,8 +20,7 @@ class Plot:
 
         self.sim_data = sim_data
         if not sim_data:
-            with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-                self.sim_data = pickle.load(sim_data_file)
+            self.sim_data = get_sim_data(SIM_DATA_PATH)
 
         self.do_plot(self.data)
 
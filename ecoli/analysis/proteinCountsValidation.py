@@ -13,13 +13,14 @@ from scipy.stats import pearsonr
 import seaborn as sns
 
 from ecoli.library.sim_data import SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from wholecell.utils.protein_counts import get_simulated_validation_counts
 
 
 class Plot():
 
     def do_plot(self, monomer_counts, simDataFile, validationDataFile, outFile):
-        sim_data = pickle.load(open(simDataFile, "rb"))
+        sim_data = get_sim_data(simDataFile)
         validation_data = pickle.load(open(validationDataFile, "rb"))
 
         sim_monomer_ids = sim_data.process.translation.monomer_data["id"]
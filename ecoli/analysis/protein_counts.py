@@ -2,7 +2,6 @@
 Plot Protein counts
 """
 
-import pickle
 import os
 
 import numpy as np
@@ -13,6 +12,7 @@ from wholecell.utils.fitting import normalize
 from wholecell.utils import units
 
 from ecoli.composites.ecoli_master import run_ecoli, SIM_DATA_PATH
+from ecoli.analysis.sim_data_cache import get_sim_data
 from ecoli.analysis.tablereader import TableReader
 
 
@@ -25,8 +25,7 @@ class Plot:
 
         self.sim_data = sim_data
         if not sim_data:
-            with open(SIM_DATA_PATH, 'rb') as sim_data_file:
-                self.sim_data = pickle.load(sim_data_file)
+            self.sim_data = get_sim_data(SIM_DATA_PATH)
 
         self.do_plot(self.data)
 
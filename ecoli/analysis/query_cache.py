@@ -0,0 +1,478 @@
+"""
+Local on-disk cache for data pulled from MongoDB by
+:py:mod:`ecoli.analysis.db`.
+
+Each cache entry is identified by a hash of the experiment ID, the query
+function and its arguments, and the sampling rate. An entry records the
+time range it covers and is extended when a query asks for times outside
+that range, so only the missing times are pulled from MongoDB.
+
+Data is stored as columns in a directory per entry. Values at each path
+inside agents are stored as one column with a row per agent per time, and
+all other paths as one column with a row per time. Numeric columns are
+``.npy`` files that can be memory-mapped (see
+:py:meth:`CacheEntry.agent_columns`), and other columns are pickled.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from bson import MinKey, MaxKey
+
+from ecoli.analysis.db import (
+    access, access_counts, deserialize_and_remove_units)
+
+
+CACHE_DIR = 'out/query_cache'
+NUMERIC_KINDS = 'biuf'
+
+
+def _key_default(value):
+    # the repr of a function includes its address, which changes every run
+    if callable(value):
+        return f'{value.__module__}.{value.__qualname__}'
+    return repr(value)
+
+
+def cache_key(name, experiment_id, spec, sampling_rate):
+    """Hash identifying the data of a query, except for its time range.
+    Functions in ``spec`` are identified by their qualified names."""
+    description = json.dumps(
+        [name, experiment_id, spec, sampling_rate],
+        sort_keys=True, default=_key_default)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def _flatten(node, prefix, leaves):
+    for key, value in node.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            _flatten(value, path, leaves)
+        else:
+            leaves[path] = value
+
+
+def _encode_column(rows, values, n_rows):
+    """Get the format of a column and the data to save for it"""
+    is_array = isinstance(values[0], np.ndarray)
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is not None and array.dtype.kind in NUMERIC_KINDS:
+        if len(rows) == n_rows:
+            return 'npy', is_array, array, None
+        full = np.zeros((n_rows,) + array.shape[1:], dtype=array.dtype)
+        full[rows] = array
+        mask = np.zeros(n_rows, dtype=bool)
+        mask[rows] = True
+        return 'npy', is_array, full, mask
+    return 'pickle', is_array, (np.asarray(rows), values), None
+
+
+def encode(data):
+    """Split data keyed by time into columns
+
+    Returns:
+        Tuple of the sorted times, the time index and ID of each agent row,
+        whether each time had an ``agents`` store, and a dictionary of
+        columns keyed by ``('global' | 'agent', path)``, each with a list
+        of row indices and a list of values.
+    """
+    times = sorted(data)
+    has_agents = np.zeros(len(times), dtype=bool)
+    agent_times = []
+    agent_ids = []
+    columns = {}
+    for time_index, time in enumerate(times):
+        timepoint = dict(data[time])
+        agents = timepoint.pop('agents', None)
+        leaves = {}
+        _flatten(timepoint, (), leaves)
+        for path, value in leaves.items():
+            rows, values = columns.setdefault(('global', path), ([], []))
+            rows.append(time_index)
+            values.append(value)
+        if agents is None:
+            continue
+        has_agents[time_index] = True
+        for agent_id, agent in agents.items():
+            row = len(agent_ids)
+            agent_times.append(time_index)
+            agent_ids.append(agent_id)
+            leaves = {}
+            _flatten(agent, (), leaves)
+            for path, value in leaves.items():
+                rows, values = columns.setdefault(('agent', path), ([], []))
+                rows.append(row)
+                values.append(value)
+    return times, agent_times, agent_ids, has_agents, columns
+
+
+def _containers(roots, path, rows, cache):
+    """Get the dictionaries at ``path`` in the roots of some rows, creating
+    them if needed. ``cache`` keeps the dictionaries by path and row."""
+    if not path:
+        return [roots[row] for row in rows]
+    level = cache.setdefault(path, {})
+    missing = [row for row in rows if row not in level]
+    if missing:
+        parents = _containers(roots, path[:-1], missing, cache)
+        for row, parent in zip(missing, parents):
+            level[row] = parent.setdefault(path[-1], {})
+    return [level[row] for row in rows]
+
+
+class CacheEntry:
+    """Columns of a cached query in ``cache_dir/key``"""
+
+    def __init__(self, key, cache_dir=CACHE_DIR):
+        self.path = os.path.join(cache_dir, key)
+        self.meta = None
+        meta_path = os.path.join(self.path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+
+    @property
+    def exists(self):
+        return self.meta is not None
+
+    @property
+    def time_range(self):
+        return self.meta['start_time'], self.meta['end_time']
+
+    def _load(self, name, mmap_mode=None):
+        return np.load(
+            os.path.join(self.path, name), mmap_mode=mmap_mode,
+            allow_pickle=False)
+
+    def _read_column(self, column, mmap_mode=None):
+        if column['format'] == 'npy':
+            values = self._load(column['file'], mmap_mode)
+            if column['mask']:
+                rows = np.flatnonzero(self._load(column['mask']))
+                values = values[rows]
+            else:
+                rows = np.arange(len(values))
+            return rows, values
+        with open(os.path.join(self.path, column['file']), 'rb') as f:
+            return pickle.load(f)
+
+    def write(self, data, start_time, end_time, extra=None):
+        """Replace the entry with ``data`` covering a time range"""
+        times, agent_times, agent_ids, has_agents, columns = encode(data)
+        tmp_path = self.path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'time.npy'), np.asarray(times))
+        np.save(os.path.join(tmp_path, 'has_agents.npy'), has_agents)
+        np.save(os.path.join(tmp_path, 'agent_time.npy'),
+            np.asarray(agent_times, dtype=np.int64))
+        np.save(os.path.join(tmp_path, 'agent_id.npy'),
+            np.asarray(agent_ids, dtype=str))
+        meta = {
+            'start_time': start_time,
+            'end_time': end_time,
+            'columns': [],
+        }
+        for index, ((kind, path), (rows, values)) in enumerate(
+            columns.items()
+        ):
+            n_rows = len(times) if kind == 'global' else len(agent_ids)
+            column_format, is_array, saved, mask = _encode_column(
+                rows, values, n_rows)
+            column = {
+                'kind': kind,
+                'path': list(path),
+                'format': column_format,
+                'array': is_array,
+                'mask': None,
+            }
+            if column_format == 'npy':
+                column['file'] = f'{index}.npy'
+                np.save(os.path.join(tmp_path, column['file']), saved)
+                if mask is not None:
+                    column['mask'] = f'{index}.mask.npy'
+                    np.save(os.path.join(tmp_path, column['mask']), mask)
+            else:
+                column['file'] = f'{index}.pkl'
+                with open(os.path.join(tmp_path, column['file']), 'wb') as f:
+                    pickle.dump(saved, f)
+            meta['columns'].append(column)
+        with open(os.path.join(tmp_path, 'extra.pkl'), 'wb') as f:
+            pickle.dump(extra, f)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp_path, self.path)
+        self.meta = meta
+
+    def read_extra(self):
+        with open(os.path.join(self.path, 'extra.pkl'), 'rb') as f:
+            return pickle.load(f)
+
+    def read(self, start_time=-np.inf, end_time=np.inf):
+        """Rebuild the cached data keyed by time, for times in a range"""
+        times = self._load('time.npy')
+        selected = (times >= start_time) & (times <= end_time)
+        time_keys = times.tolist()
+        data = {time_keys[i]: {} for i in np.flatnonzero(selected)}
+        for i in np.flatnonzero(selected & self._load('has_agents.npy')):
+            data[time_keys[i]]['agents'] = {}
+        agent_time = self._load('agent_time.npy')
+        agent_ids = self._load('agent_id.npy').tolist()
+        agent_selected = selected[agent_time]
+        agents = [None] * len(agent_ids)
+        for row in np.flatnonzero(agent_selected).tolist():
+            agent = {}
+            data[time_keys[agent_time[row]]]['agents'][agent_ids[row]] = agent
+            agents[row] = agent
+        roots = {
+            'global': [data.get(time) for time in time_keys],
+            'agent': agents,
+        }
+        row_selected = {'global': selected, 'agent': agent_selected}
+        containers = {'global': {}, 'agent': {}}
+        for column in self.meta['columns']:
+            kind = column['kind']
+            rows, values = self._read_column(column)
+            keep = row_selected[kind][rows]
+            rows = rows[keep].tolist()
+            if column['format'] == 'npy':
+                values = values[keep]
+                values = list(values) if column['array'] else values.tolist()
+            else:
+                values = [value for value, kept in zip(values, keep) if kept]
+            *parent_path, key = column['path']
+            parents = _containers(
+                roots[kind], tuple(parent_path), rows, containers[kind])
+            for parent, value in zip(parents, values):
+                parent[key] = value
+        return data
+
+    def agent_columns(self, paths, mmap_mode='r'):
+        """Get numeric columns of agent values without rebuilding the
+        nested data.
+
+        Args:
+            paths: Paths inside each agent to load.
+            mmap_mode: Memory-map mode passed to :py:func:`numpy.load`.
+
+        Returns:
+            Dictionary with one row per agent per time, containing
+            ``time``, ``agent_id``, and an array for each path. Rows
+            without a value for a path hold 0.
+        """
+        times = self._load('time.npy')
+        agent_time = self._load('agent_time.npy')
+        columns = {
+            'time': times[agent_time],
+            'agent_id': self._load('agent_id.npy', mmap_mode),
+        }
+        by_path = {
+            tuple(column['path']): column
+            for column in self.meta['columns'] if column['kind'] == 'agent'}
+        for path in paths:
+            column = by_path.get(tuple(path))
+            if column is None:
+                raise KeyError(f'{path} is not in cached agent data')
+            if column['format'] != 'npy':
+                raise ValueError(f'{path} is not a numeric column')
+            columns[tuple(path)] = self._load(column['file'], mmap_mode)
+        return columns
+
+
+def _bound(value, default):
+    return default if value is None else value
+
+
+def _unbound(value):
+    return None if np.isinf(value) else value
+
+
+def cached_query(fetch, name, experiment_id, spec=None, sampling_rate=None,
+    start_time=None, end_time=None, cache_dir=CACHE_DIR, refresh=False
+):
+    """Run a query through the cache
+
+    Args:
+        fetch: Function of ``(start_time, end_time)`` that returns a tuple
+            of data keyed by time and any extra object to cache with it.
+            A bound of None means the range is unbounded on that side.
+        name: Name of the query function
+        experiment_id: Experiment ID for simulation
+        spec: Arguments that determine what data is returned, as
+            JSON-serializable values
+        sampling_rate: Get data every this many seconds
+        start_time: Time to start pulling data
+        end_time: Time to stop pulling data
+        cache_dir: Directory to keep cache entries in
+        refresh: Pull all data again even if it is cached
+
+    Returns:
+        The data and the extra object
+    """
+    start = _bound(start_time, -np.inf)
+    end = _bound(end_time, np.inf)
+    entry = CacheEntry(
+        cache_key(name, experiment_id, spec, sampling_rate), cache_dir)
+    if refresh or not entry.exists:
+        data, extra = fetch(start_time, end_time)
+        entry.write(data, start, end, extra)
+        return data, extra
+
+    cached_start, cached_end = entry.time_range
+    missing = []
+    if start < cached_start:
+        missing.append((start, cached_start))
+    if end > cached_end:
+        missing.append((cached_end, end))
+    if missing:
+        # extend the entry, keeping its range contiguous
+        data = entry.read()
+        extra = entry.read_extra()
+        for missing_start, missing_end in missing:
+            new_data, extra = fetch(
+                _unbound(missing_start), _unbound(missing_end))
+            for time, timepoint in new_data.items():
+                data.setdefault(time, timepoint)
+        entry.write(
+            data, min(start, cached_start), max(end, cached_end), extra)
+    return entry.read(start, end), entry.read_extra()
+
+
+def _deserialize(data, cpus):
+    if cpus > 1:
+        with ProcessPoolExecutor(cpus) as executor:
+            values = list(executor.map(
+                deserialize_and_remove_units, data.values()))
+    else:
+        values = [deserialize_and_remove_units(value)
+            for value in data.values()]
+    return dict(zip(data.keys(), values))
+
+
+def cached_access(experiment_id, query=None, host='localhost', port=27017,
+    sampling_rate=None, start_time=None, end_time=None, cpus=1,
+    deserialize=False, cache_dir=CACHE_DIR, refresh=False
+):
+    """Cached :py:func:`ecoli.analysis.db.access`. If ``deserialize`` is
+    True, the data is deserialized and its units removed before it is
+    cached."""
+    def fetch(start, end):
+        data, _, sim_config = access(
+            experiment_id, query, host, port, sampling_rate=sampling_rate,
+            start_time=_bound(start, MinKey()),
+            end_time=_bound(end, MaxKey()), cpus=cpus)
+        if deserialize:
+            data = _deserialize(data, cpus)
+        return data, sim_config
+
+    spec = {'query': query, 'deserialize': deserialize}
+    data, sim_config = cached_query(
+        fetch, 'access', experiment_id, spec, sampling_rate,
+        start_time, end_time, cache_dir, refresh)
+    return data, experiment_id, sim_config
+
+
+def cached_access_counts(experiment_id, cpus=1, deserialize=False,
+    cache_dir=CACHE_DIR, refresh=False, sampling_rate=None, start_time=None,
+    end_time=None, **kwargs
+):
+    """Cached :py:func:`ecoli.analysis.db.access_counts`, taking the same
+    keyword arguments. If ``deserialize`` is True, the data is
+    deserialized and its units removed before it is cached."""
+    def fetch(start, end):
+        data = access_counts(
+            experiment_id, sampling_rate=sampling_rate, start_time=start,
+            end_time=end, cpus=cpus, **kwargs)
+        if deserialize:
+            data = _deserialize(data, cpus)
+        return data, None
+
+    spec = {
+        key: value for key, value in kwargs.items()
+        if key not in ('host', 'port')}
+    spec['deserialize'] = deserialize
+    data, _ = cached_query(
+        fetch, 'access_counts', experiment_id, spec, sampling_rate,
+        start_time, end_time, cache_dir, refresh)
+    return data
+
+
+def test_query_cache():
+    import tempfile
+
+    def make_data(times):
+        return {
+            time: {
+                'fields': {'GLC': np.full((2, 2), time)},
+                'dimensions': {'bounds': [10, 10]},
+                'agents': {
+                    agent_id: {
+                        'boundary': {'mass': time + i, 'location': [i, 1.5]},
+                        'name': f'cell {agent_id}',
+                    }
+                    for i, agent_id in enumerate(['0', '1'][:1 + time % 2])
+                },
+            }
+            for time in times
+        }
+
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        start = 0 if start is None else start
+        end = 10 if end is None else end
+        return make_data(range(start, end + 1)), {'config': 1}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def query(start, end):
+            return cached_query(
+                fetch, 'test', 'exp', {'paths': [['boundary']]}, None,
+                start, end, cache_dir)
+
+        data, extra = query(2, 5)
+        assert calls == [(2, 5)]
+        assert extra == {'config': 1}
+
+        # cached data is rebuilt without querying again
+        data, _ = query(3, 4)
+        assert len(calls) == 1
+        expected = make_data([3, 4])
+        assert sorted(data) == [3, 4]
+        assert data[3]['agents'] == expected[3]['agents']
+        assert data[4]['dimensions'] == expected[4]['dimensions']
+        np.testing.assert_array_equal(
+            data[3]['fields']['GLC'], expected[3]['fields']['GLC'])
+
+        # only the missing times are pulled to extend the entry
+        data, _ = query(0, 7)
+        assert calls[1:] == [(0, 2), (5, 7)]
+        assert sorted(data) == list(range(8))
+        data, _ = query(None, 6)
+        assert calls[3:] == [(None, 0)]
+        assert sorted(data) == list(range(11))[:7]
+
+        # numeric agent columns can be memory-mapped
+        entry = CacheEntry(
+            cache_key('test', 'exp', {'paths': [['boundary']]}, None),
+            cache_dir)
+        columns = entry.agent_columns([('boundary', 'mass')])
+        assert len(columns['time']) == len(columns['agent_id'])
+        np.testing.assert_array_equal(
+            columns[('boundary', 'mass')][:3], [0, 1, 2])
+        np.testing.assert_array_equal(columns['agent_id'][:3], ['0', '0', '1'])
+
+        # functions in specs are hashed by name, not by address
+        assert cache_key('test', 'exp', {'func': np.sum}, None) == cache_key(
+            'test', 'exp', {'func': np.sum}, None)
+        assert cache_key('test', 'exp', {'func': lambda x: x}, None) != \
+            cache_key('test', 'exp', {'func': np.sum}, None)
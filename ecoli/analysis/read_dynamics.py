@@ -3,18 +3,27 @@ Reads dynamics data for each of the nodes of a causality network from a single
 simulation.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+import itertools
 import numpy as np
 import os
 import orjson
 import hashlib
+import pickle
+import shutil
+import struct
+import time
 from tqdm import tqdm
+from typing import NamedTuple
 import zipfile
+import zlib
 
 from vivarium.library.dict_utils import get_value_from_path
 from vivarium.core.emitter import data_from_database, get_experiment_database
 
 from ecoli.processes.metabolism import (
     COUNTS_UNITS, VOLUME_UNITS, TIME_UNITS, MASS_UNITS)
+from ecoli.analysis.sim_data_cache import build_index_map, handle_for
 from ecoli.analysis.network_components import (
     EDGELIST_JSON, Node, NODELIST_JSON, COUNT_UNITS, PROB_UNITS)
 from ecoli.analysis.build_network import NODE_ID_SUFFIX
@@ -23,6 +32,8 @@ from wholecell.utils import units
 
 
 MIN_TIMESTEPS = 41  # Minimum number of timesteps for a working visualization without modification
+DYNAMICS_CACHE = 'dynamics'  # Directory in seriesOutDir for node dynamics of each experiment
+DYNAMICS_CHUNK_SIZE = 500  # Number of nodes read or compressed per task
 # REQUIRED_COLUMNS = [
 # 	("BulkMolecules", "counts"),
 # 	("ComplexationListener", "complexationEvents"),
@@ -63,13 +74,12 @@ def array_timeseries(data, path, timeseries):
     path_timeseries[path[-1]] = np.array(accumulated_data)
 
 
-def convert_dynamics(seriesOutDir, sim_data, node_list, edge_list, experiment_id):
-    """Convert the sim's dynamics data to a Causality seriesOut.zip file."""
+def load_timeseries(experiment_id, sim_data):
+    """Query the listener data of an experiment needed for node dynamics
 
-    if not experiment_id:
-        experiment_id = input('Please provide an experiment id: ')
-
-    # Retrieve the data directly from database
+    Returns:
+        Tuple of the timeseries of the data and the emitted config
+    """
     db = get_experiment_database()
     query = [
         ('bulk',),
@@ -119,106 +129,375 @@ def convert_dynamics(seriesOutDir, sim_data, node_list, edge_list, experiment_id
         (COUNTS_UNITS / MASS_UNITS / TIME_UNITS) * (
             timeseries['listeners']['fba_results']['reaction_fluxes'].T /
                 conversion_coeffs).T).asNumber(units.mmol/units.g/units.h)
+    return timeseries, config
 
-    # Construct dictionaries of indexes where needed
-    indexes = {}
 
-    def build_index_dict(id_array):
-        return {mol: i for i, mol in enumerate(id_array)}
+def build_indexes(sim_data, config):
+    """Construct dictionaries of indexes into the listener arrays"""
+    handle = handle_for(sim_data)
+    indexes = {}
 
     molecule_ids = config['state']['bulk']['_properties']['metadata']
-    indexes["BulkMolecules"] = build_index_dict(molecule_ids)
-
-    gene_ids = sim_data.process.transcription.cistron_data['gene_id']
-    indexes["Genes"] = build_index_dict(gene_ids)
+    indexes["BulkMolecules"] = build_index_map(molecule_ids)
 
-    rna_ids = sim_data.process.transcription.rna_data['id']
-    indexes["RNAs"] = build_index_dict(rna_ids)
-
-    mRNA_ids = rna_ids[sim_data.process.transcription.rna_data['is_mRNA']]
-    indexes["mRNAs"] = build_index_dict(mRNA_ids)
-
-    translated_rna_ids = sim_data.process.translation.monomer_data['cistron_id']
-    indexes["TranslatedRnas"] = build_index_dict(translated_rna_ids)
+    indexes["Genes"] = handle.index_map('genes')
+    indexes["RNAs"] = handle.index_map('rnas')
+    indexes["mRNAs"] = handle.index_map('mrnas')
+    indexes["TranslatedRnas"] = handle.index_map('translated_rnas')
 
     # metabolism_rxn_ids = TableReader(
     # 	os.path.join(simOutDir, "FBAResults")).readAttribute("reactionIDs")
-    metabolism_rxn_ids = config['state']['listeners']['fba_results'][
-        'reaction_fluxes']['_properties']['metadata']
-    metabolism_rxn_ids = sim_data.process.metabolism.reaction_stoich.keys()
-    indexes["MetabolismReactions"] = build_index_dict(metabolism_rxn_ids)
-
-    complexation_rxn_ids = sim_data.process.complexation.ids_reactions
-    indexes["ComplexationReactions"] = build_index_dict(complexation_rxn_ids)
-
-    equilibrium_rxn_ids = sim_data.process.equilibrium.rxn_ids
-    indexes["EquilibriumReactions"] = build_index_dict(equilibrium_rxn_ids)
+    indexes["MetabolismReactions"] = handle.index_map('metabolism_reactions')
+    indexes["ComplexationReactions"] = handle.index_map(
+        'complexation_reactions')
+    indexes["EquilibriumReactions"] = handle.index_map('equilibrium_reactions')
 
     # unprocessed_rna_ids = TableReader(
     #     os.path.join(simOutDir, "RnaMaturationListener")).readAttribute("unprocessed_rna_ids")
     unprocessed_rna_ids = config['state']['listeners'][
         'rna_maturation_listener']['unprocessed_rnas_consumed']['_properties']['metadata']
-    indexes["UnprocessedRnas"] = build_index_dict(unprocessed_rna_ids)
-
-    tf_ids = sim_data.process.transcription_regulation.tf_ids
-    indexes["TranscriptionFactors"] = build_index_dict(tf_ids)
-
-    trna_ids = sim_data.process.transcription.uncharged_trna_names
-    indexes["Charging"] = build_index_dict(trna_ids)
+    indexes["UnprocessedRnas"] = build_index_map(unprocessed_rna_ids)
+
+    indexes["TranscriptionFactors"] = handle.index_map('transcription_factors')
+    indexes["Charging"] = handle.index_map('uncharged_trnas')
+    return indexes
+
+
+def build_dynamics(node_dict, sim_data, indexes, volume, timeseries):
+    """Create a node with its dynamics read from the timeseries"""
+    node = Node()
+    node.node_id = node_dict['ID']
+    node.node_type = node_dict['type']
+    reader = TYPE_TO_READER_FUNCTION.get(node.node_type)
+    if reader:
+        # reader(sim_data, node, node.node_id, columns, indexes, volume)
+        reader(sim_data, node, node.node_id, indexes, volume, timeseries)
+    return node
+
+
+class SeriesEntry(NamedTuple):
+    """The compressed dynamics of one node in ``seriesOut.zip``"""
+    node_id: str
+    filename: str
+    mapping: list
+    compressed: bytes
+    crc: int
+    size: int
+
+
+def dynamics_mapping(dynamics, safe):
+    return [{
+        'index': index,
+        'units': dyn['units'],
+        'type': dyn['type'],
+        'filename': safe + '.json'}
+        for index, dyn in enumerate(dynamics)]
+
+
+def compress_node(node):
+    """Serialize the dynamics of a node and compress them with DEFLATE"""
+    dynamics_path = get_safe_name(node.node_id)
+    dynamics = node.dynamics_dict()
+    dynamics_json = orjson.dumps(dynamics, option=orjson.OPT_SERIALIZE_NUMPY)
+    compressor = zlib.compressobj(
+        zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = compressor.compress(dynamics_json) + compressor.flush()
+    return SeriesEntry(
+        str(node.node_id), dynamics_path + '.json', dynamics_mapping(dynamics, dynamics_path),
+        compressed, zlib.crc32(dynamics_json), len(dynamics_json))
+
+
+class DeflateZipWriter:
+    """Write a zip file of entries that are already compressed with raw
+    DEFLATE, e.g. by :py:func:`compress_node` in worker processes
+
+    Python's ``zipfile`` can only compress entries itself, so this writes
+    the local file headers, central directory and end of central directory
+    records of the zip format directly, with ZIP64 records where sizes,
+    offsets or the number of entries need them. The files can be read with
+    ``zipfile``.
+
+    Args:
+        path: Path of the zip file to write
+    """
 
-    # Cache cell volume array (used for calculating concentrations)
+    #: Sizes and offsets above this are written in ZIP64 extra fields
+    zip64_limit = 0xFFFFFFFF
+    #: Numbers of entries above this are written in ZIP64 records
+    zip64_count_limit = 0xFFFF
+
+    def __init__(self, path):
+        self.fp = open(path, 'wb')
+        self.entries = []
+        self.names = set()
+        now = time.localtime(time.time())
+        self.dos_date = (
+            (now.tm_year - 1980) << 9 | now.tm_mon << 5 | now.tm_mday)
+        self.dos_time = (
+            now.tm_hour << 11 | now.tm_min << 5 | now.tm_sec // 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_compressed(self, name, compressed, crc, size):
+        """Add an entry of data compressed with raw DEFLATE
+
+        Args:
+            name: Name of the entry in the zip file
+            compressed: The compressed data
+            crc: CRC-32 of the uncompressed data
+            size: Size of the uncompressed data
+        """
+        if name in self.names:
+            raise ValueError(f'Duplicate name in zip file: {name}')
+        self.names.add(name)
+        encoded_name = name.encode('utf-8')
+        offset = self.fp.tell()
+        compressed_size = len(compressed)
+        zip64 = max(size, compressed_size) > self.zip64_limit
+        extra = b''
+        if zip64:
+            extra = struct.pack('<HHQQ', 1, 16, size, compressed_size)
+        limit = 0xFFFFFFFF
+        self.fp.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, 0x800,
+            zipfile.ZIP_DEFLATED, self.dos_time, self.dos_date, crc,
+            limit if zip64 else compressed_size, limit if zip64 else size,
+            len(encoded_name), len(extra)))
+        self.fp.write(encoded_name)
+        self.fp.write(extra)
+        self.fp.write(compressed)
+        self.entries.append(
+            (encoded_name, crc, compressed_size, size, offset))
+
+    def writestr(self, name, data):
+        """Compress and add an entry"""
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.write_compressed(
+            name, compressor.compress(data) + compressor.flush(),
+            zlib.crc32(data), len(data))
+
+    def _central_directory_entry(self, entry):
+        encoded_name, crc, compressed_size, size, offset = entry
+        limit = 0xFFFFFFFF
+        zip64_values = []
+        if size > self.zip64_limit:
+            zip64_values.append(size)
+            size = limit
+        if compressed_size > self.zip64_limit:
+            zip64_values.append(compressed_size)
+            compressed_size = limit
+        if offset > self.zip64_limit:
+            zip64_values.append(offset)
+            offset = limit
+        extra = b''
+        if zip64_values:
+            extra = struct.pack(
+                f'<HH{len(zip64_values)}Q', 1, 8 * len(zip64_values),
+                *zip64_values)
+        version = 45 if zip64_values else 20
+        # made by version 'version' on Unix, with -rw------- permissions
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, 3 << 8 | version, version,
+            0x800, zipfile.ZIP_DEFLATED, self.dos_time, self.dos_date, crc,
+            compressed_size, size, len(encoded_name), len(extra), 0, 0, 0,
+            0o600 << 16, offset) + encoded_name + extra
+
+    def close(self):
+        """Write the central directory and close the file"""
+        if self.fp is None:
+            return
+        start = self.fp.tell()
+        for entry in self.entries:
+            self.fp.write(self._central_directory_entry(entry))
+        end = self.fp.tell()
+        count = len(self.entries)
+        directory_size = end - start
+        if (count > self.zip64_count_limit
+                or directory_size > self.zip64_limit
+                or start > self.zip64_limit):
+            self.fp.write(struct.pack(
+                '<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count,
+                directory_size, start))
+            self.fp.write(struct.pack('<IIQI', 0x07064b50, 0, end, 1))
+            count, directory_size, start = 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF
+        self.fp.write(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, count, count, directory_size,
+            start, 0))
+        self.fp.close()
+        self.fp = None
+
+
+# Inputs shared by the processes that read node dynamics. With the fork
+# start method, the timeseries arrays are shared with the parent process.
+_dynamics_inputs = None
+
+
+def _init_dynamics_worker(inputs):
+    global _dynamics_inputs
+    _dynamics_inputs = inputs
+
+
+def _read_chunk(chunk_path, node_dicts):
+    """Read the dynamics of a chunk of nodes and cache them"""
+    sim_data, indexes, volume, timeseries = _dynamics_inputs
+    chunk = {}
+    for node_dict in node_dicts:
+        node = build_dynamics(node_dict, sim_data, indexes, volume, timeseries)
+        if node.node_id not in chunk:
+            chunk[node.node_id] = (node.dynamics, node.dynamics_units)
+    with open(chunk_path + '.tmp', 'wb') as f:
+        pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(chunk_path + '.tmp', chunk_path)
+
+
+def _compress_chunk(generation_dirs, chunk_name):
+    """Concatenate the cached dynamics of a chunk of nodes across generations
+    and compress them"""
+    merged = {}
+    for generation_dir in generation_dirs:
+        with open(os.path.join(generation_dir, chunk_name), 'rb') as f:
+            chunk = pickle.load(f)
+        for node_id, (dynamics, dynamics_units) in chunk.items():
+            if node_id in merged:
+                merged_dynamics = merged[node_id][0]
+                for name, data in dynamics.items():
+                    merged_dynamics[name] = np.concatenate([
+                        np.atleast_1d(merged_dynamics[name]),
+                        np.atleast_1d(data)])
+            else:
+                merged[node_id] = (dict(dynamics), dynamics_units)
+    entries = []
+    for node_id, (dynamics, dynamics_units) in merged.items():
+        node = Node()
+        node.node_id = node_id
+        node.read_dynamics(dynamics, dynamics_units)
+        entries.append(compress_node(node))
+    return entries
+
+
+def _run(executor, function, args_list):
+    """Run a function over argument tuples in order, in parallel if there
+    is an executor"""
+    if executor is None:
+        for args in args_list:
+            yield function(*args)
+    else:
+        futures = [executor.submit(function, *args) for args in args_list]
+        for future in futures:
+            yield future.result()
 
-    # volume = ((1.0 / sim_data.constants.cell_density) * (
-    # 	units.fg * columns[("Mass", "cellMass")])).asNumber(units.L)
-    volume = ((1.0 / sim_data.constants.cell_density) * (
-        units.fg * timeseries['listeners']['mass']['cell_mass'])).asNumber(units.L)
 
-    def dynamics_mapping(dynamics, safe):
-        return [{
-            'index': index,
-            'units': dyn['units'],
-            'type': dyn['type'],
-            'filename': safe + '.json'}
-            for index, dyn in enumerate(dynamics)]
+def convert_dynamics(seriesOutDir, sim_data, node_list, edge_list,
+    experiment_id, cpus=1, append=False, chunk_size=DYNAMICS_CHUNK_SIZE
+):
+    """Convert the sim's dynamics data to a Causality seriesOut.zip file.
 
-    name_mapping = {}
+    The dynamics of each node are cached by experiment in
+    ``{seriesOutDir}/dynamics``, in chunks of ``chunk_size`` nodes that
+    are read, serialized, and compressed by ``cpus`` processes.
 
-    def build_dynamics(node_dict):
-        node = Node()
-        node.node_id = node_dict['ID']
-        node.node_type = node_dict['type']
-        reader = TYPE_TO_READER_FUNCTION.get(node.node_type)
-        if reader:
-            # reader(sim_data, node, node.node_id, columns, indexes, volume)
-            reader(sim_data, node, node.node_id, indexes, volume, timeseries)
-        return node
-
-    def save_node(node, name_mapping):
-        if node.node_id in name_mapping:
-            # Skip duplicates. Why are there duplicates? --check_sanity finds them.
-            return
+    Args:
+        append: If True, the series of this experiment are appended to
+            those of the experiments that were already converted (e.g.
+            earlier generations), whose dynamics are not read again.
+    """
 
-        dynamics_path = get_safe_name(node.node_id)
-        dynamics = node.dynamics_dict()
-        dynamics_json = orjson.dumps(dynamics, option=orjson.OPT_SERIALIZE_NUMPY)
+    if not experiment_id:
+        experiment_id = input('Please provide an experiment id: ')
 
-        zf.writestr(os.path.join('series', dynamics_path + '.json'), dynamics_json)
+    cache_dir = os.path.join(seriesOutDir, DYNAMICS_CACHE)
+    manifest_path = os.path.join(cache_dir, 'generations.json')
+    manifest = {'chunk_size': chunk_size, 'n_nodes': len(node_list),
+        'generations': []}
+    if append and os.path.exists(manifest_path):
+        with open(manifest_path, 'rb') as f:
+            manifest = orjson.loads(f.read())
+        if (manifest['chunk_size'], manifest['n_nodes']) != (
+                chunk_size, len(node_list)):
+            raise ValueError(
+                'The node list or chunk size differs from that of the'
+                ' cached generations. Convert them again without append.')
+    elif os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    if experiment_id not in manifest['generations']:
+        manifest['generations'].append(experiment_id)
+
+    chunks = [
+        (f'chunk_{index:05d}.pickle', node_list[start:start + chunk_size])
+        for index, start in enumerate(range(0, len(node_list), chunk_size))]
+    generation_dirs = [
+        os.path.join(cache_dir, get_safe_name(generation))
+        for generation in manifest['generations']]
+    new_dir = generation_dirs[manifest['generations'].index(experiment_id)]
+    time_path = os.path.join(new_dir, 'time.npy')
+
+    executor = None
+    if not os.path.exists(time_path):
+        timeseries, _config = load_timeseries(experiment_id, sim_data)
+        indexes = build_indexes(sim_data, _config)
+
+        # Cache cell volume array (used for calculating concentrations)
+
+        # volume = ((1.0 / sim_data.constants.cell_density) * (
+        # 	units.fg * columns[("Mass", "cellMass")])).asNumber(units.L)
+        volume = ((1.0 / sim_data.constants.cell_density) * (
+            units.fg * timeseries['listeners']['mass']['cell_mass'])).asNumber(units.L)
+
+        inputs = (sim_data, indexes, volume, timeseries)
+        os.makedirs(new_dir, exist_ok=True)
+        if cpus > 1:
+            executor = ProcessPoolExecutor(
+                cpus, initializer=_init_dynamics_worker, initargs=(inputs,))
+        else:
+            _init_dynamics_worker(inputs)
+        print('Reading node dynamics...')
+        for _ in tqdm(_run(executor, _read_chunk, [
+                (os.path.join(new_dir, chunk_name), node_dicts)
+                for chunk_name, node_dicts in chunks]), total=len(chunks)):
+            pass
+        _init_dynamics_worker(None)
+        if executor is not None:
+            executor.shutdown()
+        # written last to mark the generation as complete
+        np.save(time_path, timeseries['time'])
+        with open(manifest_path, 'wb') as f:
+            f.write(orjson.dumps(manifest))
+
+    timeseries = {'time': np.concatenate([
+        np.load(os.path.join(generation_dir, 'time.npy'))
+        for generation_dir in generation_dirs])}
 
-        name_mapping[str(node.node_id)] = dynamics_mapping(dynamics, dynamics_path)
+    name_mapping = {}
 
     # ZIP_BZIP2 saves 14% bytes vs. ZIP_DEFLATED but takes  +70 secs.
     # ZIP_LZMA  saves 19% bytes vs. ZIP_DEFLATED but takes +260 sec.
     # compresslevel=9 saves very little space.
     zip_name = os.path.join(seriesOutDir, 'seriesOut.zip')
-    with zipfile.ZipFile(zip_name, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
-        for node_dict in tqdm(node_list):
-            node = build_dynamics(node_dict)
-            save_node(node, name_mapping)
-        save_node(time_node(timeseries), name_mapping)
+    executor = ProcessPoolExecutor(cpus) if cpus > 1 else None
+    print('Writing node dynamics...')
+    with DeflateZipWriter(zip_name) as zf:
+        entries = itertools.chain.from_iterable(_run(
+            executor, _compress_chunk,
+            [(generation_dirs, chunk_name) for chunk_name, _ in chunks]))
+        entries = itertools.chain(entries, [compress_node(time_node(timeseries))])
+        for entry in tqdm(entries, total=len(node_list) + 1):
+            if entry.node_id in name_mapping:
+                # Skip duplicates. Why are there duplicates? --check_sanity finds them.
+                continue
+            zf.write_compressed(os.path.join('series', entry.filename),
+                entry.compressed, entry.crc, entry.size)
+            name_mapping[entry.node_id] = entry.mapping
 
         zf.writestr('series.json', orjson.dumps(name_mapping))
         zf.writestr(NODELIST_JSON, orjson.dumps(node_list))
         zf.writestr(EDGELIST_JSON, orjson.dumps(edge_list, option=orjson.OPT_SERIALIZE_NUMPY))
+    if executor is not None:
+        executor.shutdown()
 
 
 def time_node(timeseries):
@@ -544,3 +823,55 @@ TYPE_TO_READER_FUNCTION = {
     "TF Binding": read_tf_binding_dynamics,
     "Charging": read_charging_dynamics,
     }
+
+
+def test_deflate_zip_writer():
+    import tempfile
+
+    node = Node()
+    node.node_id = 'ATP[c]'
+    node.read_dynamics(
+        {'counts': np.arange(5), 'concentration': np.linspace(0, 1, 5)},
+        {'counts': 'N', 'concentration': 'mmol/L'})
+    entry = compress_node(node)
+    assert entry.filename == get_safe_name('ATP[c]') + '.json'
+    assert [mapping['type'] for mapping in entry.mapping] == [
+        'counts', 'concentration']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for zip64_limit in (DeflateZipWriter.zip64_limit, 10):
+            zip_name = os.path.join(tmp, f'series_{zip64_limit}.zip')
+            writer = DeflateZipWriter(zip_name)
+            # small limits to check the ZIP64 records
+            writer.zip64_limit = zip64_limit
+            writer.zip64_count_limit = min(zip64_limit, 0xFFFF)
+            with writer as zf:
+                zf.write_compressed(entry.filename, entry.compressed,
+                    entry.crc, entry.size)
+                zf.writestr('series.json', b'{}')
+            with zipfile.ZipFile(zip_name) as zf:
+                assert zf.testzip() is None
+                assert zf.namelist() == [entry.filename, 'series.json']
+                dynamics = orjson.loads(zf.read(entry.filename))
+                assert zf.read('series.json') == b'{}'
+            assert dynamics[0]['dynamics'] == list(range(5))
+
+
+def test_compress_chunk():
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        generation_dirs = []
+        for generation in range(2):
+            generation_dir = os.path.join(cache_dir, str(generation))
+            os.makedirs(generation_dir)
+            generation_dirs.append(generation_dir)
+            chunk = {'a': ({'counts': np.full(3, generation)}, {'counts': 'N'})}
+            with open(os.path.join(generation_dir, 'chunk.pickle'), 'wb') as f:
+                pickle.dump(chunk, f)
+        entries = _compress_chunk(generation_dirs, 'chunk.pickle')
+    assert len(entries) == 1
+    dynamics = orjson.loads(zlib.decompress(
+        entries[0].compressed, -zlib.MAX_WBITS))
+    assert dynamics[0]['dynamics'] == [0, 0, 0, 1, 1, 1]
+    assert entries[0].size == len(orjson.dumps(dynamics))
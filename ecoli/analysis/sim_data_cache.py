@@ -0,0 +1,152 @@
+"""
+Shared sim_data for analysis scripts
+
+:py:func:`get_sim_data` unpickles each sim_data file once per process and
+returns the same object on later calls, until the file changes. Pools of
+worker processes started with ``fork`` (the default on Linux) inherit the
+loaded sim_data if it is loaded before the pool is created, e.g. with
+:py:func:`get_sim_data_handle`.
+
+:py:class:`SimDataHandle` wraps a loaded sim_data and lazily builds and
+caches the ID arrays and ID-to-index maps that analyses commonly need, so
+they are only built once per process:
+
+>>> class Transcription:
+...     rna_data = {'id': np.array(['a[c]', 'b[c]', 'c[c]'])}
+>>> class Process:
+...     transcription = Transcription()
+>>> class SimData:
+...     process = Process()
+>>> handle = SimDataHandle(SimData())
+>>> handle.index_map('rnas')['b[c]']
+1
+>>> handle.indices('rnas', ['c[c]', 'a[c]'])
+array([2, 0])
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+from ecoli.library.sim_data_serializer import CACHE_DIR, load_sim_data
+
+
+SIM_DATA_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), '..', '..', 'reconstruction',
+        'sim_data', 'kb', 'simData.cPickle',
+    )
+)
+
+#: Functions that get each kind of ID array from sim_data
+ID_ARRAYS = {
+    'bulk': lambda sim_data:
+        sim_data.internal_state.bulk_molecules.bulk_data['id'],
+    'genes': lambda sim_data:
+        sim_data.process.transcription.cistron_data['gene_id'],
+    'cistrons': lambda sim_data:
+        sim_data.process.transcription.cistron_data['id'],
+    'rnas': lambda sim_data: sim_data.process.transcription.rna_data['id'],
+    'mrnas': lambda sim_data: sim_data.process.transcription.rna_data['id'][
+        sim_data.process.transcription.rna_data['is_mRNA']],
+    'monomers': lambda sim_data:
+        sim_data.process.translation.monomer_data['id'],
+    'translated_rnas': lambda sim_data:
+        sim_data.process.translation.monomer_data['cistron_id'],
+    'metabolism_reactions': lambda sim_data:
+        list(sim_data.process.metabolism.reaction_stoich.keys()),
+    'complexation_reactions': lambda sim_data:
+        sim_data.process.complexation.ids_reactions,
+    'equilibrium_reactions': lambda sim_data:
+        sim_data.process.equilibrium.rxn_ids,
+    'transcription_factors': lambda sim_data:
+        sim_data.process.transcription_regulation.tf_ids,
+    'uncharged_trnas': lambda sim_data:
+        sim_data.process.transcription.uncharged_trna_names,
+}
+
+# Loaded sim_data by path, with the modification time of the file
+_loaded = {}
+
+
+def build_index_map(ids):
+    """Map each ID to its index in ``ids``"""
+    return {id_: index for index, id_ in enumerate(ids)}
+
+
+class SimDataHandle:
+    """Loaded sim_data with cached ID arrays and index maps
+
+    Parameters:
+        sim_data: The loaded sim_data
+    """
+
+    def __init__(self, sim_data):
+        self.sim_data = sim_data
+        self._ids = {}
+        self._index_maps = {}
+
+    def ids(self, kind):
+        """Array of the IDs of a kind in :py:data:`ID_ARRAYS`"""
+        if kind not in self._ids:
+            self._ids[kind] = np.asarray(ID_ARRAYS[kind](self.sim_data))
+        return self._ids[kind]
+
+    def index_map(self, kind):
+        """Dictionary from the IDs of a kind to their indices"""
+        if kind not in self._index_maps:
+            self._index_maps[kind] = build_index_map(self.ids(kind).tolist())
+        return self._index_maps[kind]
+
+    def indices(self, kind, ids):
+        """Array of the indices of some IDs of a kind"""
+        index_map = self.index_map(kind)
+        return np.array([index_map[id_] for id_ in ids], dtype=int)
+
+
+def get_sim_data_handle(path=SIM_DATA_PATH, cache_dir=CACHE_DIR):
+    """Get the :py:class:`SimDataHandle` of a sim_data file, loading it
+    only if it was not loaded in this process or has changed since.
+    ``cache_dir`` is passed to
+    :py:func:`ecoli.library.sim_data_serializer.load_sim_data`."""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    loaded = _loaded.get(path)
+    if loaded is None or loaded[0] != mtime:
+        loaded = _loaded[path] = (mtime, SimDataHandle(
+            load_sim_data(path, cache_dir)))
+    return loaded[1]
+
+
+def handle_for(sim_data):
+    """Get the :py:class:`SimDataHandle` of a sim_data, sharing its cached
+    index maps if it was loaded with :py:func:`get_sim_data`."""
+    for _, handle in _loaded.values():
+        if handle.sim_data is sim_data:
+            return handle
+    return SimDataHandle(sim_data)
+
+
+def get_sim_data(path=SIM_DATA_PATH, cache_dir=CACHE_DIR):
+    """Get the sim_data in a file, loading it at most once per process"""
+    return get_sim_data_handle(path, cache_dir).sim_data
+
+
+def test_get_sim_data():
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'simData.cPickle')
+        with open(path, 'wb') as f:
+            pickle.dump({'condition': 'basal'}, f)
+        cache_dir = os.path.join(tmp, 'cache')
+        sim_data = get_sim_data(path, cache_dir)
+        assert get_sim_data(path, cache_dir) is sim_data
+        assert handle_for(sim_data) is get_sim_data_handle(path, cache_dir)
+
+        # files are loaded again after they change
+        with open(path, 'wb') as f:
+            pickle.dump({'condition': 'basal'}, f)
+        os.utime(path, ns=(0, 0))
+        assert get_sim_data(path, cache_dir) is not sim_data
@@ -0,0 +1,369 @@
+"""
+Columnar on-disk store for :py:class:`ecoli.analysis.tablereader.TableReader`
+
+Simulation output is saved with the layout of wcEcoli's ``simOut``
+directory: one directory per listener in
+:py:data:`ecoli.analysis.tablereader.MAPPING` with one ``.npy`` file per
+column, where each row holds the value emitted at one timestep.
+
+* Fixed-length columns are saved as ``{column}.npy`` with shape
+  (rows, ...).
+* Columns whose rows change length are saved as the concatenated values
+  (``{column}.values.npy``) and the row offsets into them
+  (``{column}.offsets.npy``).
+* Columns of strings or other objects are saved as pickled object arrays
+  in ``{column}.npy``.
+* Listener metadata from the emitted config is saved in
+  ``attributes.json``.
+
+Emitted states are written as they arrive, so the full output of a
+simulation never has to be held in memory, and columns are memory-mapped
+when read, so only the requested column and subcolumns are loaded.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+from vivarium.library.topology import get_in
+
+from ecoli.analysis.tablereader_utils import camel_case_to_underscored
+
+ATTRIBUTES_FILE = 'attributes.json'
+
+
+def column_path(listener, name, mapping):
+    """Path of a column in emitted states, or None if it cannot be stored
+
+    Columns without an explicit mapping use the same heuristic path as
+    :py:meth:`ecoli.analysis.tablereader.TableReader.readColumn`.
+    Columns that are mapped with functions are not stored.
+    """
+    viv_path = mapping[name]
+    if viv_path is None:
+        return (
+            'listeners',
+            camel_case_to_underscored(listener),
+            camel_case_to_underscored(name))
+    if isinstance(viv_path, tuple) and not any(
+            callable(elem) for elem in viv_path):
+        return viv_path
+    return None
+
+
+def _json_default(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class _ColumnWriter:
+    """Appends the rows of one column to a raw file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.dtype = None
+        self.row_shape = None
+        self.fixed = True
+        self.lengths = []
+        self.objects = None
+        self.file = None
+
+    def append(self, value):
+        row = np.asarray(value) if value is not None else np.zeros(0)
+        if row.dtype.names and 'count' in row.dtype.names:
+            # bulk molecules that were not serialized to counts
+            row = value = row['count']
+        if self.objects is None and row.dtype.kind in 'OSUV':
+            self._to_objects()
+        if self.objects is not None:
+            self.objects.append(value)
+            return
+
+        if self.dtype is None:
+            self.dtype = row.dtype
+            self.row_shape = row.shape
+            self.file = open(self.path + '.bin', 'wb')
+        elif row.shape != self.row_shape:
+            self.fixed = False
+        if not np.can_cast(row.dtype, self.dtype, 'safe'):
+            self._promote(np.promote_types(row.dtype, self.dtype))
+        self.file.write(np.ascontiguousarray(row, dtype=self.dtype).tobytes())
+        self.lengths.append(row.size)
+
+    def _promote(self, dtype):
+        """Recast the rows written so far to a wider dtype"""
+        self.file.close()
+        written = np.fromfile(self.path + '.bin', dtype=self.dtype)
+        written.astype(dtype).tofile(self.path + '.bin')
+        self.dtype = dtype
+        self.file = open(self.path + '.bin', 'ab')
+
+    def _to_objects(self):
+        """Keep rows of strings and other objects in memory instead"""
+        self.objects = []
+        if self.file is None:
+            return
+        self.file.close()
+        written = np.fromfile(self.path + '.bin', dtype=self.dtype)
+        offsets = np.cumsum([0] + self.lengths)
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            row = written[start:end]
+            self.objects.append(row.reshape(self.row_shape)
+                if row.size == np.prod(self.row_shape) else row)
+        os.remove(self.path + '.bin')
+        self.file = None
+
+    def close(self):
+        if self.objects is not None:
+            rows = np.empty(len(self.objects), dtype=object)
+            for index, row in enumerate(self.objects):
+                rows[index] = row
+            try:
+                stacked = np.array(self.objects)
+                if stacked.dtype != object:
+                    rows = stacked
+            except ValueError:
+                pass
+            np.save(self.path + '.npy', rows, allow_pickle=True)
+            return
+        if self.file is None:
+            return
+        self.file.close()
+        if self.fixed:
+            _raw_to_npy(self.path + '.bin', self.path + '.npy', self.dtype,
+                (len(self.lengths),) + self.row_shape)
+        else:
+            _raw_to_npy(self.path + '.bin', self.path + '.values.npy',
+                self.dtype, (int(np.sum(self.lengths)),))
+            np.save(self.path + '.offsets.npy',
+                np.cumsum([0] + self.lengths, dtype=np.int64))
+
+
+def _raw_to_npy(raw_path, npy_path, dtype, shape):
+    """Add a ``.npy`` header to raw array data without loading it"""
+    with open(npy_path, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': shape})
+        with open(raw_path, 'rb') as raw:
+            shutil.copyfileobj(raw, f)
+    os.remove(raw_path)
+
+
+class TableWriter:
+    """Write emitted states into a columnar store one timestep at a time
+
+    Parameters:
+        out_dir (str): Directory of the store
+        mapping (dict): Mapping from listener names to column names to
+            paths in the emitted state. Defaults to
+            :py:data:`ecoli.analysis.tablereader.MAPPING`.
+        emitted_config (dict): Configuration emitted at the start of the
+            experiment, from which listener metadata is saved.
+    """
+
+    def __init__(self, out_dir, mapping=None, emitted_config=None):
+        if mapping is None:
+            from ecoli.analysis.tablereader import MAPPING
+            mapping = MAPPING
+        self.out_dir = out_dir
+        self.paths = {}
+        for listener, columns in mapping.items():
+            for name in columns:
+                path = column_path(listener, name, columns)
+                if path is not None:
+                    self.paths[(listener, name)] = path
+        self.columns = {}
+        self.missing = set()
+        self.n_rows = 0
+        if emitted_config:
+            self._write_attributes(emitted_config)
+
+    def _write_attributes(self, emitted_config):
+        config = emitted_config.get('state') or {}
+        attributes = {}
+        for (listener, name), path in self.paths.items():
+            metadata = (get_in(config, path) or {}).get(
+                '_properties', {}).get('metadata')
+            if metadata is not None:
+                attributes.setdefault(listener, {})[name] = metadata
+        for listener, listener_attributes in attributes.items():
+            os.makedirs(os.path.join(self.out_dir, listener), exist_ok=True)
+            with open(os.path.join(
+                    self.out_dir, listener, ATTRIBUTES_FILE), 'w') as f:
+                json.dump(listener_attributes, f, default=_json_default)
+
+    def append(self, time, state):
+        """Add the state emitted at one timestep"""
+        state = {**state, 'time': time}
+        for (listener, name), path in self.paths.items():
+            if (listener, name) in self.missing:
+                continue
+            value = get_in(state, path)
+            column = self.columns.get((listener, name))
+            if column is None:
+                # columns are only stored if they are in the first state
+                if value is None or isinstance(value, dict) or self.n_rows:
+                    self.missing.add((listener, name))
+                    continue
+                os.makedirs(os.path.join(self.out_dir, listener),
+                    exist_ok=True)
+                column = self.columns[(listener, name)] = _ColumnWriter(
+                    os.path.join(self.out_dir, listener, name))
+            column.append(value)
+        self.n_rows += 1
+
+    def close(self):
+        for column in self.columns.values():
+            column.close()
+        self.columns = {}
+
+
+def write_table_store(data, out_dir, emitted_config=None, mapping=None):
+    """Write emitted data into a columnar store
+
+    Args:
+        data: Mapping from times to emitted states, or an iterable of
+            (time, state) pairs such as a generator that streams them
+            from a database.
+        out_dir: Directory of the store
+
+    Returns:
+        The directory of the store
+    """
+    if isinstance(data, dict):
+        data = data.items()
+    writer = TableWriter(out_dir, mapping, emitted_config)
+    try:
+        for time, state in data:
+            writer.append(time, state)
+    finally:
+        writer.close()
+    return out_dir
+
+
+class TableStore:
+    """Read columns from a columnar store written by :py:class:`TableWriter`
+
+    Parameters:
+        root (str): Directory of the store
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._attributes = {}
+
+    def listener_dir(self, listener):
+        return os.path.join(self.root, listener)
+
+    def column_names(self, listener):
+        names = set()
+        directory = self.listener_dir(listener)
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith('.npy'):
+                    name = filename[:-len('.npy')]
+                    for suffix in ('.values', '.offsets'):
+                        if name.endswith(suffix):
+                            name = name[:-len(suffix)]
+                    names.add(name)
+        return sorted(names)
+
+    def has_column(self, listener, name):
+        path = os.path.join(self.listener_dir(listener), name)
+        return os.path.exists(path + '.npy') or os.path.exists(
+            path + '.offsets.npy')
+
+    def is_variable_length(self, listener, name):
+        return os.path.exists(os.path.join(
+            self.listener_dir(listener), name + '.offsets.npy'))
+
+    def read_column(self, listener, name, indices=None):
+        """Read the rows of a column, optionally only at some subcolumns
+
+        Fixed-length columns are memory-mapped and only the selected
+        subcolumns are copied into memory. Rows of variable-length
+        columns are padded with NaN.
+
+        Returns:
+            A writable array with one row per timestep.
+        """
+        path = os.path.join(self.listener_dir(listener), name)
+        if self.is_variable_length(listener, name):
+            if indices is not None:
+                raise ValueError(
+                    f'{listener}/{name} is variable length, so its'
+                    ' subcolumns cannot be selected.')
+            values = np.load(path + '.values.npy', mmap_mode='r')
+            offsets = np.load(path + '.offsets.npy')
+            lengths = np.diff(offsets)
+            result = np.full(
+                (len(lengths), lengths.max(initial=0)), np.nan)
+            mask = np.arange(result.shape[1]) < lengths[:, np.newaxis]
+            result[mask] = values
+            return result
+        column = np.load(path + '.npy', mmap_mode='r', allow_pickle=True)
+        if indices is not None:
+            return np.array(column[:, indices])
+        return np.array(column)
+
+    def read_attribute(self, listener, name):
+        if listener not in self._attributes:
+            path = os.path.join(self.listener_dir(listener), ATTRIBUTES_FILE)
+            attributes = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    attributes = json.load(f)
+            self._attributes[listener] = attributes
+        return self._attributes[listener].get(name)
+
+
+def test_table_store():
+    import tempfile
+
+    mapping = {
+        'Main': {'time': ('time',)},
+        'Mass': {
+            'dryMass': ('listeners', 'mass', 'dry_mass'),
+            'cellMass': None,
+        },
+        'RnapData': {
+            'active_rnap_coordinates': (
+                'listeners', 'rnap_data', 'active_rnap_coordinates'),
+            'rnaInitEvent': ('listeners', 'rnap_data', 'rna_init_event'),
+        },
+        'Missing': {'column': ('listeners', 'missing')},
+    }
+    data = {
+        time: {'listeners': {
+            'mass': {'dry_mass': 300 + time, 'cell_mass': 1000.0},
+            'rnap_data': {
+                'active_rnap_coordinates': list(range(time)),
+                'rna_init_event': [time, 2 * time, 3 * time]}}}
+        for time in range(4)}
+    # a column that changes dtype midway is promoted
+    data[3]['listeners']['mass']['dry_mass'] = 303.5
+    emitted_config = {'state': {'listeners': {'rnap_data': {
+        'rna_init_event': {'_properties': {'metadata': ['a', 'b', 'c']}}}}}}
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        write_table_store(data, out_dir, emitted_config, mapping)
+        store = TableStore(out_dir)
+        assert store.column_names('Mass') == ['cellMass', 'dryMass']
+        assert not store.has_column('Missing', 'column')
+        np.testing.assert_array_equal(
+            store.read_column('Main', 'time'), [0, 1, 2, 3])
+        np.testing.assert_array_equal(
+            store.read_column('Mass', 'dryMass'), [300, 301, 302, 303.5])
+        np.testing.assert_array_equal(
+            store.read_column('RnapData', 'rnaInitEvent', [0, 2]),
+            [[0, 0], [1, 3], [2, 6], [3, 9]])
+        coordinates = store.read_column(
+            'RnapData', 'active_rnap_coordinates')
+        assert coordinates.shape == (4, 3)
+        np.testing.assert_array_equal(coordinates[2], [0, 1, np.nan])
+        assert store.read_attribute(
+            'RnapData', 'rnaInitEvent') == ['a', 'b', 'c']
@@ -1,9 +1,11 @@
+import os
 from warnings import warn
 import numpy as np
 from typing import Any
 
 from vivarium.core.emitter import timeseries_from_data
 
+from ecoli.analysis.table_store import TableStore
 from ecoli.analysis.tablereader_utils import (
     camel_case_to_underscored)
 
@@ -361,9 +363,14 @@ class TableReader(object):
     Given a path within the wcEcoli output structure and timeseries data from a vivarium-ecoli experiment,
     this class provides a way to retrieve data as if it were structured in the same way as it is in wcEcoli.
 
+    Data can also be read from a columnar store written with
+    :py:func:`ecoli.analysis.table_store.write_table_store`, in which case
+    only the requested columns are loaded from disk.
+
     Parameters:
         path (str): which listener this TableReader would be reading from
-        data (dict): data from a vivarium-ecoli experiment
+        data (dict or str): data from a vivarium-ecoli experiment, or the
+            directory of a columnar store
         emitted_config (dict): configuration emitted at start of experiment
         timeseries_data (bool): whether data is a timeseries (e.g. passed through timeseries_from_data)
     """
@@ -372,7 +379,11 @@ class TableReader(object):
         self._path = path
 
         # Store reference to the data
-        if not timeseries_data:
+        self._store = None
+        if isinstance(data, (str, os.PathLike)):
+            self._store = TableStore(data)
+            data = None
+        elif not timeseries_data:
             data = timeseries_from_data(data)
         self._data = data
 
@@ -395,6 +406,13 @@ class TableReader(object):
         If emitted_config is supplied during initialization, this can be used
         to access listener metadata (e.g. bulk molecule names for count arrays)
         """
+        if self._store is not None:
+            attribute = self._store.read_attribute(self._path, name)
+            if attribute is None and self.emitted_config is None:
+                raise DoesNotExistError(
+                    f'No attribute {name} for {self._path}')
+            if attribute is not None:
+                return attribute
         viv_path = self._mapping[name]
         sim_metadata = self.emitted_config['state'] or {}
         for key in viv_path:
@@ -428,6 +446,9 @@ class TableReader(object):
         Returns:
             ndarray: A writable 0D, 1D, or 2D array.
         """
+        if self._store is not None:
+            return self._read_stored_column(name, indices, squeeze)
+
         # Squeeze if flag is set to True
         viv_path = self._mapping[name]
         if callable(viv_path):
@@ -468,10 +489,26 @@ class TableReader(object):
 
         return result
 
+    def _read_stored_column(self, name, indices, squeeze):
+        if not self._store.has_column(self._path, name):
+            raise DoesNotExistError(
+                f'No column {name} for {self._path} in {self._store.root}')
+        if indices is not None and self._store.is_variable_length(
+                self._path, name):
+            raise VariableLengthColumnError(
+                f'Cannot select subcolumns of {self._path}/{name} because'
+                ' it is variable length.')
+        result = self._store.read_column(self._path, name, indices)
+        if squeeze:
+            result = result.squeeze()
+        return result
+
     def columnNames(self):
         """
         Returns the names of all columns.
         """
+        if self._store is not None:
+            return self._store.column_names(self._path)
         return list(self._columnNames)
 
     def close(self):
@@ -523,6 +560,40 @@ def read_bulk_molecule_counts(data, mol_names):
         yield counts
 
 
+def test_columnar_table_reader():
+    import tempfile
+    from ecoli.analysis.table_store import write_table_store
+
+    data = {
+        time: {'listeners': {
+            'mass': {'dry_mass': 300.0 + time},
+            'rnap_data': {'active_rnap_coordinates': list(range(time))},
+            'rna_synth_prob': {'n_bound_TF_per_TU': [[time, 0], [1, 1]]}}}
+        for time in range(3)}
+    with tempfile.TemporaryDirectory() as out_dir:
+        write_table_store(data, out_dir)
+        mass = TableReader('Mass', out_dir)
+        assert mass.columnNames() == ['dryMass']
+        np.testing.assert_array_equal(
+            mass.readColumn('dryMass'), [300.0, 301.0, 302.0])
+        tf_reader = TableReader('RnaSynthProb', out_dir)
+        np.testing.assert_array_equal(
+            tf_reader.readColumn('n_bound_TF_per_TU', [1]),
+            [[1, 1], [1, 1], [1, 1]])
+        rnap = TableReader('RnapData', out_dir)
+        assert rnap.readColumn('active_rnap_coordinates').shape == (3, 2)
+        try:
+            rnap.readColumn('active_rnap_coordinates', [0])
+            assert False
+        except VariableLengthColumnError:
+            pass
+        try:
+            mass.readColumn('cellMass')
+            assert False
+        except DoesNotExistError:
+            pass
+
+
 def test_table_reader():
     from ecoli.experiments.ecoli_master_sim import EcoliSim
 
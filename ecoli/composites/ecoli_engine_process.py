@@ -28,6 +28,7 @@ from ecoli.experiments.ecoli_master_sim import (
     report_profiling,
     _tuplify_topology
 )
+from ecoli.library.emit_policy import emit_policy_config
 from ecoli.library.logging_tools import write_json
 from ecoli.library.sim_data import RAND_MAX
 from ecoli.library.schema import not_a_process
@@ -71,6 +72,9 @@ class EcoliInnerSim(Composer):
             # with DivisionDetector
             'divide': True,  
             'spatial_environment': False,
+            # Daughter cells reuse the sim_data and process configs built
+            # for earlier cells with the same options
+            'cache_templates': True,
         })
         ecoli_sim.build_ecoli()
         composite = ecoli_sim.ecoli
@@ -293,6 +297,9 @@ def run_simulation(config):
     emitter_config = {'type': config['emitter']}
     for key, value in config['emitter_arg']:
         emitter_config[key] = value
+    # Emit policies are applied by the emitter of each cell
+    emitter_config = emit_policy_config(
+        emitter_config, config.get('emit_policy'))
     base_config = {
         'agent_id': config['agent_id'],
         'tunnel_out_schemas': tunnel_out_schemas,
@@ -15,6 +15,9 @@ from ecoli.processes.environment.multibody_physics import (
     Multibody, make_random_position)
 from ecoli.processes.environment.reaction_diffusion_field import (
     ReactionDiffusion)
+from ecoli.processes.environment.adaptive_reaction_diffusion import (
+    AdaptiveReactionDiffusion)
+from ecoli.library.lattice_utils import SpatialIndex
 from ecoli.composites.environment.grow_divide import (
     GrowDivideExchange, GrowDivide)
 
@@ -41,6 +44,7 @@ def make_lattice_config(
         keep_fields_emit=None,
         set_config=None,
         parallel=None,
+        refinement=None,
 ):
     config = {'multibody': {}, 'reaction_diffusion': {}}
 
@@ -78,6 +82,9 @@ def make_lattice_config(
                     '_emit': False}
                 for field_id in molecules
                 if field_id not in keep_fields_emit}}
+    if refinement:
+        config['adaptive_fields'] = True
+        config['reaction_diffusion']['refinement'] = refinement
     if parallel:
         config['reaction_diffusion']['_parallel'] = True
         config['multibody']['_parallel'] = True
@@ -105,17 +112,43 @@ class Lattice(Composer):
             'bounds': [10, 10] * units.um,
             'depth': 3000.0 * units.um,
             'diffusion': 1e-2 * units.um ** 2 / units.sec,
-        }
+            # SpatialIndex of agent bins shared by the environment
+            # processes, made for each Lattice if None. Pass
+            # Lattice.spatial_index to agent steps such as LocalField and
+            # Lysis to share it with them.
+            'spatial_index': None,
+        },
+        # refine the fields in a patch that follows the agents, with
+        # 'refinement' and 'margin' set in 'reaction_diffusion'
+        'adaptive_fields': False,
     }
 
     def __init__(self, config=None):
         super().__init__(config)
+        self.spatial_index = None
+        reaction_diffusion = self.config['reaction_diffusion']
+        multibody = self.config['multibody']
+        if reaction_diffusion is not None and not reaction_diffusion.get(
+                '_parallel'):
+            if reaction_diffusion.get('spatial_index') is None:
+                reaction_diffusion['spatial_index'] = SpatialIndex(
+                    reaction_diffusion['n_bins'],
+                    reaction_diffusion['bounds'])
+            self.spatial_index = reaction_diffusion['spatial_index']
+        if multibody is not None and not multibody.get('_parallel') and \
+                multibody.get('spatial_index') is None:
+            multibody['spatial_index'] = self.spatial_index
 
     def generate_processes(self, config):
+        if config['adaptive_fields']:
+            reaction_diffusion = AdaptiveReactionDiffusion(
+                config['reaction_diffusion'])
+        else:
+            reaction_diffusion = ReactionDiffusion(
+                config['reaction_diffusion'])
         processes = {
             'multibody': Multibody(config['multibody']),
-            'reaction_diffusion': ReactionDiffusion(
-                config['reaction_diffusion'])
+            'reaction_diffusion': reaction_diffusion,
         }
         return processes
 
@@ -128,6 +161,8 @@ class Lattice(Composer):
                 'dimensions': ('dimensions',),
             }
         }
+        if config['adaptive_fields']:
+            topology['reaction_diffusion']['patch'] = ('patch',)
         return topology
 
 
@@ -141,6 +176,7 @@ def test_lattice(
         initial_field=None,
         growth_rate=0.05,  # fast growth
         growth_noise=5e-4,
+        refinement=None,
         return_data=False
 ):
     # lattice configuration
@@ -152,7 +188,8 @@ def test_lattice(
         # 'time_step': 60,
         'jitter_force': 1e-5,
         'concentrations': {
-            external_molecule: 1.0}
+            external_molecule: 1.0},
+        'refinement': refinement,
     }
     if initial_field is not None:
         lattice_config_kwargs['concentrations'] = {
@@ -29,6 +29,7 @@ from ecoli.processes.registries import topology_registry
 
 from ecoli.composites.ecoli_configs import CONFIG_DIR_PATH
 from ecoli.library.schema import not_a_process
+from ecoli.library.emit_policy import emit_policy_config
 
 
 def _tuplify_topology(topology):
@@ -496,7 +497,10 @@ class EcoliSim:
             'emit_topology': self.emit_topology,
             'emit_processes': self.emit_processes,
             'emit_config': self.emit_config,
-            'emitter': self.emitter,
+            'emitter': emit_policy_config(
+                self.emitter, self.config.get('emit_policy'),
+                tuple(self.agents_path) + ('*',)
+                if self.divide or self.spatial_environment else ()),
         }
         if self.experiment_id:
             # Store backup of base experiment ID,
@@ -0,0 +1,262 @@
+"""
+=============
+Emit Policies
+=============
+
+Downsample and aggregate emitted data before it is written.
+
+Emit policies are configured with the ``emit_policy`` option of the
+simulation config, a list of dictionaries with the keys:
+
+* ``path``: Path to the emitted value relative to each cell, e.g.
+  ``["listeners", "monomer_counts"]``. A ``*`` in a path matches any key.
+* ``interval`` (optional): Seconds between emits of the value. Defaults to
+  emitting the value every time the state is emitted.
+* ``aggregate`` (optional): How values are combined over the window of
+  timesteps since the value was last emitted: ``last`` (default), ``mean``,
+  ``min``, or ``max``.
+* ``indices`` (optional): Indices along the first axis of the value to
+  emit, e.g. the monomers of interest.
+
+If the value at a path is a dictionary, e.g. a whole listener, the
+aggregate and indices are applied to each array or number in it.
+
+For example, to emit the average counts of only the first three monomers
+every 10 seconds:
+
+.. code-block:: json
+
+    "emit_policy": [
+        {
+            "path": ["listeners", "monomer_counts"],
+            "interval": 10,
+            "aggregate": "mean",
+            "indices": [0, 1, 2]
+        }
+    ]
+
+:py:class:`EmitPolicyEmitter` applies the policies to the history emits
+and passes them on to another emitter. The policies are saved in the
+``emit_policy`` key of the emitted experiment metadata, so analyses can
+tell which values were downsampled.
+"""
+
+import copy
+
+import numpy as np
+from vivarium.core.emitter import Emitter, get_emitter
+
+AGGREGATES = ('last', 'mean', 'min', 'max')
+
+
+def emit_policy_config(emitter, policies, path_prefix=()):
+    """Wrap an emitter config so that emits follow some policies
+
+    Args:
+        emitter: Emitter type name or config
+        policies: List of emit policies (see module docstring)
+        path_prefix: Prefixed to the path of each policy, e.g.
+            ``('agents', '*')`` if cells are in a colony.
+
+    Returns:
+        The emitter config, or the original emitter if there are no
+        policies.
+    """
+    if not policies:
+        return emitter
+    if isinstance(emitter, str):
+        emitter = {'type': emitter}
+    policies = copy.deepcopy(policies)
+    for policy in policies:
+        policy['path'] = tuple(path_prefix) + tuple(policy['path'])
+    return {
+        'type': 'emit_policy',
+        'emitter': emitter,
+        'policies': policies,
+    }
+
+
+def _match_paths(data, path):
+    """Yield the paths in ``data`` that match a path with wildcards"""
+    if not path:
+        yield ()
+        return
+    if not isinstance(data, dict):
+        return
+    key, rest = path[0], path[1:]
+    keys = data.keys() if key == '*' else [key] if key in data else []
+    for matched_key in list(keys):
+        for matched in _match_paths(data[matched_key], rest):
+            yield (matched_key,) + matched
+
+
+class _Window:
+    """Aggregate of the values of one path since it was last emitted. If
+    the value is a dictionary, e.g. a listener, each of its leaves is
+    aggregated separately."""
+
+    def __init__(self, aggregate, indices=None):
+        self.aggregate = aggregate
+        self.indices = indices
+        self.value = None
+        self.children = None
+        self.count = 0
+
+    def add(self, value):
+        if isinstance(value, dict):
+            if self.children is None:
+                self.children = {}
+            for key, child in value.items():
+                self.children.setdefault(
+                    key, _Window(self.aggregate, self.indices)).add(child)
+            self.count += 1
+            return
+        if self.indices is not None and np.ndim(value):
+            value = np.asarray(value)[self.indices]
+        if self.aggregate == 'last' or self.count == 0:
+            self.value = np.array(
+                value, dtype=float if self.aggregate == 'mean' else None)
+        elif self.aggregate == 'mean':
+            self.value += value
+        elif self.aggregate == 'min':
+            np.minimum(self.value, value, out=self.value)
+        else:
+            np.maximum(self.value, value, out=self.value)
+        self.count += 1
+
+    def pop(self):
+        if self.children is not None:
+            value = {key: child.pop() for key, child in self.children.items()}
+            self.children = None
+            self.count = 0
+            return value
+        value = self.value
+        if self.aggregate == 'mean':
+            value = value / self.count
+        self.value = None
+        self.count = 0
+        return value.tolist() if value.ndim else value.item()
+
+
+class EmitPolicy:
+    """Downsample and aggregate the values at one path of emitted data"""
+
+    def __init__(self, path, interval=None, aggregate='last', indices=None):
+        if aggregate not in AGGREGATES:
+            raise ValueError(
+                f'Unknown aggregate {aggregate} for {path}. Use one of'
+                f' {AGGREGATES}.')
+        self.path = tuple(path)
+        self.interval = interval
+        self.aggregate = aggregate
+        self.indices = None if indices is None else np.asarray(indices)
+        self.windows = {}
+        self.next_emit = {}
+
+    def apply(self, data, time):
+        """Replace the values at this path in data with their aggregates,
+        or remove them if they are not emitted at this time."""
+        paths = list(_match_paths(data, self.path))
+        # forget values of cells that are gone, e.g. after division
+        for path in set(self.windows) - set(paths):
+            del self.windows[path]
+            self.next_emit.pop(path, None)
+        for path in paths:
+            *parent_path, key = path
+            parent = data
+            for parent_key in parent_path:
+                parent = parent[parent_key]
+            value = parent[key]
+
+            window = self.windows.setdefault(
+                path, _Window(self.aggregate, self.indices))
+            if self.aggregate != 'last' or self.interval is None or \
+                    time >= self.next_emit.get(path, time):
+                window.add(value)
+            if self.interval is None or \
+                    time >= self.next_emit.get(path, time):
+                parent[key] = window.pop()
+                if self.interval is not None:
+                    self.next_emit[path] = time + self.interval
+            else:
+                del parent[key]
+
+
+class EmitPolicyEmitter(Emitter):
+    """Apply emit policies to history emits before passing them on
+
+    Config:
+        emitter: Config of the emitter that the data is passed to. The
+            ``experiment_id`` and ``embed_path`` of this emitter are
+            passed on to it.
+        policies: List of emit policies (see module docstring)
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        emitter_config = dict(config.get('emitter', {}))
+        for key in ('experiment_id', 'embed_path'):
+            if key in config:
+                emitter_config[key] = config[key]
+        self.emitter = get_emitter(emitter_config)
+        self.policies = [
+            EmitPolicy(**policy) for policy in config.get('policies', [])]
+
+    def emit(self, data):
+        if data['table'] == 'history':
+            emit_data = data['data']
+            time = emit_data.get('time')
+            for policy in self.policies:
+                policy.apply(emit_data, time)
+        elif data['table'] == 'configuration' and isinstance(
+                data['data'].get('metadata'), dict):
+            data['data']['metadata'] = {
+                **data['data']['metadata'],
+                'emit_policy': self.config.get('policies', [])}
+        self.emitter.emit(data)
+
+    def get_data(self, query=None):
+        return self.emitter.get_data(query)
+
+
+def test_emit_policy():
+    emitter = get_emitter(emit_policy_config('timeseries', [
+        {'path': ['listeners', 'monomer_counts'], 'interval': 2,
+            'aggregate': 'mean', 'indices': [0, 2]},
+        {'path': ['listeners', 'mass', 'cell_mass'], 'interval': 2},
+        {'path': ['listeners', 'fba_results'], 'aggregate': 'max'},
+        {'path': ['listeners', 'rnap_data'], 'interval': 2,
+            'aggregate': 'mean', 'indices': [1]},
+    ], ('agents', '*')))
+    emitter.emit({'table': 'configuration', 'data': {'metadata': {}}})
+    for time in range(5):
+        emitter.emit({'table': 'history', 'data': {'time': float(time),
+            'agents': {agent: {'listeners': {
+                'monomer_counts': [time, 10, 2 * time],
+                'mass': {'cell_mass': time, 'dry_mass': time},
+                'fba_results': {
+                    'media_id': time,
+                    'reaction_fluxes': [time, -time],
+                    'target_homeostatic_dmdt': {'ATP[c]': time}},
+                'rnap_data': {
+                    'active_rnap_counts': 5 * time,
+                    'rna_init_event': [time, 2 * time, 0]}}}
+            for agent in ('0', '1')}}})
+    data = emitter.get_data()
+    listeners = {
+        time: state['agents']['0']['listeners']
+        for time, state in data.items()}
+    assert [time for time in listeners
+        if 'monomer_counts' in listeners[time]] == [0, 2, 4]
+    assert listeners[0]['monomer_counts'] == [0, 0]
+    assert listeners[2]['monomer_counts'] == [1.5, 3]
+    assert listeners[4]['monomer_counts'] == [3.5, 7]
+    assert [time for time in listeners
+        if 'cell_mass' in listeners[time]['mass']] == [0, 2, 4]
+    assert listeners[3]['mass'] == {'dry_mass': 3}
+    assert listeners[3]['fba_results'] == {'media_id': 3,
+        'reaction_fluxes': [3, -3], 'target_homeostatic_dmdt': {'ATP[c]': 3}}
+    assert 'rnap_data' not in listeners[3]
+    assert listeners[4]['rnap_data'] == {
+        'active_rnap_counts': 17.5, 'rna_init_event': [7]}
+    assert data[4]['agents']['1']['listeners']['monomer_counts'] == [3.5, 7]
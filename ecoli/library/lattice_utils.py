@@ -4,10 +4,14 @@ Utilities for Lattice Environments
 ==================================
 '''
 
+import copy
+import math
+
 import numpy as np
+import pytest
 from scipy import constants
 from vivarium.core.process import Process
-from vivarium.library.units import remove_units
+from vivarium.library.units import Quantity, remove_units
 from vivarium.library.topology import get_in, assoc_path
 
 from vivarium.library.units import units
@@ -16,11 +20,50 @@ AVOGADRO = constants.N_A / units.mol
 # Cache units to save time
 UNITS_UM = units.um
 UNITS_MM = units.mM
+UNITS_L = units.L
+# Cubic microns per liter
+UM3_PER_L = 1e15
+
+#: Factors to convert from a pint unit to a canonical unit, cached by unit
+_conversion_factors = {}
+
+
+def magnitude_in(value, unit):
+    '''Get the magnitude of a quantity in a unit without pint arithmetic
+
+    The conversion factor from the quantity's unit is computed once and
+    cached. Values without units are assumed to already be in ``unit``.
+    '''
+    if not isinstance(value, Quantity):
+        return value
+    key = (value._units, unit)
+    factor = _conversion_factors.get(key)
+    if factor is None:
+        factor = (1 * value.units).to(unit).magnitude
+        _conversion_factors[key] = factor
+    return value.magnitude * factor
+
+
+def magnitudes_in(values, unit):
+    '''Apply :py:func:`magnitude_in` to a list or array quantity'''
+    if isinstance(values, Quantity):
+        return list(magnitude_in(values, unit))
+    return [magnitude_in(value, unit) for value in values]
+
+
+def to_um_magnitudes(values):
+    '''Convert a list of lengths to floats in microns
+
+    Values without units are assumed to already be in microns.
+    '''
+    return magnitudes_in(values, UNITS_UM)
 
 
 def get_bin_site(location, n_bins, bounds):
     '''Get a bin's indices in the lattice
 
+    Locations and bounds without units are in microns.
+
     Parameters:
         location (list): A list of 2 floats that specify the x and y
             coordinates of a point inside the desired bin.
@@ -34,14 +77,8 @@ def get_bin_site(location, n_bins, bounds):
         tuple: A 2-tuple of the x and y indices of the bin in the
         lattice.
     '''
-    location = [
-        coordinate.to(UNITS_UM).magnitude
-        for coordinate in location
-    ]
-    bounds = [
-        bound.to(UNITS_UM).magnitude
-        for bound in bounds
-    ]
+    location = to_um_magnitudes(location)
+    bounds = to_um_magnitudes(bounds)
     bin_site_no_rounding = np.array([
         location[0] * n_bins[0] / bounds[0],
         location[1] * n_bins[1] / bounds[1]
@@ -84,6 +121,310 @@ def count_to_concentration(count, bin_volume):
     return count / (bin_volume * AVOGADRO)
 
 
+def get_bin_volume_magnitude(n_bins, bounds, depth):
+    '''Unitless version of :py:func:`get_bin_volume`
+
+    Bounds and depth without units are in microns. Returns the volume of
+    each bin in liters.
+    '''
+    bounds = to_um_magnitudes(bounds)
+    depth = magnitude_in(depth, UNITS_UM)
+    total_volume = depth * bounds[0] * bounds[1]
+    return total_volume / (n_bins[0] * n_bins[1]) / UM3_PER_L
+
+
+def count_to_concentration_magnitude(count, bin_volume):
+    '''Unitless version of :py:func:`count_to_concentration`
+
+    Parameters:
+        count (float): The number of molecules in the bin.
+        bin_volume (float): The volume of the bin in liters.
+
+    Returns:
+        float: The concentration of molecule in the bin in mM.
+    '''
+    return count / (bin_volume * constants.N_A) * 1e3
+
+
+class LatticeDimensions:
+    '''Lattice dimensions as magnitudes in canonical units
+
+    Bounds and depth are in microns, bin volume is in liters, and
+    ``count_concentration`` is the concentration of one molecule in a bin
+    in mM. Converting from a ``dimensions`` store is only redone when one
+    of its values has been replaced.
+    '''
+
+    def __init__(self, dimensions=None):
+        self._source = None
+        if dimensions is not None:
+            self.update(dimensions)
+
+    def update(self, dimensions):
+        source = (
+            dimensions['n_bins'], dimensions['bounds'], dimensions['depth'])
+        if self._source is not None and all(
+                new is old for new, old in zip(source, self._source)):
+            return self
+        self._source = source
+        n_bins, bounds, depth = source
+        self.n_bins = [int(n_bins[0]), int(n_bins[1])]
+        self.bounds = to_um_magnitudes(bounds)
+        self.depth = magnitude_in(depth, UNITS_UM)
+        self.bin_volume = get_bin_volume_magnitude(
+            self.n_bins, self.bounds, self.depth)
+        self.count_concentration = count_to_concentration_magnitude(
+            1, self.bin_volume)
+        return self
+
+
+class SpatialIndex:
+    '''Uniform grid hash of agent locations, keyed by lattice bin
+
+    The index is maintained incrementally: :py:meth:`update` only moves
+    an agent between bins when its bin changes, and :py:meth:`sync`
+    adds, moves, and removes agents to match a dictionary of locations.
+    Locations and bounds are unitless, in microns. Queries for the
+    agents in a bin, the bins that hold agents, and the neighbors within
+    a radius only visit the bins involved instead of every agent.
+
+    An index is shared by passing the same instance in the
+    ``spatial_index`` parameter of several processes, e.g. an environment
+    process and the LocalField and Lysis steps of its agents. Copying a
+    config keeps the instance shared, but processes that run in another
+    OS process (``_parallel``) cannot share it
+    (see :py:func:`shared_spatial_index`).
+
+    Parameters:
+        n_bins (list): A list of 2 ints that specify the number of bins
+            along the x and y axes, respectively.
+        bounds (list): A list of 2 floats that define the dimensions of
+            the lattice environment along the x and y axes, in microns.
+    '''
+
+    def __init__(self, n_bins, bounds):
+        self.n_bins = None
+        self.bounds = None
+        self.agent_bins = {}
+        self.agent_locations = {}
+        self.bin_agents = {}
+        self.set_dimensions(n_bins, bounds)
+
+    def __deepcopy__(self, memo):
+        # configs are deep-copied, e.g. when daughter cells are generated,
+        # but must keep referring to the same index
+        return self
+
+    def set_dimensions(self, n_bins, bounds):
+        '''Set the lattice dimensions, re-binning agents if they changed'''
+        n_bins = (int(n_bins[0]), int(n_bins[1]))
+        bounds = tuple(float(bound) for bound in to_um_magnitudes(bounds))
+        if n_bins == self.n_bins and bounds == self.bounds:
+            return
+        self.n_bins = n_bins
+        self.bounds = bounds
+        self.bin_size = (bounds[0] / n_bins[0], bounds[1] / n_bins[1])
+        locations = self.agent_locations
+        self.agent_bins = {}
+        self.agent_locations = {}
+        self.bin_agents = {}
+        for agent_id, location in locations.items():
+            self.update(agent_id, location)
+
+    def get_bin_site(self, location):
+        '''Same as :py:func:`get_bin_site` for a unitless location'''
+        return (
+            math.floor(location[0] * self.n_bins[0] / self.bounds[0])
+            % self.n_bins[0],
+            math.floor(location[1] * self.n_bins[1] / self.bounds[1])
+            % self.n_bins[1],
+        )
+
+    def update(self, agent_id, location):
+        '''Add or move an agent, returning its bin site'''
+        location = (location[0], location[1])
+        if self.agent_locations.get(agent_id) == location:
+            return self.agent_bins[agent_id]
+        self.agent_locations[agent_id] = location
+        bin_site = self.get_bin_site(location)
+        previous_bin = self.agent_bins.get(agent_id)
+        if previous_bin != bin_site:
+            if previous_bin is not None:
+                self._remove_from_bin(agent_id, previous_bin)
+            self.agent_bins[agent_id] = bin_site
+            self.bin_agents.setdefault(bin_site, set()).add(agent_id)
+        return bin_site
+
+    def remove(self, agent_id):
+        '''Remove an agent if it is in the index'''
+        bin_site = self.agent_bins.pop(agent_id, None)
+        if bin_site is not None:
+            del self.agent_locations[agent_id]
+            self._remove_from_bin(agent_id, bin_site)
+
+    def _remove_from_bin(self, agent_id, bin_site):
+        agents = self.bin_agents[bin_site]
+        agents.discard(agent_id)
+        if not agents:
+            del self.bin_agents[bin_site]
+
+    def sync(self, locations):
+        '''Match the index to a dictionary of agent ID to location
+
+        Agents missing from ``locations`` are removed, and all others are
+        added or moved. Returns a dictionary of agent ID to bin site.
+        '''
+        for agent_id in [
+                agent_id for agent_id in self.agent_bins
+                if agent_id not in locations]:
+            self.remove(agent_id)
+        return {
+            agent_id: self.update(agent_id, location)
+            for agent_id, location in locations.items()}
+
+    def get_agent_bin(self, agent_id):
+        return self.agent_bins.get(agent_id)
+
+    def agents_in_bin(self, bin_site):
+        '''Get the IDs of the agents in a bin'''
+        return set(self.bin_agents.get(tuple(bin_site), ()))
+
+    def bins_touched(self):
+        '''Get the bin sites that contain at least one agent'''
+        return list(self.bin_agents.keys())
+
+    def neighbors(self, location, radius):
+        '''Get the IDs of the agents within ``radius`` of ``location``
+
+        Only the bins that overlap the search radius are visited.
+        '''
+        x, y = location[0], location[1]
+        x_range = range(
+            max(math.floor((x - radius) / self.bin_size[0]), 0),
+            min(math.floor((x + radius) / self.bin_size[0]),
+                self.n_bins[0] - 1) + 1)
+        y_range = range(
+            max(math.floor((y - radius) / self.bin_size[1]), 0),
+            min(math.floor((y + radius) / self.bin_size[1]),
+                self.n_bins[1] - 1) + 1)
+        radius_squared = radius ** 2
+        neighbors = []
+        for x_bin in x_range:
+            for y_bin in y_range:
+                for agent_id in self.bin_agents.get((x_bin, y_bin), ()):
+                    agent_x, agent_y = self.agent_locations[agent_id]
+                    if (agent_x - x) ** 2 + (agent_y - y) ** 2 \
+                            <= radius_squared:
+                        neighbors.append(agent_id)
+        return neighbors
+
+
+def shared_spatial_index(parameters):
+    '''Get the :py:class:`SpatialIndex` passed in the ``spatial_index``
+    parameter of a process, or None if there is none.
+
+    Raises:
+        ValueError: If the process is ``_parallel``, since it would only
+            update its own copy of the index.
+    '''
+    spatial_index = parameters.get('spatial_index')
+    if spatial_index is not None and parameters.get('_parallel'):
+        raise ValueError(
+            'A spatial_index cannot be shared with a _parallel process.')
+    return spatial_index
+
+
+def laplacian(padded):
+    '''5-point Laplacian of the interior of a field padded by one bin'''
+    return (
+        padded[:-2, 1:-1] + padded[2:, 1:-1]
+        + padded[1:-1, :-2] + padded[1:-1, 2:]
+        - 4 * padded[1:-1, 1:-1])
+
+
+def _refresh_halo(padded):
+    # reflect the edges of the field into the halo, as in
+    # scipy.ndimage.convolve with mode='reflect'
+    padded[0, 1:-1] = padded[1, 1:-1]
+    padded[-1, 1:-1] = padded[-2, 1:-1]
+    padded[1:-1, 0] = padded[1:-1, 1]
+    padded[1:-1, -1] = padded[1:-1, -2]
+
+
+def diffuse_active_tiles(
+        field, rate, dt, timestep, tile_size=16, tolerance=1e-9,
+        full_grid_fraction=0.5):
+    '''Diffuse a field, only updating tiles where it is not uniform
+
+    Runs the same explicit steps as a full-grid convolution with a
+    5-point Laplacian and reflecting boundaries, but each step only
+    updates the active tiles of ``tile_size`` bins per side plus a halo
+    of one tile. A tile is active while its concentrations changed by
+    more than ``tolerance`` in the last step, and regions that are
+    uniform within the tolerance are left unchanged. The first step,
+    and any step where more than ``full_grid_fraction`` of the tiles
+    would be updated, covers the full grid. Diffusion stops early once
+    no tile is active.
+
+    Parameters:
+        field (numpy.ndarray): The concentrations to diffuse.
+        rate (float): The diffusion coefficient divided by bin area,
+            in 1/s.
+        dt (float): The diffusion timestep, in s.
+        timestep (float): The total time to diffuse for, in s.
+
+    Returns:
+        numpy.ndarray: The diffused field.
+    '''
+    n_x, n_y = field.shape
+    tile_starts_x = np.arange(0, n_x, tile_size)
+    tile_starts_y = np.arange(0, n_y, tile_size)
+    padded = np.pad(field, 1, mode='edge')
+    interior = padded[1:-1, 1:-1]
+
+    def tile_activity(delta):
+        abs_delta = np.abs(delta)
+        tile_max = np.maximum.reduceat(abs_delta, tile_starts_x, axis=0)
+        tile_max = np.maximum.reduceat(tile_max, tile_starts_y, axis=1)
+        return tile_max > tolerance
+
+    active = None
+    t = 0.0
+    while t < timestep:
+        if active is not None:
+            # a step can only spread changes into neighboring tiles
+            region = np.pad(active, 1)
+            region = (
+                region[1:-1, 1:-1] | region[:-2, 1:-1] | region[2:, 1:-1]
+                | region[1:-1, :-2] | region[1:-1, 2:])
+        if active is None or region.mean() > full_grid_fraction:
+            delta = rate * dt * laplacian(padded)
+            interior += delta
+            active = tile_activity(delta)
+        else:
+            # evaluate all tiles before updating any of them
+            tile_deltas = []
+            for x_tile, y_tile in np.argwhere(region):
+                x_start = x_tile * tile_size
+                y_start = y_tile * tile_size
+                x_end = min(x_start + tile_size, n_x)
+                y_end = min(y_start + tile_size, n_y)
+                delta = rate * dt * laplacian(
+                    padded[x_start:x_end + 2, y_start:y_end + 2])
+                tile_deltas.append(
+                    (x_tile, y_tile, slice(x_start, x_end),
+                     slice(y_start, y_end), delta))
+            active = np.zeros_like(active)
+            for x_tile, y_tile, x_slice, y_slice, delta in tile_deltas:
+                interior[x_slice, y_slice] += delta
+                active[x_tile, y_tile] = np.abs(delta).max() > tolerance
+        _refresh_halo(padded)
+        t += dt
+        if not active.any():
+            break
+    return interior.copy()
+
+
 def make_gradient(gradient, n_bins, size):
     '''Create a gradient from a configuration
 
@@ -278,26 +619,44 @@ def gaussian(deviation, distance):
 
 def apply_exchanges(
         agents, fields, exchanges_path, location_path, n_bins, bounds,
-        bin_volume):
-    # apply exchanges from each agent
+        bin_volume, spatial_index=None):
+    '''Add agent exchanges to the fields at each agent's bin
+
+    If a :py:class:`SpatialIndex` is given, it is synced with the agent
+    locations and used to look up their bins. ``bin_volume`` without units
+    is in liters.
+    '''
+    locations = {}
+    for agent_id, agent_state in agents.items():
+        location = get_in(agent_state, location_path)
+        assert location is not None
+        locations[agent_id] = location
+    if spatial_index is not None:
+        bin_sites = spatial_index.sync({
+            agent_id: to_um_magnitudes(location)
+            for agent_id, location in locations.items()})
+    else:
+        bin_sites = {
+            agent_id: get_bin_site(location, n_bins, bounds)
+            for agent_id, location in locations.items()}
+
+    # concentration of a single molecule in a bin
+    count_concentration = count_to_concentration_magnitude(
+        1, magnitude_in(bin_volume, UNITS_L))
+
+    # collect exchanges from each agent
     agent_updates = {}
+    field_exchanges = {}
     for agent_id, agent_state in agents.items():
         exchanges = get_in(agent_state, exchanges_path)
         assert exchanges is not None
-        location = get_in(agent_state, location_path)
-        assert location is not None
-        bin_site = get_bin_site(location, n_bins, bounds)
+        bin_site = bin_sites[agent_id]
 
         reset_exchanges = {}
         for mol_id, value in exchanges.items():
             # delta concentration
-            exchange = value
-            concentration = count_to_concentration(exchange, bin_volume).to(
-                UNITS_MM).magnitude
-
-            delta_field = np.zeros((n_bins[0], n_bins[1]), dtype=np.float64)
-            delta_field[bin_site[0], bin_site[1]] += concentration
-            fields[mol_id] += delta_field
+            field_exchanges.setdefault(mol_id, []).append(
+                (bin_site[0], bin_site[1], value * count_concentration))
 
             # reset the exchange value
             reset_exchanges[mol_id] = {
@@ -309,6 +668,11 @@ def apply_exchanges(
             (agent_id,) + exchanges_path,
             reset_exchanges)
 
+    # apply all exchanges to each field at once
+    for mol_id, exchanges in field_exchanges.items():
+        x_bins, y_bins, concentrations = zip(*exchanges)
+        np.add.at(fields[mol_id], (x_bins, y_bins), concentrations)
+
     return fields, agent_updates
 
 
@@ -426,3 +790,92 @@ def make_diffusion_schema(
         },
     }
     return schema
+
+
+def test_diffuse_active_tiles():
+    from scipy.ndimage import convolve
+    laplacian_kernel = np.array([
+        [0.0, 1.0, 0.0], [1.0, -4.0, 1.0], [0.0, 1.0, 0.0]])
+
+    # uniform field with two separated sources
+    field = np.ones((70, 50))
+    field[10, 12] += 100
+    field[60, 45] += 50
+    rate = 0.2
+    dt = 0.1
+    timestep = 3
+
+    expected = field.copy()
+    t = 0.0
+    while t < timestep:
+        expected += rate * dt * convolve(
+            expected, laplacian_kernel, mode='reflect')
+        t += dt
+
+    diffused = diffuse_active_tiles(
+        field, rate, dt, timestep, tile_size=8, tolerance=1e-12)
+    np.testing.assert_allclose(diffused, expected, rtol=1e-9)
+    assert np.isclose(diffused.sum(), field.sum())
+
+    # falling back to full-grid steps gives the same result
+    diffused = diffuse_active_tiles(
+        field, rate, dt, timestep, tile_size=8, tolerance=1e-12,
+        full_grid_fraction=0)
+    np.testing.assert_allclose(diffused, expected, rtol=1e-9)
+
+
+def test_spatial_index():
+    n_bins = [4, 4]
+    bounds = [8, 8] * units.um
+    index = SpatialIndex(n_bins, bounds)
+    locations = {
+        '0': [1.0, 1.0],
+        '1': [1.5, 0.5],
+        '2': [5.0, 5.0],
+    }
+    bin_sites = index.sync(locations)
+    for agent_id, location in locations.items():
+        assert bin_sites[agent_id] == get_bin_site(
+            location * units.um, n_bins, bounds)
+    assert index.agents_in_bin((0, 0)) == {'0', '1'}
+    assert sorted(index.neighbors([1.0, 1.0], 1.0)) == ['0', '1']
+    assert sorted(index.neighbors([3.0, 3.0], 3.0)) == ['0', '1', '2']
+
+    # move an agent, remove one and add a daughter
+    index.sync({
+        '1': [7.0, 7.0],
+        '2': [5.0, 5.0],
+        '20': [5.5, 4.5],
+    })
+    assert index.agent_bins == {'1': (3, 3), '2': (2, 2), '20': (2, 2)}
+    assert index.agents_in_bin((0, 0)) == set()
+    assert sorted(index.bins_touched()) == [(2, 2), (3, 3)]
+    assert index.agents_in_bin((2, 2)) == {'2', '20'}
+
+    # re-binning on dimension changes
+    index.set_dimensions([2, 2], bounds)
+    assert set(index.agent_bins.values()) == {(1, 1)}
+    assert index.agents_in_bin((1, 1)) == {'1', '2', '20'}
+
+    # copied configs share the index, but parallel processes cannot
+    config = copy.deepcopy({'spatial_index': index})
+    assert shared_spatial_index(config) is index
+    with pytest.raises(ValueError):
+        shared_spatial_index({'spatial_index': index, '_parallel': True})
+
+
+def test_lattice_dimensions():
+    n_bins = [5, 4]
+    bounds = [10, 0.02] * units.mm
+    depth = 3 * units.um
+    dimensions = {'n_bins': n_bins, 'bounds': bounds, 'depth': depth}
+    lattice = LatticeDimensions(dimensions)
+    assert np.allclose(lattice.bounds, [1e4, 20])
+    bin_volume = get_bin_volume(n_bins, bounds, depth)
+    assert np.isclose(lattice.bin_volume, bin_volume.to(units.L).magnitude)
+    assert np.isclose(
+        lattice.count_concentration,
+        count_to_concentration(1, bin_volume).to(UNITS_MM).magnitude)
+    assert lattice.update(dimensions) is lattice
+    assert get_bin_site([7.5, 0.01] * units.mm, n_bins, bounds) == \
+        get_bin_site([7500, 10], lattice.n_bins, lattice.bounds)
@@ -0,0 +1,345 @@
+'''
+===============================
+Multi-Resolution Lattice Fields
+===============================
+
+Fields on a coarse lattice that covers the whole environment, with a
+refined patch around the colony. The patch is aligned to coarse bins,
+each coarse bin in the patch is split into ``refinement`` by
+``refinement`` fine bins, and the patch grows as the colony expands.
+
+Diffusion is computed with fluxes across bin faces, so molecules are
+conserved across the boundary between the patch and the coarse lattice.
+Coarse bins under the patch always hold the mean of their fine bins.
+'''
+
+import numpy as np
+
+from ecoli.library.lattice_utils import laplacian
+
+
+def prolong(coarse, refinement):
+    '''Split each coarse bin into ``refinement`` x ``refinement`` bins'''
+    return np.repeat(np.repeat(coarse, refinement, axis=0),
+                     refinement, axis=1)
+
+
+def restrict(fine, refinement):
+    '''Average blocks of ``refinement`` x ``refinement`` fine bins'''
+    n_x = fine.shape[0] // refinement
+    n_y = fine.shape[1] // refinement
+    return fine.reshape(n_x, refinement, n_y, refinement).mean(axis=(1, 3))
+
+
+class MultiResolutionField:
+    '''Coarse lattice fields with a refined patch around agents
+
+    Parameters:
+        fields (dict): Coarse field arrays, keyed by molecule ID.
+        bounds (list): The x and y dimensions of the environment, in
+            microns.
+        refinement (int): Number of fine bins along each side of a
+            coarse bin in the patch.
+        margin (int): Number of coarse bins kept between the agents and
+            the edge of the patch.
+    '''
+
+    def __init__(self, fields, bounds, refinement=4, margin=2):
+        self.coarse = {
+            mol_id: np.array(field, dtype=np.float64)
+            for mol_id, field in fields.items()}
+        n_bins = next(iter(self.coarse.values())).shape
+        self.n_bins = (n_bins[0], n_bins[1])
+        self.bounds = (float(bounds[0]), float(bounds[1]))
+        self.refinement = int(refinement)
+        self.margin = int(margin)
+        self.fine_bin_size = (
+            self.bounds[0] / (self.n_bins[0] * self.refinement),
+            self.bounds[1] / (self.n_bins[1] * self.refinement))
+        #: Patch as (x_start, x_end, y_start, y_end) in coarse bins, or
+        #: None if there is no patch
+        self.region = None
+        self.fine = {}
+
+    def coarse_bin(self, location):
+        return (
+            int(np.floor(location[0] * self.n_bins[0] / self.bounds[0]))
+            % self.n_bins[0],
+            int(np.floor(location[1] * self.n_bins[1] / self.bounds[1]))
+            % self.n_bins[1],
+        )
+
+    def fine_bin(self, location):
+        '''Get the fine bin of a location in the patch, or None if the
+        location is outside of the patch.'''
+        if self.region is None:
+            return None
+        x_bin, y_bin = self.coarse_bin(location)
+        x_start, x_end, y_start, y_end = self.region
+        if not (x_start <= x_bin < x_end and y_start <= y_bin < y_end):
+            return None
+        fine_x = min(
+            int(location[0] // self.fine_bin_size[0]),
+            (x_bin + 1) * self.refinement - 1)
+        fine_y = min(
+            int(location[1] // self.fine_bin_size[1]),
+            (y_bin + 1) * self.refinement - 1)
+        return (
+            max(fine_x, x_bin * self.refinement)
+            - x_start * self.refinement,
+            max(fine_y, y_bin * self.refinement)
+            - y_start * self.refinement)
+
+    def fit_region(self, locations):
+        '''Grow the patch to cover ``locations`` with the margin
+
+        The patch never shrinks. New fine bins take the concentration of
+        their coarse bin, which conserves molecules.
+
+        Returns:
+            bool: Whether the patch changed.
+        '''
+        if not locations:
+            return False
+        bins = np.array([self.coarse_bin(location) for location in locations])
+        x_start = max(bins[:, 0].min() - self.margin, 0)
+        x_end = min(bins[:, 0].max() + self.margin + 1, self.n_bins[0])
+        y_start = max(bins[:, 1].min() - self.margin, 0)
+        y_end = min(bins[:, 1].max() + self.margin + 1, self.n_bins[1])
+        if self.region is not None:
+            old_x_start, old_x_end, old_y_start, old_y_end = self.region
+            x_start = min(x_start, old_x_start)
+            x_end = max(x_end, old_x_end)
+            y_start = min(y_start, old_y_start)
+            y_end = max(y_end, old_y_end)
+        region = (x_start, x_end, y_start, y_end)
+        if region == self.region:
+            return False
+
+        r = self.refinement
+        fine = {}
+        for mol_id, coarse in self.coarse.items():
+            fine[mol_id] = prolong(coarse[x_start:x_end, y_start:y_end], r)
+            if self.region is not None:
+                old_x_start, old_x_end, old_y_start, old_y_end = self.region
+                fine[mol_id][
+                    (old_x_start - x_start) * r:(old_x_end - x_start) * r,
+                    (old_y_start - y_start) * r:(old_y_end - y_start) * r
+                ] = self.fine[mol_id]
+        self.region = region
+        self.fine = fine
+        return True
+
+    def set_coarse(self, fields):
+        '''Take new coarse fields, such as after other processes have
+        updated the fields store
+
+        Changes to coarse bins under the patch are spread evenly over
+        their fine bins. If that would make fine bins negative, they are
+        set to zero and the other fine bins in the coarse bin are scaled
+        down, so the coarse bin still holds the mean of its fine bins.
+        '''
+        for mol_id, field in fields.items():
+            field = np.array(field, dtype=np.float64)
+            if self.region is not None:
+                x_start, x_end, y_start, y_end = self.region
+                delta = field[x_start:x_end, y_start:y_end] - restrict(
+                    self.fine[mol_id], self.refinement)
+                if np.any(delta):
+                    fine = self.fine[mol_id]
+                    fine += prolong(delta, self.refinement)
+                    if np.any(fine < 0):
+                        np.maximum(fine, 0, out=fine)
+                        target = np.maximum(
+                            field[x_start:x_end, y_start:y_end], 0)
+                        current = restrict(fine, self.refinement)
+                        scale = np.divide(
+                            target, current, out=np.zeros_like(target),
+                            where=current > 0)
+                        fine *= prolong(scale, self.refinement)
+                    field[x_start:x_end, y_start:y_end] = restrict(
+                        fine, self.refinement)
+            self.coarse[mol_id] = field
+
+    def get_concentration(self, mol_id, location):
+        '''Get the concentration at a location at the finest resolution'''
+        fine_bin = self.fine_bin(location)
+        if fine_bin is not None:
+            return self.fine[mol_id][fine_bin]
+        return self.coarse[mol_id][self.coarse_bin(location)]
+
+    def add_concentration(self, mol_id, location, concentration):
+        '''Add molecules at a location
+
+        Parameters:
+            concentration (float): The change in concentration the
+                molecules would make in one coarse bin.
+        '''
+        coarse_bin = self.coarse_bin(location)
+        self.coarse[mol_id][coarse_bin] += concentration
+        fine_bin = self.fine_bin(location)
+        if fine_bin is not None:
+            self.fine[mol_id][fine_bin] += concentration * self.refinement ** 2
+
+    def apply(self, function):
+        '''Apply a function that maps a dictionary of fields to updated
+        fields, such as reactions, at the finest available resolution.'''
+        self.coarse = function(self.coarse)
+        if self.region is not None:
+            self.fine = function(self.fine)
+            x_start, x_end, y_start, y_end = self.region
+            for mol_id, fine in self.fine.items():
+                self.coarse[mol_id][x_start:x_end, y_start:y_end] = restrict(
+                    fine, self.refinement)
+
+    def diffuse(self, mol_id, rate, dt, timestep):
+        '''Diffuse a field on both resolutions
+
+        Parameters:
+            rate (float): The diffusion coefficient divided by the coarse
+                bin area, in 1/s.
+            dt (float): The maximum diffusion timestep, in s. It is
+                reduced if needed to keep the fine patch stable.
+            timestep (float): The total time to diffuse for, in s. The
+                last step is shortened to end at this time.
+        '''
+        r = self.refinement
+        fine_rate = rate * r ** 2
+        dt = min(dt, 0.2 / fine_rate)
+        coarse = self.coarse[mol_id]
+        fine = self.fine.get(mol_id)
+        # Fine bins at the edge of the patch exchange with the adjacent
+        # coarse bin across the distance between their centers. Relative
+        # to the fine bin width, that distance is (1 + r) / 2.
+        ghost_weight = 2 / (1 + r)
+
+        t = 0.0
+        while t < timestep:
+            step = min(dt, timestep - t)
+            coarse_delta = rate * step * laplacian(np.pad(coarse, 1, mode='edge'))
+            if self.region is not None:
+                x_start, x_end, y_start, y_end = self.region
+                padded = np.pad(fine, 1, mode='edge')
+                sides = []
+                if x_start > 0:
+                    sides.append((
+                        (x_start - 1, slice(y_start, y_end)),
+                        (x_start, slice(y_start, y_end)),
+                        (0, slice(1, -1)), (1, slice(1, -1))))
+                if x_end < self.n_bins[0]:
+                    sides.append((
+                        (x_end, slice(y_start, y_end)),
+                        (x_end - 1, slice(y_start, y_end)),
+                        (-1, slice(1, -1)), (-2, slice(1, -1))))
+                if y_start > 0:
+                    sides.append((
+                        (slice(x_start, x_end), y_start - 1),
+                        (slice(x_start, x_end), y_start),
+                        (slice(1, -1), 0), (slice(1, -1), 1)))
+                if y_end < self.n_bins[1]:
+                    sides.append((
+                        (slice(x_start, x_end), y_end),
+                        (slice(x_start, x_end), y_end - 1),
+                        (slice(1, -1), -1), (slice(1, -1), -2)))
+                for outside, inside, ghost, edge in sides:
+                    outside_values = coarse[outside]
+                    edge_values = padded[edge]
+                    outside_fine = np.repeat(outside_values, r)
+                    padded[ghost] = edge_values + ghost_weight * (
+                        outside_fine - edge_values)
+                    # replace the coarse flux into the outside bins with
+                    # the sum of the fine fluxes
+                    fine_flux = rate * step * ghost_weight * (
+                        edge_values - outside_fine).reshape(-1, r).sum(axis=1)
+                    coarse_flux = rate * step * (
+                        coarse[inside] - outside_values)
+                    coarse_delta[outside] += fine_flux - coarse_flux
+                fine += fine_rate * step * laplacian(padded)
+                coarse += coarse_delta
+                coarse[x_start:x_end, y_start:y_end] = restrict(fine, r)
+            else:
+                coarse += coarse_delta
+            t += step
+
+    def total(self, mol_id):
+        '''Total concentration summed over coarse bins, which is
+        proportional to the number of molecules'''
+        if self.region is None:
+            return self.coarse[mol_id].sum()
+        x_start, x_end, y_start, y_end = self.region
+        outside = self.coarse[mol_id].sum() - self.coarse[mol_id][
+            x_start:x_end, y_start:y_end].sum()
+        return outside + self.fine[mol_id].sum() / self.refinement ** 2
+
+
+def test_multiresolution_field():
+    from scipy.ndimage import convolve
+    laplacian_kernel = np.array([
+        [0.0, 1.0, 0.0], [1.0, -4.0, 1.0], [0.0, 1.0, 0.0]])
+    refinement = 3
+    bounds = [20.0, 10.0]
+    coarse = np.ones((10, 5))
+    field = MultiResolutionField(
+        {'A': coarse}, bounds, refinement=refinement, margin=1)
+
+    # a patch around two agents
+    assert field.fit_region([[5.0, 5.0], [9.0, 3.0]])
+    assert field.region == (1, 6, 0, 4)
+    assert not field.fit_region([[5.0, 5.0]])
+    field.add_concentration('A', [5.0, 5.0], 10.0)
+    field.add_concentration('A', [19.0, 9.0], 5.0)
+    assert field.get_concentration('A', [5.0, 5.0]) == 1 + 10 * 9
+    total = field.total('A')
+    assert np.isclose(total, coarse.sum() + 15)
+
+    # diffusion conserves molecules across the patch boundary
+    field.diffuse('A', rate=0.5, dt=0.1, timestep=5)
+    assert np.isclose(field.total('A'), total)
+    assert np.allclose(
+        field.coarse['A'][1:6, 0:4], restrict(field.fine['A'], refinement))
+
+    # growing the patch keeps the fine values and conserves molecules
+    fine_before = field.fine['A'].copy()
+    assert field.fit_region([[0.5, 0.5]])
+    assert field.region == (0, 6, 0, 4)
+    assert np.array_equal(
+        field.fine['A'][refinement:, :], fine_before)
+    assert np.isclose(field.total('A'), total)
+
+    # external changes to coarse bins are spread over the patch
+    updated = field.coarse['A'].copy()
+    updated[2, 2] += 1.0
+    field.set_coarse({'A': updated})
+    assert np.isclose(field.total('A'), total + 1)
+
+    # removing more than the fine bins spread evenly would hold keeps the
+    # coarse bin as the mean of its fine bins instead of adding molecules
+    field.fine['A'][6:9, 6:9] = np.arange(9).reshape(3, 3)
+    field.coarse['A'][2, 2] = 4.0
+    total = field.total('A')
+    updated = field.coarse['A'].copy()
+    updated[2, 2] = 1.0
+    field.set_coarse({'A': updated})
+    assert field.fine['A'].min() >= 0
+    np.testing.assert_allclose(
+        restrict(field.fine['A'], refinement), field.coarse['A'][0:6, 0:4])
+    assert field.coarse['A'][2, 2] == 1.0
+    assert np.isclose(field.total('A'), total - 3)
+
+    # with the patch covering the environment, diffusion matches the
+    # full fine lattice
+    fine_field = MultiResolutionField(
+        {'A': np.zeros((4, 4))}, [4.0, 4.0], refinement=2, margin=4)
+    fine_field.fit_region([[2.0, 2.0]])
+    assert fine_field.region == (0, 4, 0, 4)
+    fine_field.add_concentration('A', [1.2, 2.7], 4.0)
+    expected = fine_field.fine['A'].copy()
+    for _ in range(20):
+        expected += 0.2 * convolve(expected, laplacian_kernel, mode='reflect')
+    fine_field.diffuse('A', rate=0.05, dt=1.0, timestep=20)
+    np.testing.assert_allclose(fine_field.fine['A'], expected)
+
+    # the last step is shortened to not diffuse past the timestep
+    expected += 0.1 * convolve(expected, laplacian_kernel, mode='reflect')
+    fine_field.diffuse('A', rate=0.05, dt=1.0, timestep=0.5)
+    np.testing.assert_allclose(fine_field.fine['A'], expected)
@@ -75,6 +75,13 @@ class PymunkMultibody(object):
         'friction': 0.9,  # does this do anything?
         'physics_dt': 0.001,
         'force_scaling': 5e4,  # scales from pN
+        # 'default' applies forces body-by-body every substep, 'batched'
+        # precomputes them as arrays and applies them in a position callback
+        'physics_backend': 'default',
+        # for the batched backend, merge up to max_dt_factor substeps into
+        # one physics step while no contacts are active
+        'adaptive_dt': False,
+        'max_dt_factor': 10,
         # configured parameters
         'jitter_force': 1e-3,  # pN
         'bounds': [20, 20],
@@ -97,6 +104,14 @@ class PymunkMultibody(object):
         self.angular_damping = self.defaults['angular_damping']
         self.physics_dt = config.get('physics_dt', self.defaults['physics_dt'])
         self.force_scaling = self.defaults['force_scaling']
+        self.physics_backend = config.get(
+            'physics_backend', self.defaults['physics_backend'])
+        assert self.physics_backend in ('default', 'batched'), \
+            f'physics_backend {self.physics_backend} not supported'
+        self.adaptive_dt = config.get(
+            'adaptive_dt', self.defaults['adaptive_dt'])
+        self.max_dt_factor = config.get(
+            'max_dt_factor', self.defaults['max_dt_factor'])
 
         # configured parameters
         self.agent_shape = config.get('agent_shape', self.defaults['agent_shape'])
@@ -118,6 +133,12 @@ class PymunkMultibody(object):
         # add static barriers
         self.add_barriers(self.bounds, barriers)
 
+        # count contacts during each physics step for the adaptive timestep
+        self._n_contacts = 0
+        if self.physics_backend == 'batched':
+            handler = self.space.add_default_collision_handler()
+            handler.pre_solve = self._count_contact
+
         # initialize agents
         initial_agents = config.get('initial_agents', self.defaults['initial_agents'])
         self.bodies = {}
@@ -129,21 +150,163 @@ class PymunkMultibody(object):
             print('timestep skipped by pymunk_multibody: {}'.format(timestep))
             return
 
-        time = 0
-        while time < timestep:
-            time += self.physics_dt
+        if self.physics_backend == 'batched':
+            self.run_batched(timestep)
+        else:
+            time = 0
+            while time < timestep:
+                time += self.physics_dt
 
-            # apply forces
-            for body in self.space.bodies:
-                self.apply_jitter_force(body)
-                self.apply_motile_force(body)
-                self.apply_viscous_force(body)
+                # apply forces
+                for body in self.space.bodies:
+                    self.apply_jitter_force(body)
+                    self.apply_motile_force(body)
+                    self.apply_viscous_force(body)
 
-            # run for a physics timestep
-            self.space.step(self.physics_dt)
+                # run for a physics timestep
+                self.space.step(self.physics_dt)
 
         self.screen.update_screen()
 
+    def run_batched(self, timestep):
+        """Run with forces precomputed as arrays for all bodies and substeps
+
+        Jitter and motile impulses are drawn for every substep up front and
+        converted to velocity changes in the body frame. They are applied,
+        together with viscous damping, by a position callback that pymunk
+        invokes once per body at the start of each step. With ``adaptive_dt``, consecutive
+        substeps without active contacts are merged into a single physics
+        step, using the exact solution of the damped velocity recursion.
+        """
+        n_substeps = 0
+        time = 0
+        while time < timestep:
+            time += self.physics_dt
+            n_substeps += 1
+
+        bodies = [body for body, _ in self.bodies.values()]
+        if not bodies:
+            return
+        self._prepare_batch(bodies, n_substeps)
+
+        # take the first step at full resolution
+        self._n_contacts = 1
+        substep = 0
+        while substep < n_substeps:
+            n_merged = 1
+            if self.adaptive_dt and self._n_contacts == 0:
+                n_merged = min(self.max_dt_factor, n_substeps - substep)
+            self._set_batch_window(substep, n_merged)
+
+            self._n_contacts = 0
+            self.space.step(self.physics_dt * n_merged)
+
+            # merged steps integrate positions with the mean velocity over
+            # the window; restore the velocity at the end of the window
+            if n_merged > 1 and self._n_contacts == 0:
+                for body in bodies:
+                    vx, vy, angular_velocity = self._end_velocities[
+                        body.batch_index]
+                    body.velocity = (vx, vy)
+                    body.angular_velocity = angular_velocity
+            substep += n_merged
+
+    def _prepare_batch(self, bodies, n_substeps):
+        """Precompute body-frame velocity changes from jitter and motile
+        impulses for all bodies and substeps."""
+        n_bodies = len(bodies)
+        widths, lengths = np.array(
+            [body.dimensions for body in bodies], dtype=float).T
+        masses = np.array([body.mass for body in bodies])
+        moments = np.array([body.moment for body in bodies])
+        thrusts = np.array([getattr(body, 'thrust', 0.0) for body in bodies])
+
+        # jitter impulses at random points along the boundary,
+        # following random_body_position
+        size = (n_substeps, n_bodies)
+        side = self.rng.integers(0, 4, size=size)
+        fraction = self.rng.uniform(0, 1, size=size)
+        point_x = np.where(
+            side < 2, fraction * widths, np.where(side == 2, 0.0, widths))
+        point_y = np.where(
+            side < 2, np.where(side == 0, 0.0, lengths), fraction * lengths)
+        impulse = self.rng.normal(
+            0, self.jitter_force, size=size + (2,)) * self.force_scaling
+        self._batch_dw = (
+            point_x * impulse[:, :, 1] - point_y * impulse[:, :, 0]
+        ) / moments
+
+        # motile impulse along the body axis, applied at the back end
+        # with no moment arm
+        impulse[:, :, 0] += thrusts * self.force_scaling
+        self._batch_dv = impulse / masses[:, np.newaxis]
+        self._end_velocities = [None] * n_bodies
+
+        for index, body in enumerate(bodies):
+            body.batch_index = index
+            body.position_func = self._batched_position_func
+
+    def _set_batch_window(self, substep, n_merged):
+        """Combine the velocity changes of substeps
+        ``[substep, substep + n_merged)`` for the next physics step.
+
+        For a velocity recursion ``v[m+1] = d * (v[m] + dv[m])``, the final
+        velocity and the mean velocity over the window are both linear in
+        ``v[0]`` and the ``dv``, so the weights are shared by all bodies.
+        """
+        window = slice(substep, substep + n_merged)
+        powers = np.arange(1, n_merged + 1)
+        self._window = {}
+        for key, damping, changes in (
+                ('linear', self.damping, self._batch_dv[window]),
+                ('angular', self.angular_damping, self._batch_dw[window])):
+            damping_powers = damping ** powers
+            cumulative = np.cumsum(damping_powers)
+            # weight of the change at substep j on the end and mean velocity
+            end_weights = damping_powers[::-1]
+            mean_weights = cumulative[::-1] / n_merged
+            self._window[key] = (
+                damping_powers[-1],
+                cumulative[-1] / n_merged,
+                np.tensordot(end_weights, changes, axes=1).tolist(),
+                np.tensordot(mean_weights, changes, axes=1).tolist())
+
+    def _batched_position_func(self, body, dt):
+        index = body.batch_index
+        (end_factor, mean_factor,
+         end_dv, mean_dv) = self._window['linear']
+        (angular_end_factor, angular_mean_factor,
+         end_dw, mean_dw) = self._window['angular']
+
+        cos = math.cos(body.angle)
+        sin = math.sin(body.angle)
+        vx, vy = body.velocity
+        force_x, force_y = body.force
+        # torque is applied as an angular impulse, as in apply_motile_force
+        angular_velocity = body.angular_velocity + body.torque
+
+        # body-frame velocity changes, rotated into the world frame
+        end_x, end_y = end_dv[index]
+        mean_x, mean_y = mean_dv[index]
+        self._end_velocities[index] = (
+            end_factor * vx + cos * end_x - sin * end_y,
+            end_factor * vy + sin * end_x + cos * end_y,
+            angular_end_factor * angular_velocity + end_dw[index])
+        body.velocity = (
+            mean_factor * vx + cos * mean_x - sin * mean_y
+            + force_x / body.mass * dt,
+            mean_factor * vy + sin * mean_x + cos * mean_y
+            + force_y / body.mass * dt)
+        body.angular_velocity = (
+            angular_mean_factor * angular_velocity + mean_dw[index]
+            + body.torque / body.moment * dt)
+
+        pymunk.Body.update_position(body, dt)
+
+    def _count_contact(self, arbiter, space, data):
+        self._n_contacts += 1
+        return True
+
     def apply_motile_force(self, body):
         width, length = body.dimensions
         motile_location = (width / 2, 0)  # apply force at back end of body
@@ -421,5 +584,48 @@ def test_multibody(
         multibody.run(time_step)
 
 
+def test_batched_multibody(total_time=2, n_agents=3):
+    """Without jitter, the batched backend matches the default backend and
+    the adaptive timestep matches both while cells are not in contact."""
+    bounds = [500, 500]
+    agents = {
+        str(agent_idx): {
+            'boundary': {
+                'location': [100 + 150 * agent_idx, 250],
+                'angle': PI / 2 * agent_idx,
+                'length': 30,
+                'width': 10,
+                'mass': 1,
+                'thrust': 1e-4,
+                'torque': 1e-3}}
+        for agent_idx in range(n_agents)
+    }
+
+    positions = {}
+    for backend, adaptive_dt in [
+            ('default', False), ('batched', False), ('batched', True)]:
+        multibody = PymunkMultibody({
+            'agent_shape': 'segment',
+            'jitter_force': 0,
+            'bounds': bounds,
+            'initial_agents': agents,
+            'physics_backend': backend,
+            'adaptive_dt': adaptive_dt})
+        multibody.update_bodies(agents)
+        for _ in range(total_time):
+            multibody.run(1)
+        positions[(backend, adaptive_dt)] = np.array([
+            list(position['boundary']['location'])
+            + [position['boundary']['angle']]
+            for position in multibody.get_body_positions().values()])
+
+    default = positions[('default', False)]
+    assert not np.allclose(default[:, :2], [
+        agent['boundary']['location'] for agent in agents.values()])
+    np.testing.assert_allclose(positions[('batched', False)], default)
+    np.testing.assert_allclose(
+        positions[('batched', True)], default, rtol=1e-2)
+
+
 if __name__ == '__main__':
     test_multibody(10)
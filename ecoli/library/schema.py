@@ -1,3 +1,4 @@
+import hashlib
 from typing import List
 
 import numpy as np
@@ -146,8 +147,134 @@ def numpy_schema(name, partition=True, divider=None, emit=True):
     return schema
 
 
+#: Bulk layouts by fingerprint, see :py:class:`BulkLayout`
+_BULK_LAYOUTS = {}
+
+
+class BulkLayout:
+    """Order of the molecules in a bulk store, e.g. of the bulk molecules in
+    sim_data, with O(1) lookup of the index of a molecule name.
+
+    Bulk arrays built with this order are marked with the fingerprint of the
+    layout in the metadata of their dtype (see :py:meth:`mark`), which is
+    kept by copies and division. :py:func:`bulk_name_to_idx` uses the layout
+    of a marked array instead of searching its ids, and processes given a
+    layout in their ``bulk_layout`` parameter look up their indices when they
+    are constructed.
+
+    Args:
+        ids: Molecule names in the order of the bulk store
+    """
+
+    def __init__(self, ids):
+        self.ids = np.asarray(ids)
+        self.fingerprint = hashlib.sha256(
+            str(self.ids.dtype).encode() + self.ids.tobytes()).hexdigest()
+        self._index = {name: i for i, name in enumerate(self.ids.tolist())}
+        _BULK_LAYOUTS.setdefault(self.fingerprint, self)
+
+    def __getstate__(self):
+        return {'ids': self.ids}
+
+    def __setstate__(self, state):
+        self.__init__(state['ids'])
+
+    def name_to_idx(self, names):
+        """Same as ``bulk_name_to_idx(names, self.ids)``"""
+        try:
+            if isinstance(names, np.ndarray) or isinstance(names, list):
+                names = np.asarray(names)
+                return np.array([self._index[name] for name in names.flat],
+                    dtype=np.intp).reshape(names.shape)
+            return np.intp(self._index[names])
+        except (KeyError, TypeError):
+            # Keep the results of bulk_name_to_idx for missing names
+            return _search_bulk_names(names, self.ids)
+
+    def mark(self, bulk):
+        """Mark a bulk array with the fingerprint of this layout.
+
+        Raises:
+            ValueError: The ids of the array are not in this order.
+        """
+        if self.matches(bulk):
+            return bulk
+        if not np.array_equal(bulk['id'], self.ids):
+            raise ValueError('Bulk molecules are not in the order of the '
+                'bulk layout.')
+        return bulk.astype(np.dtype(bulk.dtype,
+            metadata={'bulk_layout': self.fingerprint}))
+
+    def matches(self, bulk):
+        """Whether a bulk array is marked with this layout"""
+        layout = get_bulk_layout(bulk)
+        return layout is not None and layout.fingerprint == self.fingerprint
+
+
+def get_bulk_layout(bulk):
+    """Layout a bulk array was marked with by :py:meth:`BulkLayout.mark`, if
+    any"""
+    metadata = bulk.dtype.metadata
+    if metadata is None:
+        return None
+    layout = _BULK_LAYOUTS.get(metadata.get('bulk_layout'))
+    if layout is None or len(layout.ids) != len(bulk):
+        return None
+    return layout
+
+
+def update_bulk_idx(process, bulk=None):
+    """Look up the bulk indices of a process by calling its
+    ``_set_bulk_idx(bulk_ids)`` method, which passes ``bulk_ids`` to
+    :py:func:`bulk_name_to_idx`.
+
+    Processes call this at the end of ``__init__`` (without ``bulk``) to look
+    up their indices in the :py:class:`BulkLayout` in their ``bulk_layout``
+    parameter, if any, and with the bulk store at the start of the steps
+    that use the indices. The indices are only looked up again, in the ids
+    of the store, if the store is not marked with the layout they were
+    looked up in.
+    """
+    if bulk is None:
+        layout = process.parameters.get('bulk_layout')
+        if layout is not None:
+            process._set_bulk_idx(layout)
+            process._bulk_idx_layout = layout.fingerprint
+        return
+    layout = get_bulk_layout(bulk)
+    fingerprint = None if layout is None else layout.fingerprint
+    if getattr(process, '_bulk_idx_layout', False) != fingerprint:
+        process._set_bulk_idx(bulk['id'])
+        process._bulk_idx_layout = fingerprint
+
+
 def bulk_name_to_idx(names, bulk_names):
     # Convert from string names to indices in bulk array
+    if isinstance(bulk_names, BulkLayout):
+        return bulk_names.name_to_idx(names)
+    # Look up the ids of a marked bulk store in its layout
+    if _is_bulk_id_field(bulk_names):
+        layout = get_bulk_layout(bulk_names.base)
+        if layout is not None:
+            return layout.name_to_idx(names)
+    return _search_bulk_names(names, bulk_names)
+
+
+def _is_bulk_id_field(bulk_names):
+    """Whether an array is the whole id field of a bulk array, e.g.
+    ``states['bulk']['id']``"""
+    bulk = getattr(bulk_names, 'base', None)
+    if not isinstance(bulk, np.ndarray) or bulk.dtype.fields is None or (
+            'id' not in bulk.dtype.fields) or bulk.ndim != 1:
+        return False
+    offset = bulk.dtype.fields['id'][1]
+    return (bulk_names.shape == bulk.shape
+        and bulk_names.strides == bulk.strides
+        and bulk_names.__array_interface__['data'][0] ==
+            bulk.__array_interface__['data'][0] + offset)
+
+
+def _search_bulk_names(names, bulk_names):
     if isinstance(names, np.ndarray) or isinstance(names, list):
         # Big brain solution from https://stackoverflow.com/a/32191125
         # One downside: all values in names MUST be in bulk_names
@@ -526,3 +653,43 @@ def get_descendent_domains(root_domains, domain_index, child_domains, place_hold
     return np.array(flatten([
         follow_domain_tree(root_domain, domain_index, child_domains, place_holder)
         for root_domain in root_domains]))
+
+
+def test_bulk_layout():
+    import copy
+    import pickle
+
+    ids = np.array(['C[c]', 'A[c]', 'B[p]', 'A[p]'])
+    bulk = np.array([(mol_id, i) for i, mol_id in enumerate(ids)],
+        dtype=[('id', ids.dtype), ('count', int)])
+    layout = BulkLayout(ids)
+    names = ['A[p]', 'C[c]', 'B[p]']
+    expected = _search_bulk_names(names, bulk['id'])
+
+    assert (layout.name_to_idx(names) == expected).all()
+    assert layout.name_to_idx(np.array([names])).shape == (1, 3)
+    assert layout.name_to_idx('B[p]') == 2
+    # Missing names give the same indices as a search of the ids
+    assert (layout.name_to_idx(['A[p]', 'D[c]']) == _search_bulk_names(
+        ['A[p]', 'D[c]'], bulk['id'])).all()
+
+    assert get_bulk_layout(bulk) is None
+    marked = layout.mark(bulk)
+    assert layout.matches(marked) and not layout.matches(bulk)
+    assert (marked == bulk).all()
+    for array in [marked.copy(), copy.deepcopy(marked),
+            pickle.loads(pickle.dumps(marked))]:
+        assert get_bulk_layout(array) is layout
+        assert (bulk_name_to_idx(names, array['id']) == expected).all()
+    assert (bulk_name_to_idx(names, layout) == expected).all()
+    # Arrays that are not the whole id field are searched
+    assert bulk_name_to_idx('C[c]', marked['id'][::-1]) == 3
+    assert get_bulk_layout(marked[1:]) is None
+    assert pickle.loads(pickle.dumps(layout)).fingerprint == layout.fingerprint
+
+    try:
+        layout.mark(bulk[::-1])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Bulk array in another order was marked.')
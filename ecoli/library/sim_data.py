@@ -1,8 +1,10 @@
 import re
 import binascii
+import hashlib
+import os
+import pickle
 from itertools import chain
 import numpy as np
-import pickle
 from vivarium.library.units import units as vivunits
 from wholecell.utils import units
 from wholecell.utils.unit_struct_array import UnitStructArray
@@ -11,6 +13,8 @@ from wholecell.utils.fitting import normalize
 from ecoli.analysis.antibiotics_colony import DE_GENES
 from ecoli.processes.polypeptide_elongation import MICROMOLAR_UNITS
 from ecoli.library.parameters import param_store
+from ecoli.library.schema import BulkLayout
+from ecoli.library.sim_data_serializer import load_sim_data
 from ecoli.library.initial_conditions import (calculate_cell_mass,
     initialize_bulk_counts, initialize_trna_charging, 
     initialize_unique_molecules, set_small_molecule_counts)
@@ -20,7 +24,46 @@ SIM_DATA_PATH = 'reconstruction/sim_data/kb/simData.cPickle'
 SIM_DATA_PATH_NO_OPERONS = 'reconstruction/sim_data/kb_no_operons/simData.cPickle'
 MAX_TIME_STEP = 1
 
+#: State and process config templates of LoadSimData instances created with
+#: ``cache_templates=True``, keyed by :py:func:`_template_key`
+_TEMPLATES = {}
+
+
+def _template_key(sim_data_path, options, process_configs):
+    """Key of the LoadSimData state built from a sim_data file with the given
+    options (every option that is not a seed)."""
+    rnai_data = None
+    if isinstance(process_configs, dict):
+        rnai_data = process_configs.get('ecoli-rna-interference')
+    return hashlib.sha256(pickle.dumps((
+        os.path.realpath(sim_data_path),
+        os.stat(sim_data_path).st_mtime_ns,
+        sorted(options.items()),
+        rnai_data,
+    ))).hexdigest()
+
+
+def _copy_template(value):
+    """Copy the dicts and lists of a config template, sharing everything
+    else (e.g. arrays) with the template."""
+    if isinstance(value, dict):
+        return {key: _copy_template(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_template(item) for item in value]
+    return value
+
+
 class LoadSimData:
+    """Loads sim_data and builds the configs of processes from it.
+
+    With ``cache_templates=True``, the state built from sim_data and every
+    config returned by :py:meth:`get_config_by_name` are cached in memory
+    and reused by later instances with the same options, e.g. the daughter
+    cells of EngineProcess colonies. Only the seeds differ between those
+    instances, and the configs are copied from the cached templates with the
+    seed of the new instance. The sim_data and arrays in the configs are
+    shared, so they must not be changed in place.
+    """
 
     def __init__(
         self,
@@ -53,14 +96,27 @@ class LoadSimData:
         update_time_step_freq=5,
         max_time_step=MAX_TIME_STEP,
         emit_unique=False,
+        cache_templates=False,
         **kwargs
     ):
+        options = {key: value for key, value in locals().items()
+            if key not in ('self', 'seed', 'process_configs', 'kwargs')}
         if not operons:
             sim_data_path = SIM_DATA_PATH_NO_OPERONS
 
         self.seed = seed
-        self.total_time = total_time
         self.random_state = np.random.RandomState(seed = seed)
+        self._seed_source = None
+        template_key = None
+        if cache_templates:
+            template_key = _template_key(
+                sim_data_path, options, process_configs)
+            if template_key in _TEMPLATES:
+                self.__dict__.update(_TEMPLATES[template_key])
+                return
+        self._config_templates = {} if cache_templates else None
+
+        self.total_time = total_time
         # Iterable of tuples with the format (time, media_id)
         self.media_timeline = media_timeline
 
@@ -88,8 +144,7 @@ class LoadSimData:
         self.degrade_misc = False
 
         # load sim_data
-        with open(sim_data_path, 'rb') as sim_data_file:
-            self.sim_data = pickle.load(sim_data_file)
+        self.sim_data = load_sim_data(sim_data_path)
 
         # Used by processes to apply submass updates to correct unique attr
         self.submass_indices = {
@@ -331,6 +386,15 @@ class LoadSimData:
             bulk_units = bulk_mol_alias.bulk_data.fullUnits()
             bulk_mol_alias.bulk_data = UnitStructArray(bulk_data, bulk_units)
 
+        # Shared by the configs of processes and the bulk store
+        self.bulk_layout = BulkLayout(
+            self.sim_data.internal_state.bulk_molecules.bulk_data['id'])
+
+        if template_key is not None:
+            _TEMPLATES[template_key] = {
+                key: value for key, value in self.__dict__.items()
+                if key not in ('seed', 'random_state', '_seed_source')}
+
 
     def get_monomer_counts_indices(self, names):
         """Given a list of monomer names without location tags, this returns
@@ -368,8 +432,15 @@ class LoadSimData:
         return [int(np.where(rna_ids==name)[0][0]) for name in names]
             
     def _seedFromName(self, name):
+        self._seed_source = ('_seedFromName', name)
         return binascii.crc32(name.encode('utf-8'), self.seed) & 0xffffffff
 
+    def _random_seed(self):
+        """Draw a seed from random_state, e.g. to get a new seed upon
+        division"""
+        self._seed_source = ('_random_seed',)
+        return self.random_state.randint(RAND_MAX)
+
     def get_config_by_name(self, name, time_step=1, parallel=False):
         name_config_mapping = {
             'ecoli-tf-binding': self.get_tf_config,
@@ -407,10 +478,29 @@ class LoadSimData:
         }
 
         try:
-            return name_config_mapping[name](time_step=time_step, parallel=parallel)
+            get_config = name_config_mapping[name]
         except KeyError:
             raise KeyError(
                 f"Process of name {name} is not known to LoadSimData.get_config_by_name")
+        if self._config_templates is None:
+            config = get_config(time_step=time_step, parallel=parallel)
+            config['bulk_layout'] = self.bulk_layout
+            return config
+
+        key = (name, time_step, parallel)
+        if key not in self._config_templates:
+            self._seed_source = None
+            config = get_config(time_step=time_step, parallel=parallel)
+            config['bulk_layout'] = self.bulk_layout
+            self._config_templates[key] = (config, self._seed_source)
+            return _copy_template(config)
+        template, seed_source = self._config_templates[key]
+        config = _copy_template(template)
+        if seed_source is not None:
+            # Draw the seed of this instance the same way as the template's
+            method, *args = seed_source
+            config['seed'] = getattr(self, method)(*args)
+        return config
 
     def get_chromosome_replication_config(self, time_step=1, parallel=False):
         get_dna_critical_mass = self.sim_data.mass.get_dna_critical_mass
@@ -542,7 +632,7 @@ class LoadSimData:
             'max_time_step': self.sim_data.process.transcription.max_time_step,
             'rnaPolymeraseElongationRateDict': self.sim_data.process.transcription.rnaPolymeraseElongationRateDict,
             'rnaIds': self.sim_data.process.transcription.rna_data['id'],
-            'rnaLengths': self.sim_data.process.transcription.rna_data["length"].asNumber(),
+            'rnaLengths': self.sim_data.process.transcription.rna_data.as_number('length'),
             'rnaSequences': self.sim_data.process.transcription.transcription_sequences,
             'ntWeights': self.sim_data.process.transcription.transcription_monomer_weights,
             'endWeight': self.sim_data.process.transcription.transcription_end_weight,
@@ -611,8 +701,8 @@ class LoadSimData:
                 for trna_id in transcription.uncharged_trna_names
                 ]),
             'rna_deg_rates': (1 / units.s) * np.concatenate((
-                transcription.rna_data['deg_rate'].asNumber(1/units.s),
-                transcription.mature_rna_data['deg_rate'].asNumber(1/units.s)
+                transcription.rna_data.as_number('deg_rate', 1/units.s),
+                transcription.mature_rna_data.as_number('deg_rate', 1/units.s)
                 )),
             # All mature RNAs are not mRNAs
             'is_mRNA': np.concatenate((
@@ -637,12 +727,12 @@ class LoadSimData:
             # End of new code
             # Load lengths and nucleotide counts for all degradable RNAs
             'rna_lengths': np.concatenate((
-                transcription.rna_data['length'].asNumber(),
-                transcription.mature_rna_data['length'].asNumber()
+                transcription.rna_data.as_number('length'),
+                transcription.mature_rna_data.as_number('length')
                 )),
             'nt_counts': np.concatenate((
-                transcription.rna_data['counts_ACGU'].asNumber(units.nt),
-                transcription.mature_rna_data['counts_ACGU'].asNumber(units.nt)
+                transcription.rna_data.as_number('counts_ACGU', units.nt),
+                transcription.mature_rna_data.as_number('counts_ACGU', units.nt)
                 )),
             # Load bulk molecule names
             'polymerized_ntp_ids': self.sim_data.molecule_groups.polymerized_ntps,
@@ -658,10 +748,10 @@ class LoadSimData:
             # Load Michaelis-Menten constants fitted to recapitulate
             # first-order RNA decay model
             'Kms': (units.mol / units.L) * np.concatenate((
-                transcription.rna_data['Km_endoRNase'].asNumber(
-                    units.mol/units.L),
-                transcription.mature_rna_data['Km_endoRNase'].asNumber(
-                    units.mol/units.L)
+                transcription.rna_data.as_number(
+                    'Km_endoRNase', units.mol/units.L),
+                transcription.mature_rna_data.as_number(
+                    'Km_endoRNase', units.mol/units.L)
                 )),
             'seed': self._seedFromName('RnaDegradation'),
             'emit_unique': self.emit_unique}
@@ -673,7 +763,7 @@ class LoadSimData:
             'time_step': time_step,
             '_parallel': parallel,
 
-            'protein_lengths': self.sim_data.process.translation.monomer_data["length"].asNumber(),
+            'protein_lengths': self.sim_data.process.translation.monomer_data.as_number('length'),
             'translation_efficiencies': normalize(self.sim_data.process.translation.translation_efficiencies_by_monomer),
             'active_ribosome_fraction': self.sim_data.process.translation.ribosomeFractionActiveDict,
             'elongation_rates': self.sim_data.process.translation.ribosomeElongationRateDict,
@@ -725,7 +815,7 @@ class LoadSimData:
             'max_time_step': translation.max_time_step,
             'n_avogadro': constants.n_avogadro,
             'proteinIds': translation.monomer_data['id'],
-            'proteinLengths': translation.monomer_data["length"].asNumber(),
+            'proteinLengths': translation.monomer_data.as_number('length'),
             'proteinSequences': translation.translation_sequences,
             'aaWeightsIncorporated': translation.translation_monomer_weights,
             'endWeight': translation.translation_end_weight,
@@ -861,12 +951,12 @@ class LoadSimData:
             'time_step': time_step,
             '_parallel': parallel,
 
-            'raw_degradation_rate': self.sim_data.process.translation.monomer_data['deg_rate'].asNumber(1 / units.s),
+            'raw_degradation_rate': self.sim_data.process.translation.monomer_data.as_number('deg_rate', 1 / units.s),
             'water_id': self.sim_data.molecule_ids.water,
             'amino_acid_ids': self.sim_data.molecule_groups.amino_acids,
-            'amino_acid_counts': self.sim_data.process.translation.monomer_data["aa_counts"].asNumber(),
+            'amino_acid_counts': self.sim_data.process.translation.monomer_data.as_number('aa_counts'),
             'protein_ids': self.sim_data.process.translation.monomer_data['id'],
-            'protein_lengths': self.sim_data.process.translation.monomer_data['length'].asNumber(),
+            'protein_lengths': self.sim_data.process.translation.monomer_data.as_number('length'),
             'seed': self._seedFromName('ProteinDegradation'),
             'emit_unique': self.emit_unique}
 
@@ -975,7 +1065,7 @@ class LoadSimData:
             'fba_reaction_ids_to_base_reaction_ids': \
                 self.sim_data.process.metabolism.reaction_id_to_base_reaction_id,
 
-            'seed': self.random_state.randint(RAND_MAX),
+            'seed': self._random_seed(),
         }
 
         # TODO Create new config-get with only necessary parts.
@@ -1117,8 +1207,8 @@ class LoadSimData:
         mass_config = {
             'cellDensity': self.sim_data.constants.cell_density.asNumber(units.g / units.L),
             'bulk_ids': self.sim_data.internal_state.bulk_molecules.bulk_data['id'],
-            'bulk_masses': self.sim_data.internal_state.bulk_molecules.bulk_data['mass'].asNumber(
-                units.fg / units.mol) / self.sim_data.constants.n_avogadro.asNumber(1 / units.mol),
+            'bulk_masses': self.sim_data.internal_state.bulk_molecules.bulk_data.as_number(
+                'mass', units.fg / units.mol) / self.sim_data.constants.n_avogadro.asNumber(1 / units.mol),
             'unique_ids': molecule_ids,
             'unique_masses': molecule_masses,
             'compartment_abbrev_to_index': self.sim_data.compartment_abbrev_to_index,
@@ -1228,6 +1318,7 @@ class LoadSimData:
             # Allocator is built into BulkMolecules container in wcEcoli
             'seed': self._seedFromName('BulkMolecules'),
             'process_names': process_names,
+            'bulk_layout': self.bulk_layout,
             'custom_priorities': {
                 'ecoli-rna-degradation': 10,
                 'ecoli-protein-degradation': 10,
@@ -1263,7 +1354,7 @@ class LoadSimData:
             'n_mature_rnas': len(mature_rna_ids),
             'mature_rna_ids': mature_rna_ids,
             'mature_rna_end_positions': transcription.mature_rna_end_positions,
-            'mature_rna_nt_counts': transcription.mature_rna_data['counts_ACGU'].asNumber(units.nt).astype(int),
+            'mature_rna_nt_counts': transcription.mature_rna_data.as_number('counts_ACGU', units.nt).astype(int),
             'unprocessed_rna_index_mapping': {
                 rna_index: i for (i, rna_index) in enumerate(unprocessed_rna_indexes)
                 },
@@ -1302,7 +1393,7 @@ class LoadSimData:
             'ribosome30S': self.sim_data.molecule_ids.s30_full_complex,
             'ribosome50S': self.sim_data.molecule_ids.s50_full_complex,
             
-            'seed': self.random_state.randint(RAND_MAX),
+            'seed': self._random_seed(),
             'emit_unique': self.emit_unique
         }
         return rna_interference_config
@@ -1315,7 +1406,7 @@ class LoadSimData:
             '_parallel': parallel,
             'trna_ids': rna_ids[is_trna],
             # Ensure that a new seed is set upon division
-            'seed': self.random_state.randint(RAND_MAX),
+            'seed': self._random_seed(),
             'emit_unique': self.emit_unique
         }
         return tetracycline_ribosome_equilibrium_config
@@ -1362,8 +1453,8 @@ class LoadSimData:
         # Calculate number of NMPs that should be added when consolidating rRNA
         # molecules
         counts_ACGU = np.vstack((
-            rna_data['counts_ACGU'].asNumber(units.nt),
-            mature_rna_data['counts_ACGU'].asNumber(units.nt)
+            rna_data.as_number('counts_ACGU', units.nt),
+            mature_rna_data.as_number('counts_ACGU', units.nt)
             ))
         rna_id_to_index = {
             rna_id: i for i, rna_id
@@ -1524,9 +1615,9 @@ class LoadSimData:
         constrained = exchange_data['importConstrainedExchangeMolecules']
         import_molecules = set(unconstrained) | set(constrained)
 
-        bulk_state = initialize_bulk_counts(self.sim_data, media_id,
-            import_molecules, self.random_state, mass_coeff,
-            self.ppgpp_regulation, self.trna_attenuation)
+        bulk_state = self.bulk_layout.mark(initialize_bulk_counts(
+            self.sim_data, media_id, import_molecules, self.random_state,
+            mass_coeff, self.ppgpp_regulation, self.trna_attenuation))
         cell_mass = calculate_cell_mass(bulk_state, {}, self.sim_data)
         # Create new PRNG for unique ID generation so self.random_state
         # can be used to faithfully replicate wcEcoli behavior
@@ -1565,3 +1656,50 @@ class LoadSimData:
                 }
             }
         }
+
+
+def test_cache_templates(tmp_path, monkeypatch):
+    import functools
+    import sys
+    from types import SimpleNamespace
+
+    monkeypatch.setattr(sys.modules[__name__], 'load_sim_data',
+        functools.partial(load_sim_data, cache_dir=str(tmp_path / 'cache')))
+
+    sim_data = SimpleNamespace(
+        submass_name_to_index={'protein': 0},
+        internal_state=SimpleNamespace(bulk_molecules=SimpleNamespace(
+            bulk_data={'id': np.array(['A[c]', 'B[c]', 'C[c]'])})),
+        process=SimpleNamespace(
+            transcription=SimpleNamespace(rna_data={
+                'id': np.array(['A[c]', 'B[c]', 'C[c]']),
+                'is_tRNA': np.array([True, False, True])}),
+            chromosome_structure=SimpleNamespace(
+                relaxed_DNA_base_pairs_per_turn=10.5)))
+    sim_data_path = str(tmp_path / 'simData.cPickle')
+    with open(sim_data_path, 'wb') as f:
+        pickle.dump(sim_data, f)
+
+    def configs(seed, cache_templates):
+        load_sim_data = LoadSimData(sim_data_path=sim_data_path, seed=seed,
+            cache_templates=cache_templates)
+        return load_sim_data, [
+            load_sim_data.get_config_by_name(name)
+            for name in ['tetracycline-ribosome-equilibrium',
+                'dna_supercoiling_listener',
+                'tetracycline-ribosome-equilibrium']]
+
+    mother, mother_configs = configs(1, True)
+    daughter, daughter_configs = configs(2, True)
+    _, uncached_configs = configs(2, False)
+    assert daughter.sim_data is mother.sim_data
+    assert [config.get('seed') for config in daughter_configs] == [
+        config.get('seed') for config in uncached_configs]
+    assert daughter_configs[0]['seed'] != mother_configs[0]['seed']
+    for config, uncached in zip(daughter_configs, uncached_configs):
+        assert config.keys() == uncached.keys()
+    assert (daughter_configs[0]['trna_ids'] == ['A[c]', 'C[c]']).all()
+    # Configs are new dicts sharing the arrays of the template
+    assert daughter_configs[0] is not daughter_configs[2]
+    assert daughter_configs[0]['trna_ids'] is mother_configs[0]['trna_ids']
+    assert daughter_configs[0]['bulk_layout'] is mother.bulk_layout
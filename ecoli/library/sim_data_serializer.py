@@ -0,0 +1,262 @@
+"""
+===================
+Sim Data Serializer
+===================
+
+Unpickling a sim_data spends most of its time copying the data of its many
+NumPy arrays, including the arrays in Unum quantities and
+:py:class:`wholecell.utils.unit_struct_array.UnitStructArray`. :py:func:`dump`
+pickles an object with protocol 5, which leaves the data of contiguous
+arrays out of the pickle, and writes that data after the pickle as raw,
+aligned buffers. :py:func:`load` memory-maps the file and passes the buffers
+back to pickle, so arrays are restored without copying and their data is
+only read from disk when it is used. Arrays are mapped copy-on-write, so
+changing them does not change the file.
+
+Each file starts with a header holding the format version and a schema hash
+of the source code of the classes that make up sim_data, and :py:func:`load`
+raises :py:class:`StaleSimDataError` if they do not match the current code.
+
+:py:func:`load_sim_data` loads a pickled sim_data (e.g. ``simData.cPickle``)
+through such a file in the cache directory, which is written on the first
+load and reused until the pickle or the schema changes. Only the newest file
+of each pickle is kept, and the pickle is loaded directly if the file cannot
+be written.
+"""
+
+import functools
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import warnings
+
+import numpy as np
+
+from wholecell.utils import filepath
+
+
+#: Directory of cached sim_data files (deleted by ``make clean``)
+CACHE_DIR = os.path.join(filepath.ROOT_PATH, 'cache')
+
+#: Change this to invalidate files written by earlier versions of this module
+FORMAT_VERSION = 1
+
+#: Source code that defines how sim_data is pickled, relative to ROOT_PATH
+SCHEMA_PATHS = [
+    'reconstruction/ecoli/simulation_data.py',
+    'reconstruction/ecoli/dataclasses',
+    'wholecell/utils/unit_struct_array.py',
+    'wholecell/utils/units.py',
+]
+
+MAGIC = b'SIMDATA\n'
+ALIGNMENT = 64
+
+
+class StaleSimDataError(Exception):
+    """The file was written by another format version or schema"""
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+@functools.lru_cache(maxsize=None)
+def schema_hash():
+    """Hash of the source code in :py:data:`SCHEMA_PATHS`"""
+    hasher = hashlib.sha256()
+    for schema_path in SCHEMA_PATHS:
+        path = os.path.join(filepath.ROOT_PATH, schema_path)
+        if os.path.isdir(path):
+            paths = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names if name.endswith('.py'))
+        else:
+            paths = [path]
+        for file_path in paths:
+            hasher.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, 'rb') as f:
+                hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def dump(obj, path, schema=None):
+    """Write an object to a file that :py:func:`load` maps into memory
+
+    Args:
+        obj: Object to write
+        path: Path of the file
+        schema: Schema hash to save in the file, defaults to
+            :py:func:`schema_hash`
+    """
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    buffers = [buffer.raw() for buffer in buffers]
+
+    offsets = []
+    end = len(data)
+    for buffer in buffers:
+        offset = _aligned(end)
+        offsets.append([offset, buffer.nbytes])
+        end = offset + buffer.nbytes
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'schema': schema_hash() if schema is None else schema,
+        'pickle': [0, len(data)],
+        'buffers': offsets,
+    }).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.seek(data_start)
+        f.write(data)
+        for (offset, _), buffer in zip(offsets, buffers):
+            f.seek(data_start + offset)
+            f.write(buffer)
+
+
+def load(path, schema=None):
+    """Load an object written by :py:func:`dump`
+
+    Args:
+        path: Path of the file
+        schema: Expected schema hash, defaults to :py:func:`schema_hash`
+
+    Raises:
+        StaleSimDataError: The file was written by another version of this
+            module or with another schema.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a serialized sim_data file.')
+        header_size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size))
+        expected_schema = schema_hash() if schema is None else schema
+        if header['version'] != FORMAT_VERSION or (
+                header['schema'] != expected_schema):
+            raise StaleSimDataError(
+                f'{path} was written by another version of the code.')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    view = memoryview(mapped)
+    data_start = _aligned(len(MAGIC) + 8 + header_size)
+    buffers = [
+        view[data_start + offset:data_start + offset + size]
+        for offset, size in header['buffers']]
+    offset, size = header['pickle']
+    return pickle.loads(
+        view[data_start + offset:data_start + offset + size],
+        buffers=buffers)
+
+
+def load_sim_data(path, cache_dir=CACHE_DIR):
+    """Load a pickled sim_data, through a file written by :py:func:`dump`
+    in ``cache_dir`` that is reused until the pickle or schema changes.
+
+    Files cached for older versions of the same pickle are deleted. If the
+    cache cannot be written, e.g. because ``cache_dir`` is read-only, the
+    unpickled sim_data is returned.
+
+    Args:
+        path: Path of the pickled sim_data
+        cache_dir: Directory of the cached files, or None to just unpickle
+            the sim_data
+    """
+    if cache_dir is None:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    stat = os.stat(path)
+    real_path = os.path.realpath(path)
+    prefix = 'sim-data-{}-'.format(
+        hashlib.sha256(real_path.encode()).hexdigest()[:16])
+    key = hashlib.sha256(
+        f'{real_path}\n{stat.st_size}\n{stat.st_mtime_ns}\n'
+        f'{schema_hash()}\n{FORMAT_VERSION}'.encode()).hexdigest()
+    cache_name = f'{prefix}{key}.bin'
+    cache_path = os.path.join(cache_dir, cache_name)
+    if os.path.exists(cache_path):
+        try:
+            return load(cache_path)
+        except StaleSimDataError:
+            pass
+
+    with open(path, 'rb') as f:
+        sim_data = pickle.load(f)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        filepath.makedirs(cache_dir)
+        dump(sim_data, tmp_path)
+        os.replace(tmp_path, cache_path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith('.bin') and (
+                    name != cache_name):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        warnings.warn(f'Could not cache {path} in {cache_dir}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sim_data
+
+
+def test_load_sim_data(tmp_path):
+    from wholecell.utils import units
+    from wholecell.utils.unit_struct_array import UnitStructArray
+
+    struct_array = np.zeros(3, dtype=[('id', 'U10'), ('mass', np.float64)])
+    struct_array['id'] = ['a', 'b', 'c']
+    struct_array['mass'] = [1., 2., 3.]
+    sim_data = {
+        'masses': UnitStructArray(struct_array, {'id': None, 'mass': units.g}),
+        'rates': units.s * np.arange(1000.),
+        'index': {'a': 0, 'b': 1},
+        'strides': np.arange(10)[::2],
+    }
+    path = str(tmp_path / 'simData.cPickle')
+    with open(path, 'wb') as f:
+        pickle.dump(sim_data, f)
+
+    for _ in range(2):
+        loaded = load_sim_data(path, str(tmp_path / 'cache'))
+        assert loaded['masses']['mass'].asNumber(units.g).tolist() == [1, 2, 3]
+        assert loaded['masses']['id'].tolist() == ['a', 'b', 'c']
+        assert (loaded['rates'].asNumber(units.s) == np.arange(1000.)).all()
+        assert loaded['index'] == {'a': 0, 'b': 1}
+        assert loaded['strides'].tolist() == [0, 2, 4, 6, 8]
+    cache_path, = (tmp_path / 'cache').iterdir()
+
+    # Loaded arrays can be changed without changing the file
+    loaded['rates'].asNumber()[0] = -1
+    assert load(str(cache_path))['rates'].asNumber()[0] == 0
+
+    # Files written for other code are not loaded
+    dump(sim_data, str(cache_path), schema='old')
+    try:
+        load(str(cache_path))
+    except StaleSimDataError:
+        pass
+    else:
+        raise AssertionError('Stale file was loaded.')
+    assert load_sim_data(path, str(tmp_path / 'cache'))['index'] == {
+        'a': 0, 'b': 1}
+
+    # Only the file for the latest version of the pickle is kept
+    os.utime(path, ns=(0, 0))
+    load_sim_data(path, str(tmp_path / 'cache'))
+    new_cache_path, = (tmp_path / 'cache').iterdir()
+    assert new_cache_path != cache_path
+
+    # The pickle is still loaded if the cache cannot be written
+    not_a_dir = tmp_path / 'file'
+    not_a_dir.write_text('')
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter('always')
+        assert load_sim_data(path, str(not_a_dir))['index'] == {
+            'a': 0, 'b': 1}
@@ -1,13 +1,11 @@
 import os
 import math
 import random
-import itertools
 
 import matplotlib
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.lines import Line2D
-from matplotlib.colors import hsv_to_rgb, rgb_to_hsv
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import hsv_to_rgb, rgb_to_hsv, to_rgb
 from mpl_toolkits.axes_grid1 import make_axes_locatable, anchored_artists
 import numpy as np
 
@@ -25,26 +23,8 @@ DEFAULT_HUE = 45 / 360
 DEFAULT_SV = [100.0 / 100.0, 70.0 / 100.0]
 BASELINE_TAG_COLOR = [0, 0, 1]  # HSV
 FLOURESCENT_SV = [0.75, 1.0]  # SV for fluorescent colors
-
-
-class LineWidthData(Line2D):
-    def __init__(self, *args, **kwargs):
-        _lw_data = kwargs.pop("linewidth", 1)
-        super().__init__(*args, **kwargs)
-        self._lw_data = _lw_data
-
-    def _get_lw(self):
-        if self.axes is not None:
-            ppd = 72.0 / self.axes.figure.dpi
-            trans = self.axes.transData.transform
-            return ((trans((1, self._lw_data)) - trans((0, 0))) * ppd)[1]
-        else:
-            return 1
-
-    def _set_lw(self, lw):
-        self._lw_data = lw
-
-    _linewidth = property(_get_lw, _set_lw)
+# number of vertices along each rounded end of a drawn agent
+CAP_RESOLUTION = 12
 
 
 def init_axes(
@@ -121,6 +101,146 @@ def mutate_color(baseline_hsv):
     return new_hsv
 
 
+def _capsule_polygons(centers, angles, half_lengths, radii):
+    """Outlines of rods with round ends
+
+    Args:
+        centers: Array of rod centers with shape (N, 2)
+        angles: Array of angles of the rod axes in radians
+        half_lengths: Array of distances from the center to the center
+            of each round end
+        radii: Array of rod radii
+
+    Returns:
+        Array of polygon vertices with shape
+        (N, 2 * ``CAP_RESOLUTION``, 2).
+    """
+    arc = np.linspace(-PI / 2, PI / 2, CAP_RESOLUTION)
+    axis = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    ends = [
+        centers + half_lengths[:, np.newaxis] * axis,
+        centers - half_lengths[:, np.newaxis] * axis]
+    caps = []
+    for end, offset in zip(ends, [0, PI]):
+        cap_angles = angles[:, np.newaxis] + offset + arc
+        caps.append(end[:, np.newaxis, :] + radii[:, np.newaxis, np.newaxis]
+            * np.stack([np.cos(cap_angles), np.sin(cap_angles)], axis=-1))
+    return np.concatenate(caps, axis=1)
+
+
+def _rectangle_polygons(centers, angles, lengths, widths):
+    """Corners of rectangles with their length along each angle"""
+    corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) / 2
+    # rotate 90 degrees to match field
+    theta = angles + PI / 2
+    cos, sin = np.cos(theta), np.sin(theta)
+    x = corners[:, 0] * widths[:, np.newaxis]
+    y = corners[:, 1] * lengths[:, np.newaxis]
+    return centers[:, np.newaxis, :] + np.stack([
+        x * cos[:, np.newaxis] - y * sin[:, np.newaxis],
+        x * sin[:, np.newaxis] + y * cos[:, np.newaxis]], axis=-1)
+
+
+def _to_rgb_array(colors):
+    """Convert a list of HSV lists and RGB color strings to RGB"""
+    rgb = np.zeros((len(colors), 3))
+    hsv_idx = [i for i, color in enumerate(colors) if not isinstance(color, str)]
+    if hsv_idx:
+        rgb[hsv_idx] = hsv_to_rgb(
+            np.array([colors[i] for i in hsv_idx], dtype=float))
+    for i, color in enumerate(colors):
+        if isinstance(color, str):
+            rgb[i] = to_rgb(color)
+    return rgb
+
+
+def draw_agents(
+    ax,
+    agents_data,
+    colors,
+    agent_shape,
+    membrane_widths,
+    membrane_colors,
+    alpha=1,
+):
+    """Draw agents on an axes as a single collection
+
+    Args:
+        ax: The axes to draw on.
+        agents_data (list): Agent data dictionaries with a ``boundary``.
+        colors (list): HSV color (or RGB color string) of each agent body.
+        agent_shape (str): One of ``rectangle``, ``segment``, and ``circle``.
+        membrane_widths (list): Width of each drawn agent boundary.
+        membrane_colors (list): RGB color of each drawn agent boundary.
+
+    Returns:
+        The :py:class:`matplotlib.collections.PolyCollection` added to
+        ``ax``, or None if there are no agents.
+    """
+    if not agents_data:
+        return None
+    boundaries = [data["boundary"] for data in agents_data]
+    centers = np.array([boundary["location"][:2] for boundary in boundaries],
+        dtype=float)
+    body_colors = _to_rgb_array(colors)
+    membrane_widths = np.asarray(membrane_widths, dtype=float)
+    membrane_colors = np.array([to_rgb(color) for color in membrane_colors])
+
+    if agent_shape == "circle":
+        radii = np.array([boundary["diameter"] for boundary in boundaries]) / 2
+        zeros = np.zeros(len(boundaries))
+        polygons = _capsule_polygons(centers, zeros, zeros, radii)
+        collection = PolyCollection(
+            polygons,
+            facecolors=body_colors,
+            edgecolors=membrane_colors,
+            linewidths=membrane_widths,
+            alpha=alpha,
+        )
+
+    elif agent_shape in ("rectangle", "segment"):
+        angles = np.array([boundary["angle"] for boundary in boundaries],
+            dtype=float)
+        lengths = np.array([boundary["length"] for boundary in boundaries],
+            dtype=float)
+        widths = np.array([boundary["width"] for boundary in boundaries],
+            dtype=float)
+        if agent_shape == "rectangle":
+            polygons = _rectangle_polygons(centers, angles, lengths, widths)
+            collection = PolyCollection(
+                polygons,
+                facecolors=body_colors,
+                edgecolors=membrane_colors,
+                linewidths=membrane_widths,
+                alpha=alpha,
+            )
+        else:
+            # membrane as a rod of the full width with the body drawn on
+            # top, both in data units
+            axis_angles = angles + PI
+            half_lengths = lengths / 2 - widths / 2
+            membranes = _capsule_polygons(
+                centers, axis_angles, half_lengths, widths / 2)
+            bodies = _capsule_polygons(
+                centers, axis_angles, half_lengths,
+                (widths - membrane_widths) / 2)
+            # interleave so that each agent covers the agents drawn before it
+            polygons = np.stack([membranes, bodies], axis=1).reshape(
+                -1, *membranes.shape[1:])
+            facecolors = np.stack([membrane_colors, body_colors], axis=1
+                ).reshape(-1, 3)
+            collection = PolyCollection(
+                polygons,
+                facecolors=facecolors,
+                linewidths=0,
+                alpha=alpha,
+            )
+    else:
+        return None
+    ax.add_collection(collection)
+    return collection
+
+
 def plot_agent(
     ax,
     data,
@@ -142,102 +262,9 @@ def plot_agent(
     """
     if not data or not data.get("boundary"):
         return
-    x_center = data["boundary"]["location"][0]
-    y_center = data["boundary"]["location"][1]
-
-    # get color, convert to rgb. Strings are already RGB
-    if isinstance(color, str):
-        rgb = color
-    else:
-        rgb = hsv_to_rgb(color)
-
-    if agent_shape == "rectangle":
-        theta = (
-            data["boundary"]["angle"] / PI * 180 + 90
-        )  # rotate 90 degrees to match field
-        length = data["boundary"]["length"]
-        width = data["boundary"]["width"]
-
-        # get bottom left position
-        x_offset = width / 2
-        y_offset = length / 2
-        theta_rad = math.radians(theta)
-        dx = x_offset * math.cos(theta_rad) - y_offset * math.sin(theta_rad)
-        dy = x_offset * math.sin(theta_rad) + y_offset * math.cos(theta_rad)
-
-        x = x_center - dx
-        y = y_center - dy
-
-        # Create a rectangle
-        shape = patches.Rectangle(
-            (x, y),
-            width,
-            length,
-            angle=theta,
-            linewidth=membrane_width,
-            edgecolor=membrane_color,
-            alpha=alpha,
-            facecolor=rgb,
-        )
-        ax.add_patch(shape)
-
-    elif agent_shape == "segment":
-        theta = (
-            data["boundary"]["angle"] / PI * 180 + 90
-        )  # rotate 90 degrees to match field
-        length = data["boundary"]["length"]
-        width = data["boundary"]["width"]
-
-        radius = width / 2
-
-        # get the two ends
-        length_offset = (length / 2) - radius
-        theta_rad = math.radians(theta)
-        dx = -length_offset * math.sin(theta_rad)
-        dy = length_offset * math.cos(theta_rad)
-
-        x1 = x_center - dx
-        y1 = y_center - dy
-        x2 = x_center + dx
-        y2 = y_center + dy
-
-        # segment plot
-        membrane = LineWidthData(
-            [x1, x2],
-            [y1, y2],
-            color=membrane_color,
-            linewidth=width,
-            alpha=alpha,
-            solid_capstyle="round",
-        )
-        line = LineWidthData(
-            [x1, x2],
-            [y1, y2],
-            color=rgb,
-            alpha=alpha,
-            linewidth=width - membrane_width,
-            solid_capstyle="round",
-        )
-        ax.add_line(membrane)
-        ax.add_line(line)
-
-    elif agent_shape == "circle":
-        diameter = data["boundary"]["diameter"]
-
-        # get bottom left position
-        radius = diameter / 2
-        x = x_center - radius
-        y = y_center - radius
-
-        # Create a circle
-        circle = patches.Circle(
-            (x, y),
-            radius,
-            linewidth=membrane_width,
-            edgecolor=membrane_color,
-            alpha=alpha,
-        )
-        ax.add_patch(circle)
+    draw_agents(
+        ax, [data], [color], agent_shape, [membrane_width], [membrane_color],
+        alpha)
 
 
 def plot_agents(
@@ -253,6 +280,8 @@ def plot_agents(
 ):
     """Plot agents.
 
+    All agents are drawn as a single collection (see :py:func:`draw_agents`).
+
     Args:
         ax: the axis for plot
         agents (dict): a mapping from agent ID to that agent's data,
@@ -275,29 +304,35 @@ def plot_agents(
         agent_colors = dict()
     if not highlight_agent:
         highlight_agent = []
+    agents_data = []
+    colors = []
+    membrane_widths = []
+    membrane_colors = []
     for agent_id, agent_data in agents.items():
+        if not agent_data or not agent_data.get("boundary"):
+            continue
         color = agent_colors.get(agent_id, [DEFAULT_HUE] + DEFAULT_SV)
-        if dead_color and agent_data.get("boundary"):
-            if agent_data["boundary"].get("dead"):
-                color = dead_color
-        if agent_data:
-            if agent_id in highlight_agent:
-                agent_membrane_width = highlight_agent[
-                    agent_id]['membrane_width']
-                agent_membrane_color = highlight_agent[
-                    agent_id]['membrane_color']
-            else:
-                agent_membrane_width = membrane_width
-                agent_membrane_color = membrane_color
-            plot_agent(
-                ax,
-                agent_data,
-                color,
-                agent_shape,
-                agent_membrane_width,
-                agent_membrane_color,
-                alpha,
-            )
+        if dead_color and agent_data["boundary"].get("dead"):
+            color = dead_color
+        agents_data.append(agent_data)
+        colors.append(color)
+        if agent_id in highlight_agent:
+            membrane_widths.append(
+                highlight_agent[agent_id]['membrane_width'])
+            membrane_colors.append(
+                highlight_agent[agent_id]['membrane_color'])
+        else:
+            membrane_widths.append(membrane_width)
+            membrane_colors.append(membrane_color)
+    draw_agents(
+        ax,
+        agents_data,
+        colors,
+        agent_shape,
+        membrane_widths,
+        membrane_colors,
+        alpha,
+    )
 
     if len(agents) == 1:
         ax.set_title("1 agent", y=1.1)
@@ -328,11 +363,10 @@ def get_phylogeny_colors_from_names(agent_ids):
 
     # make phylogeny with {mother_id: [daughter_1_id, daughter_2_id]}
     phylogeny = {agent_id: [] for agent_id in agent_ids}
-    for agent1, agent2 in itertools.combinations(agent_ids, 2):
-        if agent1 == agent2[0:-1]:
-            phylogeny[agent1].append(agent2)
-        elif agent2 == agent1[0:-1]:
-            phylogeny[agent2].append(agent1)
+    for agent_id in agent_ids:
+        mother_id = agent_id[0:-1]
+        if mother_id in phylogeny and mother_id != agent_id:
+            phylogeny[mother_id].append(agent_id)
 
     # get initial ancestors
     daughters = list(phylogeny.values())
@@ -987,14 +1021,18 @@ def make_tags_figure(
                 norm = matplotlib.colors.Normalize(vmin=min_tag, vmax=max_tag)
                 mappable = matplotlib.cm.ScalarMappable(
                     norm=norm, cmap=cmap)
-            for agent_id, agent_data in agents[time].items():
-                # get current tag concentration, and determine color
+            # get current tag concentrations, and determine colors
+            levels = []
+            for agent_data in agents[time].values():
                 level = get_value_from_path(agent_data, tag_id)
                 if convert_to_concs:
                     volume = agent_data.get("boundary", {}).get("volume", 0)
                     level = level / volume if volume else 0
-                agent_tag_colors[agent_id] = rgb_to_hsv(
-                    mappable.to_rgba(level)[:3])
+                levels.append(level)
+            if levels:
+                tag_hsv = rgb_to_hsv(
+                    mappable.to_rgba(np.array(levels, dtype=float))[:, :3])
+                agent_tag_colors = dict(zip(agents[time], tag_hsv))
 
             agent_tag_colors.update(agent_colors)
             plot_agents(
@@ -1046,3 +1084,41 @@ def make_tags_figure(
         fig.subplots_adjust(wspace=0.7, hspace=0.1)
         fig.savefig(fig_path, bbox_inches="tight")
     return fig
+
+
+def test_plot_agents():
+    agents = {
+        '0': {'boundary': {
+            'location': [2.0, 3.0], 'angle': 0.0, 'length': 2.0,
+            'width': 1.0, 'diameter': 1.0}},
+        '00': {'boundary': {
+            'location': [5.0, 5.0], 'angle': PI / 2, 'length': 4.0,
+            'width': 1.0, 'diameter': 2.0, 'dead': True}},
+        '01': {},
+    }
+    agent_colors = get_phylogeny_colors_from_names(list(agents))
+    assert agent_colors['0'] == [agent_colors['0'][0]] + DEFAULT_SV
+    assert len(agent_colors['00']) == 3
+
+    fig, ax = plt.subplots()
+    plot_agents(ax, agents, agent_colors, agent_shape='segment',
+        dead_color=[0, 0, 0], membrane_width=0.2)
+    # one collection holds the membrane and body of each agent
+    collection, = ax.collections
+    paths = collection.get_paths()
+    assert len(paths) == 4
+    np.testing.assert_allclose(
+        paths[1].vertices.min(axis=0), [1.1, 2.6], atol=0.01)
+    np.testing.assert_allclose(
+        paths[2].vertices.max(axis=0), [5.5, 7.0], atol=0.01)
+    np.testing.assert_allclose(collection.get_facecolors()[3, :3], 0)
+    assert ax.get_title() == '3 agents'
+
+    for shape, extent in [('rectangle', [1.0, 2.5]), ('circle', [1.5, 2.5])]:
+        fig, ax = plt.subplots()
+        plot_agents(ax, agents, agent_colors, agent_shape=shape)
+        collection, = ax.collections
+        np.testing.assert_allclose(
+            collection.get_paths()[0].vertices.min(axis=0), extent,
+            atol=0.01)
+    plt.close('all')
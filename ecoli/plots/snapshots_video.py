@@ -1,6 +1,5 @@
 import os
-import shutil
-import copy
+import collections
 import concurrent.futures
 
 import cv2
@@ -8,6 +7,7 @@ import numpy as np
 import matplotlib
 matplotlib.use('agg')
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from tqdm import tqdm
 
 from vivarium.core.composition import TEST_OUT_DIR
@@ -28,18 +28,45 @@ DEFAULT_HIGHLIGHT_COLOR = [0, 1, 1]
 PLOT_WIDTH = 7
 
 
-def make_snapshot_saver(
+def figure_to_frame(fig, tight=True, pad_inches=0.1):
+    """Render a figure to an RGB array with the Agg backend and close it
+
+    With ``tight``, the frame is cropped (or padded with white) to the
+    extent of the figure's artists plus ``pad_inches``, like
+    ``savefig(bbox_inches='tight')``.
+    """
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    frame = np.asarray(canvas.buffer_rgba())[..., :3]
+    if tight:
+        height, width = frame.shape[:2]
+        bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad_inches)
+        x0, y0, x1, y1 = np.round(bbox.extents * fig.dpi).astype(int)
+        # rows count from the top of the figure
+        top, bottom = height - y1, height - y0
+        tight_frame = np.full((bottom - top, x1 - x0, 3), 255, dtype=np.uint8)
+        src_top, src_left = max(top, 0), max(x0, 0)
+        src_bottom, src_right = min(bottom, height), min(x1, width)
+        tight_frame[
+            src_top - top:src_bottom - top, src_left - x0:src_right - x0
+        ] = frame[src_top:src_bottom, src_left:src_right]
+        frame = tight_frame
+    else:
+        frame = frame.copy()
+    plt.close(fig)
+    return frame
+
+
+def make_snapshot_renderer(
     multibody_agent_colors,
     multibody_field_range,
     bounds,
-    images_dir,
     **kwargs
 ):
     # Must be global for multiprocessing to work
-    global save_snapshot_figure
-    def save_snapshot_figure(data_at_time):
+    global render_snapshot_frame
+    def render_snapshot_frame(data_at_time):
         time = data_at_time[0]
-        fig_path = os.path.join(images_dir, f"img{time}.jpg")
         multibody_agents, multibody_fields = format_snapshot_data(
             {time: data_at_time[1]})
         fig = make_snapshots_figure(
@@ -55,26 +82,22 @@ def make_snapshot_saver(
             plot_width=PLOT_WIDTH,
             scale_bar_length=0,
             **kwargs)
-        fig.savefig(fig_path, bbox_inches='tight')
-        plt.close()
-        return fig_path
-    return save_snapshot_figure
+        return figure_to_frame(fig)
+    return render_snapshot_frame
 
 
-def make_tags_saver(
+def make_tags_renderer(
     agent_colors,
     tag_ranges,
     tag_colors,
     bounds,
-    images_dir,
     convert_to_concs=False,
     **kwargs
 ):
     # Must be global for multiprocessing to work
-    global save_tags_figure
-    def save_tags_figure(data_at_time):
+    global render_tags_frame
+    def render_tags_frame(data_at_time):
         time = data_at_time[0]
-        fig_path = os.path.join(images_dir, f"img{time}.jpg")
         agents = {time: data_at_time[1].get('agents', {})}
         fig = make_tags_figure(
             time_indices=[time],
@@ -90,79 +113,114 @@ def make_tags_saver(
             scale_bar_length=0,
             convert_to_concs=convert_to_concs,
             **kwargs)
-        fig.savefig(fig_path, bbox_inches='tight')
-        plt.close()
-        return fig_path
-    return save_tags_figure
+        return figure_to_frame(fig)
+    return render_tags_frame
 
 
-def make_timeseries_saver(
+def make_timeseries_renderer(
     data,
     show_timeseries,
     highlight_agents,
     highlight_color,
-    images_dir
 ):
+    plot_settings = {
+        'column_width': 6,
+        'row_height': 2,
+        'stack_column': True,
+        'tick_label_size': 10,
+        'linewidth': 2,
+        'title_size': 10}
+
+    if show_timeseries:
+        plot_settings.update({'include_paths': show_timeseries})
+
+    # remove agents not included in highlight_agents
+    if highlight_agents:
+        data = {
+            time: {
+                **state,
+                'agents': {
+                    agent_id: agent_state
+                    for agent_id, agent_state in state['agents'].items()
+                    if agent_id in highlight_agents}}
+            for time, state in data.items()}
+        agent_colors = {agent_id: highlight_color for agent_id in highlight_agents}
+        plot_settings.update({'agent_colors': agent_colors})
+    time_vec = list(data.keys())
+
     # Must be global for multiprocessing to work
-    global save_timeseries_figure
-    def save_timeseries_figure(t_index):
-        time_vec = list(data.keys())
-
-        plot_settings = {
-            'column_width': 6,
-            'row_height': 2,
-            'stack_column': True,
-            'tick_label_size': 10,
-            'linewidth': 2,
-            'title_size': 10}
-
-        if show_timeseries:
-            plot_settings.update({'include_paths': show_timeseries})
-
-        # remove agents not included in highlight_agents
-        if highlight_agents:
-            for time, state in data.items():
-                agents = state['agents']
-                for agent_id, agent_state in agents.items():
-                    if agent_id not in highlight_agents:
-                        del data[time]['agents'][agent_id]
-            agent_colors = {agent_id: highlight_color for agent_id in highlight_agents}
-            plot_settings.update({'agent_colors': agent_colors})
-
-        fig_path = os.path.join(images_dir, f"timeseries{t_index}.jpg")
-        time_indices = np.array(range(0, t_index+1))
+    global render_timeseries_frame
+    def render_timeseries_frame(t_index):
         current_data = {
             time_vec[index]: data[time_vec[index]]
-            for index in time_indices}
+            for index in range(0, t_index+1)}
         fig = plot_agents_multigen(current_data, dict(plot_settings))
-        fig.savefig(fig_path, bbox_inches='tight')
-        plt.close()
-        return fig_path
-    return save_timeseries_figure
+        return figure_to_frame(fig)
+    return render_timeseries_frame
 
 
-def video_from_images(img_paths, out_file):
-    # make the video
-    img_array = []
-    size = None
-    for img_file in img_paths:
-        img = cv2.imread(img_file)
-        height, width, layers = img.shape
-        if size:
-            if width < size[0]:
-                size[0] = width
-            if height < size[0]:
-                size[1] = height
-        else:
-            size = [width, height]
-        img_array.append(img)
-
-    out = cv2.VideoWriter(out_file, cv2.VideoWriter_fourcc(*'mp4v'), 15, size)
-    for i in range(len(img_array)):
-        # Crop all images to smallest size to avoid frame skips
-        img_array[i] = img_array[i][0:size[1], 0:size[0]]
-        out.write(img_array[i])
-    out.release()
+def iter_frames(render, items, cpus=1, max_pending=None):
+    """Render frames in order as they are needed
+
+    Args:
+        render: Function that returns an RGB frame for an item
+        items: Iterable of items to render
+        cpus: Number of worker processes. Frames are rendered in this
+            process if 1.
+        max_pending: Most frames that are rendered ahead of the one
+            being consumed. Defaults to twice ``cpus``.
+    """
+    if cpus == 1:
+        for item in items:
+            yield render(item)
+        return
+    max_pending = max_pending or 2 * cpus
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(cpus) as executor:
+        for item in items:
+            pending.append(executor.submit(render, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def fit_frame(frame, size):
+    """Crop or pad (with white) an RGB frame to ``size`` (width, height)"""
+    width, height = size
+    frame = frame[:height, :width]
+    if frame.shape[:2] != (height, width):
+        padded = np.full((height, width, 3), 255, dtype=np.uint8)
+        padded[:frame.shape[0], :frame.shape[1]] = frame
+        frame = padded
+    return frame
+
+
+def write_video(frames, out_file, size=None, fps=15):
+    """Encode RGB frames into a video as they arrive
+
+    Args:
+        frames: Iterable of RGB frames
+        size: Frame size (width, height). Defaults to the size of the
+            first frame. Other frames are cropped or padded to this size
+            so that none are skipped by the encoder.
+
+    Returns:
+        Number of frames written
+    """
+    writer = None
+    n_frames = 0
+    for frame in frames:
+        if writer is None:
+            if size is None:
+                size = (frame.shape[1], frame.shape[0])
+            writer = cv2.VideoWriter(
+                out_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        writer.write(cv2.cvtColor(fit_frame(frame, size), cv2.COLOR_RGB2BGR))
+        n_frames += 1
+    if writer is not None:
+        writer.release()
+    return n_frames
 
 
 def make_video(
@@ -180,6 +238,9 @@ def make_video(
 ):
     """Make a video with snapshots across time
 
+    Frames are rendered in memory by ``cpus`` worker processes and
+    encoded in order as they finish.
+
     Args:
         plot_type: (str) select either 'fields' or 'tags'. 'fields' is the default
     """
@@ -192,13 +253,8 @@ def make_video(
     if isinstance(bounds[0], Quantity):
         bounds = tuple(bound.to(units.um).magnitude for bound in bounds)
 
-    # make images directory, remove if existing
     out_file = os.path.join(out_dir, f'{filename}.mp4')
     out_file2 = os.path.join(out_dir, f'{filename}_timeseries.mp4')
-    images_dir = os.path.join(out_dir, f'_images_{plot_type}')
-    if os.path.isdir(images_dir):
-        shutil.rmtree(images_dir)
-    os.makedirs(images_dir)
 
     agent_colors = {}
     if highlight_agents:
@@ -214,11 +270,10 @@ def make_video(
         multibody_agent_colors = get_agent_colors(multibody_agents)
         multibody_agent_colors.update(agent_colors)
 
-        do_plot = make_snapshot_saver(
+        do_plot = make_snapshot_renderer(
             multibody_agent_colors, 
             multibody_field_range, 
             bounds,
-            images_dir,
             **kwargs)
 
     elif plot_type == 'tags':
@@ -230,12 +285,11 @@ def make_video(
             convert_to_concs=kwargs.get('convert_to_concs', False),
             tag_colors=kwargs.get('tag_colors', {}))
 
-        do_plot = make_tags_saver(
+        do_plot = make_tags_renderer(
             agent_colors, 
             tag_ranges,
             tag_colors, 
             bounds,
-            images_dir,
             **kwargs)
 
     # Only plot data for every `step` timepoints
@@ -248,28 +302,57 @@ def make_video(
             time_counter += 1
         data = filtered_data
 
-    with concurrent.futures.ProcessPoolExecutor(cpus) as executor:
-        img_paths = list(tqdm(executor.map(do_plot, data.items()), total=len(data)))
+    # make the video
+    write_video(
+        tqdm(iter_frames(do_plot, data.items(), cpus), total=len(data)),
+        out_file)
 
-    img_paths_2 = []
     if show_timeseries:
-        timeseries_fun = make_timeseries_saver(
+        timeseries_fun = make_timeseries_renderer(
             data,
             show_timeseries=show_timeseries,
             highlight_agents=highlight_agents,
-            highlight_color=highlight_color,
-            images_dir=images_dir)
-        time_indices = list(range(0, len(time_vec)))
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            img_paths_2 = list(tqdm(executor.map(
-                timeseries_fun, time_indices), total=len(time_indices)))
-
-    # make the video
-    video_from_images(img_paths, out_file)
-    video_from_images(img_paths_2, out_file2)
-
-    # delete image folder
-    shutil.rmtree(images_dir)
+            highlight_color=highlight_color)
+        time_indices = list(range(0, len(data)))
+        write_video(
+            tqdm(iter_frames(timeseries_fun, time_indices, cpus),
+                total=len(time_indices)),
+            out_file2)
+
+
+def test_write_video():
+    import tempfile
+
+    frames = [
+        np.full((40, 60, 3), value, dtype=np.uint8)
+        for value in range(0, 250, 50)]
+    # frames that differ in size are fit to the first
+    frames[2] = np.zeros((30, 70, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as out_dir:
+        out_file = os.path.join(out_dir, 'test.mp4')
+        assert write_video(iter_frames(lambda f: f, frames), out_file) == 5
+        video = cv2.VideoCapture(out_file)
+        assert video.get(cv2.CAP_PROP_FRAME_COUNT) == 5
+        assert video.get(cv2.CAP_PROP_FRAME_WIDTH) == 60
+        assert video.get(cv2.CAP_PROP_FRAME_HEIGHT) == 40
+        video.release()
+
+    fig, ax = plt.subplots(figsize=(2, 1), dpi=50)
+    ax.plot([0, 1], [0, 1])
+    assert figure_to_frame(fig, tight=False).shape == (50, 100, 3)
+
+    # tight frames are framed like savefig(bbox_inches='tight')
+    import io
+    for text_x in (0.5, 1.5):
+        fig = plt.figure(figsize=(4, 3), dpi=50)
+        fig.text(text_x, 0.5, 'frame', fontsize=20)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', bbox_inches='tight')
+        saved = cv2.imdecode(
+            np.frombuffer(buffer.getvalue(), np.uint8), cv2.IMREAD_COLOR)
+        frame = figure_to_frame(fig)
+        assert abs(frame.shape[0] - saved.shape[0]) <= 1
+        assert abs(frame.shape[1] - saved.shape[1]) <= 1
 
 
 def main(total_time=2000, step=60, exchange=False):
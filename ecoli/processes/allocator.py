@@ -11,7 +11,7 @@ from vivarium.core.process import Step
 
 from ecoli.processes.registries import topology_registry
 from ecoli.library.schema import (counts, numpy_schema, bulk_name_to_idx,
-    listener_schema)
+    listener_schema, update_bulk_idx)
 
 # Register default topology for this process, associating it with process name
 NAME = 'allocator'
@@ -67,6 +67,12 @@ class Allocator(Step):
 
         # Helper indices for Numpy indexing
         self.molecule_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(self.moleculeNames,
+            bulk_ids)
+        self.atp_idx = bulk_name_to_idx('ATP[c]', bulk_ids)
 
     def ports_schema(self):
         ports = {
@@ -98,10 +104,7 @@ class Allocator(Step):
         return ports
 
     def next_update(self, timestep, states):
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(self.moleculeNames,
-                states['bulk']['id'])
-            self.atp_idx = bulk_name_to_idx('ATP[c]', states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         total_counts = counts(states['bulk'], self.molecule_idx)
         original_totals = total_counts.copy()
         counts_requested = np.zeros((self.n_molecules, self.n_processes),
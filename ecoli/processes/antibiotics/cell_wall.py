@@ -59,7 +59,8 @@ from ecoli.library.cell_wall.lattice import (
     calculate_lattice_size,
     get_length_distributions,
 )
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 from ecoli.library.parameters import param_store
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.shape import length_from_volume, surface_area_from_length
@@ -140,6 +141,10 @@ class CellWall(Process):
         # Helper indices for Numpy arrays
         self.pbp_ids = list(self.parameters["PBP"].values())
         self.pbp_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.pbp_idx = bulk_name_to_idx(self.pbp_ids, bulk_ids)
 
     def ports_schema(self):
         schema = {
@@ -235,8 +240,7 @@ class CellWall(Process):
         return schema
 
     def next_update(self, timestep, states):
-        if self.pbp_idx is None:
-            self.pbp_idx = bulk_name_to_idx(self.pbp_ids, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         update = {}
         
         # Unpack states
@@ -7,7 +7,8 @@ from vivarium.processes.timeline import TimelineProcess
 from vivarium.core.emitter import timeseries_from_data
 
 from ecoli.library.lattice_utils import AVOGADRO
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 
 CONV_UNITS = 1 / units.mM
 
@@ -32,6 +33,12 @@ class ConcToCounts(Step):
     def __init__(self, parameters=None):
         super().__init__(parameters)
         self.molecule_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(
+            self.parameters['molecules_to_convert'],
+            bulk_ids)
 
     def ports_schema(self):
         schema = {
@@ -73,10 +80,7 @@ class ConcToCounts(Step):
         return initial_state
 
     def next_update(self, timestep, states):
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(
-                self.parameters['molecules_to_convert'],
-                states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         update = {'bulk': []}
         for mol_idx, molecule in zip(self.molecule_idx,
             self.parameters['molecules_to_convert']):
@@ -2,7 +2,8 @@ import numpy as np
 
 from vivarium.core.process import Step
 
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 
 # Register default topology for this process, associating it with process name
@@ -34,6 +35,11 @@ class MureinDivision(Step):
 
         # Helper indices for Numpy array
         self.murein_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.murein_idx = bulk_name_to_idx(
+            self.parameters["murein_name"], bulk_ids)
 
     def ports_schema(self):
         return {
@@ -68,9 +74,7 @@ class MureinDivision(Step):
         }
 
     def next_update(self, timestep, states):
-        if self.murein_idx is None:
-            self.murein_idx = bulk_name_to_idx(
-                self.parameters["murein_name"], states["bulk"]["id"])
+        update_bulk_idx(self, states['bulk'])
 
         update = {"murein_state": {}, "bulk": []}
         # Ensure that lattice is a numpy array so divider works properly.
@@ -8,7 +8,8 @@ from vivarium.library.units import units, remove_units
 from vivarium.plots.simulation_output import plot_variables
 
 from ecoli.library.parameters import param_store
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.shape import length_from_volume
 from ecoli.processes.bulk_timeline import BulkTimelineProcess
@@ -123,6 +124,13 @@ class PBPBinding(Step):
 
         # Helper indices for Numpy arrays
         self.murein_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.murein_idx = bulk_name_to_idx(self.murein, bulk_ids)
+        self.pbp1a_idx = bulk_name_to_idx(self.PBP1A, bulk_ids)
+        self.pbp1ba_idx = bulk_name_to_idx(self.PBP1B_alpha, bulk_ids)
+        self.pbp1bg_idx = bulk_name_to_idx(self.PBP1B_gamma, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -193,12 +201,7 @@ class PBPBinding(Step):
         }
 
     def next_update(self, timestep, states):
-        if self.murein_idx is None:
-            bulk_ids = states["bulk"]["id"]
-            self.murein_idx = bulk_name_to_idx(self.murein, bulk_ids)
-            self.pbp1a_idx = bulk_name_to_idx(self.PBP1A, bulk_ids)
-            self.pbp1ba_idx = bulk_name_to_idx(self.PBP1B_alpha, bulk_ids)
-            self.pbp1bg_idx = bulk_name_to_idx(self.PBP1B_gamma, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
         update = {"murein_state": {}}
         
         # Calculate fraction of active PBP1a, PBP1b using Hill Equation
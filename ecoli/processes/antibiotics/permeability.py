@@ -1,5 +1,6 @@
 import numpy as np
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 from ecoli.states.wcecoli_state import get_state_from_file
 from ecoli.processes.bulk_timeline import BulkTimelineProcess
 from vivarium.core.emitter import timeseries_from_data
@@ -44,6 +45,11 @@ class Permeability(Step):
         self.diffusing_molecules = self.parameters['diffusing_molecules']
         # Helper indices for Numpy arrays
         self.porin_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.porin_idx = bulk_name_to_idx(
+            self.porin_ids, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -59,9 +65,7 @@ class Permeability(Step):
         }
 
     def next_update(self, timestep, states):
-        if self.porin_idx is None:
-            self.porin_idx = bulk_name_to_idx(
-                self.porin_ids, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         porins = counts(states['bulk'], self.porin_idx)
         porins = dict(zip(self.porin_ids, porins))
         surface_area = states['surface_area']
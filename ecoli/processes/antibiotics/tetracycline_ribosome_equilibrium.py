@@ -4,7 +4,8 @@ from scipy.optimize import root_scalar
 from vivarium.core.process import Step
 from vivarium.library.units import units
 
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 
 
 AVOGADRO = N_A / units.mol
@@ -47,6 +48,17 @@ class TetracyclineRibosomeEquilibrium(Step):
             seed=self.parameters['seed'])
         # Helper indices for Numpy indexing
         self.trna_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.trna_idx = bulk_name_to_idx(
+            self.parameters['trna_ids'], bulk_ids)
+        self.free_30s_idx = bulk_name_to_idx(
+            'CPLX0-3953[c]', bulk_ids)
+        self.free_50s_idx = bulk_name_to_idx(
+            'CPLX0-3962[c]', bulk_ids)
+        self.tet_30s_idx = bulk_name_to_idx(
+            'CPLX0-3953-tetracycline[c]', bulk_ids)
 
     def ports_schema(self):
         return {
@@ -82,16 +94,7 @@ class TetracyclineRibosomeEquilibrium(Step):
                 ) == 0
 
     def next_update(self, _, states):
-        if self.trna_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.trna_idx = bulk_name_to_idx(
-                self.parameters['trna_ids'], bulk_ids)
-            self.free_30s_idx = bulk_name_to_idx(
-                'CPLX0-3953[c]', bulk_ids)
-            self.free_50s_idx = bulk_name_to_idx(
-                'CPLX0-3962[c]', bulk_ids)
-            self.tet_30s_idx = bulk_name_to_idx(
-                'CPLX0-3953-tetracycline[c]', bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         volume = states['volume']
 
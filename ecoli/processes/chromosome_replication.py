@@ -19,7 +19,8 @@ molecules.
 import numpy as np
 
 from ecoli.library.schema import (create_unique_indexes,
-    numpy_schema, counts, attrs, bulk_name_to_idx, listener_schema)
+    numpy_schema, counts, attrs, bulk_name_to_idx, listener_schema,
+    update_bulk_idx)
 
 from wholecell.utils import units
 from wholecell.utils.polymerize import (
@@ -120,6 +121,15 @@ class ChromosomeReplication(PartitionedProcess):
         self.ppi = self.parameters['ppi']
 
         self.ppi_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.ppi_idx = bulk_name_to_idx(self.ppi, bulk_ids)
+        self.replisome_trimers_idx = bulk_name_to_idx(
+            self.replisome_trimers_subunits, bulk_ids)
+        self.replisome_monomers_idx = bulk_name_to_idx(
+            self.replisome_monomers_subunits, bulk_ids)
+        self.dntps_idx = bulk_name_to_idx(self.dntps, bulk_ids)
 
     def ports_schema(self):
 
@@ -155,13 +165,7 @@ class ChromosomeReplication(PartitionedProcess):
                 ) == 0
 
     def calculate_request(self, timestep, states):
-        if self.ppi_idx is None:
-            self.ppi_idx = bulk_name_to_idx(self.ppi, states['bulk']['id'])
-            self.replisome_trimers_idx = bulk_name_to_idx(
-                self.replisome_trimers_subunits, states['bulk']['id'])
-            self.replisome_monomers_idx = bulk_name_to_idx(
-                self.replisome_monomers_subunits, states['bulk']['id'])
-            self.dntps_idx = bulk_name_to_idx(self.dntps, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         requests = {}
         # Get total count of existing oriC's
         n_oriC = states['oriCs']['_entryState'].sum()
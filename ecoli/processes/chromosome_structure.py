@@ -12,7 +12,7 @@ from vivarium.core.process import Step
 
 from ecoli.processes.registries import topology_registry
 from ecoli.library.schema import (create_unique_indexes, listener_schema,
-    numpy_schema, attrs, bulk_name_to_idx)
+    numpy_schema, attrs, bulk_name_to_idx, update_bulk_idx)
 from wholecell.utils.polymerize import buildSequences
 
 # Register default topology for this process, associating it with process name
@@ -123,6 +123,27 @@ class ChromosomeStructure(Step):
 
         self.random_state = np.random.RandomState(
             seed=self.parameters['seed'])
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.fragmentBasesIdx = bulk_name_to_idx(
+            self.fragmentBases, bulk_ids)
+        self.active_tfs_idx = bulk_name_to_idx(
+            self.active_tfs, bulk_ids)
+        self.ribosome_30S_subunit_idx = bulk_name_to_idx(
+            self.ribosome_30S_subunit, bulk_ids)
+        self.ribosome_50S_subunit_idx = bulk_name_to_idx(
+            self.ribosome_50S_subunit, bulk_ids)
+        self.amino_acids_idx = bulk_name_to_idx(
+            self.amino_acids, bulk_ids)
+        self.water_idx = bulk_name_to_idx(
+            self.water, bulk_ids)
+        self.ppi_idx = bulk_name_to_idx(
+            self.ppi, bulk_ids)
+        self.inactive_RNAPs_idx = bulk_name_to_idx(
+            self.inactive_RNAPs, bulk_ids)
+        self.mature_rna_idx = bulk_name_to_idx(
+            self.mature_rna_ids, bulk_ids)
 
     def ports_schema(self):
         ports = {
@@ -185,26 +206,7 @@ class ChromosomeStructure(Step):
                 ) == 0
 
     def next_update(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.inactive_RNAPs_idx is None:
-            self.fragmentBasesIdx = bulk_name_to_idx(
-                self.fragmentBases, states['bulk']['id'])
-            self.active_tfs_idx = bulk_name_to_idx(
-                self.active_tfs, states['bulk']['id'])
-            self.ribosome_30S_subunit_idx = bulk_name_to_idx(
-                self.ribosome_30S_subunit, states['bulk']['id'])
-            self.ribosome_50S_subunit_idx = bulk_name_to_idx(
-                self.ribosome_50S_subunit, states['bulk']['id'])
-            self.amino_acids_idx = bulk_name_to_idx(
-                self.amino_acids, states['bulk']['id'])
-            self.water_idx = bulk_name_to_idx(
-                self.water, states['bulk']['id'])
-            self.ppi_idx = bulk_name_to_idx(
-                self.ppi, states['bulk']['id'])
-            self.inactive_RNAPs_idx = bulk_name_to_idx(
-                self.inactive_RNAPs, states['bulk']['id'])
-            self.mature_rna_idx = bulk_name_to_idx(
-                self.mature_rna_ids, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         
         if states['first_update']:
             return {'first_update': False}
@@ -23,7 +23,7 @@ from stochastic_arrow import StochasticSystem
 from vivarium.core.composition import simulate_process
 
 from ecoli.library.schema import (
-    numpy_schema, bulk_name_to_idx, counts, listener_schema)
+    numpy_schema, bulk_name_to_idx, counts, listener_schema, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.partition import PartitionedProcess
 
@@ -65,6 +65,11 @@ class Complexation(PartitionedProcess):
         self.randomState = np.random.RandomState(seed = self.parameters['seed'])
         self.seed = self.randomState.randint(2**31)
         self.system = StochasticSystem(self.stoichiometry, random_seed=self.seed)
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(
+            self.molecule_names, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -79,9 +84,7 @@ class Complexation(PartitionedProcess):
 
     def calculate_request(self, timestep, states):
         timestep = states['timestep']
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(
-                self.molecule_names, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
 
         moleculeCounts = counts(states['bulk'], self.molecule_idx)
 
@@ -2,7 +2,8 @@ from scipy.constants import N_A
 
 from vivarium.core.process import Step
 from vivarium.library.units import units, Quantity
-from ecoli.library.schema import bulk_name_to_idx, numpy_schema, counts
+from ecoli.library.schema import (
+    bulk_name_to_idx, numpy_schema, counts, update_bulk_idx)
 
 AVOGADRO = N_A / units.mol
 
@@ -23,6 +24,11 @@ class ConcentrationsDeriver(Step):
         self.var = self.parameters['variables']
         # Helper indices for Numpy indexing
         self.bulk_var_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.bulk_var_idx = bulk_name_to_idx(
+            self.bulk_var, bulk_ids)
 
     def ports_schema(self):
         schema = {
@@ -47,9 +53,7 @@ class ConcentrationsDeriver(Step):
         return schema
 
     def next_update(self, timestep, states):
-        if self.bulk_var_idx is None:
-            self.bulk_var_idx = bulk_name_to_idx(
-                self.bulk_var, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         volume = states['volume']
         assert isinstance(volume, Quantity)
         var_concs = {
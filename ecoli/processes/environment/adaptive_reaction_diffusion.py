@@ -0,0 +1,220 @@
+'''
+=================================
+Adaptive Reaction Diffusion Field
+=================================
+
+Reaction diffusion on a coarse lattice over the whole environment, with
+a refined patch that follows the colony. See
+:py:class:`ecoli.library.multiresolution_lattice.MultiResolutionField`.
+'''
+import numpy as np
+
+from vivarium.core.process import assoc_path
+from vivarium.library.units import units
+from vivarium.library.topology import get_in
+
+from ecoli.library.lattice_utils import (
+    UNITS_MM,
+    to_um_magnitudes,
+)
+from ecoli.library.multiresolution_lattice import MultiResolutionField
+from ecoli.processes.environment.reaction_diffusion_field import (
+    ReactionDiffusion)
+
+
+NAME = 'adaptive_reaction_diffusion'
+
+
+class AdaptiveReactionDiffusion(ReactionDiffusion):
+    '''
+    :py:class:`ReactionDiffusion` with a refined patch around the agents.
+
+    The ``fields`` store holds the coarse lattice, so processes that read
+    or update it work as they do with :py:class:`ReactionDiffusion`.
+    Agents exchange with and sense the fine bins where they are in the
+    patch. The fine fields are kept by the process and emitted to the
+    ``patch`` port.
+
+    Parameters:
+        refinement (int): Number of fine bins along each side of a
+            coarse bin in the patch.
+        margin (int): Number of coarse bins kept between the agents and
+            the edge of the patch.
+    '''
+
+    name = NAME
+    defaults = {
+        **ReactionDiffusion.defaults,
+        'refinement': 4,
+        'margin': 2,
+    }
+
+    def __init__(self, parameters=None):
+        super().__init__(parameters)
+        self.field = None
+
+    def ports_schema(self):
+        schema = super().ports_schema()
+        schema['patch'] = {
+            'region': {
+                '_default': [],
+                '_updater': 'set',
+                '_emit': True},
+            'refinement': {
+                '_default': self.parameters['refinement'],
+                '_updater': 'set',
+                '_emit': True},
+            'fields': {
+                mol_id: {
+                    '_default': np.zeros((0, 0)),
+                    '_updater': 'set',
+                    '_emit': True}
+                for mol_id in self.molecule_ids}}
+        return schema
+
+    def next_update(self, timestep, states):
+        fields = states['fields']
+        agents = states['agents']
+        lattice = self.dimensions.update(states['dimensions'])
+        self.n_bins = lattice.n_bins
+        self.bounds = lattice.bounds
+        self.spatial_index.set_dimensions(self.n_bins, self.bounds)
+
+        # pick up changes made to the coarse fields by other processes
+        if self.field is None or self.field.n_bins != tuple(
+                self.n_bins) or self.field.bounds != tuple(self.bounds):
+            self.field = MultiResolutionField(
+                fields, self.bounds,
+                refinement=self.parameters['refinement'],
+                margin=self.parameters['margin'])
+        else:
+            self.field.set_coarse(fields)
+        field = self.field
+
+        locations = {
+            agent_id: to_um_magnitudes(get_in(specs, self.location_path))
+            for agent_id, specs in agents.items()}
+        self.spatial_index.sync(locations)
+        field.fit_region(list(locations.values()))
+
+        ###################
+        # apply exchanges #
+        ###################
+        agent_updates = {}
+        for agent_id, specs in agents.items():
+            exchanges = get_in(specs, self.exchanges_path)
+            reset_exchanges = {}
+            for mol_id, value in exchanges.items():
+                field.add_concentration(
+                    mol_id, locations[agent_id],
+                    value * lattice.count_concentration)
+                reset_exchanges[mol_id] = {
+                    '_value': -value,
+                    '_updater': 'accumulate'}
+            assoc_path(
+                agent_updates,
+                (agent_id,) + self.exchanges_path,
+                reset_exchanges)
+
+        #####################
+        # react and diffuse #
+        #####################
+        t = 0
+        while t < timestep:
+            field.apply(lambda state: self.react(state, timestep))
+            for mol_id in self.molecule_ids:
+                coarse = field.coarse[mol_id]
+                fine = field.fine.get(mol_id)
+                if coarse.min() != coarse.max() or (
+                        fine is not None and fine.min() != fine.max()):
+                    field.diffuse(
+                        mol_id, self.diffusion_rate,
+                        self.diffusion_dt_magnitude, timestep)
+            t += self.parameters['internal_time_step']
+
+        delta_fields = {
+            mol_id: field.coarse[mol_id] - state
+            for mol_id, state in fields.items()}
+
+        # get each agent's local environment at the finest resolution
+        local_environments = {}
+        for agent_id, location in locations.items():
+            assoc_path(
+                local_environments,
+                (agent_id,) + self.external_path,
+                {
+                    mol_id: {
+                        '_value': units.Quantity(
+                            field.get_concentration(mol_id, location),
+                            UNITS_MM),
+                        '_updater': 'set'}
+                    for mol_id in self.molecule_ids})
+        for agent_id, update in agent_updates.items():
+            local_environments.setdefault(agent_id, {})
+            assoc_path(
+                local_environments[agent_id], self.exchanges_path,
+                get_in(update, self.exchanges_path))
+
+        return {
+            'fields': delta_fields,
+            'agents': local_environments,
+            'patch': {
+                'region': list(field.region or []),
+                'fields': {
+                    mol_id: fine.copy()
+                    for mol_id, fine in field.fine.items()}}}
+
+
+def test_adaptive_reaction_diffusion():
+    n_bins = [20, 20]
+    bounds = [20 * units.um, 20 * units.um]
+    process = AdaptiveReactionDiffusion({
+        'molecules': ['beta-lactam', 'beta-lactamase'],
+        'n_bins': n_bins,
+        'bounds': bounds,
+        'depth': 2 * units.um,
+        'diffusion': 1 * units.um ** 2 / units.sec,
+        'refinement': 2,
+        'margin': 1,
+        'reactions': {
+            'antibiotic_hydrolysis': {
+                'stoichiometry': {'beta-lactam': -1},
+                'catalyzed by': 'beta-lactamase'}},
+        'kinetic_parameters': {
+            'antibiotic_hydrolysis': {
+                'beta-lactamase': {
+                    'kcat_f': 10.0,
+                    'beta-lactam': 0.1}}},
+    })
+    state = process.initial_state({'beta-lactam': 1.0})
+    state['agents'] = {'0': {'boundary': {
+        'location': [10.2 * units.um, 10.7 * units.um],
+        'exchanges': {'beta-lactamase': 1000},
+        'external': {'beta-lactam': 1.0, 'beta-lactamase': 0.0}}}}
+
+    update = process.next_update(1, state)
+    patch = update['patch']
+    assert patch['region'] == [9, 12, 9, 12]
+    assert patch['fields']['beta-lactamase'].shape == (6, 6)
+
+    # secreted enzyme is conserved through diffusion
+    fields = {
+        mol_id: state['fields'][mol_id] + delta
+        for mol_id, delta in update['fields'].items()}
+    count_concentration = process.dimensions.count_concentration
+    assert np.isclose(
+        fields['beta-lactamase'].sum(), 1000 * count_concentration)
+    assert np.isclose(
+        patch['fields']['beta-lactamase'].sum() / 4
+        + fields['beta-lactamase'].sum()
+        - fields['beta-lactamase'][9:12, 9:12].sum(),
+        1000 * count_concentration)
+
+    # the agent senses its fine bin, which is more concentrated than the
+    # coarse bin around it
+    external = update['agents']['0']['boundary']['external']
+    enzyme = external['beta-lactamase']['_value'].to(UNITS_MM).magnitude
+    assert enzyme > fields['beta-lactamase'][10, 10]
+    assert external['beta-lactam']['_value'].to(UNITS_MM).magnitude < 1.0
+    exchanges = update['agents']['0']['boundary']['exchanges']
+    assert exchanges['beta-lactamase']['_value'] == -1000
@@ -24,11 +24,16 @@ from vivarium.library.dict_utils import deep_merge
 
 from ecoli.library.lattice_utils import (
     get_bin_site,
-    get_bin_volume,
+    LatticeDimensions,
+    to_um_magnitudes,
+    UNITS_MM,
     make_gradient,
     apply_exchanges,
     ExchangeAgent,
     make_diffusion_schema,
+    shared_spatial_index,
+    SpatialIndex,
+    diffuse_active_tiles,
 )
 from ecoli.plots.snapshots import plot_snapshots
 
@@ -67,6 +72,16 @@ class DiffusionField(Process):
         'exchanges_path': ('boundary', 'exchanges'),
         'external_path': ('boundary', 'external'),
         'location_path': ('boundary', 'location'),
+        # SpatialIndex of agent bins to share with other processes
+        'spatial_index': None,
+        # 'full' diffuses the whole grid every step, 'active_tiles' only
+        # diffuses tiles where the field is not uniform
+        'diffusion_mode': 'full',
+        'active_tiles': {
+            'tile_size': 16,
+            'tolerance': 1e-9,  # mM change per diffusion step
+            'full_grid_fraction': 0.5,
+        },
     }
 
     def __init__(self, parameters=None):
@@ -92,16 +107,25 @@ class DiffusionField(Process):
         dx2 = dx * dy
         self.diffusion = diffusion / dx2
         self.diffusion_dt = 0.01 * units.sec
+        # unitless diffusion parameters for diffusion_delta
+        self.diffusion_rate = self.diffusion.to(1 / units.sec).magnitude
+        self.diffusion_dt_magnitude = self.diffusion_dt.to(units.sec).magnitude
         # self.diffusion_dt = 0.5 * dx ** 2 * dy ** 2 / (2 * self.diffusion * (dx ** 2 + dy ** 2))
 
-        # volume, to convert between counts and concentration
-        self.bin_volume = get_bin_volume(self.n_bins, self.bounds, depth)
+        # volume, to convert between counts and concentration, in L
+        self.dimensions = LatticeDimensions({
+            'n_bins': self.n_bins, 'bounds': self.bounds, 'depth': depth})
+        self.bin_volume = self.dimensions.bin_volume
+        self.spatial_index = shared_spatial_index(self.parameters)
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex(self.n_bins, self.bounds)
+        else:
+            self.spatial_index.set_dimensions(self.n_bins, self.bounds)
 
         # initialize gradient fields
         gradient = self.parameters['gradient']
         if gradient:
-            unitless_bounds = [
-                bound.to(units.um).magnitude for bound in self.bounds]
+            unitless_bounds = to_um_magnitudes(self.bounds)
             gradient_fields = make_gradient(
                 gradient, self.n_bins, unitless_bounds)
             self.initial.update(gradient_fields)
@@ -147,7 +171,8 @@ class DiffusionField(Process):
             self.location_path,
             self.n_bins,
             self.bounds,
-            self.bin_volume)
+            self.bin_volume,
+            spatial_index=self.spatial_index)
 
         # diffuse field
         new_fields = self.diffuse(new_fields, timestep)
@@ -171,12 +196,13 @@ class DiffusionField(Process):
     def get_bin_site(self, location):
         return get_bin_site(location, self.n_bins, self.bounds)
 
-    def get_single_local_environments(self, location, fields):
-        bin_site = self.get_bin_site(location)
+    def get_single_local_environments(self, location, fields, bin_site=None):
+        if bin_site is None:
+            bin_site = self.get_bin_site(location)
         local_environment = {}
         for mol_id, field in fields.items():
             local_environment[mol_id] = {
-                '_value': field[bin_site] * units.mM,
+                '_value': units.Quantity(field[bin_site], UNITS_MM),
                 '_updater': 'set'}
         return local_environment
 
@@ -190,6 +216,7 @@ class DiffusionField(Process):
                     self.get_single_local_environments(
                         get_in(specs, self.location_path),
                         fields,
+                        self.spatial_index.get_agent_bin(agent_id),
                     ),
                 )
         return local_environments
@@ -202,8 +229,13 @@ class DiffusionField(Process):
         ''' calculate concentration changes cause by diffusion'''
         field_new = field.copy()
         t = 0.0
-        dt = min(timestep, self.diffusion_dt.to(units.sec).magnitude)
-        diffusion = self.diffusion.to(1 / units.sec).magnitude
+        dt = min(timestep, self.diffusion_dt_magnitude)
+        diffusion = self.diffusion_rate
+        if self.parameters['diffusion_mode'] == 'active_tiles':
+            field_new = diffuse_active_tiles(
+                field, diffusion, dt, timestep,
+                **self.parameters['active_tiles'])
+            return field_new - field, field_new
         while t < timestep:
             field_new += diffusion * dt * convolve(field_new, LAPLACIAN_2D, mode='reflect')
             t += dt
@@ -215,7 +247,7 @@ class DiffusionField(Process):
         for mol_id, field in fields.items():
 
             # run diffusion if molecule field is not uniform
-            if len(set(field.flatten())) != 1:
+            if field.min() != field.max():
                 delta, new_field = self.diffusion_delta(field, timestep)
             else:
                 delta = np.zeros_like(field)
@@ -5,8 +5,9 @@ from vivarium.library.units import units
 
 from ecoli.library.lattice_utils import (
     get_bin_site,
-    get_bin_volume,
-    count_to_concentration,
+    LatticeDimensions,
+    shared_spatial_index,
+    to_um_magnitudes,
 )
 
 
@@ -18,11 +19,20 @@ class LocalField(Step):
         'bin_volume': 1e-6 * units.L,
         'n_bins': [1, 1],
         'bounds': [1, 1] * units.um,
+        # SpatialIndex shared with the environment processes, which this
+        # step keeps up to date with the agent's location
+        'spatial_index': None,
+        'agent_id': None,
     }
 
     def __init__(self, parameters=None):
         super().__init__(parameters)
+        if self.parameters['spatial_index'] is not None and \
+                self.parameters['agent_id'] is None:
+            raise ValueError(
+                'LocalField needs an agent_id to update a spatial_index.')
         self.bin_volume = self.parameters['bin_volume']
+        self.dimensions = LatticeDimensions()
 
     def initial_state(self, config=None):
         return {
@@ -62,24 +72,27 @@ class LocalField(Step):
 
     def next_update(self, timestep, states):
         location = states['location']
-        n_bins = states['dimensions']['n_bins']
-        bounds = states['dimensions']['bounds']
-        depth = states['dimensions']['depth']
+        lattice = self.dimensions.update(states['dimensions'])
+        n_bins = lattice.n_bins
+        bounds = lattice.bounds
         exchanges = states['exchanges']
 
-        # get bin volume
-        bin_site = get_bin_site(location, n_bins, bounds)
-        bin_volume = get_bin_volume(n_bins, bounds, depth)
+        # get bin site
+        spatial_index = shared_spatial_index(self.parameters)
+        if spatial_index is not None:
+            spatial_index.set_dimensions(n_bins, bounds)
+            bin_site = spatial_index.update(
+                self.parameters['agent_id'], to_um_magnitudes(location))
+        else:
+            bin_site = get_bin_site(location, n_bins, bounds)
 
         # apply exchanges
         delta_fields = {}
         reset_exchanges = {}
         for mol_id, value in exchanges.items():
 
-            # delta concentration
-            exchange = value * units.count
-            concentration = count_to_concentration(exchange, bin_volume).to(
-                units.mmol / units.L).magnitude
+            # delta concentration in mM
+            concentration = value * lattice.count_concentration
 
             delta_field = np.zeros((n_bins[0], n_bins[1]), dtype=np.float64)
             delta_field[bin_site[0], bin_site[1]] += concentration
@@ -120,6 +133,19 @@ def test_local_fields():
 
     output = local_fields_process.next_update(0, initial_state)
 
+    # a shared spatial index needs the ID of the agent to update
+    from ecoli.library.lattice_utils import SpatialIndex
+    spatial_index = SpatialIndex(n_bins, bounds)
+    try:
+        LocalField({'spatial_index': spatial_index})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('LocalField accepted an index without agent_id')
+    LocalField({'spatial_index': spatial_index, 'agent_id': '0'}).next_update(
+        0, initial_state)
+    assert spatial_index.agents_in_bin((0, 0)) == {'0'}
+
 
 if __name__ == '__main__':
     test_local_fields()
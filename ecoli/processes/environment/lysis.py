@@ -16,10 +16,13 @@ from ecoli.processes.environment.multibody_physics import PI
 from ecoli.processes.environment.local_field import LocalField
 from ecoli.library.lattice_utils import (
     get_bin_site,
-    get_bin_volume,
-    count_to_concentration,
+    LatticeDimensions,
+    shared_spatial_index,
+    SpatialIndex,
+    to_um_magnitudes,
 )
-from ecoli.library.schema import bulk_name_to_idx, counts, numpy_schema
+from ecoli.library.schema import (
+    bulk_name_to_idx, counts, numpy_schema, update_bulk_idx)
 
 
 
@@ -31,15 +34,26 @@ class Lysis(Step):
     defaults = {
         'secreted_molecules': [],
         'bin_volume': 1e-6 * units.L,
+        # SpatialIndex shared with the environment processes, from which
+        # lysed agents are removed
+        'spatial_index': None,
     }
 
     def __init__(self, parameters=None):
         super().__init__(parameters)
         self.agent_id = self.parameters['agent_id']
         self.bin_volume = self.parameters['bin_volume']
+        self.dimensions = LatticeDimensions()
 
         # Helper indices for Numpy indexing
         self.secreted_mol_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.secreted_mol_idx = {
+            mol_name: bulk_name_to_idx(mol_name, bulk_ids)
+            for mol_name in self.parameters['secreted_molecules']
+        }
 
     def ports_schema(self):
         fields_schema = {
@@ -75,21 +89,24 @@ class Lysis(Step):
         }
 
     def next_update(self, timestep, states):
-        if self.secreted_mol_idx is None:
-            self.secreted_mol_idx = {
-                mol_name: bulk_name_to_idx(mol_name, states['internal']['id'])
-                for mol_name in self.parameters['secreted_molecules']
-            }
+        update_bulk_idx(self, states['internal'])
 
         if states['trigger']:
             location = states['location']
-            n_bins = states['dimensions']['n_bins']
-            bounds = states['dimensions']['bounds']
-            depth = states['dimensions']['depth']
-
-            # get bin volume
-            bin_site = get_bin_site(location, n_bins, bounds)
-            bin_volume = get_bin_volume(n_bins, bounds, depth)
+            lattice = self.dimensions.update(states['dimensions'])
+            n_bins = lattice.n_bins
+            bounds = lattice.bounds
+
+            # get bin site
+            spatial_index = shared_spatial_index(self.parameters)
+            if spatial_index is not None:
+                spatial_index.set_dimensions(n_bins, bounds)
+                # the bin the index has for the agent, unless it moved
+                bin_site = spatial_index.update(
+                    self.agent_id, to_um_magnitudes(location))
+                spatial_index.remove(self.agent_id)
+            else:
+                bin_site = get_bin_site(location, n_bins, bounds)
 
             # apply internal states to fields
             internal = states['internal']
@@ -97,14 +114,11 @@ class Lysis(Step):
             for mol_id, mol_idx in self.secreted_mol_idx.items():
                 value = counts(internal, mol_idx)
 
-                # delta concentration
-                exchange = value
-                concentration = count_to_concentration(exchange, bin_volume).to(
-                    units.mM)
+                # delta concentration in mM
+                concentration = value * lattice.count_concentration
 
                 delta_field = np.zeros((n_bins[0], n_bins[1]), dtype=np.float64)
-                delta_field[bin_site[0], bin_site[1]] += concentration.to(
-                    units.mM).magnitude
+                delta_field[bin_site[0], bin_site[1]] += concentration
                 delta_fields[mol_id] = {
                     '_value': delta_field,
                     '_updater': 'accumulate'}
@@ -140,6 +154,10 @@ class ToyTransportBurst(Process):
 
         # Helper indices for Numpy arrays
         self.molecule_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(self.molecules, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -170,9 +188,7 @@ class ToyTransportBurst(Process):
         }
 
     def next_update(self, timestep, states):
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(self.molecules,
-                states['internal']['id'])
+        update_bulk_idx(self, states['internal'])
         added = np.zeros(len(self.molecules))
         exchanged = {}
         added_mass = 0.0 * units.fg
@@ -221,6 +237,7 @@ class LysisAgent(Composer):
             'burst_mass': 2000 * units.fg,
         },
         'local_field': {},
+        'spatial_index': None,
         'boundary_path': ('boundary',),
         'fields_path': ('..', '..', 'fields'),
         'dimensions_path': ('..', '..', 'dimensions',),
@@ -236,9 +253,14 @@ class LysisAgent(Composer):
         assert config['agent_id']
         lysis_config = {
             'agent_id': config['agent_id'],
+            'spatial_index': config['spatial_index'],
             **config['lysis']}
+        local_field_config = {
+            'agent_id': config['agent_id'],
+            'spatial_index': config['spatial_index'],
+            **config['local_field']}
         return {
-            'local_field': LocalField(config['local_field']),
+            'local_field': LocalField(local_field_config),
             'lysis': Lysis(lysis_config),
         }
 
@@ -292,8 +314,11 @@ def test_lysis(
 ):
     from ecoli.composites.environment.lattice import Lattice
 
+    # agent bins shared by the environment and the agents' steps
+    spatial_index = SpatialIndex(n_bins, bounds)
     lattice_composer = Lattice({
         'reaction_diffusion': {
+            'spatial_index': spatial_index,
             'molecules': [molecule_name],
             'bounds': bounds,
             'n_bins': n_bins,
@@ -313,6 +338,7 @@ def test_lysis(
 
     # configure the agent composer
     agent_composer = LysisAgent({
+        'spatial_index': spatial_index,
         'lysis': {
             'secreted_molecules': [molecule_name]
         },
@@ -362,6 +388,10 @@ def test_lysis(
     sim.update(total_time)
     data = sim.emitter.get_data_unitless()
 
+    # the shared index only holds the agents that have not lysed
+    assert set(spatial_index.agent_bins) <= set(sim.state.get_value()[
+        'agents'])
+
     if return_data:
         return data
 
@@ -26,6 +26,8 @@ from vivarium.core.composition import (
 # vivarium-cell imports
 from ecoli.processes.environment.derive_globals import volume_from_length
 from ecoli.library.pymunk_multibody import PymunkMultibody
+from ecoli.library.lattice_utils import (
+    magnitude_in, magnitudes_in, shared_spatial_index)
 from ecoli.plots.snapshots import (
     plot_snapshots,
     format_snapshot_data,
@@ -97,6 +99,11 @@ class Multibody(Process):
           micrometers, with ``[x, y]``.
         * **mother_machine** (:py:class:`bool`): if set to ``True``, mother
           machine barriers are introduced.
+        * **physics_backend** (:py:class:`str`): ``default`` applies forces
+          to each body in Python every physics substep, ``batched``
+          precomputes them as arrays for all bodies and substeps.
+        * **adaptive_dt** (:py:class:`bool`): with the ``batched`` backend,
+          take longer physics steps while no bodies are in contact.
         * ***animate*** (:py:class:`bool`): interactive matplotlib option to
           animate multibody. To run with animation turned on set True, and use
           the TKAgg matplotlib backend:
@@ -122,8 +129,13 @@ class Multibody(Process):
         'velocity_unit': DEFAULT_VELOCITY_UNIT,
         'boundary_key': 'boundary',
         'mother_machine': False,
+        'physics_backend': 'default',
+        'adaptive_dt': False,
         'animate': False,
         'seed': 0,
+        # SpatialIndex of agent bins shared with the environment, used
+        # to find the agents above the channels of a mother machine
+        'spatial_index': None,
     }
 
     def __init__(self, parameters=None):
@@ -134,6 +146,7 @@ class Multibody(Process):
         self.agent_shape = self.parameters['agent_shape']
         self.bounds = self.parameters['bounds']
         self.mother_machine = self.parameters['mother_machine']
+        self.spatial_index = shared_spatial_index(self.parameters)
 
         # units
         self.length_unit = self.parameters['length_unit']
@@ -151,6 +164,8 @@ class Multibody(Process):
             'bounds': remove_units(self.bounds),
             'barriers': self.mother_machine,
             'physics_dt': self.parameters['timestep'] / 10,
+            'physics_backend': self.parameters['physics_backend'],
+            'adaptive_dt': self.parameters['adaptive_dt'],
             'seed': self.parameters['seed']
         }
         self.physics = PymunkMultibody(multibody_config)
@@ -210,10 +225,9 @@ class Multibody(Process):
         return schema
 
     def next_update(self, timestep, states):
-        agents = states['agents']
+        agents = self.get_unitless_boundaries(states['agents'])
 
         # animate before update
-        agents = remove_units(agents)
         if self.animate:
             self.animate_frame(agents)
 
@@ -227,30 +241,68 @@ class Multibody(Process):
         agent_positions = self.physics.get_body_positions()
         update = {'agents': agent_positions}
 
+        for agent in update['agents'].values():
+            agent['boundary']['location'] = units.Quantity(
+                np.array(agent['boundary']['location']), self.length_unit)
+
         # for mother machine configurations, remove agents above the channel height
         if self.mother_machine:
-            channel_height = self.mother_machine['channel_height']
-            delete_agents = []
-            for agent_id, position in agent_positions.items():
-                location = position['boundary']['location']
-                y_loc = location[1]
-                if y_loc > channel_height:
-                    # cell has moved past the channels
-                    delete_agents.append(agent_id)
+            delete_agents = self.agents_above(
+                agent_positions, self.mother_machine['channel_height'])
             if delete_agents:
-                update['agents'] = {
-                    agent_id: position
-                    for agent_id, position in agent_positions.items()
-                    if agent_id not in delete_agents}
-
-                update['agents']['_delete'] = [
-                    agent_id for agent_id in delete_agents]
-
-        for agent in update['agents'].values():
-            agent['boundary']['location'] *= units.um
+                for agent_id in delete_agents:
+                    del update['agents'][agent_id]
+                update['agents']['_delete'] = delete_agents
 
         return update
 
+    def agents_above(self, agent_positions, height):
+        """Get the IDs of the agents located above a height, in the
+        length unit. With a spatial index, only the agents in bins that
+        reach above the height are checked."""
+        candidates = agent_positions
+        if self.spatial_index is not None:
+            um_per_length = (1 * self.length_unit).to(units.um).magnitude
+            self.spatial_index.sync({
+                agent_id: [
+                    coordinate * um_per_length for coordinate in
+                    position['boundary']['location'].magnitude]
+                for agent_id, position in agent_positions.items()})
+            bin_height = self.spatial_index.bin_size[1] / um_per_length
+            candidates = [
+                agent_id
+                for bin_site in self.spatial_index.bins_touched()
+                if (bin_site[1] + 1) * bin_height > height
+                for agent_id in self.spatial_index.agents_in_bin(bin_site)]
+        return sorted(
+            agent_id for agent_id in candidates
+            if magnitude_in(
+                agent_positions[agent_id]['boundary']['location'][1],
+                self.length_unit) > height)
+
+    def get_unitless_boundaries(self, agents):
+        """Get the agent boundaries as magnitudes in the length and
+        mass units of the physics engine, for the keys it uses."""
+        boundary_key = self.parameters['boundary_key']
+        boundaries = {}
+        for agent_id, agent in agents.items():
+            boundary = agent[boundary_key]
+            boundaries[agent_id] = {
+                'boundary': {
+                    'location': magnitudes_in(
+                        boundary['location'], self.length_unit),
+                    'angle': boundary['angle'],
+                    'length': magnitude_in(
+                        boundary['length'], self.length_unit),
+                    'width': magnitude_in(
+                        boundary['width'], self.length_unit),
+                    'mass': magnitude_in(boundary['mass'], self.mass_unit),
+                    'thrust': boundary['thrust'],
+                    'torque': boundary['torque'],
+                }
+            }
+        return boundaries
+
     ## matplotlib interactive plot
     def animate_frame(self, agents):
         plt.cla()
@@ -515,6 +567,24 @@ def test_daughter_locations():
     assert locations == [[1.5, 2.5], [2.5, 1.5]]
 
 
+def test_agents_above():
+    from ecoli.library.lattice_utils import SpatialIndex
+
+    bounds = [20, 20] * units.um
+    positions = {
+        agent_id: {'boundary': {
+            'location': units.Quantity(np.array(location), units.um)}}
+        for agent_id, location in {
+            '0': [1, 2], '1': [15, 11], '2': [5, 10.5], '3': [7, 19]}.items()}
+    spatial_index = SpatialIndex([4, 4], bounds)
+    above = Multibody({
+        'bounds': bounds, 'spatial_index': spatial_index}).agents_above(
+            positions, 10.6)
+    assert above == Multibody({'bounds': bounds}).agents_above(
+        positions, 10.6) == ['1', '3']
+    assert spatial_index.agents_in_bin((1, 2)) == {'2'}
+
+
 def main():
     out_dir = os.path.join(PROCESS_OUT_DIR, NAME)
     if not os.path.exists(out_dir):
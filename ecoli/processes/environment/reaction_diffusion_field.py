@@ -18,11 +18,16 @@ from vivarium.library.dict_utils import deep_merge
 
 from ecoli.library.lattice_utils import (
     get_bin_site,
-    get_bin_volume,
+    LatticeDimensions,
+    to_um_magnitudes,
+    UNITS_MM,
     apply_exchanges,
     ExchangeAgent,
     make_gradient,
     make_diffusion_schema,
+    shared_spatial_index,
+    SpatialIndex,
+    diffuse_active_tiles,
 )
 from vivarium.library.topology import get_in
 from ecoli.plots.snapshots import plot_snapshots
@@ -57,6 +62,16 @@ class ReactionDiffusion(Process):
         'exchanges_path': ('boundary', 'exchanges'),
         'external_path': ('boundary', 'external'),
         'location_path': ('boundary', 'location'),
+        # SpatialIndex of agent bins to share with other processes
+        'spatial_index': None,
+        # 'full' diffuses the whole grid every step, 'active_tiles' only
+        # diffuses tiles where the field is not uniform
+        'diffusion_mode': 'full',
+        'active_tiles': {
+            'tile_size': 16,
+            'tolerance': 1e-9,  # mM change per diffusion step
+            'full_grid_fraction': 0.5,
+        },
 
         # these parameters are not in diffusion_field
         'reactions': {},
@@ -78,7 +93,15 @@ class ReactionDiffusion(Process):
         self.n_bins = self.parameters['n_bins']
         self.bounds = self.parameters['bounds']
         depth = self.parameters['depth']
-        self.bin_volume = get_bin_volume(self.n_bins, self.bounds, depth)
+        # dimensions as magnitudes in um and L, converted once
+        self.dimensions = LatticeDimensions({
+            'n_bins': self.n_bins, 'bounds': self.bounds, 'depth': depth})
+        self.bin_volume = self.dimensions.bin_volume
+        self.spatial_index = shared_spatial_index(self.parameters)
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex(self.n_bins, self.bounds)
+        else:
+            self.spatial_index.set_dimensions(self.n_bins, self.bounds)
 
         # diffusion
         diffusion = self.parameters['diffusion']
@@ -91,6 +114,9 @@ class ReactionDiffusion(Process):
         dx2 = dx * dy
         self.diffusion = diffusion / dx2
         self.diffusion_dt = 0.01 * units.sec
+        # unitless diffusion parameters for diffusion_delta
+        self.diffusion_rate = self.diffusion.to(1 / units.sec).magnitude
+        self.diffusion_dt_magnitude = self.diffusion_dt.to(units.sec).magnitude
         # self.diffusion_dt = 0.5 * dx ** 2 * dy ** 2 / (2 * self.diffusion * (dx ** 2 + dy ** 2))
         self.exchanges_path = tuple(self.parameters['exchanges_path'])
         self.external_path = tuple(self.parameters['external_path'])
@@ -157,8 +183,7 @@ class ReactionDiffusion(Process):
         gradient = self.parameters.get('gradient')
         if gradient:
             gradient_molecules = list(gradient['molecules'].keys())
-            unitless_bounds = [
-                bound.to(units.um).magnitude for bound in self.bounds]
+            unitless_bounds = to_um_magnitudes(self.bounds)
             gradient_fields = make_gradient(
                 gradient, self.n_bins, unitless_bounds)
             initial['fields'].update(gradient_fields)
@@ -188,12 +213,11 @@ class ReactionDiffusion(Process):
         dimensions = states['dimensions']
 
         # volume, to convert between counts and concentration
-        self.n_bins = dimensions['n_bins']
-        self.bounds = dimensions['bounds']
-        self.bin_volume = get_bin_volume(
-            self.n_bins,
-            self.bounds,
-            dimensions['depth'])
+        lattice = self.dimensions.update(dimensions)
+        self.n_bins = lattice.n_bins
+        self.bounds = lattice.bounds
+        self.bin_volume = lattice.bin_volume
+        self.spatial_index.set_dimensions(self.n_bins, self.bounds)
 
         # make new fields for the updated state
         new_fields = copy.deepcopy(fields)
@@ -208,7 +232,8 @@ class ReactionDiffusion(Process):
             self.location_path,
             self.n_bins,
             self.bounds,
-            self.bin_volume)
+            self.bin_volume,
+            spatial_index=self.spatial_index)
 
         #####################
         # react and diffuse #
@@ -238,12 +263,13 @@ class ReactionDiffusion(Process):
     def get_bin_site(self, location):
         return get_bin_site(location, self.n_bins, self.bounds)
 
-    def get_single_local_environments(self, location, fields):
-        bin_site = self.get_bin_site(location)
+    def get_single_local_environments(self, location, fields, bin_site=None):
+        if bin_site is None:
+            bin_site = self.get_bin_site(location)
         local_environment = {}
         for mol_id, field in fields.items():
             local_environment[mol_id] = {
-                '_value': field[bin_site] * units.mM,
+                '_value': units.Quantity(field[bin_site], UNITS_MM),
                 '_updater': 'set'}
         return local_environment
 
@@ -257,6 +283,7 @@ class ReactionDiffusion(Process):
                     self.get_single_local_environments(
                         get_in(specs, self.location_path),
                         fields,
+                        self.spatial_index.get_agent_bin(agent_id),
                     ),
                 )
         return local_environments
@@ -271,8 +298,12 @@ class ReactionDiffusion(Process):
         '''calculate new concentrations resulting from diffusion'''
         field_new = field.copy()
         t = 0.0
-        dt = min(timestep, self.diffusion_dt.to(units.sec).magnitude)
-        diffusion = self.diffusion.to(1 / units.sec).magnitude
+        dt = min(timestep, self.diffusion_dt_magnitude)
+        diffusion = self.diffusion_rate
+        if self.parameters['diffusion_mode'] == 'active_tiles':
+            return diffuse_active_tiles(
+                field, diffusion, dt, timestep,
+                **self.parameters['active_tiles'])
         while t < timestep:
             field_new += diffusion * dt * convolve(field_new, LAPLACIAN_2D, mode='reflect')
             t += dt
@@ -283,7 +314,7 @@ class ReactionDiffusion(Process):
         for mol_id, field in fields.items():
 
             # run diffusion if molecule field is not uniform
-            if len(set(field.flatten())) != 1:
+            if field.min() != field.max():
                 new_field = self.diffusion_delta(field, timestep)
             else:
                 new_field = field
@@ -313,16 +344,23 @@ class ReactionDiffusion(Process):
 
                 if np.sum(catalyst_field) > 0.0 and np.sum(substrate_field) > 0.0:
 
+                    # with active tiles, only react where there is catalyst
+                    sites = slice(None)
+                    if self.parameters['diffusion_mode'] == 'active_tiles':
+                        sites = np.nonzero(catalyst_field)
+                    catalyst = catalyst_field[sites]
+                    substrate = substrate_field[sites]
+
                     # calculate flux and delta
-                    flux = kcat * catalyst_field * substrate_field
+                    flux = kcat * catalyst * substrate
                     # add km term if declared
                     if substrate_km:
-                        denominator = substrate_field + substrate_km
+                        denominator = substrate + substrate_km
                         flux /= denominator
                     delta = stoich[substrate_id] * flux * timestep
 
                     # updates
-                    new_fields[substrate_id] += delta
+                    new_fields[substrate_id][sites] += delta
 
         return new_fields
 
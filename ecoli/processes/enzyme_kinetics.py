@@ -7,7 +7,8 @@ import numpy as np
 from vivarium.core.process import Process
 from vivarium.core.composition import simulate_process
 from ecoli.library.kinetic_rate_laws import KineticFluxModel
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 
 
 NAME = 'enzyme_kinetics'
@@ -93,6 +94,10 @@ class EnzymeKinetics(Process):
         self.molecules_ids = [mol_id[1] for mol_id in self.kinetic_rate_laws.molecule_ids]
 
         self.molecules_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecules_idx = bulk_name_to_idx(self.molecules_ids, bulk_ids)
 
     # def initial_state(self, config):
     #     # TODO (Cyrus) - test if this works
@@ -115,9 +120,7 @@ class EnzymeKinetics(Process):
         return schema
 
     def next_update(self, timestep, states):
-        if self.molecules_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.molecules_idx = bulk_name_to_idx(self.molecules_ids, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # TODO (Cyrus) -- convert molecules to concentrations
         molecule_counts = counts(states['bulk'], self.molecules_idx)
@@ -11,7 +11,7 @@ that maintains equilibrium.
 import numpy as np
 
 from ecoli.library.schema import (
-    numpy_schema, bulk_name_to_idx, counts, listener_schema)
+    numpy_schema, bulk_name_to_idx, counts, listener_schema, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.partition import PartitionedProcess
 
@@ -81,6 +81,11 @@ class Equilibrium(PartitionedProcess):
 
         self.complex_ids = self.parameters['complex_ids']
         self.reaction_ids = self.parameters['reaction_ids']
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(
+            self.moleculeNames, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -95,10 +100,7 @@ class Equilibrium(PartitionedProcess):
         }
 
     def calculate_request(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(
-                self.moleculeNames, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
 
         # Get molecule counts
         moleculeCounts = counts(states['bulk'], self.molecule_idx)
@@ -11,7 +11,8 @@ from numpy.lib import recfunctions as rfn
 
 from vivarium.core.process import Deriver
 from vivarium.library.units import units as viv_units
-from ecoli.library.schema import numpy_schema, counts, attrs, bulk_name_to_idx
+from ecoli.library.schema import (
+    numpy_schema, counts, attrs, bulk_name_to_idx, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 from wholecell.utils import units
 
@@ -134,6 +135,12 @@ class MassListener(Deriver):
 
         # Enable flag for perfect recapitulation of wcEcoli mass calculations
         self.match_wcecoli = self.parameters['match_wcecoli']
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.bulk_idx = bulk_name_to_idx(self.bulk_ids, bulk_ids)
+        if self.match_wcecoli:
+            self.bulk_addon = np.zeros((len(self.bulk_idx), 16))
 
     def ports_schema(self):
         split_divider_schema = {
@@ -208,11 +215,7 @@ class MassListener(Deriver):
         return (states['global_time'] % states['timestep']) == 0
 
     def next_update(self, timestep, states):
-        if self.bulk_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.bulk_idx = bulk_name_to_idx(self.bulk_ids, bulk_ids)
-            if self.match_wcecoli:
-                self.bulk_addon = np.zeros((len(self.bulk_idx), 16))
+        update_bulk_idx(self, states['bulk'])
 
         mass_update = {}
 
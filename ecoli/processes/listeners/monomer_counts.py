@@ -5,7 +5,8 @@ Monomer Counts Listener
 """
 
 import numpy as np
-from ecoli.library.schema import numpy_schema, counts, bulk_name_to_idx
+from ecoli.library.schema import (
+    numpy_schema, counts, bulk_name_to_idx, update_bulk_idx)
 from vivarium.core.process import Step
 
 from ecoli.processes.registries import topology_registry
@@ -111,6 +112,30 @@ class MonomerCounts(Step):
 
         # Helper indices for Numpy indexing
         self.monomer_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.bulk_molecule_idx = bulk_name_to_idx(
+            self.bulk_molecule_ids, bulk_ids)
+        self.monomer_idx = bulk_name_to_idx(self.monomer_ids, bulk_ids)
+        self.complexation_molecule_idx = bulk_name_to_idx(
+            self.complexation_molecule_ids, bulk_ids)
+        self.complexation_complex_idx = bulk_name_to_idx(
+            self.complexation_complex_ids, bulk_ids)
+        self.equilibrium_molecule_idx = bulk_name_to_idx(
+            self.equilibrium_molecule_ids, bulk_ids)
+        self.equilibrium_complex_idx = bulk_name_to_idx(
+            self.equilibrium_complex_ids, bulk_ids)
+        self.two_component_system_molecule_idx = bulk_name_to_idx(
+            self.two_component_system_molecule_ids, bulk_ids)
+        self.two_component_system_complex_idx = bulk_name_to_idx(
+            self.two_component_system_complex_ids, bulk_ids)
+        self.ribosome_subunit_idx = bulk_name_to_idx(
+            self.ribosome_subunit_ids, bulk_ids)
+        self.rnap_subunit_idx = bulk_name_to_idx(
+            self.rnap_subunit_ids, bulk_ids)
+        self.replisome_subunit_idx = bulk_name_to_idx(
+            self.replisome_subunit_ids, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -138,29 +163,7 @@ class MonomerCounts(Step):
         return (states['global_time'] % states['timestep']) == 0
 
     def next_update(self, timestep, states):
-        if self.monomer_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.bulk_molecule_idx = bulk_name_to_idx(
-                self.bulk_molecule_ids, bulk_ids)
-            self.monomer_idx = bulk_name_to_idx(self.monomer_ids, bulk_ids)
-            self.complexation_molecule_idx = bulk_name_to_idx(
-                self.complexation_molecule_ids, bulk_ids)
-            self.complexation_complex_idx = bulk_name_to_idx(
-                self.complexation_complex_ids, bulk_ids)
-            self.equilibrium_molecule_idx = bulk_name_to_idx(
-                self.equilibrium_molecule_ids, bulk_ids)
-            self.equilibrium_complex_idx = bulk_name_to_idx(
-                self.equilibrium_complex_ids, bulk_ids)
-            self.two_component_system_molecule_idx = bulk_name_to_idx(
-                self.two_component_system_molecule_ids, bulk_ids)
-            self.two_component_system_complex_idx = bulk_name_to_idx(
-                self.two_component_system_complex_ids, bulk_ids)
-            self.ribosome_subunit_idx = bulk_name_to_idx(
-                self.ribosome_subunit_ids, bulk_ids)
-            self.rnap_subunit_idx = bulk_name_to_idx(
-                self.rnap_subunit_ids, bulk_ids)
-            self.replisome_subunit_idx = bulk_name_to_idx(
-                self.replisome_subunit_ids, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # Get current counts of bulk and unique molecules
         bulkMoleculeCounts = counts(states['bulk'], self.bulk_molecule_idx)
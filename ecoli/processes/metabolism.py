@@ -22,7 +22,7 @@ from vivarium.library.units import units as vivunits
 
 from ecoli.processes.registries import topology_registry
 from ecoli.library.schema import (
-    numpy_schema, bulk_name_to_idx, counts, listener_schema)
+    numpy_schema, bulk_name_to_idx, counts, listener_schema, update_bulk_idx)
 from wholecell.utils import units
 from wholecell.utils.random import stochasticRound
 from wholecell.utils.modular_fba import FluxBalanceAnalysis
@@ -203,6 +203,18 @@ class Metabolism(Step):
         self.reaction_mapping_matrix = csr_matrix(
             (v, (base_rxn_indexes, fba_rxn_indexes)),
             shape=shape)
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.metabolite_idx = bulk_name_to_idx(
+            self.model.metaboliteNamesFromNutrients, bulk_ids)
+        self.catalyst_idx = bulk_name_to_idx(
+            self.model.catalyst_ids, bulk_ids)
+        self.kinetics_enzymes_idx = bulk_name_to_idx(
+            self.model.kinetic_constraint_enzymes, bulk_ids)
+        self.kinetics_substrates_idx = bulk_name_to_idx(
+            self.model.kinetic_constraint_substrates, bulk_ids)
+        self.aa_idx = bulk_name_to_idx(self.aa_names, bulk_ids)
 
 
     def __getstate__(self):
@@ -354,17 +366,7 @@ class Metabolism(Step):
         return (states['global_time'] % states['timestep']) == 0
 
     def next_update(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.metabolite_idx is None:
-            self.metabolite_idx = bulk_name_to_idx(
-                self.model.metaboliteNamesFromNutrients, states['bulk']['id'])
-            self.catalyst_idx = bulk_name_to_idx(
-                self.model.catalyst_ids, states['bulk']['id'])
-            self.kinetics_enzymes_idx = bulk_name_to_idx(
-                self.model.kinetic_constraint_enzymes, states['bulk']['id'])
-            self.kinetics_substrates_idx = bulk_name_to_idx(
-                self.model.kinetic_constraint_substrates, states['bulk']['id'])
-            self.aa_idx = bulk_name_to_idx(self.aa_names, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
 
         if states['first_update']:
             return {'first_update': False}
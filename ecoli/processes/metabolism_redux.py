@@ -12,7 +12,7 @@ from vivarium.core.process import Step
 from vivarium.library.units import units as vivunits
 
 from ecoli.library.schema import (numpy_schema, bulk_name_to_idx,
-    listener_schema, counts)
+    listener_schema, counts, update_bulk_idx)
 
 from wholecell.utils import units
 
@@ -301,6 +301,17 @@ class MetabolismRedux(Step):
         self.reaction_mapping_matrix = csr_matrix(
             (v, (base_rxn_indexes, fba_rxn_indexes)),
             shape=shape)
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.homeostatic_metabolite_idx = bulk_name_to_idx(
+            self.homeostatic_metabolites, bulk_ids)
+        self.catalyst_idx = bulk_name_to_idx(self.catalyst_ids, bulk_ids)
+        self.kinetics_enzymes_idx = bulk_name_to_idx(
+            self.kinetic_constraint_enzymes, bulk_ids)
+        self.kinetics_substrates_idx = bulk_name_to_idx(
+            self.kinetic_constraint_substrates, bulk_ids)
+        self.aa_idx = bulk_name_to_idx(self.aa_names, bulk_ids)
 
     def ports_schema(self):
 
@@ -398,16 +409,7 @@ class MetabolismRedux(Step):
             return {'first_update': False}
 
         # Initialize indices
-        if self.homeostatic_metabolite_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.homeostatic_metabolite_idx = bulk_name_to_idx(
-                self.homeostatic_metabolites, bulk_ids)
-            self.catalyst_idx = bulk_name_to_idx(self.catalyst_ids, bulk_ids)
-            self.kinetics_enzymes_idx = bulk_name_to_idx(
-                self.kinetic_constraint_enzymes, bulk_ids)
-            self.kinetics_substrates_idx = bulk_name_to_idx(
-                self.kinetic_constraint_substrates, bulk_ids)
-            self.aa_idx = bulk_name_to_idx(self.aa_names, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         unconstrained = states['environment']['exchange_data']['unconstrained']
         constrained = states['environment']['exchange_data']['constrained']
@@ -10,7 +10,7 @@ from vivarium.core.process import Step
 from vivarium.library.units import units as vivunits
 
 from ecoli.library.schema import (numpy_schema, bulk_name_to_idx,
-    listener_schema, counts)
+    listener_schema, counts, update_bulk_idx)
 
 from wholecell.utils import units
 
@@ -152,6 +152,13 @@ class MetabolismReduxClassic(Step):
 
         # Cache uptake parameters from previous timestep
         self.allowed_exchange_uptake = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.homeostatic_metabolite_idx = bulk_name_to_idx(self.homeostatic_metabolites, bulk_ids)
+        self.catalyst_idx = bulk_name_to_idx(self.catalyst_ids, bulk_ids)
+        self.kinetics_enzymes_idx = bulk_name_to_idx(self.kinetic_constraint_enzymes, bulk_ids)
+        self.kinetics_substrates_idx = bulk_name_to_idx(self.kinetic_constraint_substrates, bulk_ids)
 
     def ports_schema(self):
 
@@ -245,12 +252,7 @@ class MetabolismReduxClassic(Step):
             return {'first_update': False}
 
         # Initialize indices
-        if self.homeostatic_metabolite_idx is None:
-            self.bulk_ids = states['bulk']['id']
-            self.homeostatic_metabolite_idx = bulk_name_to_idx(self.homeostatic_metabolites, self.bulk_ids)
-            self.catalyst_idx = bulk_name_to_idx(self.catalyst_ids, self.bulk_ids)
-            self.kinetics_enzymes_idx = bulk_name_to_idx(self.kinetic_constraint_enzymes, self.bulk_ids)
-            self.kinetics_substrates_idx = bulk_name_to_idx(self.kinetic_constraint_substrates, self.bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # metabolites not in either set are constrained to zero uptake.
         exchange_data = states['environment']['exchange_data']
@@ -26,7 +26,7 @@ from vivarium.plots.simulation_output import plot_variables
 
 # vivarium-ecoli imports
 from ecoli.library.schema import (listener_schema, numpy_schema, counts, attrs,
-    bulk_name_to_idx)
+    bulk_name_to_idx, update_bulk_idx)
 from ecoli.models.polypeptide_elongation_models import (BaseElongationModel,
     TranslationSupplyElongationModel, SteadyStateElongationModel,
     MICROMOLAR_UNITS)
@@ -243,6 +243,35 @@ class PolypeptideElongation(PartitionedProcess):
 
         self.zero_aa_exchange_rates = MICROMOLAR_UNITS / units.s * np.zeros(
             len(self.amino_acids))
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.proton_idx = bulk_name_to_idx(self.proton, bulk_ids)
+        self.water_idx = bulk_name_to_idx(self.water, bulk_ids)
+        self.rela_idx = bulk_name_to_idx(self.rela, bulk_ids)
+        self.spot_idx = bulk_name_to_idx(self.spot, bulk_ids)
+        self.ppgpp_idx = bulk_name_to_idx(self.ppgpp, bulk_ids)
+        self.monomer_idx = bulk_name_to_idx(self.proteinIds, bulk_ids)
+        self.amino_acid_idx = bulk_name_to_idx(self.amino_acids, bulk_ids)
+        self.aa_enzyme_idx = bulk_name_to_idx(self.aa_enzymes, bulk_ids)
+        self.ppgpp_rxn_metabolites_idx = bulk_name_to_idx(
+            self.ppgpp_reaction_metabolites, bulk_ids)
+        self.uncharged_trna_idx = bulk_name_to_idx(
+            self.uncharged_trna_names, bulk_ids)
+        self.charged_trna_idx = bulk_name_to_idx(
+            self.charged_trna_names, bulk_ids)
+        self.charging_molecule_idx = bulk_name_to_idx(
+            self.charging_molecule_names, bulk_ids)
+        self.synthetase_idx = bulk_name_to_idx(
+            self.synthetase_names, bulk_ids)
+        self.ribosome30S_idx = bulk_name_to_idx(
+            self.ribosome30S, bulk_ids)
+        self.ribosome50S_idx = bulk_name_to_idx(
+            self.ribosome50S, bulk_ids)
+        self.aa_importer_idx = bulk_name_to_idx(
+            self.aa_importers, bulk_ids)
+        self.aa_exporter_idx = bulk_name_to_idx(
+            self.aa_exporters, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -383,34 +412,7 @@ class PolypeptideElongation(PartitionedProcess):
         elongation rate.
         """
 
-        if self.proton_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.proton_idx = bulk_name_to_idx(self.proton, bulk_ids)
-            self.water_idx = bulk_name_to_idx(self.water, bulk_ids)
-            self.rela_idx = bulk_name_to_idx(self.rela, bulk_ids)
-            self.spot_idx = bulk_name_to_idx(self.spot, bulk_ids)
-            self.ppgpp_idx = bulk_name_to_idx(self.ppgpp, bulk_ids)
-            self.monomer_idx = bulk_name_to_idx(self.proteinIds, bulk_ids)
-            self.amino_acid_idx = bulk_name_to_idx(self.amino_acids, bulk_ids)
-            self.aa_enzyme_idx = bulk_name_to_idx(self.aa_enzymes, bulk_ids)
-            self.ppgpp_rxn_metabolites_idx = bulk_name_to_idx(
-                self.ppgpp_reaction_metabolites, bulk_ids)
-            self.uncharged_trna_idx = bulk_name_to_idx(
-                self.uncharged_trna_names, bulk_ids)
-            self.charged_trna_idx = bulk_name_to_idx(
-                self.charged_trna_names, bulk_ids)
-            self.charging_molecule_idx = bulk_name_to_idx(
-                self.charging_molecule_names, bulk_ids)
-            self.synthetase_idx = bulk_name_to_idx(
-                self.synthetase_names, bulk_ids)
-            self.ribosome30S_idx = bulk_name_to_idx(
-                self.ribosome30S, bulk_ids)
-            self.ribosome50S_idx = bulk_name_to_idx(
-                self.ribosome50S, bulk_ids)
-            self.aa_importer_idx = bulk_name_to_idx(
-                self.aa_importers, bulk_ids)
-            self.aa_exporter_idx = bulk_name_to_idx(
-                self.aa_exporters, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # MODEL SPECIFIC: get ribosome elongation rate
         self.ribosomeElongationRate = self.elongation_model.elongation_rate(states)
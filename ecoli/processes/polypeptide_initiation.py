@@ -15,7 +15,7 @@ import numpy as np
 
 from vivarium.core.composition import simulate_process
 from ecoli.library.schema import (create_unique_indexes, numpy_schema, attrs,
-    counts, bulk_name_to_idx, listener_schema)
+    counts, bulk_name_to_idx, listener_schema, update_bulk_idx)
 
 from wholecell.utils import units
 from wholecell.utils.fitting import normalize
@@ -116,6 +116,11 @@ class PolypeptideInitiation(PartitionedProcess):
         
         # Helper indices for Numpy indexing
         self.ribosome30S_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.ribosome30S_idx = bulk_name_to_idx(self.ribosome30S, bulk_ids)
+        self.ribosome50S_idx = bulk_name_to_idx(self.ribosome50S, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -145,10 +150,7 @@ class PolypeptideInitiation(PartitionedProcess):
         }
 
     def calculate_request(self, timestep, states):
-        if self.ribosome30S_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.ribosome30S_idx = bulk_name_to_idx(self.ribosome30S, bulk_ids)
-            self.ribosome50S_idx = bulk_name_to_idx(self.ribosome50S, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         current_media_id = states['environment']['media_id']
 
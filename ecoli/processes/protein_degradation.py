@@ -16,7 +16,8 @@ from vivarium.core.composition import simulate_process
 
 from ecoli.library.data_predicates import (
     monotonically_increasing, monotonically_decreasing, all_nonnegative)
-from ecoli.library.schema import numpy_schema, counts, bulk_name_to_idx
+from ecoli.library.schema import (
+    numpy_schema, counts, bulk_name_to_idx, update_bulk_idx)
 
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.partition import PartitionedProcess
@@ -78,19 +79,21 @@ class ProteinDegradation(PartitionedProcess):
         # Assuming N-1 H2O is required per peptide chain length N
         self.degradation_matrix[self.water_index, :] = -(np.sum(
             self.degradation_matrix[self.amino_acid_indexes, :], axis=0) - 1)
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.water_idx = bulk_name_to_idx(self.water_id, bulk_ids)
+        self.protein_idx = bulk_name_to_idx(
+            self.protein_ids, bulk_ids)
+        self.metabolite_idx = bulk_name_to_idx(
+            self.metabolite_ids, bulk_ids)
 
     def ports_schema(self):
         return {'bulk': numpy_schema('bulk'),
                 'timestep': {'_default': self.parameters['time_step']}}
 
     def calculate_request(self, timestep, states):
-        # In first timestep, convert all strings to indices
-        if self.metabolite_idx is None:
-            self.water_idx = bulk_name_to_idx(self.water_id, states['bulk']['id'])
-            self.protein_idx = bulk_name_to_idx(
-                self.protein_ids, states['bulk']['id'])
-            self.metabolite_idx = bulk_name_to_idx(
-                self.metabolite_ids, states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
 
         protein_data = counts(states['bulk'], self.protein_idx)
         # Determine how many proteins to degrade based on the degradation rates
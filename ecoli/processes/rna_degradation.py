@@ -35,7 +35,8 @@ digestion":
 import numpy as np
 
 from ecoli.library.schema import (
-    bulk_name_to_idx, counts, attrs, numpy_schema, listener_schema)
+    bulk_name_to_idx, counts, attrs, numpy_schema, listener_schema,
+    update_bulk_idx)
 
 from wholecell.utils import units
 
@@ -177,6 +178,23 @@ class RnaDegradation(PartitionedProcess):
 
         # Numpy indices for bulk molecules
         self.water_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.charged_trna_idx = bulk_name_to_idx(
+            self.charged_trna_names, bulk_ids)
+        self.bulk_rnas_idx = bulk_name_to_idx(self.all_rna_ids, bulk_ids)
+        self.nmps_idx = bulk_name_to_idx(self.nmp_ids, bulk_ids)
+        self.fragment_metabolites_idx = bulk_name_to_idx(
+            self.end_cleavage_metabolite_ids, bulk_ids)
+        self.fragment_bases_idx = bulk_name_to_idx(
+            self.polymerized_ntp_ids, bulk_ids)
+        self.endoRNase_idx = bulk_name_to_idx(self.endoRNase_ids, bulk_ids)
+        self.exoRNase_idx = bulk_name_to_idx(self.exoRNase_ids, bulk_ids)
+        self.ribosome30S_idx = bulk_name_to_idx(self.ribosome30S, bulk_ids)
+        self.ribosome50S_idx = bulk_name_to_idx(self.ribosome50S, bulk_ids)
+        self.water_idx = bulk_name_to_idx(self.water_id, bulk_ids)
+        self.proton_idx = bulk_name_to_idx(self.proton_id, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -206,22 +224,7 @@ class RnaDegradation(PartitionedProcess):
         }
 
     def calculate_request(self, timestep, states):
-        if self.water_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.charged_trna_idx = bulk_name_to_idx(
-                self.charged_trna_names, bulk_ids)
-            self.bulk_rnas_idx = bulk_name_to_idx(self.all_rna_ids, bulk_ids)
-            self.nmps_idx = bulk_name_to_idx(self.nmp_ids, bulk_ids)
-            self.fragment_metabolites_idx = bulk_name_to_idx(
-                self.end_cleavage_metabolite_ids, bulk_ids)
-            self.fragment_bases_idx = bulk_name_to_idx(
-                self.polymerized_ntp_ids, bulk_ids)
-            self.endoRNase_idx = bulk_name_to_idx(self.endoRNase_ids, bulk_ids)
-            self.exoRNase_idx = bulk_name_to_idx(self.exoRNase_ids, bulk_ids)
-            self.ribosome30S_idx = bulk_name_to_idx(self.ribosome30S, bulk_ids)
-            self.ribosome50S_idx = bulk_name_to_idx(self.ribosome50S, bulk_ids)
-            self.water_idx = bulk_name_to_idx(self.water_id, bulk_ids)
-            self.proton_idx = bulk_name_to_idx(self.proton_id, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # Compute factor that convert counts into concentration, and vice versa
         cell_mass = states['listeners']['mass']['cell_mass'] * units.fg
@@ -12,7 +12,8 @@ import warnings
 from vivarium.core.process import Process
 from vivarium.core.engine import Engine
 
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx, counts, attrs
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, counts, attrs, update_bulk_idx)
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.unique_update import UniqueUpdate
 
@@ -56,6 +57,13 @@ class RnaInterference(Process):
         self.random_state = np.random.RandomState(seed=self.parameters['seed'])
 
         self.srna_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.srna_idx = bulk_name_to_idx(self.srna_ids, bulk_ids)
+        self.subunit_idx = bulk_name_to_idx(
+            [self.ribosome30S, self.ribosome50S], bulk_ids)
+        self.duplex_idx = bulk_name_to_idx(self.duplex_ids, bulk_ids)
     
     def ports_schema(self):
         return {
@@ -67,12 +75,7 @@ class RnaInterference(Process):
         }
         
     def next_update(self, timestep, states):
-        if self.srna_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.srna_idx = bulk_name_to_idx(self.srna_ids, bulk_ids)
-            self.subunit_idx = bulk_name_to_idx(
-                [self.ribosome30S, self.ribosome50S], bulk_ids)
-            self.duplex_idx = bulk_name_to_idx(self.duplex_ids, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         update = {
             'bulk': [],
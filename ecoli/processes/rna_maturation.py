@@ -9,7 +9,7 @@ import numpy as np
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.partition import PartitionedProcess
 from ecoli.library.schema import (
-    listener_schema, numpy_schema, counts, bulk_name_to_idx)
+    listener_schema, numpy_schema, counts, bulk_name_to_idx, update_bulk_idx)
 
 # Register default topology for this process, associating it with process name
 NAME = 'ecoli-rna-maturation'
@@ -64,6 +64,33 @@ class RnaMaturation(PartitionedProcess):
 
         # Numpy indices for bulk molecules
         self.ppi_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.unprocessed_rna_idx = bulk_name_to_idx(
+            self.unprocessed_rna_ids, bulk_ids)
+        self.mature_rna_idx = bulk_name_to_idx(
+            self.mature_rna_ids, bulk_ids)
+        self.rna_maturation_enzyme_idx = bulk_name_to_idx(
+            self.rna_maturation_enzyme_ids, bulk_ids)
+        self.fragment_base_idx = bulk_name_to_idx(
+            self.fragment_bases, bulk_ids)
+        self.ppi_idx = bulk_name_to_idx(self.ppi, bulk_ids)
+        self.water_idx = bulk_name_to_idx(self.water, bulk_ids)
+        self.nmps_idx = bulk_name_to_idx(self.nmps, bulk_ids)
+        self.proton_idx = bulk_name_to_idx(self.proton, bulk_ids)
+        self.main_23s_rRNA_idx = bulk_name_to_idx(
+            self.main_23s_rRNA_id, bulk_ids)
+        self.main_16s_rRNA_idx = bulk_name_to_idx(
+            self.main_16s_rRNA_id, bulk_ids)
+        self.main_5s_rRNA_idx = bulk_name_to_idx(
+            self.main_5s_rRNA_id, bulk_ids)
+        self.variant_23s_rRNA_idx = bulk_name_to_idx(
+            self.variant_23s_rRNA_ids, bulk_ids)
+        self.variant_16s_rRNA_idx = bulk_name_to_idx(
+            self.variant_16s_rRNA_ids, bulk_ids)
+        self.variant_5s_rRNA_idx = bulk_name_to_idx(
+            self.variant_5s_rRNA_ids, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -86,32 +113,7 @@ class RnaMaturation(PartitionedProcess):
 
     def calculate_request(self, timestep, states):
         # Get bulk indices
-        if self.ppi_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.unprocessed_rna_idx = bulk_name_to_idx(
-                self.unprocessed_rna_ids, bulk_ids)
-            self.mature_rna_idx = bulk_name_to_idx(
-                self.mature_rna_ids, bulk_ids)
-            self.rna_maturation_enzyme_idx = bulk_name_to_idx(
-                self.rna_maturation_enzyme_ids, bulk_ids)
-            self.fragment_base_idx = bulk_name_to_idx(
-                self.fragment_bases, bulk_ids)
-            self.ppi_idx = bulk_name_to_idx(self.ppi, bulk_ids)
-            self.water_idx = bulk_name_to_idx(self.water, bulk_ids)
-            self.nmps_idx = bulk_name_to_idx(self.nmps, bulk_ids)
-            self.proton_idx = bulk_name_to_idx(self.proton, bulk_ids)
-            self.main_23s_rRNA_idx = bulk_name_to_idx(
-                self.main_23s_rRNA_id, bulk_ids)
-            self.main_16s_rRNA_idx = bulk_name_to_idx(
-                self.main_16s_rRNA_id, bulk_ids)
-            self.main_5s_rRNA_idx = bulk_name_to_idx(
-                self.main_5s_rRNA_id, bulk_ids)
-            self.variant_23s_rRNA_idx = bulk_name_to_idx(
-                self.variant_23s_rRNA_ids, bulk_ids)
-            self.variant_16s_rRNA_idx = bulk_name_to_idx(
-                self.variant_16s_rRNA_ids, bulk_ids)
-            self.variant_5s_rRNA_idx = bulk_name_to_idx(
-                self.variant_5s_rRNA_ids, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
 
         unprocessed_rna_counts = counts(states['bulk_total'], self.unprocessed_rna_idx)
@@ -10,7 +10,8 @@ import numpy as np
 from vivarium.core.process import Process
 from vivarium.core.composition import simulate_process
 
-from ecoli.library.schema import numpy_schema, bulk_name_to_idx
+from ecoli.library.schema import (
+    numpy_schema, bulk_name_to_idx, update_bulk_idx)
 
 
 class Exchange(Process):
@@ -34,15 +35,18 @@ class Exchange(Process):
         self.exchange_rate = np.array(list(
             self.parameters['exchanges'].values()))
         self.exchange_mol_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.exchange_mol_idx = bulk_name_to_idx(self.exchange_mol,
+            bulk_ids)
 
     def ports_schema(self):
         return {
             'bulk': numpy_schema('bulk')}
 
     def next_update(self, timestep, states):
-        if self.exchange_mol_idx is None:
-            self.exchange_mol_idx = bulk_name_to_idx(self.exchange_mol,
-                states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         exchange = self.exchange_rate * timestep
         return {'bulk': [(self.exchange_mol_idx, exchange)]}
 
@@ -11,7 +11,8 @@ import numpy as np
 from vivarium.core.process import Step
 
 from ecoli.library.schema import (
-    listener_schema, numpy_schema, attrs, bulk_name_to_idx, counts)
+    listener_schema, numpy_schema, attrs, bulk_name_to_idx, counts,
+    update_bulk_idx)
 
 from wholecell.utils.random import stochasticRound
 from wholecell.utils import units
@@ -120,6 +121,20 @@ class TfBinding(Step):
             self.marR_name = "CPLX0-7710[c]"
             self.marR_tet = "marR-tet[c]"
         self.submass_indices = self.parameters['submass_indices']
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.active_tf_idx = {
+            tf_id: bulk_name_to_idx(tf_name, bulk_ids)
+            for tf_id, tf_name in self.active_tfs.items()
+        }
+        self.inactive_tf_idx = {
+            tf_id : bulk_name_to_idx(tf_name, bulk_ids)
+            for tf_id, tf_name in self.inactive_tfs.items()
+        }
+        if "PD00365" in self.tf_ids:
+            self.marR_idx = bulk_name_to_idx(self.marR_name, bulk_ids)
+            self.marR_tet_idx = bulk_name_to_idx(self.marR_tet, bulk_ids)
         
     def ports_schema(self):
         return {
@@ -146,20 +161,7 @@ class TfBinding(Step):
         }
         
     def next_update(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.active_tf_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.active_tf_idx = {
-                tf_id: bulk_name_to_idx(tf_name, bulk_ids)
-                for tf_id, tf_name in self.active_tfs.items()
-            }
-            self.inactive_tf_idx = {
-                tf_id : bulk_name_to_idx(tf_name, bulk_ids)
-                for tf_id, tf_name in self.inactive_tfs.items()
-            }
-            if "PD00365" in self.tf_ids:
-                self.marR_idx = bulk_name_to_idx(self.marR_name, bulk_ids)
-                self.marR_tet_idx = bulk_name_to_idx(self.marR_tet, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
         
         if states['first_update']:
             return {'first_update': False}
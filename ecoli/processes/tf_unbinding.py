@@ -9,7 +9,8 @@ import numpy as np
 from vivarium.core.process import Step
 
 from ecoli.processes.registries import topology_registry
-from ecoli.library.schema import bulk_name_to_idx, attrs, numpy_schema
+from ecoli.library.schema import (
+    bulk_name_to_idx, attrs, numpy_schema, update_bulk_idx)
 
 # Register default topology for this process, associating it with process name
 NAME = 'ecoli-tf-unbinding'
@@ -42,6 +43,11 @@ class TfUnbinding(Step):
 
         # Numpy indices for bulk molecules
         self.active_tf_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.active_tf_idx = bulk_name_to_idx(
+            [tf + '[c]' for tf in self.tf_ids], bulk_ids)
 
     def ports_schema(self):
         return {
@@ -63,10 +69,7 @@ class TfUnbinding(Step):
         return (states['global_time'] % states['timestep']) == 0
 
     def next_update(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.active_tf_idx is None:
-            self.active_tf_idx = bulk_name_to_idx(
-                [tf + '[c]' for tf in self.tf_ids], states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
         
         if states['first_update']:
             return {'first_update': False}
@@ -23,7 +23,8 @@ from wholecell.utils.polymerize import buildSequences, polymerize, computeMassIn
 from wholecell.utils import units
 
 from ecoli.library.schema import (
-    counts, attrs, numpy_schema, bulk_name_to_idx, listener_schema)
+    counts, attrs, numpy_schema, bulk_name_to_idx, listener_schema,
+    update_bulk_idx)
 from ecoli.library.data_predicates import monotonically_increasing
 from ecoli.processes.registries import topology_registry
 from ecoli.processes.partition import PartitionedProcess
@@ -172,6 +173,18 @@ class TranscriptElongation(PartitionedProcess):
 
         # Helper indices for Numpy indexing
         self.bulk_RNA_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.bulk_RNA_idx = bulk_name_to_idx(self.rnaIds, bulk_ids)
+        self.ntps_idx = bulk_name_to_idx(self.ntp_ids, bulk_ids)
+        self.ppi_idx = bulk_name_to_idx(self.ppi, bulk_ids)
+        self.inactive_RNAP_idx = bulk_name_to_idx(
+            self.inactive_RNAP, bulk_ids)
+        self.fragmentBases_idx = bulk_name_to_idx(
+            self.fragmentBases, bulk_ids)
+        self.charged_trnas_idx = bulk_name_to_idx(
+            self.charged_trnas, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -212,18 +225,7 @@ class TranscriptElongation(PartitionedProcess):
         }
 
     def calculate_request(self, timestep, states):
-        # At first update, convert all strings to indices
-        if self.bulk_RNA_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.bulk_RNA_idx = bulk_name_to_idx(self.rnaIds, bulk_ids)
-            self.ntps_idx = bulk_name_to_idx(self.ntp_ids, bulk_ids)
-            self.ppi_idx = bulk_name_to_idx(self.ppi, bulk_ids)
-            self.inactive_RNAP_idx = bulk_name_to_idx(
-                self.inactive_RNAP, bulk_ids)
-            self.fragmentBases_idx = bulk_name_to_idx(
-                self.fragmentBases, bulk_ids)
-            self.charged_trnas_idx = bulk_name_to_idx(
-                self.charged_trnas, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # Calculate elongation rate based on the current media
         current_media_id = states['environment']['media_id']
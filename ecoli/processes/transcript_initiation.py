@@ -24,7 +24,7 @@ from vivarium.core.composition import simulate_process
 
 from ecoli.library.schema import (
     create_unique_indexes, listener_schema,
-    numpy_schema, counts, attrs, bulk_name_to_idx
+    numpy_schema, counts, attrs, bulk_name_to_idx, update_bulk_idx
 )
 
 from wholecell.utils import units
@@ -274,6 +274,12 @@ class TranscriptInitiation(PartitionedProcess):
 
         # Helper indices for Numpy indexing
         self.ppgpp_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.ppgpp_idx = bulk_name_to_idx(self.ppgpp, bulk_ids)
+        self.inactive_RNAP_idx = bulk_name_to_idx(
+            self.inactive_RNAP, bulk_ids)
 
     def ports_schema(self):
         return {
@@ -313,12 +319,7 @@ class TranscriptInitiation(PartitionedProcess):
         }
 
     def calculate_request(self, timestep, states):
-        # At first update, convert all strings to indices
-        if self.ppgpp_idx is None:
-            bulk_ids = states['bulk']['id']
-            self.ppgpp_idx = bulk_name_to_idx(self.ppgpp, bulk_ids)
-            self.inactive_RNAP_idx = bulk_name_to_idx(
-                self.inactive_RNAP, bulk_ids)
+        update_bulk_idx(self, states['bulk'])
 
         # Get all inactive RNA polymerases
         requests = {
@@ -12,7 +12,7 @@ and back in response to counts of ligand stimulants.
 import numpy as np
 
 from ecoli.library.schema import (
-    numpy_schema, bulk_name_to_idx, counts)
+    numpy_schema, bulk_name_to_idx, counts, update_bulk_idx)
 
 from wholecell.utils import units
 from ecoli.processes.registries import topology_registry
@@ -67,6 +67,11 @@ class TwoComponentSystem(PartitionedProcess):
 
         # Helper indices for Numpy indexing
         self.molecule_idx = None
+        update_bulk_idx(self)
+
+    def _set_bulk_idx(self, bulk_ids):
+        self.molecule_idx = bulk_name_to_idx(self.moleculeNames,
+            bulk_ids)
 
     def ports_schema(self):
         return {
@@ -78,10 +83,7 @@ class TwoComponentSystem(PartitionedProcess):
 
 
     def calculate_request(self, timestep, states):
-        # At t=0, convert all strings to indices
-        if self.molecule_idx is None:
-            self.molecule_idx = bulk_name_to_idx(self.moleculeNames,
-                states['bulk']['id'])
+        update_bulk_idx(self, states['bulk'])
 
         # Get molecule counts
         moleculeCounts = counts(states['bulk'], self.molecule_idx)
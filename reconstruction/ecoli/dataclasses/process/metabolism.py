@@ -23,6 +23,7 @@ from reconstruction.ecoli.knowledge_base_raw import KnowledgeBaseEcoli
 # NOTE: Importing SimulationDataEcoli would make a circular reference so use Any.
 #from reconstruction.ecoli.simulation_data import SimulationDataEcoli
 from wholecell.utils import units
+from wholecell.utils.expression_kernel import ExpressionKernel
 
 KINETIC_CONSTRAINT_CONC_UNITS = units.umol / units.L
 K_CAT_UNITS = 1 / units.s
@@ -499,9 +500,9 @@ class Metabolism(object):
 		for use in Metabolism process. Inputs should be unitless but the order
 		of magnitude should match the kinetics parameters (umol/L/s).
 
-		If trying to pickle sim_data object after function has been called,
-		_compiled_enzymes and _compiled_saturation might not be able to be pickled.
-		See __getstate__(), __setstate__() comments on PR 111 to address.
+		The enzyme and saturation expressions are compiled once into
+		vectorized kernels (see wholecell.utils.expression_kernel), which are
+		cached on disk and can be pickled with sim_data.
 
 		Returns np.array of floats of the kinetic constraint target for each
 		reaction with kinetic parameters
@@ -518,19 +519,16 @@ class Metabolism(object):
 		'''
 
 		if self._compiled_enzymes is None:
-			self._compiled_enzymes = eval('lambda e: {}'.format(self._enzymes))
+			self._compiled_enzymes = ExpressionKernel(self._enzymes, 'e')
 		if self._compiled_saturation is None:
-			self._compiled_saturation = eval('lambda s: {}'.format(self._saturations))
+			self._compiled_saturation = ExpressionKernel(self._saturations, 's')
 
 		# Strip units from args
 		enzs = enzymes.asNumber(KINETIC_CONSTRAINT_CONC_UNITS)
 		subs = substrates.asNumber(KINETIC_CONSTRAINT_CONC_UNITS)
 
-		capacity = np.array(self._compiled_enzymes(enzs))[:, None] * self._kcats
-		saturation = np.array([
-			[min(v), sum(v) / len(v), max(v)]
-			for v in self._compiled_saturation(subs)
-			])
+		capacity = self._compiled_enzymes(enzs)[:, None] * self._kcats
+		saturation = self._compiled_saturation.min_mean_max(subs)
 
 		return KINETIC_CONSTRAINT_CONC_UNITS * K_CAT_UNITS * capacity * saturation
 
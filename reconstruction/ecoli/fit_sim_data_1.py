@@ -7,15 +7,19 @@ TODO: functionalize so that values are not both set and returned from some metho
 
 import binascii
 import functools
+import hashlib
+import inspect
 import itertools
+import multiprocessing
 import os
 import pickle
 import time
 import traceback
-from typing import Callable, List
+import types
+from typing import Any, Callable, Dict, List
 
 from stochastic_arrow import StochasticSystem
-from cvxpy import Variable, Problem, Minimize, norm
+from cvxpy import Variable, Parameter, Problem, Minimize, multiply, norm
 import numpy as np
 import scipy.optimize
 import scipy.sparse
@@ -52,6 +56,27 @@ TIME_UNITS = units.s
 
 functions_run = []
 
+# Seconds spent running each Parca step, reported at the end of fitSimData_1
+step_times = {}  # type: Dict[str, float]
+
+# sim_data shared with the worker processes forked by apply_updates
+_shared_sim_data = None
+
+# Cache keys of the Parca inputs followed by each Parca step that has run.
+# The results of each step are cached in CACHE_DIR under its key.
+cache_keys = []  # type: List[str]
+
+CACHE_DIR = os.path.join(filepath.ROOT_PATH, 'cache')
+
+# Source code that Parca steps depend on in addition to the functions in
+# this file, relative to ROOT_PATH
+CACHE_CODE_PATHS = ['reconstruction/ecoli', 'reconstruction/spreadsheets.py',
+	'wholecell/utils', 'wholecell/io', 'ecoli/library']
+
+# Keyword arguments that do not change the results of Parca steps
+CACHE_IGNORED_KWARGS = {'cpus', 'load_intermediate', 'save_intermediates',
+	'intermediates_directory', 'use_cache', 'raw_data'}
+
 
 def fitSimData_1(raw_data, **kwargs):
 	"""
@@ -79,11 +104,19 @@ def fitSimData_1(raw_data, **kwargs):
 			is not fit to protein synthesis demands
 		disable_rnapoly_capacity_fitting (bool) - if True, RNA polymerase
 			expression is not fit to protein synthesis demands
+		use_cache (bool) - if True (default), the results of each Parca step
+			are cached in CACHE_DIR and steps with unchanged inputs are
+			skipped (see save_state)
 	"""
 
 	sim_data = SimulationDataEcoli()
 	cell_specs = {}
 
+	cache_keys.clear()
+	step_times.clear()
+	if kwargs.get('use_cache', True) and kwargs.get('load_intermediate') is None:
+		cache_keys.append(inputs_cache_key(raw_data))
+
 	# Functions to modify sim_data and/or cell_specs
 	# Functions defined below should be wrapped by @save_state to allow saving
 	# and loading sim_data and cell_specs to skip certain functions while doing
@@ -99,6 +132,15 @@ def fitSimData_1(raw_data, **kwargs):
 	sim_data, cell_specs = set_conditions(sim_data, cell_specs, **kwargs)
 	sim_data, cell_specs = final_adjustments(sim_data, cell_specs, **kwargs)
 
+	if isinstance(sim_data, CachedState):
+		sim_data, cell_specs = sim_data.load()
+
+	if step_times:
+		print('Parca step times:')
+		for func_name, seconds in step_times.items():
+			print(f'  {func_name:<20} {seconds:8.1f} s')
+		print(f'  {"total":<20} {sum(step_times.values()):8.1f} s')
+
 	if sim_data is None:
 		raise ValueError('sim_data is not specified.  Check that the'
 			f' load_intermediate function ({kwargs.get("load_intermediate")})'
@@ -106,6 +148,108 @@ def fitSimData_1(raw_data, **kwargs):
 
 	return sim_data
 
+def _hash_files(hasher, paths, extensions=None, exclude=()):
+	"""Update a hash with the relative paths and contents of files."""
+	for path in paths:
+		if os.path.isfile(path):
+			files = [path]
+		else:
+			files = sorted(
+				os.path.join(dir_path, file_name)
+				for dir_path, dir_names, file_names in os.walk(path)
+				for file_name in file_names
+				if extensions is None or file_name.endswith(extensions))
+		for file_path in files:
+			if file_path in exclude:
+				continue
+			hasher.update(os.path.relpath(file_path, filepath.ROOT_PATH).encode())
+			with open(file_path, 'rb') as f:
+				hasher.update(f.read())
+
+def inputs_cache_key(raw_data):
+	"""
+	Cache key of the inputs to the Parca: the flat files and options that
+	raw_data was loaded with and the source code the Parca steps depend on.
+	"""
+	from reconstruction.ecoli.knowledge_base_raw import FLAT_DIR
+
+	hasher = hashlib.sha256()
+	options = {
+		attr: getattr(raw_data, attr, None)
+		for attr in ('operons_on', 'new_genes_option', 'list_of_dict_filenames',
+			'removed_data', 'modified_data', 'added_data')}
+	hasher.update(repr(sorted(options.items())).encode())
+	_hash_files(hasher, [FLAT_DIR])
+	# Functions in this file are hashed with each step (see step_source)
+	_hash_files(hasher, [
+		path for path in (
+			os.path.join(filepath.ROOT_PATH, code_path)
+			for code_path in CACHE_CODE_PATHS)
+		if os.path.exists(path)
+		], extensions='.py', exclude={os.path.realpath(__file__)})
+	return hasher.hexdigest()
+
+def _code_names(code):
+	"""Global names used by a code object and the code objects nested in it."""
+	names = set(code.co_names)
+	for const in code.co_consts:
+		if isinstance(const, types.CodeType):
+			names |= _code_names(const)
+	return names
+
+def step_source(func):
+	"""
+	Source of a Parca step and the functions and constants in the same
+	module that it uses, directly or through other functions.
+	"""
+	func = inspect.unwrap(func)
+	module_globals = func.__globals__
+	sources = {}
+	pending = [func]
+	while pending:
+		f = pending.pop()
+		if f.__name__ in sources:
+			continue
+		sources[f.__name__] = inspect.getsource(f)
+		for name in sorted(_code_names(f.__code__)):
+			value = module_globals.get(name)
+			if isinstance(value, types.FunctionType):
+				value = inspect.unwrap(value)
+				if value.__module__ == func.__module__:
+					pending.append(value)
+			elif isinstance(value, (bool, int, float, str, tuple)):
+				sources[name] = repr(value)
+	return '\n'.join(sources[name] for name in sorted(sources))
+
+def step_cache_key(func, upstream_key, kwargs):
+	"""
+	Cache key of a Parca step from the key of the step before it, its source
+	code and the keyword arguments it accepts.
+	"""
+	parameters = inspect.signature(inspect.unwrap(func)).parameters
+	options = {
+		key: value for key, value in kwargs.items()
+		if key in parameters and key not in CACHE_IGNORED_KWARGS}
+	hasher = hashlib.sha256()
+	hasher.update(upstream_key.encode())
+	hasher.update(func.__name__.encode())
+	hasher.update(step_source(func).encode())
+	hasher.update(repr(sorted(options.items())).encode())
+	return hasher.hexdigest()
+
+class CachedState(object):
+	"""
+	sim_data and cell_specs cached after a Parca step, which are only loaded
+	if a later step needs to run.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+
+	def load(self):
+		with open(self.path, 'rb') as f:
+			return pickle.load(f)
+
 def save_state(func):
 	"""
 	Wrapper for functions called in fitSimData_1() to allow saving and loading
@@ -114,6 +258,12 @@ def save_state(func):
 	steps that are not required to recalculate in order to work with the desired
 	stage of parameter calculation.
 
+	Unless intermediates are loaded or use_cache is False, the state after
+	each function is also cached in CACHE_DIR under a key that hashes its
+	inputs (see inputs_cache_key and step_cache_key). Functions whose key
+	has a cached state are skipped, and cached states are only loaded from
+	disk when a later function needs to run.
+
 	This wrapper expects arguments in the kwargs passed into a wrapped function:
 		save_intermediates (bool): if True, the state (sim_data and cell_specs)
 			will be saved to disk in intermediates_directory
@@ -122,6 +272,7 @@ def save_state(func):
 		load_intermediate (str): the name of the function to load sim_data and
 			cell_specs from, functions prior to and including this will be
 			skipped but all following functions will run
+		use_cache (bool): if False, do not read or write cached states
 	"""
 
 	@functools.wraps(func)
@@ -134,12 +285,32 @@ def save_state(func):
 		sim_data_file = os.path.join(intermediates_dir, f'sim_data_{func_name}.cPickle')
 		cell_specs_file = os.path.join(intermediates_dir, f'cell_specs_{func_name}.cPickle')
 
+		cache_file = None
+		if cache_keys:
+			key = step_cache_key(func, cache_keys[-1], kwargs)
+			cache_keys.append(key)
+			cache_file = os.path.join(CACHE_DIR, f'parca-{func_name}-{key}.cPickle')
+
+		# Skip the wrapped function if its results are cached
+		if cache_file is not None and os.path.exists(cache_file):
+			sim_data, cell_specs = CachedState(cache_file), {}
+			print(f'Found cached {func_name}')
 		# Run the wrapped function if the function to load is not specified or was already loaded
-		if load_intermediate is None or load_intermediate in functions_run:
+		elif load_intermediate is None or load_intermediate in functions_run:
+			if args and isinstance(args[0], CachedState):
+				args = args[0].load() + args[2:]
 			start = time.time()
 			sim_data, cell_specs = func(*args, **kwargs)
 			end = time.time()
+			step_times[func_name] = end - start
 			print(f'Ran {func_name} in {end - start:.0f} s')
+
+			if cache_file is not None:
+				filepath.makedirs(CACHE_DIR)
+				tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+				with open(tmp_file, 'wb') as f:
+					pickle.dump((sim_data, cell_specs), f, protocol=pickle.HIGHEST_PROTOCOL)
+				os.replace(tmp_file, cache_file)
 		# Load the saved results from the wrapped function if it is set to be loaded
 		elif load_intermediate == func_name:
 			if not os.path.exists(sim_data_file) or not os.path.exists(cell_specs_file):
@@ -159,6 +330,8 @@ def save_state(func):
 
 		# Save the current state of the parameter calculator after the function to disk
 		if kwargs.get('save_intermediates', False) and intermediates_dir != '' and sim_data is not None:
+			if isinstance(sim_data, CachedState):
+				sim_data, cell_specs = sim_data.load()
 			os.makedirs(intermediates_dir, exist_ok=True)
 			with open(sim_data_file, 'wb') as f:
 				pickle.dump(sim_data, f, protocol=pickle.HIGHEST_PROTOCOL)
@@ -240,10 +413,11 @@ def tf_condition_specs(sim_data, cell_specs, cpus=1,
 	# Apply updates to cell_specs from buildTfConditionCellSpecifications for each TF condition
 	conditions = list(sorted(sim_data.tf_to_active_inactive_conditions))
 	args = [
-		(sim_data, tf, variable_elongation_transcription, variable_elongation_translation,
+		(tf, variable_elongation_transcription, variable_elongation_translation,
 				disable_ribosome_capacity_fitting, disable_rnapoly_capacity_fitting)
 		for tf in conditions]
-	apply_updates(buildTfConditionCellSpecifications, args, conditions, cell_specs, cpus)
+	apply_updates(buildTfConditionCellSpecifications, args, conditions, cell_specs,
+		cpus, sim_data=sim_data)
 
 	for conditionKey in cell_specs:
 		if conditionKey == "basal":
@@ -266,11 +440,29 @@ def tf_condition_specs(sim_data, cell_specs, cpus=1,
 
 @save_state
 def fit_condition(sim_data, cell_specs, cpus=1, **kwargs):
-	# Apply updates from fitCondition to cell_specs for each fit condition
+	# Find the bulk and protein monomer distributions and the amino acid
+	# supply to translation of each fit condition, sampling the bulk
+	# distributions of all conditions and seeds in parallel
 	conditions = list(sorted(cell_specs))
-	args = [(sim_data, cell_specs[condition], condition)
-		for condition in conditions]
-	apply_updates(fitCondition, args, conditions, cell_specs, cpus)
+	inputs = {}
+	args = [(cell_specs[condition], condition) for condition in conditions]
+	apply_updates(conditionBulkDistributionInputs, args, conditions, inputs,
+		cpus, sim_data=sim_data)
+
+	samples = {}
+	labels = [(condition, seed)
+		for condition in conditions for seed in range(N_SEEDS)]
+	args = [(inputs[condition], condition, seed) for condition, seed in labels]
+	apply_updates(conditionBulkDistributionSample, args,
+		['{} seed {}'.format(*label) for label in labels], samples, cpus,
+		sim_data=sim_data)
+
+	for condition in conditions:
+		bulk_distributions = bulkDistributionsFromSamples(sim_data,
+			inputs[condition],
+			[samples[condition, seed] for seed in range(N_SEEDS)])
+		cell_specs.update(updateConditionSpec(
+			sim_data, cell_specs[condition], condition, bulk_distributions))
 
 	for condition_label in sorted(cell_specs):
 		nutrients = sim_data.conditions[condition_label]["nutrients"]
@@ -394,12 +586,30 @@ def final_adjustments(sim_data, cell_specs, **kwargs):
 
 	return sim_data, cell_specs
 
-def apply_updates(func, args, labels, dest, cpus):
-	# type: (Callable[..., dict], List[tuple], List[str], dict, int) -> None
+def _set_shared_sim_data(sim_data):
+	"""Pool initializer to set the shared sim_data in spawned workers."""
+	global _shared_sim_data
+	_shared_sim_data = sim_data
+
+def _apply_shared(func, args):
+	"""Call func with the sim_data shared with the worker processes and
+	return the result with the elapsed time."""
+	start = time.time()
+	result = func(_shared_sim_data, *args)
+	return result, time.time() - start
+
+def apply_updates(func, args, labels, dest, cpus, sim_data=None):
+	# type: (Callable[..., dict], List[tuple], List[str], dict, int, Any) -> None
 	"""
 	Use multiprocessing (if cpus > 1) to apply args to a function to get
 	dictionary updates for a destination dictionary.
 
+	If sim_data is given, it is passed to func before the args. Workers are
+	forked after sim_data is set as a module global so they share it
+	copy-on-write instead of each task pickling its own copy. Where forking
+	is not available, sim_data is sent once to each spawned worker instead.
+	The time of each call is reported.
+
 	Args:
 		func: function to call with args
 		args: list of args to apply to func
@@ -407,42 +617,82 @@ def apply_updates(func, args, labels, dest, cpus):
 		dest: destination dictionary that will be updated with results
 			from each function call
 		cpus: number of cpus to use
-	"""
-
-	if cpus > 1:
-		print("Starting {} Parca processes".format(cpus))
-
-		# Apply args to func
-		pool = parallelization.pool(cpus)
-		results = {
-			label: pool.apply_async(func, a)
-			for label, a in zip(labels, args)
-			}
-		pool.close()
-		pool.join()
-
-		# Check results from function calls and update dest
-		failed = []
-		for label, result in results.items():
-			if result.successful():
-				dest.update(result.get())
+		sim_data: passed to func as the first arg if not None
+	"""
+	global _shared_sim_data
+
+	name = func.__name__
+	if sim_data is not None:
+		args = [(func, a) for a in args]
+		func = _apply_shared
+		_shared_sim_data = sim_data
+
+	start = time.time()
+	times = {}
+	try:
+		if cpus > 1:
+			print("Starting {} Parca processes".format(cpus))
+
+			# Apply args to func
+			if sim_data is not None and can_fork():
+				pool = multiprocessing.get_context('fork').Pool(processes=cpus)
+			elif sim_data is not None:
+				pool = multiprocessing.get_context('spawn').Pool(
+					processes=cpus, initializer=_set_shared_sim_data,
+					initargs=(sim_data,))
 			else:
-				# noinspection PyBroadException
-				try:
-					result.get()
-				except Exception as e:
-					traceback.print_exc()
-					failed.append(label)
-
-		# Cleanup
-		if failed:
-			raise RuntimeError('Error(s) raised for {} while using multiple processes'
-				.format(', '.join(failed)))
-		pool = None
-		print("End parallel processing")
-	else:
-		for a in args:
-			dest.update(func(*a))
+				pool = parallelization.pool(cpus)
+			results = {
+				label: pool.apply_async(func, a)
+				for label, a in zip(labels, args)
+				}
+			pool.close()
+			pool.join()
+
+			# Check results from function calls and update dest
+			failed = []
+			for label, result in results.items():
+				if result.successful():
+					update = result.get()
+					if sim_data is not None:
+						update, times[label] = update
+					dest.update(update)
+				else:
+					# noinspection PyBroadException
+					try:
+						result.get()
+					except Exception as e:
+						traceback.print_exc()
+						failed.append(label)
+
+			# Cleanup
+			if failed:
+				raise RuntimeError('Error(s) raised for {} while using multiple processes'
+					.format(', '.join(failed)))
+			pool = None
+			print("End parallel processing")
+		else:
+			for label, a in zip(labels, args):
+				update = func(*a)
+				if sim_data is not None:
+					update, times[label] = update
+				dest.update(update)
+	finally:
+		_shared_sim_data = None
+
+	if times:
+		slowest = max(times, key=times.get)
+		print('Ran {} {} tasks in {:.0f} s ({:.0f} s of work, slowest: {} in {:.0f} s)'
+			.format(len(times), name, time.time() - start,
+				sum(times.values()), slowest, times[slowest]))
+
+def can_fork():
+	# type: () -> bool
+	"""Return True if worker processes can be forked to share memory with
+	this process. Forking is avoided on macOS where it is unsafe with some
+	system libraries (see parallelization.pool)."""
+	return ('fork' in multiprocessing.get_all_start_methods()
+		and not parallelization.is_macos())
 
 def buildBasalCellSpecifications(
 		sim_data,
@@ -851,25 +1101,41 @@ def expressionConverge(
 
 	return expression, synthProb, fit_cistron_expression, avgCellDryMassInit, fitAvgSolubleTargetMolMass, bulkContainer, concDict
 
-def fitCondition(sim_data, spec, condition):
+def conditionBulkDistributionInputs(sim_data, spec, condition):
+	"""
+	Returns {condition: inputs} with the inputs to bulkDistributionSample for
+	the given condition. This uses the specs "expression", "concDict",
+	"avgCellDryMassInit" and "doubling_time" of the condition.
 	"""
-	Takes a given condition and returns the predicted bulk average, bulk deviation,
-	protein monomer average, protein monomer deviation, and amino acid supply to
-	translation. This relies on calculateBulkDistributions and calculateTranslationSupply.
 
-	Inputs
-	------
-	- condition (str) - condition to fit (eg 'CPLX0-7705__active')
-	- spec {property (str): property values} - cell specifications for the given condition.
-	This function uses the specs "expression", "concDict", "avgCellDryMassInit",
-	and "doubling_time"
+	if VERBOSE > 0:
+		print("Fitting condition {}".format(condition))
 
-	Returns
-	--------
-	- A dictionary {condition (str): spec (dict)} with the updated spec dictionary
-	with the following values updated:
+	return {condition: bulkDistributionInputs(
+		sim_data,
+		spec["expression"],
+		spec["concDict"],
+		spec["avgCellDryMassInit"],
+		spec["doubling_time"],
+		)}
+
+def conditionBulkDistributionSample(sim_data, inputs, condition, seed):
+	"""
+	Returns {(condition, seed): sample} with the sample from
+	bulkDistributionSample for the given condition and seed.
+	"""
+
+	return {(condition, seed): bulkDistributionSample(sim_data, inputs, seed)}
+
+def updateConditionSpec(sim_data, spec, condition, bulk_distributions):
+	"""
+	Sets the bulk distributions from bulkDistributionsFromSamples and the
+	amino acid supply rates to translation in the spec of a condition and
+	returns {condition: spec}.
+
+	Updates the following values of spec:
 		- bulkAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
-			for the mean of the counts of all bulk molecules 
+			for the mean of the counts of all bulk molecules
 		- bulkDeviationContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
 			for the standard deviation of the counts of all bulk molecules
 		- proteinMonomerAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
@@ -880,17 +1146,7 @@ def fitCondition(sim_data, spec, condition):
 		for each amino acid to translation
 	"""
 
-	if VERBOSE > 0:
-		print("Fitting condition {}".format(condition))
-
-	# Find bulk and protein distributions
-	bulkAverageContainer, bulkDeviationContainer, proteinMonomerAverageContainer, proteinMonomerDeviationContainer = calculateBulkDistributions(
-		sim_data,
-		spec["expression"],
-		spec["concDict"],
-		spec["avgCellDryMassInit"],
-		spec["doubling_time"],
-		)
+	bulkAverageContainer, bulkDeviationContainer, proteinMonomerAverageContainer, proteinMonomerDeviationContainer = bulk_distributions
 	spec["bulkAverageContainer"] = bulkAverageContainer
 	spec["bulkDeviationContainer"] = bulkDeviationContainer
 	spec["proteinMonomerAverageContainer"] = proteinMonomerAverageContainer
@@ -1936,19 +2192,19 @@ def fitMaintenanceCosts(sim_data, bulkContainer):
 
 	sim_data.constants.darkATP = darkATP
 
-def calculateBulkDistributions(sim_data, expression, concDict, avgCellDryMassInit, doubling_time):
+def bulkDistributionInputs(sim_data, expression, concDict, avgCellDryMassInit, doubling_time):
 	"""
 	Finds a distribution of copy numbers for macromolecules. While RNA and protein
 	expression can be approximated using well-described statistical	distributions,
-	complexes require absolute copy numbers. To get these distributions, this
-	function instantiates many cells with a reduced set of molecules, forms complexes,
-	and iterates through equilibrium and two-component system processes until
-	metabolite counts reach a steady-state. It then computes the resulting
+	complexes require absolute copy numbers. To get these distributions,
+	bulkDistributionSample instantiates N_SEEDS cells with a reduced set of
+	molecules, forms complexes, and iterates through equilibrium and
+	two-component system processes until metabolite counts reach a
+	steady-state, and bulkDistributionsFromSamples computes the resulting
 	statistical distributions.
 
-	Requires
-	--------
-	- N_SEEDS (int) - the number of instantiated cells
+	This computes the molecule indexes and initial counts that are shared by
+	each cell instantiated by bulkDistributionSample.
 
 	Inputs
 	------
@@ -1960,14 +2216,9 @@ def calculateBulkDistributions(sim_data, expression, concDict, avgCellDryMassIni
 
 	Returns
 	--------
-	- bulkAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
-		for the mean of the counts of all bulk molecules
-	- bulkDeviationContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
-		for the standard deviation of the counts of all bulk molecules 
-	- proteinMonomerAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
-		for the mean of the counts of all protein monomers
-	- proteinMonomerDeviationContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
-		for the standard deviation of the counts of all protein monomers
+	- inputs (dict) - indexes into an empty bulk container ('bulkContainer')
+	of each group of molecules and the initial counts of RNAs, proteins and
+	metabolites
 	"""
 
 	# Ids
@@ -1982,16 +2233,16 @@ def calculateBulkDistributions(sim_data, expression, concDict, avgCellDryMassIni
 		set(ids_rnas) | set(ids_protein) | set(ids_complex) | set(ids_equilibrium) | set(ids_twoComponentSystem) | set(ids_metabolites)
 		)
 
-	# Data for complexation
-	complexationStoichMatrix = sim_data.process.complexation.stoich_matrix().astype(np.int64, order ="F")
-	# Data for equilibrium binding
-	# equilibriumDerivatives = sim_data.process.equilibrium.derivatives
-	# equilibriumDerivativesJacobian = sim_data.process.equilibrium.derivativesJacobian
-
 	# Data for metabolites
 	cellDensity = sim_data.constants.cell_density
 	cellVolume = avgCellDryMassInit / cellDensity / sim_data.mass.cell_dry_mass_fraction
 
+	# Metabolite counts that the equilibrium and two component system
+	# processes are iterated to
+	metCounts = conc_metabolites * cellVolume * sim_data.constants.n_avogadro
+	metCounts.normalize()
+	metCounts.checkNoUnit()
+
 	# Construct bulk container
 
 	# We want to know something about the distribution of the copy numbers of
@@ -2005,93 +2256,131 @@ def calculateBulkDistributions(sim_data, expression, concDict, avgCellDryMassIni
 	bulkContainer = np.array([mol_data for mol_data in
 		zip(bulk_ids, np.zeros(len(bulk_ids)))],
 		dtype=[('id', bulk_ids.dtype), ('count', int)])
-	
-	rna_idx = bulk_name_to_idx(ids_rnas, bulkContainer['id'])
-	protein_idx = bulk_name_to_idx(ids_protein, bulkContainer['id'])
-	complexation_molecules_idx = bulk_name_to_idx(ids_complex, bulkContainer['id'])
-	equilibrium_molecules_idx = bulk_name_to_idx(
-		ids_equilibrium, bulkContainer['id'])
-	two_component_system_molecules_idx = bulk_name_to_idx(
-		ids_twoComponentSystem, bulkContainer['id'])
-	metabolites_idx = bulk_name_to_idx(ids_metabolites, bulkContainer['id'])
-	all_molecules_idx = bulk_name_to_idx(allMoleculesIDs, bulkContainer['id'])
 
-	allMoleculeCounts = np.empty((N_SEEDS, len(allMoleculesIDs)), np.int64)
-	proteinMonomerCounts = np.empty((N_SEEDS, len(ids_protein)), np.int64)
+	return {
+		'bulkContainer': bulkContainer,
+		'rna_idx': bulk_name_to_idx(ids_rnas, bulkContainer['id']),
+		'protein_idx': bulk_name_to_idx(ids_protein, bulkContainer['id']),
+		'complexation_molecules_idx': bulk_name_to_idx(ids_complex, bulkContainer['id']),
+		'equilibrium_molecules_idx': bulk_name_to_idx(
+			ids_equilibrium, bulkContainer['id']),
+		'two_component_system_molecules_idx': bulk_name_to_idx(
+			ids_twoComponentSystem, bulkContainer['id']),
+		'metabolites_idx': bulk_name_to_idx(ids_metabolites, bulkContainer['id']),
+		'all_molecules_idx': bulk_name_to_idx(allMoleculesIDs, bulkContainer['id']),
+		'rna_counts': totalCount_RNA * distribution_RNA,
+		'protein_counts': totalCount_protein * distribution_protein,
+		'metabolite_counts': metCounts.asNumber().round(),
+		'cell_volume': cellVolume.asNumber(units.L),
+		}
+
+def bulkDistributionSample(sim_data, inputs, seed):
+	"""
+	Instantiates one cell with the molecules from bulkDistributionInputs,
+	forms complexes and iterates equilibrium and two-component system
+	processes until metabolite counts reach a steady-state. Samples only
+	depend on the seed, so they can be computed in any order or in parallel.
+
+	Returns
+	--------
+	- allMoleculeCounts (np.ndarray of int) - counts of the molecules given by
+	inputs['all_molecules_idx']
+	- proteinMonomerCounts (np.ndarray of int) - counts of the proteins given
+	by inputs['protein_idx'] before complexation
+	"""
 
 	if VERBOSE > 1:
-		print("Bulk distribution seed:")
+		print('seed = {}'.format(seed))
 
-	# Instantiate cells to find average copy numbers of macromolecules
-	for seed in range(N_SEEDS):
-		if VERBOSE > 1:
-			print('seed = {}'.format(seed))
-
-		bulkContainer['count'][all_molecules_idx] = 0
-
-		bulkContainer['count'][rna_idx] = totalCount_RNA * distribution_RNA
-
-		bulkContainer['count'][protein_idx] = totalCount_protein * distribution_protein
-
-		proteinMonomerCounts[seed, :] = counts(bulkContainer, protein_idx)
-		complexationMoleculeCounts = counts(bulkContainer, complexation_molecules_idx)
-
-		# Form complexes
-		time_step = 2**31 # don't stop until all complexes are formed.
-		complexation_rates = sim_data.process.complexation.rates
-		system = StochasticSystem(complexationStoichMatrix.T, random_seed=seed)
-		complexation_result = system.evolve(
-			time_step, complexationMoleculeCounts, complexation_rates)
-
-		updatedCompMoleculeCounts = complexation_result['outcome']
-		bulkContainer['count'][complexation_molecules_idx] = updatedCompMoleculeCounts
-
-		metDiffs = np.inf * np.ones_like(counts(bulkContainer, metabolites_idx))
-		nIters = 0
-
-		# Iterate processes until metabolites converge to a steady-state
-		while np.linalg.norm(metDiffs, np.inf) > 1:
-			random_state = np.random.RandomState(seed)
-			metCounts = conc_metabolites * cellVolume * sim_data.constants.n_avogadro
-			metCounts.normalize()
-			metCounts.checkNoUnit()
-			bulkContainer['count'][metabolites_idx] = metCounts.asNumber().round()
-
-			# Find reaction fluxes from equilibrium process
-			# Do not use jit to avoid compiling time (especially when running
-			# in parallel since sim_data needs to be pickled and reconstructed
-			# each time)
-			rxnFluxes, _ = sim_data.process.equilibrium.fluxes_and_molecules_to_SS(
-				bulkContainer['count'][equilibrium_molecules_idx],
-				cellVolume.asNumber(units.L),
-				sim_data.constants.n_avogadro.asNumber(1 / units.mol),
-				random_state, jit=False,
-				)
-			bulkContainer['count'][equilibrium_molecules_idx] += np.dot(
-				sim_data.process.equilibrium.stoich_matrix().astype(np.int64),
-				rxnFluxes.astype(np.int64))
-			assert np.all(bulkContainer['count'][equilibrium_molecules_idx] >= 0)
-
-			# Find changes from two component system
-			_, moleculeCountChanges = sim_data.process.two_component_system.molecules_to_ss(
-				bulkContainer['count'][two_component_system_molecules_idx],
-				cellVolume.asNumber(units.L),
-				sim_data.constants.n_avogadro.asNumber(1 / units.mmol)
-				)
+	bulkContainer = inputs['bulkContainer'].copy()
+	protein_idx = inputs['protein_idx']
+	complexation_molecules_idx = inputs['complexation_molecules_idx']
+	equilibrium_molecules_idx = inputs['equilibrium_molecules_idx']
+	two_component_system_molecules_idx = inputs['two_component_system_molecules_idx']
+	metabolites_idx = inputs['metabolites_idx']
+	cellVolume = inputs['cell_volume']
+
+	bulkContainer['count'][inputs['rna_idx']] = inputs['rna_counts']
+
+	bulkContainer['count'][protein_idx] = inputs['protein_counts']
+
+	proteinMonomerCounts = counts(bulkContainer, protein_idx)
+	complexationMoleculeCounts = counts(bulkContainer, complexation_molecules_idx)
+
+	# Form complexes
+	time_step = 2**31 # don't stop until all complexes are formed.
+	complexationStoichMatrix = sim_data.process.complexation.stoich_matrix().astype(np.int64, order ="F")
+	complexation_rates = sim_data.process.complexation.rates
+	system = StochasticSystem(complexationStoichMatrix.T, random_seed=seed)
+	complexation_result = system.evolve(
+		time_step, complexationMoleculeCounts, complexation_rates)
+
+	updatedCompMoleculeCounts = complexation_result['outcome']
+	bulkContainer['count'][complexation_molecules_idx] = updatedCompMoleculeCounts
+
+	metDiffs = np.inf * np.ones_like(counts(bulkContainer, metabolites_idx))
+	nIters = 0
+	equilibriumStoichMatrix = sim_data.process.equilibrium.stoich_matrix().astype(np.int64)
+
+	# Iterate processes until metabolites converge to a steady-state
+	while np.linalg.norm(metDiffs, np.inf) > 1:
+		random_state = np.random.RandomState(seed)
+		bulkContainer['count'][metabolites_idx] = inputs['metabolite_counts']
+
+		# Find reaction fluxes from equilibrium process
+		# Do not use jit to avoid compiling time (especially when running
+		# in parallel since each worker process would compile its own copy)
+		rxnFluxes, _ = sim_data.process.equilibrium.fluxes_and_molecules_to_SS(
+			bulkContainer['count'][equilibrium_molecules_idx],
+			cellVolume,
+			sim_data.constants.n_avogadro.asNumber(1 / units.mol),
+			random_state, jit=False,
+			)
+		bulkContainer['count'][equilibrium_molecules_idx] += np.dot(
+			equilibriumStoichMatrix, rxnFluxes.astype(np.int64))
+		assert np.all(bulkContainer['count'][equilibrium_molecules_idx] >= 0)
+
+		# Find changes from two component system
+		_, moleculeCountChanges = sim_data.process.two_component_system.molecules_to_ss(
+			bulkContainer['count'][two_component_system_molecules_idx],
+			cellVolume,
+			sim_data.constants.n_avogadro.asNumber(1 / units.mmol)
+			)
 
-			bulkContainer['count'][two_component_system_molecules_idx] += \
-				moleculeCountChanges.astype(np.int64)
+		bulkContainer['count'][two_component_system_molecules_idx] += \
+			moleculeCountChanges.astype(np.int64)
 
-			metDiffs = bulkContainer['count'][metabolites_idx
-				] - metCounts.asNumber().round()
+		metDiffs = bulkContainer['count'][metabolites_idx
+			] - inputs['metabolite_counts']
 
-			nIters += 1
-			if nIters > 100:
-				raise Exception("Equilibrium reactions are not converging!")
+		nIters += 1
+		if nIters > 100:
+			raise Exception("Equilibrium reactions are not converging!")
 
-		allMoleculeCounts[seed, :] = counts(bulkContainer, all_molecules_idx)
+	return counts(bulkContainer, inputs['all_molecules_idx']), proteinMonomerCounts
+
+def bulkDistributionsFromSamples(sim_data, inputs, samples):
+	"""
+	Computes the statistics of the samples from bulkDistributionSample.
+
+	Returns
+	--------
+	- bulkAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
+		for the mean of the counts of all bulk molecules
+	- bulkDeviationContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
+		for the standard deviation of the counts of all bulk molecules
+	- proteinMonomerAverageContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
+		for the mean of the counts of all protein monomers
+	- proteinMonomerDeviationContainer (np.ndarray object) - Two columns: 'id' for name and 'count'
+		for the standard deviation of the counts of all protein monomers
+	"""
+
+	allMoleculeCounts = np.array([sample[0] for sample in samples], np.int64)
+	proteinMonomerCounts = np.array([sample[1] for sample in samples], np.int64)
+	all_molecules_idx = inputs['all_molecules_idx']
 
 	# Update counts in bulk objects container
+	bulk_ids = inputs['bulkContainer']['id']
 	bulkAverageContainer = np.array([mol_data for mol_data in
 		zip(bulk_ids, np.zeros(len(bulk_ids)))],
 		dtype=[('id', bulk_ids.dtype), ('count', np.float64)])
@@ -2116,6 +2405,36 @@ def calculateBulkDistributions(sim_data, expression, concDict, avgCellDryMassIni
 
 # Math functions
 
+def parametrized_matrix_product(entries, shape, x):
+	"""
+	Build the product A @ x of a cvxpy variable x and a matrix A whose
+	nonzero elements can only be at the given positions. The values of these
+	elements are a Parameter, so a problem using the product can be solved
+	again for new values of A without being canonicalized again.
+
+	Inputs
+	------
+	- entries: (row indexes, column indexes) of the elements of A that can
+	be nonzero, possibly repeated
+	- shape: shape of A
+	- x: cvxpy variable of length shape[1]
+
+	Returns
+	--------
+	- product: cvxpy expression equal to A @ x
+	- values: Parameter to set to the values A[entries] of the elements
+	- entries: (row indexes, column indexes) of the elements in values
+	"""
+
+	rows, cols = np.unique(np.column_stack(entries), axis=0).T
+	values = Parameter(len(rows))
+	select_rows = scipy.sparse.csr_matrix(
+		(np.ones(len(rows)), (rows, np.arange(len(rows)))),
+		shape=(shape[0], len(rows)))
+	product = select_rows @ multiply(values, x[cols])
+
+	return product, values, (rows, cols)
+
 def totalCountFromMassesAndRatios(totalMass, individualMasses, distribution):
 	"""
 	Function to determine the expected total counts for a group of molecules
@@ -2599,6 +2918,7 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 		- G: Matrix of values in pPromoterBound, rearranged based on each RNA
 		- row_name_to_index: Dict[str, int] of row names of G to row index
 		- col_name_to_index: Dict[str, int] of column names of G to column index
+		- G_entries: row and column indexes of the elements of G that are set
 		"""
 
 		gI, gJ, gV = [], [], []
@@ -2657,7 +2977,7 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 		G = np.zeros((len(row_name_to_index), len(col_name_to_index)), np.float64)
 		G[gI, gJ] = gV
 
-		return G, row_name_to_index, col_name_to_index
+		return G, row_name_to_index, col_name_to_index, (gI, gJ)
 
 	def build_matrix_Z(sim_data, col_name_to_index):
 		"""
@@ -2836,6 +3156,7 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 		- fixedTFIdxs: Indexes of columns that correspond to fixed TFs in H and pInit
 		- pPromoterBoundIdxs: Dictionary of indexes to pInit.
 		- H_col_name_to_index: Dict[str, int] of column names of H to column index
+		- H_entries: row and column indexes of the elements of H that are set
 		"""
 
 		rDict = dict([(col_name, value) for col_name, value in zip(col_name_to_index, r)])
@@ -2945,7 +3266,7 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 
 		fixedTFIdxs = np.array(fixedTFIdxs, dtype=int)
 
-		return H, pInit, pAlphaIdxs, pNotAlphaIdxs, fixedTFIdxs, pPromoterBoundIdxs, H_col_name_to_index
+		return H, pInit, pAlphaIdxs, pNotAlphaIdxs, fixedTFIdxs, pPromoterBoundIdxs, H_col_name_to_index, (hI, hJ)
 
 	def build_matrix_pdiff(sim_data, H_col_name_to_index):
 		"""
@@ -3076,34 +3397,47 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 	# Build vector of existing fit transcription probabilities
 	k, kInfo = build_vector_k(sim_data, cell_specs)
 
+	# The optimization problems for R and P are built on the first iteration
+	# with the elements of G and H as parameters. Later iterations only
+	# update the parameter values and reuse the canonicalized problems.
+	prob_r = None
+	prob_p = None
+
 	# Repeat for a fixed maximum number of iterations
 	for i in range(PROMOTER_MAX_ITERATIONS):
+		iteration_start = time.time()
+
 		# Build matrices used in optimizing R
-		G, G_row_name_to_index, G_col_name_to_index = build_matrix_G(sim_data, pPromoterBound)
-		Z = build_matrix_Z(sim_data, G_col_name_to_index)
-		T = build_matrix_T(sim_data, G_col_name_to_index)
-
-		# Optimize R such that transcription initiation probabilities computed
-		# from existing values of P in matrix G are close to fit values.
-		R = Variable(G.shape[1])  # Vector of r's and alpha's
-
-		# Objective: minimize difference between k and G @ R
-		objective_r = Minimize(
-			norm(G @ (PROMOTER_SCALING * R) - PROMOTER_SCALING * k, PROMOTER_NORM_TYPE))
-
-		# Optimization constraints
-		# 1) 0 <= Z @ R <= 1 : Assuming P = 1 for all TFs, all possible
-		# combinations of TFs should yield a valid transcription probability
-		# value between zero and one.
-		# 2) T @ R >= 0 : Values of r for positive regulation should be positive,
-		# and values of r for negative regulation should be negative.
-		constraint_r = [
-			0 <= Z @ (PROMOTER_SCALING * R), Z @ (PROMOTER_SCALING * R) <= PROMOTER_SCALING,
-			T @ (PROMOTER_SCALING * R) >= 0]
-
-		# Solve optimization problem
-		prob_r = Problem(objective_r, constraint_r)
-		prob_r.solve(solver='ECOS', max_iters=1000)
+		G, G_row_name_to_index, G_col_name_to_index, G_set = build_matrix_G(sim_data, pPromoterBound)
+
+		if prob_r is None:
+			Z = build_matrix_Z(sim_data, G_col_name_to_index)
+			T = build_matrix_T(sim_data, G_col_name_to_index)
+
+			# Optimize R such that transcription initiation probabilities computed
+			# from existing values of P in matrix G are close to fit values.
+			R = Variable(G.shape[1])  # Vector of r's and alpha's
+			GR, G_values, G_entries = parametrized_matrix_product(G_set, G.shape, R)
+
+			# Objective: minimize difference between k and G @ R
+			objective_r = Minimize(
+				norm(PROMOTER_SCALING * GR - PROMOTER_SCALING * k, PROMOTER_NORM_TYPE))
+
+			# Optimization constraints
+			# 1) 0 <= Z @ R <= 1 : Assuming P = 1 for all TFs, all possible
+			# combinations of TFs should yield a valid transcription probability
+			# value between zero and one.
+			# 2) T @ R >= 0 : Values of r for positive regulation should be positive,
+			# and values of r for negative regulation should be negative.
+			constraint_r = [
+				0 <= Z @ (PROMOTER_SCALING * R), Z @ (PROMOTER_SCALING * R) <= PROMOTER_SCALING,
+				T @ (PROMOTER_SCALING * R) >= 0]
+
+			prob_r = Problem(objective_r, constraint_r)
+
+		# Solve optimization problem, starting from the previous optimum
+		G_values.value = G[G_entries]
+		prob_r.solve(solver='ECOS', max_iters=1000, warm_start=True)
 
 		if prob_r.status == 'optimal_inaccurate':
 			raise RuntimeError('Solver found an optimum that is inaccurate.'
@@ -3115,54 +3449,57 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 		r = np.array(R.value).reshape(-1)
 		r[np.abs(r) < ECOS_0_TOLERANCE] = 0  # Adjust to 0 for small values from solver tolerance
 
-		# Use optimal value of R to construct matrix H and vector Pdiff
-		H, pInit, pAlphaIdxs, pNotAlphaIdxs, fixedTFIdxs, pPromoterBoundIdxs, H_col_name_to_index = build_matrix_H(
+		# Use optimal value of R to construct matrix H
+		H, pInit, pAlphaIdxs, pNotAlphaIdxs, fixedTFIdxs, pPromoterBoundIdxs, H_col_name_to_index, H_set = build_matrix_H(
 			sim_data, G_col_name_to_index, pPromoterBound, r, fixedTFs, cell_specs)
-		pdiff = build_matrix_pdiff(sim_data, H_col_name_to_index)
 
-		# On first iteration, save the value of the initial p
-		if i == 0:
+		if prob_p is None:
+			# On first iteration, save the value of the initial p
 			pInit0 = pInit.copy()
+			pdiff = build_matrix_pdiff(sim_data, H_col_name_to_index)
+
+			# Optimize P such that the transcription probabilities computed from
+			# current values of R in matrix H are close to fit values.
+			P = Variable(H.shape[1])
+			HP, H_values, H_entries = parametrized_matrix_product(H_set, H.shape, P)
+
+			# Construct a boolean vector that marks column indexes of H
+			# corresponding to alpha's and fixed TFs
+			D = np.zeros(H.shape[1])
+			D[pAlphaIdxs] = 1
+			D[fixedTFIdxs] = 1
+
+			# Mask initial p with boolean vector constructed above
+			Drhs = pInit0.copy()
+			Drhs[D != 1] = 0
+
+			# Objective: minimize difference between k (fit RNAP initiation
+			# probabilities) and H @ P (computed initiation probabilities) while
+			# also minimizing deviation of P from the original value calculated
+			# from mean TF and ligand concentrations
+			objective_p = Minimize(
+				norm(PROMOTER_SCALING * HP - PROMOTER_SCALING * k, PROMOTER_NORM_TYPE)
+				+ PROMOTER_REG_COEFF * norm(P - pInit0, PROMOTER_NORM_TYPE))
+
+			# Constraints
+			# 1) 0 <= P <= 1 : All DNA-bound probabilities should be between zero
+			# and one.
+			# 2) D @ P == Drhs : Values of P that correspond to alpha's and fixed TFs
+			# should not change.
+			# 3) pdiff @ P >= PROMOTER_PDIFF_THRESHOLD : There must be at least a
+			# certain difference between binding probabilities of a TF in conditions
+			# TF__active and TF__inactive
+			constraint_p = [
+				0 <= PROMOTER_SCALING * P, PROMOTER_SCALING * P <= PROMOTER_SCALING,
+				np.diag(D) @ (PROMOTER_SCALING * P) == PROMOTER_SCALING * Drhs,
+				pdiff @ (PROMOTER_SCALING * P) >= PROMOTER_SCALING * PROMOTER_PDIFF_THRESHOLD,
+				]
 
-		# Optimize P such that the transcription probabilities computed from
-		# current values of R in matrix H are close to fit values.
-		P = Variable(H.shape[1])
-
-		# Construct a boolean vector that marks column indexes of H
-		# corresponding to alpha's and fixed TFs
-		D = np.zeros(H.shape[1])
-		D[pAlphaIdxs] = 1
-		D[fixedTFIdxs] = 1
-
-		# Mask initial p with boolean vector constructed above
-		Drhs = pInit0.copy()
-		Drhs[D != 1] = 0
-
-		# Objective: minimize difference between k (fit RNAP initiation
-		# probabilities) and H @ P (computed initiation probabilities) while
-		# also minimizing deviation of P from the original value calculated
-		# from mean TF and ligand concentrations
-		objective_p = Minimize(
-			norm(H @ (PROMOTER_SCALING * P) - PROMOTER_SCALING * k, PROMOTER_NORM_TYPE)
-			+ PROMOTER_REG_COEFF * norm(P - pInit0, PROMOTER_NORM_TYPE))
-
-		# Constraints
-		# 1) 0 <= P <= 1 : All DNA-bound probabilities should be between zero
-		# and one.
-		# 2) D @ P == Drhs : Values of P that correspond to alpha's and fixed TFs
-		# should not change.
-		# 3) pdiff @ P >= PROMOTER_PDIFF_THRESHOLD : There must be at least a
-		# certain difference between binding probabilities of a TF in conditions
-		# TF__active and TF__inactive
-		constraint_p = [
-			0 <= PROMOTER_SCALING * P, PROMOTER_SCALING * P <= PROMOTER_SCALING,
-			np.diag(D) @ (PROMOTER_SCALING * P) == PROMOTER_SCALING * Drhs,
-			pdiff @ (PROMOTER_SCALING * P) >= PROMOTER_SCALING * PROMOTER_PDIFF_THRESHOLD,
-			]
-
-		# Solve optimization problem
-		prob_p = Problem(objective_p, constraint_p)
-		prob_p.solve(solver='ECOS')
+			prob_p = Problem(objective_p, constraint_p)
+
+		# Solve optimization problem, starting from the previous optimum
+		H_values.value = H[H_entries]
+		prob_p.solve(solver='ECOS', warm_start=True)
 
 		if prob_p.status == 'optimal_inaccurate':
 			raise RuntimeError('Solver found an optimum that is inaccurate.'
@@ -3180,11 +3517,20 @@ def fitPromoterBoundProbability(sim_data, cell_specs):
 		# Update pPromoterBound with fit p
 		fromArray(p, pPromoterBound, pPromoterBoundIdxs)
 
+		fit_norm = np.linalg.norm(np.dot(H, p) - k, PROMOTER_NORM_TYPE)
+		if VERBOSE > 0:
+			residual = max(np.max(constraint.violation(), initial=0)
+				for constraint in constraint_r + constraint_p)
+			print(f'Promoter fitting iteration {i}: r objective {prob_r.value:.6g},'
+				f' p objective {prob_p.value:.6g}, fit norm {fit_norm:.6g},'
+				f' constraint residual {residual:.2g},'
+				f' {time.time() - iteration_start:.1f} s')
+
 		# Break from loop if parameters have converged
-		if np.abs(np.linalg.norm(np.dot(H, p) - k, PROMOTER_NORM_TYPE) - lastNorm) < PROMOTER_CONVERGENCE_THRESHOLD:
+		if np.abs(fit_norm - lastNorm) < PROMOTER_CONVERGENCE_THRESHOLD:
 			break
 		else:
-			lastNorm = np.linalg.norm(np.dot(H, p) - k, PROMOTER_NORM_TYPE)
+			lastNorm = fit_norm
 
 	# Update sim_data with fit bound probabilities and RNAP initiation
 	# probabilities computed from these bound probabilities
@@ -3569,8 +3915,8 @@ def setKmCooperativeEndoRNonLinearRNAdecay(sim_data, bulkContainer):
 		sim_data.process.transcription.mature_rna_data['id']
 	))
 	degradation_rates = (1 / units.s) * np.concatenate((
-		sim_data.process.transcription.rna_data['deg_rate'].asNumber(1/units.s),
-		sim_data.process.transcription.mature_rna_data['deg_rate'].asNumber(1/units.s)
+		sim_data.process.transcription.rna_data.as_number('deg_rate', 1/units.s),
+		sim_data.process.transcription.mature_rna_data.as_number('deg_rate', 1/units.s)
 		))
 	endoRNase_idx = bulk_name_to_idx(sim_data.process.rna_decay.endoRNase_ids,
 		bulkContainer['id'])
@@ -3,18 +3,29 @@ KnowledgeBase for Ecoli
 Whole-cell knowledge base for Ecoli. Contains all raw, un-fit data processed
 directly from CSV flat files.
 
+Parsed flat files are cached in CACHE_DIR, keyed by a hash of each file and
+of the parsing code, so they are only parsed again after they change.
 """
+import functools
+import hashlib
 import io
 import os
 import json
-from typing import List, Dict
+import pickle
+from typing import Any, Callable, List, Dict
 import warnings
 
+from reconstruction import spreadsheets
 from reconstruction.spreadsheets import read_tsv
 from wholecell.io import tsv
+from wholecell.utils import filepath
 from wholecell.utils import units  # used by eval()
 
 FLAT_DIR = os.path.join(os.path.dirname(__file__), "flat")
+CACHE_DIR = os.path.join(filepath.ROOT_PATH, 'cache')
+
+# Code that parses the flat files. Changes to it invalidate cached files.
+PARSER_PATHS = [spreadsheets.__file__, tsv.__file__, units.__file__]
 LIST_OF_DICT_FILENAMES = [
 	"amino_acid_export_kms.tsv",
 	"amino_acid_export_kms_removed.tsv",
@@ -157,6 +168,47 @@ ADDED_DATA = {
 	}
 
 
+@functools.lru_cache(maxsize=None)
+def _parser_checksum():
+	# type: () -> str
+	hasher = hashlib.sha256()
+	for path in PARSER_PATHS:
+		with open(path, 'rb') as f:
+			hasher.update(f.read())
+	return hasher.hexdigest()
+
+
+def load_cached(load, file_path, cache_dir=CACHE_DIR):
+	# type: (Callable[[str], Any], str, str) -> Any
+	"""
+	Return load(file_path), caching the result in cache_dir under a key that
+	hashes the contents of the file, the name of load and the parsing code.
+	The cache is not used if cache_dir is None.
+	"""
+	if cache_dir is None:
+		return load(file_path)
+
+	hasher = hashlib.sha256()
+	hasher.update(_parser_checksum().encode())
+	hasher.update(load.__qualname__.encode())
+	with open(file_path, 'rb') as f:
+		hasher.update(f.read())
+	cache_path = os.path.join(
+		cache_dir, f'kb-raw-{hasher.hexdigest()}.cPickle')
+
+	if os.path.exists(cache_path):
+		with open(cache_path, 'rb') as f:
+			return pickle.load(f)
+
+	data = load(file_path)
+	filepath.makedirs(cache_dir)
+	tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+	with open(tmp_path, 'wb') as f:
+		pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+	os.replace(tmp_path, cache_path)
+	return data
+
+
 class DataStore(object):
 	def __init__(self):
 		pass
@@ -164,9 +216,10 @@ class DataStore(object):
 class KnowledgeBaseEcoli(object):
 	""" KnowledgeBaseEcoli """
 
-	def __init__(self, operons_on: bool, remove_rrna_operons: bool, remove_rrff: bool, new_genes_option: str="off"):
+	def __init__(self, operons_on: bool, remove_rrna_operons: bool, remove_rrff: bool, new_genes_option: str="off", use_cache: bool=True):
 		self.operons_on = operons_on
 		self.new_genes_option = new_genes_option
+		self._cache_dir = CACHE_DIR if use_cache else None
 
 		if not operons_on and remove_rrna_operons:
 			warnings.warn("Setting the 'remove_rrna_operons' option to 'True'"
@@ -250,7 +303,8 @@ class KnowledgeBaseEcoli(object):
 		for filename in LIST_OF_PARAMETER_FILENAMES:
 			self._load_parameters(os.path.join(FLAT_DIR, filename))
 
-		self.genome_sequence = self._load_sequence(os.path.join(FLAT_DIR, SEQUENCE_FILE))
+		self.genome_sequence = load_cached(self._load_sequence,
+			os.path.join(FLAT_DIR, SEQUENCE_FILE), self._cache_dir)
 
 		self._prune_data()
 
@@ -286,10 +340,11 @@ class KnowledgeBaseEcoli(object):
 		attr_name = file_name.split(os.path.sep)[-1].split(".")[0]
 		setattr(path, attr_name, [])
 
-		rows = read_tsv(file_name)
+		rows = load_cached(read_tsv, file_name, self._cache_dir)
 		setattr(path, attr_name, rows)
 
-	def _load_sequence(self, file_path):
+	@staticmethod
+	def _load_sequence(file_path):
 		from Bio import SeqIO
 
 		with open(file_path, "r") as handle:
@@ -298,6 +353,11 @@ class KnowledgeBaseEcoli(object):
 
 	def _load_parameters(self, file_path):
 		attr_name = file_path.split(os.path.sep)[-1].split(".")[0]
+		param_dict = load_cached(self._read_parameters, file_path, self._cache_dir)
+		setattr(self, attr_name, param_dict)
+
+	@staticmethod
+	def _read_parameters(file_path):
 		param_dict = {}
 
 		with io.open(file_path, "rb") as csvfile:
@@ -314,7 +374,7 @@ class KnowledgeBaseEcoli(object):
 					value = value * unit
 				param_dict[row['name']] = value
 
-		setattr(self, attr_name, param_dict)
+		return param_dict
 
 	def _prune_data(self):
 		"""
@@ -336,13 +396,10 @@ class KnowledgeBaseEcoli(object):
 
 			# Remove any matching rows
 			data = getattr(self, data_attr)
-			n_entries = len(data)
-			removed_ids = set()
-			for i, row in enumerate(data[::-1]):
-				checked_id = tuple([row[col] for col in removed_cols])
-				if checked_id in ids_to_remove:
-					data.pop(n_entries - i - 1)
-					removed_ids.add(checked_id)
+			checked_ids = [tuple([row[col] for col in removed_cols]) for row in data]
+			removed_ids = ids_to_remove.intersection(checked_ids)
+			data[:] = [row for row, checked_id in zip(data, checked_ids)
+				if checked_id not in removed_ids]
 
 			# Print warnings for entries that were marked to be removed that
 			# does not exist in the original data file. Fold changes are
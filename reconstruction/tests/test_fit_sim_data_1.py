@@ -2,16 +2,95 @@
 Test fitkb1.py
 """
 
+import shutil
+import tempfile
+import types
 import unittest
+from unittest import mock
 
+from reconstruction.ecoli import fit_sim_data_1
 from reconstruction.ecoli.fit_sim_data_1 import (totalCountFromMassesAndRatios,
 	proteinDistributionFrommRNA, mRNADistributionFromProtein,
 	calculateMinPolymerizingEnzymeByProductDistribution,
-	netLossRateFromDilutionAndDegradationProtein)
+	netLossRateFromDilutionAndDegradationProtein, save_state, step_cache_key,
+	CachedState, apply_updates, parametrized_matrix_product,
+	bulkDistributionSample, bulkDistributionsFromSamples,
+	conditionBulkDistributionSample)
 
+from cvxpy import Variable
 import numpy as np
 from wholecell.utils import units
 
+SCALE = 2
+calls = []
+
+def scaled(value):
+	return SCALE * value
+
+@save_state
+def first_step(sim_data, cell_specs, value=1, **kwargs):
+	calls.append('first_step')
+	return sim_data + [scaled(value)], cell_specs
+
+@save_state
+def second_step(sim_data, cell_specs, **kwargs):
+	calls.append('second_step')
+	return sim_data + [0], cell_specs
+
+class MockComplexation(object):
+	# A + B -> AB and A + C -> AC compete for A, so outcomes depend on the seed
+	rates = np.array([1.0, 1.0])
+
+	def stoich_matrix(self):
+		return np.array([[-1, -1], [-1, 0], [0, -1], [1, 0], [0, 1]])
+
+class MockEquilibrium(object):
+	# AB -> M with a random flux of 0 or 1
+	def stoich_matrix(self):
+		return np.array([[-1], [1]])
+
+	def fluxes_and_molecules_to_SS(self, moleculeCounts, cellVolume,
+			nAvogadro, random_state, jit=True):
+		return np.array([min(random_state.randint(0, 2), moleculeCounts[0])]), None
+
+class MockTwoComponentSystem(object):
+	def molecules_to_ss(self, moleculeCounts, cellVolume, nAvogadro):
+		return None, np.zeros(len(moleculeCounts))
+
+class MockSimData(object):
+	def __init__(self):
+		self.process = types.SimpleNamespace(
+			complexation=MockComplexation(),
+			equilibrium=MockEquilibrium(),
+			two_component_system=MockTwoComponentSystem(),
+			translation=types.SimpleNamespace(
+				monomer_data={'id': np.array(['A[c]', 'B[c]', 'C[c]'])}))
+		self.constants = types.SimpleNamespace(
+			n_avogadro=6.02214076e23 / units.mol)
+
+def bulk_distribution_inputs():
+	ids = np.array(['A[c]', 'B[c]', 'C[c]', 'AB[c]', 'AC[c]', 'M[c]'])
+	return {
+		'bulkContainer': np.array(list(zip(ids, np.zeros(len(ids), int))),
+			dtype=[('id', ids.dtype), ('count', int)]),
+		'rna_idx': np.array([], int),
+		'protein_idx': np.array([0, 1, 2]),
+		'complexation_molecules_idx': np.array([0, 1, 2, 3, 4]),
+		'equilibrium_molecules_idx': np.array([3, 5]),
+		'two_component_system_molecules_idx': np.array([5]),
+		'metabolites_idx': np.array([5]),
+		'all_molecules_idx': np.arange(len(ids)),
+		'rna_counts': np.array([]),
+		'protein_counts': np.array([50, 30, 30]),
+		'metabolite_counts': np.array([100]),
+		'cell_volume': 1e-15,
+		}
+
+def condition_update(sim_data, condition, factor):
+	if condition == 'bad':
+		raise ValueError(condition)
+	return {condition: sim_data['scale'] * factor}
+
 
 class Test_fitkb1(unittest.TestCase):
 
@@ -109,3 +188,113 @@ class Test_fitkb1(unittest.TestCase):
 			net.asNumber(1/units.min).tolist(),
 			((np.log(2) / doublingTime).asNumber(1/units.min) + degradationRates.asNumber(1/units.min)).tolist()
 			)
+
+	def test_step_cache_key(self):
+		key = step_cache_key(first_step, 'inputs', {'value': 1, 'cpus': 1})
+		self.assertEqual(key,
+			step_cache_key(first_step, 'inputs', {'value': 1, 'cpus': 4}))
+		self.assertNotEqual(key,
+			step_cache_key(first_step, 'inputs', {'value': 2}))
+		self.assertNotEqual(key,
+			step_cache_key(first_step, 'other inputs', {'value': 1}))
+
+		# Functions and constants used by the step are part of its key
+		self.assertIn('def scaled(value)', fit_sim_data_1.step_source(first_step))
+		with mock.patch(f'{__name__}.SCALE', 3):
+			self.assertNotEqual(key,
+				step_cache_key(first_step, 'inputs', {'value': 1}))
+
+	def test_cached_steps(self):
+		cache_dir = tempfile.mkdtemp()
+		try:
+			with mock.patch.object(fit_sim_data_1, 'CACHE_DIR', cache_dir):
+				def run(**kwargs):
+					fit_sim_data_1.cache_keys[:] = ['inputs']
+					state = first_step([], {}, **kwargs)
+					return second_step(*state, **kwargs)
+
+				sim_data, _ = run(value=1)
+				self.assertEqual(sim_data, [2, 0])
+				self.assertEqual(calls, ['first_step', 'second_step'])
+
+				# Cached steps are skipped without loading their state
+				sim_data, _ = run(value=1)
+				self.assertIsInstance(sim_data, CachedState)
+				self.assertEqual(sim_data.load()[0], [2, 0])
+				self.assertEqual(len(calls), 2)
+
+				# Changed options rerun the step and the steps after it
+				sim_data, _ = run(value=3)
+				self.assertEqual(sim_data, [6, 0])
+				self.assertEqual(calls[2:], ['first_step', 'second_step'])
+		finally:
+			fit_sim_data_1.cache_keys.clear()
+			shutil.rmtree(cache_dir)
+
+	def test_apply_updates(self):
+		sim_data = {'scale': 3}
+		labels = ['a', 'b', 'c']
+		args = [(label, factor) for factor, label in enumerate(labels)]
+		for cpus in (1, 2):
+			dest = {'basal': 1}
+			apply_updates(condition_update, args, labels, dest, cpus,
+				sim_data=sim_data)
+			self.assertEqual(dest, {'basal': 1, 'a': 0, 'b': 3, 'c': 6})
+			self.assertIsNone(fit_sim_data_1._shared_sim_data)
+
+		# Spawned workers (e.g. on macOS) get sim_data from the pool initializer
+		with mock.patch.object(fit_sim_data_1, 'can_fork', return_value=False):
+			dest = {}
+			apply_updates(condition_update, args, labels, dest, 2,
+				sim_data=sim_data)
+		self.assertEqual(dest, {'a': 0, 'b': 3, 'c': 6})
+
+		# Args that include sim_data are applied as is
+		dest = {}
+		apply_updates(condition_update, [(sim_data, 'a', 2)], ['a'], dest, 1)
+		self.assertEqual(dest, {'a': 6})
+
+		with self.assertRaises(RuntimeError):
+			apply_updates(condition_update, [('bad', 1), ('a', 1)], ['bad', 'a'],
+				{}, 2, sim_data=sim_data)
+
+	def test_bulk_distribution_samples(self):
+		sim_data = MockSimData()
+		inputs = bulk_distribution_inputs()
+		seeds = list(range(6))
+
+		# Samples only depend on their seed
+		samples = [bulkDistributionSample(sim_data, inputs, seed)
+			for seed in seeds]
+		for seed in reversed(seeds):
+			sample = bulkDistributionSample(sim_data, inputs, seed)
+			np.testing.assert_array_equal(sample[0], samples[seed][0])
+			np.testing.assert_array_equal(sample[1], samples[seed][1])
+		self.assertGreater(
+			len({tuple(sample[0]) for sample in samples}), 1)
+		np.testing.assert_array_equal(inputs['bulkContainer']['count'], 0)
+
+		# Serial and parallel samples are identical
+		args = [(inputs, 'basal', seed) for seed in seeds]
+		labels = ['basal seed {}'.format(seed) for seed in seeds]
+		for cpus in (1, 2):
+			dest = {}
+			apply_updates(conditionBulkDistributionSample, args, labels, dest,
+				cpus, sim_data=sim_data)
+			distributions = bulkDistributionsFromSamples(sim_data, inputs,
+				[dest['basal', seed] for seed in seeds])
+			expected = bulkDistributionsFromSamples(sim_data, inputs, samples)
+			for container, expected_container in zip(distributions, expected):
+				np.testing.assert_array_equal(container, expected_container)
+
+	def test_parametrized_matrix_product(self):
+		A = np.array([[1., 0, 2], [0, 0, 3]])
+		x = Variable(3)
+		x.value = np.array([1., 2, 3])
+
+		# Repeated entries are included once
+		product, values, entries = parametrized_matrix_product(
+			([0, 0, 1, 0], [0, 2, 2, 2]), A.shape, x)
+		for matrix in (A, 2 * A):
+			values.value = matrix[entries]
+			np.testing.assert_array_equal(product.value, matrix @ x.value)
@@ -0,0 +1,65 @@
+"""
+Test knowledge_base_raw.py
+
+	cd wcEcoli
+	pytest reconstruction/tests/test_knowledge_base_raw.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from reconstruction.ecoli import knowledge_base_raw
+from reconstruction.ecoli.knowledge_base_raw import KnowledgeBaseEcoli, load_cached
+from reconstruction.spreadsheets import read_tsv
+
+
+class Test_knowledge_base_raw(unittest.TestCase):
+
+	def setUp(self):
+		self.cache_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.cache_dir)
+
+	def test_load_cached(self):
+		parsed = []
+		def parse(path):
+			parsed.append(path)
+			return read_tsv(path)
+
+		file_path = os.path.join(knowledge_base_raw.FLAT_DIR, 'compartments.tsv')
+		rows = load_cached(parse, file_path, self.cache_dir)
+		self.assertEqual(rows, read_tsv(file_path))
+		self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+		# Cached files are not parsed again
+		self.assertEqual(load_cached(parse, file_path, self.cache_dir), rows)
+		self.assertEqual(parsed, [file_path])
+
+		# Changed files are parsed again
+		changed_path = os.path.join(self.cache_dir, 'compartments.tsv')
+		with open(file_path) as f:
+			lines = f.readlines()
+		with open(changed_path, 'w') as f:
+			f.writelines(lines[:-1])
+		self.assertEqual(load_cached(parse, changed_path, self.cache_dir),
+			rows[:-1])
+		self.assertEqual(parsed, [file_path, changed_path])
+
+	def test_prune_data(self):
+		kb = KnowledgeBaseEcoli.__new__(KnowledgeBaseEcoli)
+		kb.genes = [{'id': 'a', 'name': 1}, {'id': 'b', 'name': 2},
+			{'id': 'a', 'name': 3}, {'id': 'c', 'name': 4}]
+		kb.genes_removed = [{'id': 'a'}, {'id': 'd'}]
+		kb.removed_data = {'genes': 'genes_removed'}
+		genes = kb.genes
+
+		kb._prune_data()
+		self.assertIs(kb.genes, genes)
+		self.assertEqual(kb.genes, [{'id': 'b', 'name': 2}, {'id': 'c', 'name': 4}])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -48,6 +48,11 @@ def main():
         help='Directory to save or load intermediate sim_data and cell_specs'
         ' results from if --load-intermediate or --save-intermediates'
         ' are set.')
+    parser.add_argument('--cache', default=True,
+        action=argparse.BooleanOptionalAction,
+        help='Cache the parsed flat files and the results of each Parca step'
+        ' in the cache directory and skip steps whose inputs, options and'
+        ' code have not changed.')
     parser.add_argument('--variable-elongation-transcription', default=True,
         action=argparse.BooleanOptionalAction,
         help='Use a different elongation rate for different transcripts'
@@ -79,7 +84,8 @@ def main():
     raw_data = KnowledgeBaseEcoli(
         operons_on=args.operons,
         remove_rrna_operons=args.remove_rrna_operons,
-        remove_rrff=args.remove_rrff)
+        remove_rrff=args.remove_rrff,
+        use_cache=args.cache)
     print(f"{time.ctime()}: Saving raw_data")
     with open(raw_data_file, 'wb') as f:
         pickle.dump(raw_data, f)
@@ -93,7 +99,8 @@ def main():
         variable_elongation_transcription=args.variable_elongation_transcription,
         variable_elongation_translation=args.variable_elongation_translation,
         disable_ribosome_capacity_fitting=(not args.ribosome_fitting),
-        disable_rnapoly_capacity_fitting=(not args.rnapoly_fitting)
+        disable_rnapoly_capacity_fitting=(not args.rnapoly_fitting),
+        use_cache=args.cache,
     )
     print(f"{time.ctime()}: Saving sim_data")
     with open(sim_data_file, 'wb') as f:
@@ -0,0 +1,94 @@
+"""
+Test expression_kernel.py
+
+	cd wcEcoli
+	pytest wholecell/tests/utils/test_expression_kernel.py
+"""
+
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from wholecell.utils.expression_kernel import ExpressionKernel
+
+
+SATURATIONS = ('[[s[0]/(s[0] + 0.5), 2/(s[1] + 2)], [0, 1], '
+	'[s[1]**2/(s[1]**2 + 3.0), s[2]/(s[2] + 0.1), -0.5*s[0] + 1], '
+	'[s[2]/(s[2] + 0.25)]]')
+ENZYMES = '[e[0], e[2], e[1], e[0]]'
+
+
+class Test_expression_kernel(unittest.TestCase):
+
+	def setUp(self):
+		self.cache_dir = tempfile.mkdtemp()
+		self.s = np.array([0.2, 1.5, 3.0])
+
+	def tearDown(self):
+		shutil.rmtree(self.cache_dir)
+
+	def expected_min_mean_max(self, s):
+		return np.array([
+			[min(v), sum(v) / len(v), max(v)]
+			for v in eval('lambda s: {}'.format(SATURATIONS))(s)
+			])
+
+	def test_min_mean_max(self):
+		kernel = ExpressionKernel(SATURATIONS, 's', self.cache_dir)
+		npt.assert_allclose(
+			kernel.min_mean_max(self.s), self.expected_min_mean_max(self.s),
+			rtol=1e-15)
+
+		# Division by zero follows NumPy semantics
+		with np.errstate(divide='ignore', invalid='ignore'):
+			kernel = ExpressionKernel('[[1/s[0], s[1]]]', 's', None)
+			npt.assert_array_equal(
+				kernel.min_mean_max(np.array([0., 1.])), [[1, np.inf, np.inf]])
+
+	def test_flat_list(self):
+		kernel = ExpressionKernel(ENZYMES, 'e', self.cache_dir)
+		e = np.array([1., 2., 3.])
+		npt.assert_array_equal(kernel(e), [1., 3., 2., 1.])
+
+	def test_cache(self):
+		kernel = ExpressionKernel(SATURATIONS, 's', self.cache_dir)
+		cached = ExpressionKernel(SATURATIONS, 's', self.cache_dir)
+		npt.assert_array_equal(
+			cached.min_mean_max(self.s), kernel.min_mean_max(self.s))
+
+		unpickled = pickle.loads(pickle.dumps(kernel))
+		npt.assert_array_equal(
+			unpickled.min_mean_max(self.s), kernel.min_mean_max(self.s))
+
+	def test_kinetic_constraints(self):
+		from reconstruction.ecoli.dataclasses.process.metabolism import Metabolism
+
+		constraints = {
+			'RXN-1': {'enzyme': 'ENZ-B[c]', 'kcat': [1.0, 3.0],
+				'saturation': ['"GLC[p]" / ("GLC[p]" + 0.02)', '1']},
+			'RXN-2': {'enzyme': 'ENZ-A[c]', 'kcat': [2.0],
+				'saturation': ['1']},
+			'RXN-3': {'enzyme': 'ENZ-B[c]', 'kcat': [0.5],
+				'saturation': ['"ATP[c]"**2 / ("ATP[c]"**2 + 1e-4)',
+					'1 / (1 + "GLC[p]" / 5)']},
+			}
+		_, _, _, _, saturations, enzymes, _ = Metabolism._lambdify_constraints(
+			constraints)
+		s = np.array([0.01, 0.3])
+		e = np.array([2.0, 7.0])
+		kernel = ExpressionKernel(saturations, 's', self.cache_dir)
+		npt.assert_allclose(kernel.min_mean_max(s), np.array([
+			[min(v), sum(v) / len(v), max(v)]
+			for v in eval('lambda s: {}'.format(saturations))(s)
+			]), rtol=1e-15)
+		kernel = ExpressionKernel(enzymes, 'e', self.cache_dir)
+		npt.assert_array_equal(
+			kernel(e), eval('lambda e: {}'.format(enzymes))(e))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -2,9 +2,12 @@
 Test unit_struct_array.py
 """
 
+from wholecell.utils import unit_struct_array
 from wholecell.utils.unit_struct_array import UnitStructArray
-from wholecell.utils.units import g, mol
+from wholecell.utils.units import fg, g, mol
 import numpy as np
+import numpy.testing as npt
+import pickle
 
 import unittest
 
@@ -111,3 +114,46 @@ class Test_unit_struct_array(unittest.TestCase):
 			'Units do not match! Quantity has units your input does not!\n',
 		):
 			self.us_array['mass'] = [1, 2, 3]
+
+	def test_as_number(self):
+		self.us_array['mass'] = g * np.array([1., 2., 3.])
+		mass = self.us_array.as_number('mass', g)
+		npt.assert_array_equal(mass, self.us_array['mass'].asNumber(g))
+		npt.assert_array_equal(
+			self.us_array.as_number('mass'), self.us_array['mass'].asNumber())
+		npt.assert_array_equal(
+			self.us_array.as_number('mass', fg),
+			self.us_array['mass'].asNumber(fg))
+		npt.assert_array_equal(
+			self.us_array.as_number('id'), self.struct_array['id'])
+
+		# Values in the stored unit are read-only views of the field
+		self.assertTrue(np.shares_memory(mass, self.struct_array))
+		with self.assertRaises(ValueError):
+			mass[0] = 5.
+		self.us_array['mass'] = fg * np.array([4., 5., 6.])
+		npt.assert_array_equal(mass, [4., 5., 6.])
+		npt.assert_array_equal(
+			self.us_array.as_number('mass', g),
+			self.us_array['mass'].asNumber(g))
+
+		with self.assertRaisesRegex(Exception, 'Field is unitless!\n'):
+			self.us_array.as_number('id', g)
+		with self.assertRaises(Exception):
+			self.us_array.as_number('mass', mol)
+
+		unpickled = pickle.loads(pickle.dumps(self.us_array))
+		self.assertNotIn('_unit_checks', unpickled.__dict__)
+		npt.assert_array_equal(unpickled.as_number('mass', fg), [4., 5., 6.])
+
+	def test_as_number_debug(self):
+		self.us_array['mass'] = g * np.array([1., 2., 3.])
+		unit_struct_array.DEBUG_UNITS = True
+		try:
+			mass = self.us_array.as_number('mass', g)
+			self.assertFalse(np.shares_memory(mass, self.struct_array))
+			npt.assert_array_equal(mass, [1., 2., 3.])
+			with self.assertRaises(Exception):
+				self.us_array.as_number('mass', mol)
+		finally:
+			unit_struct_array.DEBUG_UNITS = False
@@ -0,0 +1,212 @@
+"""
+Vectorized evaluation of many small generated expressions.
+
+Sympy-generated code such as the kinetic constraint saturation terms of
+Metabolism is a long list of short expressions of one array, e.g.
+'[[s[0] / (0.5 + s[0]), 2 / (2 + s[1])], [0, 1]]'. Evaluating it as one
+Python expression builds nested lists element by element.
+
+ExpressionKernel instead groups the expressions by their structure with the
+array indices and numeric constants taken out, e.g. 's[i] / (c + s[i])'.
+Each group is then evaluated for all of its expressions at once with NumPy
+by gathering the indices and constants of the group as arrays. The generated
+code and arrays are cached on disk, keyed by a hash of the expressions, so
+later simulations skip parsing.
+"""
+
+import ast
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from wholecell.utils import filepath
+
+
+#: Directory of cached kernels (deleted by `make clean`)
+CACHE_DIR = os.path.join(filepath.ROOT_PATH, 'cache')
+
+# Change this to invalidate cached kernels if the generated code changes
+KERNEL_VERSION = 1
+
+
+class _Normalizer(ast.NodeTransformer):
+	"""Replace the indices into an array and the numeric constants of an
+	expression with numbered names, recording their values."""
+
+	def __init__(self, variable):
+		self.variable = variable
+		self.indices = []  # type: List[int]
+		self.constants = []  # type: List[float]
+
+	def visit_Subscript(self, node):
+		index = node.slice
+		if (isinstance(node.value, ast.Name) and node.value.id == self.variable
+				and isinstance(index, ast.Constant)
+				and isinstance(index.value, int)):
+			self.indices.append(index.value)
+			return ast.Name(id='_x{}'.format(len(self.indices) - 1), ctx=ast.Load())
+		return self.generic_visit(node)
+
+	def visit_Constant(self, node):
+		if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+			self.constants.append(node.value)
+			return ast.Name(id='_c{}'.format(len(self.constants) - 1), ctx=ast.Load())
+		return node
+
+
+def _flatten(source):
+	# type: (str) -> Tuple[List[ast.expr], np.ndarray]
+	"""Parse a list, or a list of lists, of expressions into a flat list of
+	expressions and the offset of each group of expressions in it."""
+	tree = ast.parse(source, mode='eval').body
+	if not isinstance(tree, ast.List):
+		raise ValueError('Expected a list of expressions.')
+	expressions = []
+	offsets = []
+	for element in tree.elts:
+		offsets.append(len(expressions))
+		if isinstance(element, ast.List):
+			if not element.elts:
+				raise ValueError('Groups of expressions cannot be empty.')
+			expressions.extend(element.elts)
+		else:
+			expressions.append(element)
+	return expressions, np.array(offsets, dtype=np.int64)
+
+
+def build_kernel(source, variable):
+	# type: (str, str) -> Tuple[str, Dict[str, np.ndarray]]
+	"""Generate the code and arrays of a kernel for the expressions in
+	source (see ExpressionKernel)."""
+	expressions, offsets = _flatten(source)
+
+	templates = {}  # type: Dict[str, Tuple[ast.expr, List[int], List[List[int]], List[List[float]]]]
+	for position, expression in enumerate(expressions):
+		normalizer = _Normalizer(variable)
+		template = normalizer.visit(expression)
+		key = ast.dump(template)
+		if key not in templates:
+			templates[key] = (template, [], [], [])
+		_, positions, indices, constants = templates[key]
+		positions.append(position)
+		indices.append(normalizer.indices)
+		constants.append(normalizer.constants)
+
+	arrays = {'offsets': offsets, 'size': np.array(len(expressions))}
+	lines = ['def evaluate({}, out):'.format(variable)]
+	for number, (template, positions, indices, constants) in enumerate(
+			templates.values()):
+		names = {}
+		for slot, values in enumerate(zip(*indices)):
+			name = '_t{}_x{}'.format(number, slot)
+			arrays[name] = np.array(values, dtype=np.int64)
+			names['_x{}'.format(slot)] = '{}[{}]'.format(variable, name)
+		for slot, values in enumerate(zip(*constants)):
+			name = '_t{}_c{}'.format(number, slot)
+			arrays[name] = np.array(values, dtype=np.float64)
+			names['_c{}'.format(slot)] = name
+
+		class Substitute(ast.NodeTransformer):
+			def visit_Name(self, node):
+				if node.id in names:
+					return ast.parse(names[node.id], mode='eval').body
+				return node
+
+		expression = ast.unparse(Substitute().visit(template))
+		positions_name = '_t{}'.format(number)
+		arrays[positions_name] = np.array(positions, dtype=np.int64)
+		lines.append('\tout[{}] = {}'.format(positions_name, expression))
+	lines.append('\treturn out')
+
+	return '\n'.join(lines) + '\n', arrays
+
+
+class ExpressionKernel(object):
+	"""
+	Evaluate a list of expressions of one array, e.g. '[e[0], e[2]]', or a
+	list of groups of expressions, e.g. '[[s[0] / (1 + s[0]), 1], [0, 1]]',
+	with vectorized NumPy operations.
+
+	The expressions may use arithmetic operators, numeric constants and
+	constant indices into the array. Results follow NumPy semantics, e.g.
+	division by zero gives inf instead of raising.
+
+	Kernels can be pickled. They are rebuilt from the disk cache on
+	unpickling.
+
+	Args:
+		source: str representation of the list of expressions
+		variable: name of the array in the expressions
+		cache_dir: directory to cache the generated kernel in, or None to
+			not cache it
+	"""
+
+	def __init__(self, source, variable, cache_dir=CACHE_DIR):
+		# type: (str, str, str) -> None
+		self.source = source
+		self.variable = variable
+		self.cache_dir = cache_dir
+		self._load()
+
+	def _load(self):
+		checksum = hashlib.sha256('{}\n{}\n{}'.format(
+			KERNEL_VERSION, self.variable, self.source).encode()).hexdigest()
+		cache_path = None
+		arrays = None
+		if self.cache_dir is not None:
+			cache_path = os.path.join(
+				self.cache_dir, 'expression-kernel-{}.npz'.format(checksum))
+			if os.path.exists(cache_path):
+				with np.load(cache_path) as cached:
+					arrays = {key: cached[key] for key in cached.files}
+				code = str(arrays.pop('code'))
+
+		if arrays is None:
+			code, arrays = build_kernel(self.source, self.variable)
+			if cache_path is not None:
+				filepath.makedirs(self.cache_dir)
+				tmp_path = cache_path + '.tmp.{}.npz'.format(os.getpid())
+				np.savez(tmp_path, code=np.array(code), **arrays)
+				os.replace(tmp_path, cache_path)
+
+		self.offsets = arrays.pop('offsets')
+		self.size = int(arrays.pop('size'))
+		self.counts = np.diff(np.append(self.offsets, self.size))
+		namespace = dict(arrays, np=np)
+		exec(compile(code, '<expression kernel {}>'.format(checksum[:12]), 'exec'),
+			namespace)
+		self._evaluate = namespace['evaluate']
+
+	def __getstate__(self):
+		return {'source': self.source, 'variable': self.variable,
+			'cache_dir': self.cache_dir}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._load()
+
+	def values(self, x):
+		# type: (np.ndarray) -> np.ndarray
+		"""Values of all expressions, flattened across groups."""
+		return self._evaluate(np.asarray(x), np.empty(self.size))
+
+	def __call__(self, x):
+		# type: (np.ndarray) -> np.ndarray
+		"""Value of the first expression of each group, e.g. of each
+		expression if the source is a flat list."""
+		return self.values(x)[self.offsets]
+
+	def min_mean_max(self, x):
+		# type: (np.ndarray) -> np.ndarray
+		"""(n groups, 3) min, mean and max value of the expressions in each
+		group."""
+		if len(self.offsets) == 0:
+			return np.zeros((0, 3))
+		values = self.values(x)
+		return np.column_stack((
+			np.minimum.reduceat(values, self.offsets),
+			np.add.reduceat(values, self.offsets) / self.counts,
+			np.maximum.reduceat(values, self.offsets),
+			))
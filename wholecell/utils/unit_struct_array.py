@@ -7,14 +7,25 @@ being used while loading constants.
 TODO: Unum is a defunct project. Its source repo is no longer online. Either
 switch to a newer package like Pint or copy and improve the Unum source code
 from its Python package.
+
+UnitStructArray.as_number() is the fast path for code that only wants the
+numbers of a field: units are checked with Unum the first time a field is
+read in a unit and later reads in the field's own unit return a read-only
+view of the field. Set the environment variable DEBUG_UNITS=1 to check
+units with Unum on every read instead.
 """
 
+import os
+
 import numpy as np
 from typing import Dict, Optional
 import unum
 
 from wholecell.utils import units as units_pkg
 
+#: Check units with Unum on every call to UnitStructArray.as_number()
+DEBUG_UNITS = bool(int(os.environ.get('DEBUG_UNITS', '0')))
+
 class UnitStructArray(object):
 	"""Wraps Numpy structured arrays using Unum units. Will assure that correct
 	units are being used while loading constants.
@@ -47,6 +58,59 @@ class UnitStructArray(object):
 		else:
 			return self.units[fieldname] * self.struct_array[fieldname]
 
+	def as_number(self, fieldname, unit=None):
+		"""Values of a field as a plain array, equal to
+		self[fieldname].asNumber(unit) for fields with units and to
+		self[fieldname] for unitless fields (unit must then be None).
+
+		The units are checked the first time the field is read in a unit. If
+		the field is stored in that unit, the result is a read-only view of
+		the field (cast to float like asNumber() if a unit is given), so
+		changes to the field show up in it. Other units are converted with
+		Unum on every call.
+		"""
+		field_unit = self.units[fieldname]
+		if DEBUG_UNITS:
+			if field_unit is None and unit is not None:
+				raise Exception('Field is unitless!\n')
+			field = self._field(fieldname)
+			return field if field_unit is None else field.asNumber(unit)
+
+		key = (fieldname, None if unit is None else
+			(unit._value, tuple(sorted(unit._unit.items()))))
+		checks = self.__dict__.setdefault('_unit_checks', {})
+		check = checks.get(key)
+		if check is None or check[0] is not field_unit:
+			check = (field_unit, self._is_stored_unit(fieldname, unit))
+			checks[key] = check
+
+		if not check[1]:
+			return self._field(fieldname).asNumber(unit)
+		values = self.struct_array[fieldname]
+		if unit is not None and values.dtype.kind != 'f':
+			values = values.astype(np.float64)
+		values.flags.writeable = False
+		return values
+
+	def _is_stored_unit(self, fieldname, unit):
+		"""Whether reading a field in unit (or in normalized units if None)
+		gives the stored values. Raises if the units are not compatible."""
+		field_unit = self.units[fieldname]
+		if field_unit is None:
+			if unit is not None:
+				raise Exception('Field is unitless!\n')
+			return True
+		if not units_pkg.hasUnit(field_unit):
+			raise Exception('Field has incorrect units or unitless designation!\n')
+
+		if unit is None:
+			normalized = field_unit.copy(True)
+			return (field_unit._value == 1 and normalized._value == 1
+				and normalized._unit == field_unit._unit)
+		field_unit.asNumber(unit)  # raises if the units are not compatible
+		return (field_unit._value == 1 and unit._value == 1
+			and field_unit._unit == unit._unit)
+
 	def fullArray(self):
 		return self.struct_array
 
@@ -82,6 +146,11 @@ class UnitStructArray(object):
 		else:
 			raise Exception("Can't assign data-type other than unum datatype or list/numpy array!\n")
 
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state.pop('_unit_checks', None)
+		return state
+
 	def __len__(self):
 		return len(self.struct_array)
 